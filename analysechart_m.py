@@ -7,12 +7,24 @@ from datetime import datetime, timedelta
 import pytz
 import json
 import multiprocessing
+import marketstatusstore
+import metrics
+import candlecomponents
+import gridlines
+import incrementalchart
+import chartcache
+import chartcalibration
+import plotarea
+import artifactbundle
 
 # Path configuration
 BASE_INPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
 BASE_OUTPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\processing"
 MARKETS_JSON_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\base.json"
 
+# Written after a successful analysis so charts fetchchart's pipeline already analysed are skipped here
+ANALYSED_MARKER = "analysedchart.json"
+
 # Initialize global credentials as None
 LOGIN_ID = None
 PASSWORD = None
@@ -21,6 +33,9 @@ TERMINAL_PATH = None
 MARKETS = []
 TIMEFRAMES = []
 
+# Pixel-to-price/bar calibration of the chart being processed, set by process_market_timeframe
+CHART_CALIBRATION = None
+
 def normalize_timeframe(timeframe):
     """Normalize timeframe strings to a consistent format."""
     timeframe = timeframe.lower().strip()
@@ -257,78 +272,68 @@ def candletimeleft_5minutes(market, candle_time, min_time_left):
 
 
 def clear_image_and_json_files():
-    """Clear all .png, .jpg, .jpeg, and .json files in all market/timeframe subfolders within BASE_OUTPUT_FOLDER."""
+    """Clear the per-chart artifact bundles, plus any loose .png, .jpg, .jpeg and .json files, in all
+    market/timeframe subfolders within BASE_OUTPUT_FOLDER."""
     try:
         if not os.path.exists(BASE_OUTPUT_FOLDER):
             print(f"Output folder does not exist: {BASE_OUTPUT_FOLDER}")
             return
 
-        # Define the file extensions to delete
-        file_extensions = ('.png', '.jpg', '.jpeg', '.json')
+        # One unlink per chart for the intermediates
+        bundles_removed = artifactbundle.remove_bundles(BASE_OUTPUT_FOLDER)
 
-        # Iterate through each market folder
+        # JSON sidecars, and images written while bundles were disabled
+        file_extensions = ('.png', '.jpg', '.jpeg', '.json')
+        files_removed = 0
         for market in os.listdir(BASE_OUTPUT_FOLDER):
             market_path = os.path.join(BASE_OUTPUT_FOLDER, market)
-            if os.path.isdir(market_path):
-                # Iterate through each timeframe folder within the market folder
-                for timeframe in os.listdir(market_path):
-                    timeframe_path = os.path.join(market_path, timeframe)
-                    if os.path.isdir(timeframe_path):
-                        # Iterate through files in the timeframe folder
-                        for item in os.listdir(timeframe_path):
-                            item_path = os.path.join(timeframe_path, item)
-                            # Check if the item is a file and has a target extension
-                            if os.path.isfile(item_path) and item.lower().endswith(file_extensions):
-                                try:
-                                    os.remove(item_path)
-                                    print(f"Deleted file: {item_path}")
-                                except Exception as e:
-                                    print(f"Error deleting file {item_path}: {e}")
-                            else:
-                                print(f"Skipped non-target file or directory: {item_path}")
-                    else:
-                        print(f"Skipped non-directory: {timeframe_path}")
-            else:
-                print(f"Skipped non-directory: {market_path}")
+            if not os.path.isdir(market_path):
+                continue
+            for timeframe in os.listdir(market_path):
+                timeframe_path = os.path.join(market_path, timeframe)
+                if not os.path.isdir(timeframe_path):
+                    continue
+                for item in os.listdir(timeframe_path):
+                    item_path = os.path.join(timeframe_path, item)
+                    if os.path.isfile(item_path) and item.lower().endswith(file_extensions):
+                        try:
+                            os.remove(item_path)
+                            files_removed += 1
+                        except Exception as e:
+                            print(f"Error deleting file {item_path}: {e}")
+        print(f"Cleared {bundles_removed} artifact bundles and {files_removed} other files in {BASE_OUTPUT_FOLDER}")
 
     except Exception as e:
         print(f"Error clearing output folder {BASE_OUTPUT_FOLDER}: {e}")
 
 def check_market_verification(market):
-    """Check if all timeframes for a market are verified in the market's verification.json file."""
+    """Check if all timeframes for a market are verified in the market status store."""
     try:
-        market_folder_name = market.replace(" ", "_")
-        verification_file = os.path.join(BASE_INPUT_FOLDER, market_folder_name, "verification.json")
-        if not os.path.exists(verification_file):
-            print(f"Verification file not found for {market}: {verification_file}")
-            return False
-        try:
-            with open(verification_file, 'r') as f:
-                verification_data = json.load(f)
-            # Access the "verification" key (Note: Adjusting for actual structure in verification.json)
-            for timeframe in TIMEFRAMES:
-                normalized_tf = normalize_timeframe(timeframe).lower()  # Normalize timeframe for key
-                timeframe_key = timeframe.lower()  # Use original timeframe for verification data key
-                if timeframe_key not in verification_data:
-                    print(f"Timeframe {timeframe} not found in verification data for {market}")
-                    return False
-                if verification_data[timeframe_key] != "chart_identified":
-                    print(f"Verification failed for {market} timeframe {timeframe}: value is '{verification_data[timeframe_key]}', expected 'chart_identified'")
-                    return False
-            print(f"All timeframes verified for market: {market}")
-            return True
-        except Exception as e:
-            print(f"Error reading verification file for {market}: {e}")
+        verification_data = marketstatusstore.get_verification(market)
+        if verification_data is None:
+            print(f"Verification not found for {market}")
             return False
+        for timeframe in TIMEFRAMES:
+            timeframe_key = timeframe.lower()  # Use original timeframe for verification data key
+            if timeframe_key not in verification_data:
+                print(f"Timeframe {timeframe} not found in verification data for {market}")
+                return False
+            if verification_data[timeframe_key] != "chart_identified":
+                print(f"Verification failed for {market} timeframe {timeframe}: value is '{verification_data[timeframe_key]}', expected 'chart_identified'")
+                return False
+        print(f"All timeframes verified for market: {market}")
+        return True
     except Exception as e:
         print(f"Error checking verification for market {market}: {e}")
         return False
 
+@metrics.timed(kind="image")
 def load_latest_chart(input_folder, market_name, timeframe):
-    """Find and load the latest chart image with filename format market_timeframe.png."""
+    """Find and load the latest chart image with filename format market_timeframe.png.
+    Returns (img, base_name, hsv); the decode is shared with fetchchart's verification through chartcache."""
     if not os.path.exists(input_folder):
         print(f"Input folder does not exist: {input_folder}")
-        return None, None
+        return None, None, None
     
     # Normalize timeframe for folder and filename
     normalized_tf = normalize_timeframe(timeframe)
@@ -339,11 +344,11 @@ def load_latest_chart(input_folder, market_name, timeframe):
     
     if os.path.isfile(chart_path):
         print(f"Chart file found: {chart_path}")
-        img = cv2.imread(chart_path)
-        if img is None:
+        chart = chartcache.load_chart(chart_path)
+        if chart is None:
             raise ValueError(f"Failed to load image: {chart_path}")
         base_name = os.path.splitext(os.path.basename(chart_path))[0]
-        return img, base_name
+        return chart["image"], base_name, chart["hsv"]
     
     # Fallback: Search for files containing market_timeframe
     search_pattern = f"{market_name.replace(' ', '_')}_{normalized_tf}"
@@ -356,17 +361,57 @@ def load_latest_chart(input_folder, market_name, timeframe):
     
     if not files:
         print(f"No files found containing '{search_pattern}' in {input_folder}")
-        return None, None
+        return None, None, None
     
     chart_path = max(files, key=os.path.getmtime)
     print(f"Latest chart file found: {chart_path}")
     
-    img = cv2.imread(chart_path)
-    if img is None:
+    chart = chartcache.load_chart(chart_path)
+    if chart is None:
         raise ValueError(f"Failed to load image: {chart_path}")
     
     base_name = os.path.splitext(os.path.basename(chart_path))[0]
-    return img, base_name
+    return chart["image"], base_name, chart["hsv"]
+
+def analysis_signature(market, timeframe):
+    """Content keys of the fetched chart and its candlesamountinbetween.json, the two inputs an analysis depends on.
+    None when the chart is missing."""
+    market_folder_name = market.replace(" ", "_")
+    normalized_tf = normalize_timeframe(timeframe)
+    chart_path = os.path.join(BASE_INPUT_FOLDER, market_folder_name, normalized_tf, f"{market_folder_name}_{normalized_tf}.png")
+    between_path = os.path.join(
+        r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders", market_folder_name, normalized_tf, "candlesamountinbetween.json"
+    )
+    try:
+        with open(chart_path, 'rb') as f:
+            signature = {"chart_key": chartcache.content_key(f.read())}
+    except OSError:
+        return None
+    try:
+        with open(between_path, 'rb') as f:
+            signature["candlesamountinbetween_key"] = chartcache.content_key(f.read())
+    except OSError:
+        signature["candlesamountinbetween_key"] = None
+    return signature
+
+def is_analysed(market, timeframe):
+    """True when the outputs in the processing folder already belong to the current chart and start number."""
+    signature = analysis_signature(market, timeframe)
+    if signature is None:
+        return False
+    marker_path = os.path.join(BASE_OUTPUT_FOLDER, market.replace(" ", "_"), normalize_timeframe(timeframe), ANALYSED_MARKER)
+    try:
+        with open(marker_path, 'r') as f:
+            return json.load(f) == signature
+    except (OSError, ValueError):
+        return False
+
+def skip_analysed_tasks(tasks):
+    """Drop (market, timeframe) tasks whose current chart was already analysed."""
+    analysed = [task for task in tasks if is_analysed(*task)]
+    for market, timeframe in analysed:
+        print(f"Market {market} timeframe {timeframe} already analysed for its current chart, skipping")
+    return [task for task in tasks if task not in analysed]
 
 def crop_image(img, height, width):
     """Crop the image: 200px from left, 30px from bottom, 150px from right."""
@@ -374,9 +419,11 @@ def crop_image(img, height, width):
         raise ValueError(f"Image too small to crop (height: {height}, width: {width})")
     return img[0:height-20, 0:width-100]
 
-def enhance_colors(img):
-    """Convert to HSV and enhance saturation and brightness for red and green pixels."""
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+@metrics.timed(kind="image")
+def enhance_colors(img, hsv=None):
+    """Convert to HSV (unless already given) and enhance saturation and brightness for red and green pixels."""
+    if hsv is None:
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
     red_lower1 = np.array([0, 20, 20])
     red_upper1 = np.array([15, 255, 255])
     red_lower2 = np.array([165, 20, 20])
@@ -421,33 +468,29 @@ def set_background_black(img_enhanced, mask):
     img_enhanced[background_mask > 0] = [0, 0, 0]
     return img_enhanced
 
+@metrics.timed(kind="image")
+def enhance_chart(img, hsv=None):
+    """Colour enhancement steps for a cropped chart (or a strip of it): returns img_enhanced, mask_red, mask_green, mask."""
+    img_enhanced, mask_red, mask_green, mask = enhance_colors(img, hsv)
+    img_enhanced = replace_near_black_wicks(img_enhanced, mask_red, mask_green)
+    img_enhanced = sharpen_image(img_enhanced)
+    img_enhanced = set_background_black(img_enhanced, mask)
+    return img_enhanced, mask_red, mask_green, mask
+
 def save_enhanced_image(img_enhanced, base_name, output_folder):
     """Save the enhanced image."""
     normalized_tf = normalize_timeframe(base_name.split('_')[-1])  # Extract timeframe from base_name
     market_name = '_'.join(base_name.split('_')[:-1])  # Extract market name
     output_folder = os.path.join(BASE_OUTPUT_FOLDER, market_name, normalized_tf)
     os.makedirs(output_folder, exist_ok=True)
-    debug_image_path = os.path.join(output_folder, f"{base_name}_enhanced.png")
-    cv2.imwrite(debug_image_path, img_enhanced)
+    debug_image_path = artifactbundle.save_layer(output_folder, base_name, "enhanced", img_enhanced)
     print(f"Debug enhanced image saved to: {debug_image_path}")
     return debug_image_path
 
-def remove_horizontal_lines(img_enhanced, mask_red, mask_green, width):
-    """Remove horizontal lines from the image."""
-    gray = cv2.cvtColor(img_enhanced, cv2.COLOR_BGR2GRAY)
-    binary = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)[1]
-    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(width * 0.2), 1))
-    horizontal_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
-    
-    contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        aspect_ratio = w / float(h)
-        if w > width * 0.1 and aspect_ratio > 10 and h < 5:
-            cv2.drawContours(img_enhanced, [contour], -1, (0, 0, 0), -1)
-            cv2.drawContours(mask_red, [contour], -1, 0, -1)
-            cv2.drawContours(mask_green, [contour], -1, 0, -1)
-    
+@metrics.timed(kind="image")
+def remove_horizontal_lines(img_enhanced, mask_red, mask_green, width, method=gridlines.DEFAULT_METHOD):
+    """Remove horizontal lines from the image (row-projection detection; method="morphology" for the MORPH_OPEN path)."""
+    gridlines.remove_lines(img_enhanced, mask_red, mask_green, width, method)
     mask = cv2.bitwise_or(mask_red, mask_green)
     return img_enhanced, mask_red, mask_green, mask
 
@@ -531,69 +574,35 @@ def load_candlesamountinbetween(market, timeframe):
             print(f"Error saving loadednumber.json after critical error: {str(save_e)}")
         return start_number
 
+@metrics.timed(kind="image")
 def detect_candlestick_contours(img_enhanced, mask_red, mask_green, start_number):
     """Detect and draw contours for red and green candlesticks, draw one white arrow per unique candlestick position pointing downward to the top with a vertical line to the image top, and collect arrow data for JSON output. Save labelstart.json with start number and any errors."""
     errors = []  # List to store any errors or issues
     try:
         img_contours = img_enhanced.copy()
         height, width = img_contours.shape[:2]
-        contours_red, _ = cv2.findContours(mask_red, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        red_count = 0
-        red_positions = []
-        all_candlestick_positions = []
-
-        for contour in contours_red:
-            area = cv2.contourArea(contour)
-            if area < 0.01:
-                errors.append(f"Skipped red contour with area {area} (below threshold 0.01)")
-                continue
-            red_count += 1
-            x, y, w, h = cv2.boundingRect(contour)
-            center_x = x + w // 2
-            top_y = y
-            bottom_y = y + h
-            red_positions.append((center_x, top_y, bottom_y))
-            all_candlestick_positions.append((center_x, top_y, bottom_y, 'red', contour))
-
-        contours_green, _ = cv2.findContours(mask_green, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        green_count = 0
-        green_positions = []
-
-        for contour in contours_green:
-            area = cv2.contourArea(contour)
-            if area < 0.01:
-                errors.append(f"Skipped green contour with area {area} (below threshold 0.01)")
-                continue
-            green_count += 1
-            x, y, w, h = cv2.boundingRect(contour)
-            center_x = x + w // 2
-            top_y = y
-            bottom_y = y + h
-            green_positions.append((center_x, top_y, bottom_y))
-            all_candlestick_positions.append((center_x, top_y, bottom_y, 'green', contour))
+
+        candles = candlecomponents.extract_candles(mask_red, mask_green)
+        for color in candlecomponents.COLORS:
+            for area in candles["skipped"][color]:
+                errors.append(f"Skipped {color} contour with area {area} (below threshold 0.01)")
+        red_positions = [pos[:3] for pos in candlecomponents.positions(candles, color='red')]
+        green_positions = [pos[:3] for pos in candlecomponents.positions(candles, color='green')]
+        red_count = len(red_positions)
+        green_count = len(green_positions)
 
         # Check if no contours were detected
         if red_count == 0 and green_count == 0:
             errors.append("No valid red or green candlestick contours detected")
 
-        unique_positions = []
-        seen_x = {}
-        for pos in sorted(all_candlestick_positions, key=lambda x: x[0]):
-            center_x, top_y, bottom_y, color, contour = pos
-            if center_x not in seen_x:
-                seen_x[center_x] = pos
-                unique_positions.append(pos)
-            else:
-                existing_pos = seen_x[center_x]
-                existing_contour = existing_pos[4]
-                if cv2.contourArea(contour) > cv2.contourArea(existing_contour):
-                    unique_positions[unique_positions.index(existing_pos)] = pos
-                    seen_x[center_x] = pos
+        # Keep the largest candlestick at each x position
+        unique_indices = candlecomponents.unique_by_x(candles["center_x"], candles["area"])
+        unique_positions = candlecomponents.positions(candles, unique_indices)
 
-        for center_x, top_y, bottom_y, color, contour in unique_positions:
+        for index, (center_x, top_y, bottom_y, color) in zip(unique_indices.tolist(), unique_positions):
             contour_color = (255, 0, 0) if color == 'red' else (255, 255, 255)
             try:
-                cv2.drawContours(img_contours, [contour], -1, contour_color, 1)
+                cv2.drawContours(img_contours, [candles["contours"][index]], -1, contour_color, 1)
                 arrow_start = (center_x, max(0, top_y - 30))
                 arrow_end = (center_x, top_y)
                 cv2.arrowedLine(img_contours, arrow_start, arrow_end, (255, 255, 255), 1, tipLength=0.3)
@@ -603,7 +612,7 @@ def detect_candlestick_contours(img_enhanced, mask_red, mask_green, start_number
 
         arrow_data = []
         arrow_count = 0
-        for i, (center_x, top_y, bottom_y, color, _) in enumerate(reversed(unique_positions[:-1]), start=start_number):
+        for i, (center_x, top_y, bottom_y, color) in enumerate(reversed(unique_positions[:-1]), start=start_number):
             arrow_count += 1
             arrow_data.append({
                 "arrow_number": i,
@@ -650,6 +659,29 @@ def detect_candlestick_contours(img_enhanced, mask_red, mask_green, start_number
             print(f"Error saving labelstart.json after critical error: {str(save_e)}")
         return img_contours, [], [], []  # Return empty data to allow processing to continue
 
+def calibrate_chart(input_folder, output_folder, arrow_data, positions):
+    """Fit the chart's pixel -> price/bar mapping against the candles fetched with it and save calibration.json.
+    Returns the calibration, the capture candles and {arrow number: x} for annotating the contracts."""
+    candles = chartcalibration.load_capture_candles(input_folder)
+    extents = {}
+    for x, top_y, bottom_y in positions:
+        if x in extents:
+            top_y, bottom_y = min(top_y, extents[x][0]), max(bottom_y, extents[x][1])
+        extents[x] = (top_y, bottom_y)
+    calibration = chartcalibration.calibrate(arrow_data, extents, candles)
+    if calibration is None:
+        print(f"No chart calibration for {output_folder}: capture candles missing or too few candles detected")
+    else:
+        print(f"Chart calibration: {calibration['price_per_pixel']:.6g} per pixel, RMS {calibration['price_rms']:.6g}, "
+              f"shift {calibration['alignment_shift']}, {'valid' if calibration['valid'] else 'rejected'}")
+        calibration_json_path = os.path.join(output_folder, chartcalibration.CALIBRATION_FILE)
+        try:
+            with open(calibration_json_path, 'w') as f:
+                json.dump(calibration, f, indent=4)
+        except Exception as e:
+            print(f"Error saving {calibration_json_path}: {str(e)}")
+    return {"calibration": calibration, "candles": candles, "arrow_x": {arrow["arrow_number"]: arrow["x"] for arrow in arrow_data}}
+
 def save_arrow_data_to_json(arrow_data, output_folder):
     """Save the arrow data to a JSON file named after the market in the OUTPUT_FOLDER."""
     normalized_tf = normalize_timeframe(output_folder.split(os.sep)[-1])  # Extract timeframe from output_folder
@@ -671,8 +703,7 @@ def save_contour_image(img_contours, base_name, output_folder):
     market_name = '_'.join(base_name.split('_')[:-1])  # Extract market name
     output_folder = os.path.join(BASE_OUTPUT_FOLDER, market_name, normalized_tf)
     os.makedirs(output_folder, exist_ok=True)
-    contour_image_path = os.path.join(output_folder, f"{base_name}_contours.png")
-    cv2.imwrite(contour_image_path, img_contours)
+    contour_image_path = artifactbundle.save_layer(output_folder, base_name, "contours", img_contours)
     print(f"Original contour image saved to: {contour_image_path}")
     return contour_image_path
 
@@ -733,11 +764,11 @@ def save_connected_contour_image(img_connected_contours, base_name, output_folde
     market_name = '_'.join(base_name.split('_')[:-1])  # Extract market name
     output_folder = os.path.join(BASE_OUTPUT_FOLDER, market_name, normalized_tf)
     os.makedirs(output_folder, exist_ok=True)
-    connected_contour_image_path = os.path.join(output_folder, f"{base_name}_connected_contours.png")
-    cv2.imwrite(connected_contour_image_path, img_connected_contours)
+    connected_contour_image_path = artifactbundle.save_layer(output_folder, base_name, "connected_contours", img_connected_contours)
     print(f"Connected contour image saved to: {connected_contour_image_path}")
     return connected_contour_image_path
 
+@metrics.timed(kind="image")
 def identify_parent_highs_and_lows(img_enhanced, all_positions, base_name, left_required, right_required, arrow_data, output_folder):
     """Identify and label Parent Highs (PH) and Parent Lows (PL) on the enhanced image using arrow numbers."""
     normalized_tf = normalize_timeframe(base_name.split('_')[-1])  # Extract timeframe from base_name
@@ -903,8 +934,7 @@ def identify_parent_highs_and_lows(img_enhanced, all_positions, base_name, left_
     print(f"Identified {pl_count} Parent Lows (PL) with {left_required} left and {right_required} right lows required")
     print(f"Identified {ph_count} Parent Highs (PH) with {left_required} left and {right_required} right highs required")
     
-    parent_labeled_image_path = os.path.join(output_folder, f"{base_name}_parent_highs_lows.png")
-    cv2.imwrite(parent_labeled_image_path, img_parent_labeled)
+    parent_labeled_image_path = artifactbundle.save_layer(output_folder, base_name, "parent_highs_lows", img_parent_labeled)
     print(f"Parent highs and lows labeled image saved to: {parent_labeled_image_path}")
     
     return parent_labeled_image_path, pl_labels, ph_labels
@@ -921,6 +951,7 @@ def controlleftandrighthighsandlows(left, right):
         raise ValueError(f"Invalid input for left or right: {e}")
     
 #TRENDLINE AND DRAWING
+@metrics.timed(kind="image")
 def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, left_required, right_required, 
                                 main_trendline_position, distance_threshold, num_contracts, allow_latest_main_trendline,
                                 pl_labels, ph_labels):
@@ -1974,8 +2005,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
     
     if num_contracts == 0:
         print("Number of contracts set to 0, only PH/PL labels and position numbers drawn")
-        main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-        cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+        main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
         print(f"Parent trendlines image saved to: {main_trendline_image_path}")
         save_contracts_data_to_json(contracts_data)
         return main_trendline_image_path, main_trendline_data
@@ -2092,8 +2122,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
               f"reassigned_orderparent: {main_trendline['receiver']['reassigned_orderparent']}")
     
     # Save the trendline image
-    main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-    cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+    main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
     print(f"Parent trendlines image saved to: {main_trendline_image_path}")
     
     # Save contracts data to JSON
@@ -2119,6 +2148,12 @@ def save_contracts_data_to_json(contracts_data):
     output_folder = os.path.join(BASE_OUTPUT_FOLDER, market_name, normalized_tf)
     os.makedirs(output_folder, exist_ok=True)  # Ensure folder exists
 
+    # Attach the candles each contract refers to, found through the chart calibration
+    if CHART_CALIBRATION is not None:
+        chartcalibration.annotate_contracts(
+            contracts_data, CHART_CALIBRATION["calibration"], CHART_CALIBRATION["candles"], CHART_CALIBRATION["arrow_x"]
+        )
+
     # Save all contracts data
     json_path = os.path.join(output_folder, "contracts.json")
     try:
@@ -2226,18 +2261,17 @@ def main_trendlinetocandleposition(position):
     
     return str(pos)
 
+@metrics.timed()
 def process_5minutes_timeframe():
     """Process markets for the 5-minute (M5) timeframe where verification.json has all timeframes chart_identified, all_timeframes verified, and market is in batchbybatch.json."""
     def check_status_json(market):
-        """Check if the status.json file for a market and M5 timeframe has 'chart_identified' status."""
+        """Check if the stored status for a market and M5 timeframe is 'chart_identified'."""
         try:
             normalized_tf = normalize_timeframe("M5")
-            market_folder_name = market.replace(" ", "_")
-            status_file = os.path.join(BASE_INPUT_FOLDER, market_folder_name, normalized_tf, "status.json")
-            os.makedirs(os.path.dirname(status_file), exist_ok=True)
+            status_data = marketstatusstore.get_status(market, normalized_tf)
             
-            if not os.path.exists(status_file):
-                print(f"Status file not found for {market} timeframe M5: {status_file}. Creating default status.json")
+            if status_data is None:
+                print(f"Status not found for {market} timeframe M5. Creating default status")
                 default_status = {
                     "market": market,
                     "timeframe": "M5",
@@ -2246,11 +2280,8 @@ def process_5minutes_timeframe():
                     "status": "order_free",
                     "elligible_status": "order_free"
                 }
-                with open(status_file, 'w') as f:
-                    json.dump(default_status, f, indent=4)
+                status_data = marketstatusstore.update_status(market, normalized_tf, default_status)
             
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
             status = status_data.get("status", "")
             return status == "chart_identified"
         except Exception as e:
@@ -2258,17 +2289,13 @@ def process_5minutes_timeframe():
             return False
 
     def check_verification_json(market):
-        """Check if verification.json exists and all timeframes are 'chart_identified' with 'all_timeframes' set to 'verified'."""
+        """Check if the market's verification exists and all timeframes are 'chart_identified' with 'all_timeframes' set to 'verified'."""
         try:
-            market_folder_name = market.replace(" ", "_")
-            verification_file = os.path.join(BASE_INPUT_FOLDER, market_folder_name, "verification.json")
-            if not os.path.exists(verification_file):
-                print(f"Verification file not found for {market}: {verification_file}")
+            verification_data = marketstatusstore.get_verification(market)
+            if verification_data is None:
+                print(f"Verification not found for {market}")
                 return False
             
-            with open(verification_file, 'r') as f:
-                verification_data = json.load(f)
-            
             required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
             all_timeframes_valid = all(
                 verification_data.get(tf, "") == "chart_identified" for tf in required_timeframes
@@ -2348,6 +2375,7 @@ def process_5minutes_timeframe():
             print("No markets with valid verification.json, 'chart_identified' status for M5, and in batchbybatch.json found. Exiting.")
             return
         
+        tasks = skip_analysed_tasks(tasks)
         print(f"Processing {len(tasks)} markets for M5 timeframe")
         
         # Use multiprocessing to process valid markets for M5 timeframe in parallel
@@ -2363,6 +2391,7 @@ def process_5minutes_timeframe():
     except Exception as e:
         print(f"Error in process_5minutes_timeframe: {e}")
 
+@metrics.timed(flush_after=True)
 def process_market_timeframe(market, timeframe):
     """Process a single market and timeframe combination."""
     try:
@@ -2374,13 +2403,15 @@ def process_market_timeframe(market, timeframe):
         output_folder = os.path.join(BASE_OUTPUT_FOLDER, market_folder_name, normalized_tf)
         
         # Set global OUTPUT_FOLDER for use in draw_parent_main_trendlines and JSON saving functions
-        global OUTPUT_FOLDER
+        global OUTPUT_FOLDER, CHART_CALIBRATION
         OUTPUT_FOLDER = output_folder
+        CHART_CALIBRATION = None
         
         # Create output folder
         os.makedirs(output_folder, exist_ok=True)
         
         print(f"Processing market: {market}, timeframe: {timeframe}")
+        signature = analysis_signature(market, timeframe)
         
         # MECHANISM CONTROLS
         left_required, right_required = controlleftandrighthighsandlows("1", "1")
@@ -2393,27 +2424,38 @@ def process_market_timeframe(market, timeframe):
         start_number = load_candlesamountinbetween(market, timeframe)
         
         # Load latest chart
-        img, base_name = load_latest_chart(input_folder, market, timeframe)
+        img, base_name, hsv = load_latest_chart(input_folder, market, timeframe)
         if img is None:
             return False
         
         # Get image dimensions
         height, width = img.shape[:2]
         
-        # Crop image
+        # Crop image (and its cached HSV conversion the same way)
         img = crop_image(img, height, width)
-        
-        # Enhance colors
-        img_enhanced, mask_red, mask_green, mask = enhance_colors(img)
-        
-        # Replace near-black wicks
-        img_enhanced = replace_near_black_wicks(img_enhanced, mask_red, mask_green)
-        
-        # Sharpen image
-        img_enhanced = sharpen_image(img_enhanced)
-        
-        # Set background to black
-        img_enhanced = set_background_black(img_enhanced, mask)
+        hsv = crop_image(hsv, height, width)
+        
+        # Keep only the plot area holding the candles; every later step runs on that region
+        roi = plotarea.plot_area(output_folder, hsv)
+        img = np.ascontiguousarray(plotarea.crop(img, roi))
+        hsv = np.ascontiguousarray(plotarea.crop(hsv, roi))
+        
+        # Enhance colors, only at the right edge when the previous cycle's chart lines up
+        cache = incrementalchart.load_cache(output_folder)
+        enhanced = incrementalchart.enhance_incremental(cache, img, start_number, enhance_chart, hsv)
+        checked, unchecked_runs = False, 0
+        if enhanced is not None:
+            checked, unchecked_runs = True, int(cache.get("unchecked_runs", 0)) + 1
+            if incrementalchart.check_due(cache):
+                full = enhance_chart(img, hsv)
+                unchecked_runs = 0
+                if not incrementalchart.matches_full_pass(enhanced, full, lambda *arrays: remove_horizontal_lines(*arrays, width)):
+                    print(f"Incremental analysis for {market} {timeframe} found different candles than a full pass, using the full pass")
+                    enhanced, checked = full, False
+        if enhanced is None:
+            enhanced = enhance_chart(img, hsv)
+        img_enhanced, mask_red, mask_green, mask = enhanced
+        cache_arrays = (img.copy(), img_enhanced.copy(), mask_red.copy(), mask_green.copy())
         
         # Save enhanced image
         save_enhanced_image(img_enhanced, base_name, output_folder)
@@ -2424,6 +2466,14 @@ def process_market_timeframe(market, timeframe):
         # Detect candlestick contours and collect arrow data with start_number
         img_contours, red_positions, green_positions, arrow_data = detect_candlestick_contours(img_enhanced, mask_red, mask_green, start_number)
         
+        # Keep this chart for the next cycle's incremental pass
+        if incrementalchart.ENABLED:
+            incrementalchart.save_cache(output_folder, *cache_arrays, [pos[0] for pos in red_positions + green_positions], start_number,
+                                        checked, unchecked_runs)
+        
+        # Fit pixel -> price/bar against the candles fetched with the chart
+        CHART_CALIBRATION = calibrate_chart(input_folder, output_folder, arrow_data, red_positions + green_positions)
+        
         # Save arrow data to JSON
         save_arrow_data_to_json(arrow_data, output_folder)
         
@@ -2456,25 +2506,32 @@ def process_market_timeframe(market, timeframe):
             ph_labels=ph_labels
         )
         
+        if signature is not None:
+            with open(os.path.join(output_folder, ANALYSED_MARKER), 'w') as f:
+                json.dump(signature, f, indent=4)
+        
+        # One bundle write for all of this chart's intermediate images
+        artifactbundle.flush()
+        
         print(f"Completed processing market: {market}, timeframe: {timeframe}")
         return True
     
     except Exception as e:
         print(f"Error processing market {market} timeframe {timeframe}: {e}")
+        artifactbundle.flush()
         return False
 
+@metrics.timed()
 def main():
     def check_status_json(market, timeframe):
-        """Check if the status.json file for a market and timeframe has 'chart_identified' status.
-        Create a default status.json if it doesn't exist."""
+        """Check if the stored status for a market and timeframe is 'chart_identified'.
+        Create a default status if it doesn't exist."""
         try:
             normalized_tf = normalize_timeframe(timeframe)
-            market_folder_name = market.replace(" ", "_")
-            status_file = os.path.join(BASE_INPUT_FOLDER, market_folder_name, normalized_tf, "status.json")
-            os.makedirs(os.path.dirname(status_file), exist_ok=True)
+            status_data = marketstatusstore.get_status(market, normalized_tf)
             
-            if not os.path.exists(status_file):
-                print(f"Status file not found for {market} timeframe {timeframe}: {status_file}. Creating default status.json")
+            if status_data is None:
+                print(f"Status not found for {market} timeframe {timeframe}. Creating default status")
                 default_status = {
                     "market": market,
                     "timeframe": timeframe,
@@ -2483,11 +2540,8 @@ def main():
                     "status": "order_free",
                     "elligible_status": "order_free"
                 }
-                with open(status_file, 'w') as f:
-                    json.dump(default_status, f, indent=4)
+                status_data = marketstatusstore.update_status(market, normalized_tf, default_status)
             
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
             status = status_data.get("status", "")
             return status == "chart_identified"
         except Exception as e:
@@ -2495,17 +2549,13 @@ def main():
             return False
 
     def check_verification_json(market):
-        """Check if verification.json exists and all timeframes are 'chart_identified' with 'all_timeframes' set to 'verified'."""
+        """Check if the market's verification exists and all timeframes are 'chart_identified' with 'all_timeframes' set to 'verified'."""
         try:
-            market_folder_name = market.replace(" ", "_")
-            verification_file = os.path.join(BASE_INPUT_FOLDER, market_folder_name, "verification.json")
-            if not os.path.exists(verification_file):
-                print(f"Verification file not found for {market}: {verification_file}")
+            verification_data = marketstatusstore.get_verification(market)
+            if verification_data is None:
+                print(f"Verification not found for {market}")
                 return False
             
-            with open(verification_file, 'r') as f:
-                verification_data = json.load(f)
-            
             required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
             all_timeframes_valid = all(
                 verification_data.get(tf, "") == "chart_identified" for tf in required_timeframes
@@ -2592,6 +2642,7 @@ def main():
                 print("No market-timeframe combinations with valid verification.json, 'chart_identified' status, and in batchbybatch.json found. Exiting.")
                 return
             
+            tasks = skip_analysed_tasks(tasks)
             print(f"Processing {len(tasks)} market-timeframe combinations with valid verification.json and 'chart_identified' status")
             
             # Save non-verified markets to nonverifiedmarkets.json
@@ -0,0 +1,129 @@
+import glob
+import json
+import os
+import sys
+import cv2
+import numpy as np
+
+# Intermediate images of a chart go into one <base_name>.bundle.npz in its output folder, written once per chart,
+# instead of a PNG per step. With ENABLED = False every layer is written as its own PNG again.
+ENABLED = True
+BUNDLE_SUFFIX = ".bundle.npz"
+
+# Layers are stored PNG-encoded at a low zlib level: lossless, far smaller than raw arrays, quick to write
+PNG_COMPRESSION = 1
+
+# Separates the bundle path from the layer name in the references save_layer returns
+LAYER_SEPARATOR = "::"
+
+# Layers queued for bundles that have not been flushed yet, by bundle path
+_pending = {}
+
+
+def bundle_path(output_folder, base_name):
+    return os.path.join(output_folder, f"{base_name}{BUNDLE_SUFFIX}")
+
+
+def save_layer(output_folder, base_name, name, img):
+    """Queue an image layer for the chart's bundle (written by flush) and return its reference, '<bundle>::<name>'."""
+    if not ENABLED:
+        image_path = os.path.join(output_folder, f"{base_name}_{name}.png")
+        cv2.imwrite(image_path, img)
+        return image_path
+    path = bundle_path(output_folder, base_name)
+    _pending.setdefault(path, {})[name] = img.copy()
+    return f"{path}{LAYER_SEPARATOR}{name}"
+
+
+def load_layer(reference):
+    """Image for a save_layer reference (from the pending layers or the bundle on disk), or a plain image path."""
+    if LAYER_SEPARATOR not in reference:
+        return cv2.imread(reference)
+    path, name = reference.split(LAYER_SEPARATOR, 1)
+    if name in _pending.get(path, {}):
+        return _pending[path][name].copy()
+    with np.load(path) as bundle:
+        key = f"layer_{name}"
+        if key not in bundle.files:
+            return None
+        return cv2.imdecode(bundle[key], cv2.IMREAD_COLOR)
+
+
+def flush(path=None):
+    """Write the pending bundles (or just the one at path) together with the JSON sidecars next to them."""
+    paths = [path] if path is not None else list(_pending)
+    written = []
+    for bundle in paths:
+        layers = _pending.pop(bundle, None)
+        if not layers:
+            continue
+        arrays = {}
+        for name, img in layers.items():
+            ok, encoded = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+            if ok:
+                arrays[f"layer_{name}"] = encoded
+        # Downstream stages read the JSON files themselves; the bundle keeps a copy so it is a complete record
+        for json_path in glob.glob(os.path.join(os.path.dirname(bundle), "*.json")):
+            with open(json_path, 'rb') as f:
+                arrays[f"json_{os.path.basename(json_path)}"] = np.frombuffer(f.read(), dtype=np.uint8)
+        try:
+            temp_path = f"{bundle}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, bundle)
+            written.append(bundle)
+        except Exception as e:
+            print(f"Error writing artifact bundle {bundle}: {str(e)}")
+    return written
+
+
+def list_layers(path):
+    """(image layer names, JSON sidecar names) stored in a bundle."""
+    with np.load(path) as bundle:
+        layers = [key[len("layer_"):] for key in bundle.files if key.startswith("layer_")]
+        sidecars = [key[len("json_"):] for key in bundle.files if key.startswith("json_")]
+    return layers, sidecars
+
+
+def load_json(path, name):
+    with np.load(path) as bundle:
+        return json.loads(bundle[f"json_{name}"].tobytes().decode("utf-8"))
+
+
+def remove_bundles(folder):
+    """Delete every bundle under folder, one unlink per chart; returns how many were removed."""
+    removed = 0
+    for path in glob.glob(os.path.join(folder, "**", f"*{BUNDLE_SUFFIX}"), recursive=True):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"Error deleting bundle {path}: {e}")
+    return removed
+
+
+if __name__ == "__main__":
+    # python artifactbundle.py <bundle> [layer or sidecar.json] [output.png]
+    #   no name: list the layers and sidecars; a layer: show it (or write it to output.png); a sidecar: print it
+    if len(sys.argv) < 2:
+        print("Usage: python artifactbundle.py <bundle> [layer or sidecar.json] [output.png]")
+        sys.exit(1)
+    path = sys.argv[1]
+    layers, sidecars = list_layers(path)
+    if len(sys.argv) == 2:
+        print(f"Layers: {', '.join(layers) or 'none'}")
+        print(f"JSON sidecars: {', '.join(sidecars) or 'none'}")
+    elif sys.argv[2] in sidecars:
+        print(json.dumps(load_json(path, sys.argv[2]), indent=4))
+    elif sys.argv[2] in layers:
+        img = load_layer(f"{path}{LAYER_SEPARATOR}{sys.argv[2]}")
+        if len(sys.argv) > 3:
+            cv2.imwrite(sys.argv[3], img)
+            print(f"Layer {sys.argv[2]} written to {sys.argv[3]}")
+        else:
+            cv2.imshow(sys.argv[2], img)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
+    else:
+        print(f"No layer or sidecar named {sys.argv[2]} in {path}")
+        sys.exit(1)
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Readers on Windows (the web pages, other programmes) can hold the target open for a moment
+REPLACE_RETRIES = 10
+REPLACE_RETRY_DELAY = 0.05
+
+
+def write_json_atomic(path, data, indent=4):
+    """Write data to path through a temp file in the same folder and os.replace, so readers never see a partial file."""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(temp_path, path)
+                return path
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_DELAY)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on '<path>.lock' across processes for the duration of the block."""
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, 'a+') as lock_file:
+        if os.name == "nt":
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds; keep waiting like flock does
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
@@ -4,6 +4,7 @@ import numpy as np
 import shutil
 import json
 import multiprocessing
+import artifactbundle
 
 # Path configuration
 BASE_INPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\bouncestream\chart\fetched"
@@ -131,8 +132,7 @@ def set_background_black(img_enhanced, mask):
 
 def save_enhanced_image(img_enhanced, base_name, output_folder):
     """Save the enhanced image."""
-    debug_image_path = os.path.join(output_folder, f"{base_name}_enhanced.png")
-    cv2.imwrite(debug_image_path, img_enhanced)
+    debug_image_path = artifactbundle.save_layer(output_folder, base_name, "enhanced", img_enhanced)
     print(f"Debug enhanced image saved to: {debug_image_path}")
     return debug_image_path
 
@@ -241,8 +241,7 @@ def save_arrow_data_to_json(arrow_data, output_folder):
 
 def save_contour_image(img_contours, base_name, output_folder):
     """Save the contour image."""
-    contour_image_path = os.path.join(output_folder, f"{base_name}_contours.png")
-    cv2.imwrite(contour_image_path, img_contours)
+    contour_image_path = artifactbundle.save_layer(output_folder, base_name, "contours", img_contours)
     print(f"Original contour image saved to: {contour_image_path}")
     return contour_image_path
 
@@ -299,8 +298,7 @@ def connect_contours(img_contours, red_positions, green_positions):
 
 def save_connected_contour_image(img_connected_contours, base_name, output_folder):
     """Save the connected contour image."""
-    connected_contour_image_path = os.path.join(output_folder, f"{base_name}_connected_contours.png")
-    cv2.imwrite(connected_contour_image_path, img_connected_contours)
+    connected_contour_image_path = artifactbundle.save_layer(output_folder, base_name, "connected_contours", img_connected_contours)
     print(f"Connected contour image saved to: {connected_contour_image_path}")
     return connected_contour_image_path
 
@@ -420,8 +418,7 @@ def identify_parent_highs_and_lows(img_enhanced, all_positions, base_name, left_
     print(f"Identified {pl_count} Parent Lows (PL) with {left_required} left and {right_required} right lows required")
     print(f"Identified {ph_count} Parent Highs (PH) with {left_required} left and {right_required} right highs required")
     
-    parent_labeled_image_path = os.path.join(output_folder, f"{base_name}_parent_highs_lows.png")
-    cv2.imwrite(parent_labeled_image_path, img_parent_labeled)
+    parent_labeled_image_path = artifactbundle.save_layer(output_folder, base_name, "parent_highs_lows", img_parent_labeled)
     print(f"Parent highs and lows labeled image saved to: {parent_labeled_image_path}")
     
     return parent_labeled_image_path, pl_labels, ph_labels
@@ -1064,8 +1061,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
     
     if num_contracts == 0:
         print("Number of contracts set to 0, only position numbers drawn")
-        main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-        cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+        main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
         print(f"Parent main_trendlines image saved to: {main_trendline_image_path}")
         save_main_trendline_data_to_json(main_trendline_data)
         save_contracts_data_to_json(contracts_data)
@@ -1195,8 +1191,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
         print(f"Contracts data - order_status={contracts_entry['receiver']['order_status']}, "
               f"stoploss_status={contracts_entry['receiver']['stoploss_status']}")
     
-    main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-    cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+    main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
     print(f"Parent main_trendlines image saved to: {main_trendline_image_path}")
     
     save_main_trendline_data_to_json(main_trendline_data)
@@ -1358,11 +1353,13 @@ def process_market_timeframe(market, timeframe):
             ph_labels=ph_labels
         )
         
+        artifactbundle.flush()
         print(f"Completed processing market: {market}, timeframe: {timeframe}")
         return True
     
     except Exception as e:
         print(f"Error processing market {market} timeframe {timeframe}: {e}")
+        artifactbundle.flush()
         return False
 
 def main():
@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 import shutil
 import json
+import artifactbundle
 
 # Path configuration
 BASE_INPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\bouncestream\chart\fetched"
@@ -121,8 +122,7 @@ def set_background_black(img_enhanced, mask):
 
 def save_enhanced_image(img_enhanced, base_name):
     """Save the enhanced image."""
-    debug_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_enhanced.png")
-    cv2.imwrite(debug_image_path, img_enhanced)
+    debug_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "enhanced", img_enhanced)
     print(f"Debug enhanced image saved to: {debug_image_path}")
     return debug_image_path
 
@@ -251,8 +251,7 @@ def save_arrow_data_to_json(arrow_data):
 
 def save_contour_image(img_contours, base_name):
     """Save the contour image."""
-    contour_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_contours.png")
-    cv2.imwrite(contour_image_path, img_contours)
+    contour_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "contours", img_contours)
     print(f"Original contour image saved to: {contour_image_path}")
     return contour_image_path
 
@@ -309,8 +308,7 @@ def connect_contours(img_contours, red_positions, green_positions):
 
 def save_connected_contour_image(img_connected_contours, base_name):
     """Save the connected contour image."""
-    connected_contour_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_connected_contours.png")
-    cv2.imwrite(connected_contour_image_path, img_connected_contours)
+    connected_contour_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "connected_contours", img_connected_contours)
     print(f"Connected contour image saved to: {connected_contour_image_path}")
     return connected_contour_image_path
 
@@ -466,8 +464,7 @@ def identify_parent_highs_and_lows(img_enhanced, all_positions, base_name, left_
     print(f"Identified {ph_count} Parent Highs (PH) with {left_required} left and {right_required} right highs required")
     
     # Save the labeled image
-    parent_labeled_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_highs_lows.png")
-    cv2.imwrite(parent_labeled_image_path, img_parent_labeled)
+    parent_labeled_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_highs_lows", img_parent_labeled)
     print(f"Parent highs and lows labeled image saved to: {parent_labeled_image_path}")
     
     return parent_labeled_image_path, pl_labels, ph_labels
@@ -1399,8 +1396,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
     
     if num_contracts == 0:
         print("Number of contracts set to 0, only position numbers drawn")
-        main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-        cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+        main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
         print(f"Parent trendlines image saved to: {main_trendline_image_path}")
         save_contracts_data_to_json(contracts_data)
         return main_trendline_image_path, main_trendline_data
@@ -1489,8 +1485,7 @@ def draw_parent_main_trendlines(img_parent_labeled, all_positions, base_name, le
               f"order_parent: {main_trendline['receiver']['order_parent']}")
     
     # Save the trendline image
-    main_trendline_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_parent_main_trendlines.png")
-    cv2.imwrite(main_trendline_image_path, img_main_trendlines)
+    main_trendline_image_path = artifactbundle.save_layer(OUTPUT_FOLDER, base_name, "parent_main_trendlines", img_main_trendlines)
     print(f"Parent trendlines image saved to: {main_trendline_image_path}")
     
     # Save contracts data to JSON
@@ -1685,7 +1680,7 @@ def main():
         parent_labeled_image_path, pl_labels, ph_labels = identify_parent_highs_and_lows(
             img_enhanced, all_positions, base_name, left_required, right_required, arrow_data
         )
-        img_parent_labeled = cv2.imread(parent_labeled_image_path)
+        img_parent_labeled = artifactbundle.load_layer(parent_labeled_image_path)
         
         # Draw main_trendlines between Parent Highs and Lows and collect main_trendline data
         main_trendline_image_path, main_trendline_data = draw_parent_main_trendlines(
@@ -1701,6 +1696,8 @@ def main():
         
     except Exception as e:
         print(f"Error processing image: {e}")
+    finally:
+        artifactbundle.flush()
 if __name__ == "__main__":
     main()
     
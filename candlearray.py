@@ -0,0 +1,114 @@
+import math
+import numbers
+from datetime import datetime, timezone
+import numpy as np
+
+# Field names used by candle_data.json / pricecandle.json entries
+CANDLE_FIELDS = ("Time", "Open", "High", "Low", "Close")
+
+
+def format_time(epoch):
+    """'YYYY-mm-dd HH:MM:SS' for an MT5 bar time, as str(pd.to_datetime(t, unit='s')) prints it."""
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_time(time_str):
+    return int(datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+
+
+def is_position(value):
+    """True for a usable position number: any real number, NumPy scalars included (not None, labels or NaN)."""
+    return isinstance(value, numbers.Real) and math.isfinite(value)
+
+
+class CandleArray:
+    """Closed candles held as NumPy columns, oldest first, addressed by position number.
+
+    Position 1 is the most recent completed candle and position len(self) the oldest, the same
+    numbering candle_data.json uses for its 'Candle_<position>' keys.
+    """
+
+    def __init__(self, time, open_, high, low, close):
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open_, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.close = np.asarray(close, dtype=float)
+
+    @classmethod
+    def from_rates(cls, rates):
+        """Build from the structured array returned by mt5.copy_rates_from_pos(symbol, tf, 1, count)."""
+        return cls(rates['time'], rates['open'], rates['high'], rates['low'], rates['close'])
+
+    @classmethod
+    def from_candle_data(cls, candle_data):
+        """Build from a candle_data.json dict ({'Candle_1': {...}, ...}), e.g. when resuming from disk."""
+        count = len(candle_data)
+        columns = {field: [None] * count for field in CANDLE_FIELDS}
+        for key, candle in candle_data.items():
+            index = count - int(key.split("_", 1)[1])
+            columns["Time"][index] = parse_time(candle["Time"])
+            for field in CANDLE_FIELDS[1:]:
+                columns[field][index] = candle[field]
+        return cls(columns["Time"], columns["Open"], columns["High"], columns["Low"], columns["Close"])
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def positions(self):
+        return len(self) - np.arange(len(self))
+
+    def indices(self, positions):
+        """Array indices for the given position numbers (a list or a NumPy array); -1 where a position is not held."""
+        positions = np.asarray([int(p) if is_position(p) else 0 for p in np.asarray(positions, dtype=object).ravel()], dtype=np.int64)
+        indices = len(self) - positions
+        indices[(positions < 1) | (positions > len(self))] = -1
+        return indices
+
+    def gather(self, positions):
+        """Resolve many position numbers at once into {position: candle dict} for the positions held."""
+        positions = list(dict.fromkeys(int(p) for p in np.asarray(positions, dtype=object).ravel() if is_position(p)))
+        indices = self.indices(positions)
+        found = indices >= 0
+        gathered = {}
+        if not found.any():
+            return gathered
+        selected = indices[found]
+        rows = zip(
+            np.asarray(positions)[found].tolist(), self.time[selected].tolist(), self.open[selected].tolist(),
+            self.high[selected].tolist(), self.low[selected].tolist(), self.close[selected].tolist()
+        )
+        for position, t, o, h, l, c in rows:
+            gathered[position] = {"Time": format_time(t), "Open": o, "High": h, "Low": l, "Close": c}
+        return gathered
+
+    def window(self, start_pos, end_pos=1):
+        """View of the candles from position start_pos down to end_pos (oldest first), or None if not all held."""
+        if start_pos > len(self) or end_pos < 1 or start_pos < end_pos:
+            return None
+        start, stop = len(self) - start_pos, len(self) - end_pos + 1
+        return CandleArray(self.time[start:stop], self.open[start:stop], self.high[start:stop],
+                           self.low[start:stop], self.close[start:stop])
+
+    def to_columns(self):
+        """Compact column form for JSON output: positions, epoch times and OHLC as parallel lists."""
+        return {
+            "position_number": self.positions.tolist(),
+            "time": self.time.tolist(),
+            "open": self.open.tolist(),
+            "high": self.high.tolist(),
+            "low": self.low.tolist(),
+            "close": self.close.tolist()
+        }
+
+    def to_candle_data(self):
+        """The candle_data.json dict ({'Candle_<position>': {...}}) for these candles."""
+        count = len(self)
+        times, opens, highs, lows, closes = (self.time.tolist(), self.open.tolist(), self.high.tolist(),
+                                             self.low.tolist(), self.close.tolist())
+        return {
+            f"Candle_{count - i}": {"Time": format_time(times[i]), "Open": opens[i], "High": highs[i],
+                                    "Low": lows[i], "Close": closes[i]}
+            for i in range(count)
+        }
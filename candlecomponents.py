@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+COLORS = ("red", "green")
+
+
+def extract_candles(mask_red, mask_green):
+    """Candlestick contours of the red and green masks, with their boxes and areas as parallel arrays.
+
+    Contours with a contourArea below 0.01 (one pixel wide or high) are skipped; their areas are listed
+    under "skipped" per color. "contours" holds the kept contours in the same order as the arrays.
+    """
+    result = {"contours": [], "skipped": {}}
+    columns = {"center_x": [], "top_y": [], "bottom_y": [], "color": [], "area": []}
+    for color_index, (color, mask) in enumerate(zip(COLORS, (mask_red, mask_green))):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        result["skipped"][color] = []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < 0.01:
+                result["skipped"][color].append(area)
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            result["contours"].append(contour)
+            columns["center_x"].append(x + w // 2)
+            columns["top_y"].append(y)
+            columns["bottom_y"].append(y + h)
+            columns["color"].append(color_index)
+            columns["area"].append(area)
+    for name, values in columns.items():
+        result[name] = np.array(values, dtype=np.float64 if name == "area" else np.int64)
+    return result
+
+
+def unique_by_x(center_x, area):
+    """Indices of the largest contour at each center_x (the earliest on ties), ordered by x."""
+    order = np.lexsort((np.arange(len(center_x)), -area, center_x))
+    _, first = np.unique(center_x[order], return_index=True)
+    return order[first]
+
+
+def positions(candles, indices=None, color=None):
+    """(center_x, top_y, bottom_y, color) tuples for the given contour indices, optionally of one color only."""
+    if indices is None:
+        indices = np.arange(len(candles["center_x"]))
+    if color is not None:
+        indices = indices[candles["color"][indices] == COLORS.index(color)]
+    return [
+        (cx, top, bottom, COLORS[c]) for cx, top, bottom, c in zip(
+            candles["center_x"][indices].tolist(), candles["top_y"][indices].tolist(),
+            candles["bottom_y"][indices].tolist(), candles["color"][indices].tolist()
+        )
+    ]
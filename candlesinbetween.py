@@ -0,0 +1,54 @@
+import os
+from datetime import datetime, timezone
+from atomicjson import write_json_atomic
+
+# updateorders' per market/timeframe folder, where analysechart_m reads candlesamountinbetween.json
+ORDERS_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders"
+FILE_NAME = "candlesamountinbetween.json"
+
+TIMEFRAME_MINUTES = {"M5": 5, "M15": 15, "M30": 30, "H1": 60, "H4": 240}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def inbetween_data(market, timeframe, newmostrecent, matched_candle):
+    """candlesamountinbetween.json contents for a new most recent completed candle ({'time', 'high_price', 'low_price'})
+    and the chart's matched candle ({'timestamp', 'high', 'low'}). Raises ValueError on a malformed timestamp."""
+    newmostrecent_time = datetime.strptime(newmostrecent['time'], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    matched_time = datetime.strptime(matched_candle['timestamp'], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    time_diff = (newmostrecent_time - matched_time).total_seconds()
+    candles_inbetween = int(abs(time_diff) / (TIMEFRAME_MINUTES.get(timeframe, 5) * 60))
+    plusmostrecent = candles_inbetween + 1
+    return {
+        "market": market,
+        "timeframe": timeframe,
+        "candles in between": str(candles_inbetween),
+        "plus_newmostrecent": str(plusmostrecent),
+        "new number position for matched candle data": str(plusmostrecent),
+        "new most recent": {
+            "timestamp newmostrecent": newmostrecent['time'],
+            "newmostrecent high": float(newmostrecent.get('high_price', 0)),
+            "newmostrecent low": float(newmostrecent.get('low_price', 0))
+        },
+        "matched candle data": {
+            "timestamp of matched candledata": matched_candle['timestamp'],
+            "matched candledata high": float(matched_candle.get('high', 0)),
+            "matched candledata low": float(matched_candle.get('low', 0))
+        }
+    }
+
+
+def refresh_for_chart(market, timeframe, mostrecent_completedcandle):
+    """Write candlesamountinbetween.json for a chart analysed as soon as it is captured. The chart's own most recent
+    completed candle (fetchchart's mostrecent_completedcandle.json) is then both the matched candle and the new most
+    recent one, which is what updateorders computes when no candle closed in between. Returns the path written."""
+    candle_time = datetime.fromisoformat(mostrecent_completedcandle['time'].replace('Z', '+00:00'))
+    timestamp = candle_time.astimezone(timezone.utc).strftime(TIME_FORMAT)
+    high, low = float(mostrecent_completedcandle['high_price']), float(mostrecent_completedcandle['low_price'])
+    # updateorders writes base.json's upper-case timeframe; fetchchart passes the normalised lower-case one
+    data = inbetween_data(
+        market, timeframe.upper(),
+        {"time": timestamp, "high_price": high, "low_price": low},
+        {"timestamp": timestamp, "high": high, "low": low}
+    )
+    path = os.path.join(ORDERS_FOLDER, market.replace(" ", "_"), timeframe.lower(), FILE_NAME)
+    return write_json_atomic(path, data)
@@ -0,0 +1,56 @@
+import hashlib
+import cv2
+import numpy as np
+
+# Decoded charts shared between fetchchart verification and analysechart in this process, keyed by the
+# PNG's content hash. Memory only: a decoded frame and its HSV take about 12 MB, and writing and reading
+# that back from disk costs as much as decoding the PNG again.
+ENABLED = True
+
+# The last few charts used by this process
+_memory = {}
+_MEMORY_ENTRIES = 4
+
+
+def content_key(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _remember(key, entry):
+    _memory[key] = entry
+    while len(_memory) > _MEMORY_ENTRIES:
+        _memory.pop(next(iter(_memory)))
+    return entry
+
+
+def decode_bytes(data):
+    """Decoded chart for encoded image bytes: {'key', 'image' (BGR), 'hsv'}, or None if the bytes do not decode.
+    The arrays are shared with every other caller of the same chart and are read-only; copy before drawing on them."""
+    key = content_key(data)
+    if key in _memory:
+        return _memory[key]
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    image.setflags(write=False)
+    hsv.setflags(write=False)
+    entry = {"key": key, "image": image, "hsv": hsv}
+    return _remember(key, entry) if ENABLED else entry
+
+
+def load_chart(image_path):
+    """Decoded chart of an image file (see decode_bytes), or None if it cannot be read."""
+    try:
+        with open(image_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    return decode_bytes(data)
+
+
+def in_range(entry, lower, upper, region=None):
+    """cv2.inRange over the cached HSV image (optionally a (row slice, column slice) region of it)."""
+    hsv = entry["hsv"] if region is None else entry["hsv"][region]
+    return cv2.inRange(hsv, np.array(lower), np.array(upper))
@@ -0,0 +1,171 @@
+import json
+import os
+import numpy as np
+from candlearray import CandleArray, format_time
+
+# Closed candles fetchchart fetches together with each chart, saved next to the chart
+CAPTURE_CANDLES_FILE = "capturecandles.json"
+CAPTURE_CANDLE_COUNT = 300
+
+# Fitted pixel-to-price/bar mapping, saved with the other analysechart outputs
+CALIBRATION_FILE = "calibration.json"
+
+# Chart candles and fetched bars may be off by a candle or two (a missed doji, a bar closing during capture)
+MAX_ALIGNMENT_SHIFT = 2
+
+# Fewer aligned candles than this are not enough for a fit
+MIN_SAMPLES = 10
+
+# Points further than this many median absolute deviations from the first fit are dropped before refitting
+OUTLIER_FACTOR = 3.0
+
+# A fit is trusted when its RMS residual stays under this fraction of the visible price range
+MAX_RELATIVE_RESIDUAL = 0.01
+
+
+def save_capture_candles(folder, rates):
+    """Write the closed candles fetched with a chart (mt5.copy_rates_from_pos(symbol, tf, 1, count)) next to it."""
+    with open(os.path.join(folder, CAPTURE_CANDLES_FILE), 'w') as f:
+        json.dump(CandleArray.from_rates(rates).to_columns(), f)
+
+
+def load_capture_candles(folder):
+    """CandleArray of the candles fetched with the chart in folder, or None."""
+    path = os.path.join(folder, CAPTURE_CANDLES_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            columns = json.load(f)
+        return CandleArray(columns["time"], columns["open"], columns["high"], columns["low"], columns["close"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading capture candles {path}: {str(e)}")
+        return None
+
+
+def fit_line(x, y):
+    """Least-squares y = slope * x + intercept, refitted once without outliers.
+    Returns (slope, intercept, rms residual, points used)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.ones(len(x), dtype=bool)
+    for refit in (False, True):
+        design = np.column_stack([x[keep], np.ones(int(keep.sum()))])
+        (slope, intercept), *_ = np.linalg.lstsq(design, y[keep], rcond=None)
+        residual = y - (slope * x + intercept)
+        deviation = np.median(np.abs(residual[keep]))
+        inliers = np.abs(residual) <= OUTLIER_FACTOR * deviation
+        if refit or deviation == 0 or inliers.sum() < MIN_SAMPLES or inliers.all():
+            break
+        keep = inliers
+    rms = float(np.sqrt(np.mean(residual[keep] ** 2)))
+    return float(slope), float(intercept), rms, int(keep.sum())
+
+
+def calibrate(arrow_data, extents, candles):
+    """Fit the chart's y-pixel -> price and x-pixel -> bar mappings against the candles fetched with it.
+
+    arrow_data are analysechart's arrows (one per completed candle), extents maps a candle's center x to its
+    (top_y, bottom_y) and candles is the CandleArray from load_capture_candles. Candle tops are fitted against
+    highs and bottoms against lows, trying each alignment within MAX_ALIGNMENT_SHIFT and keeping the best.
+    Returns the calibration dict, or None when there is not enough to fit.
+    """
+    if candles is None:
+        return None
+    # Rightmost completed candle first, i.e. capture position 1 when the chart and bars line up
+    xs = np.array(sorted((arrow["x"] for arrow in arrow_data if arrow["x"] in extents), reverse=True))
+    if len(xs) < MIN_SAMPLES:
+        return None
+    tops = np.array([extents[x][0] for x in xs.tolist()], dtype=float)
+    bottoms = np.array([extents[x][1] for x in xs.tolist()], dtype=float)
+    offsets = np.arange(len(xs))
+
+    best = None
+    for shift in range(-MAX_ALIGNMENT_SHIFT, MAX_ALIGNMENT_SHIFT + 1):
+        positions = offsets + 1 + shift
+        held = (positions >= 1) & (positions <= len(candles))
+        if held.sum() < MIN_SAMPLES:
+            continue
+        indices = candles.indices(positions[held].tolist())
+        highs, lows = candles.high[indices], candles.low[indices]
+        slope, intercept, rms, used = fit_line(np.concatenate([tops[held], bottoms[held]]), np.concatenate([highs, lows]))
+        if best is None or rms < best["price_rms"]:
+            best = {
+                "alignment_shift": shift,
+                "price_per_pixel": slope,
+                "price_at_y0": intercept,
+                "price_rms": rms,
+                "price_range": float(highs.max() - lows.min()),
+                "samples": used
+            }
+    if best is None:
+        return None
+
+    # Screen y grows downwards, so prices must fall as y grows
+    best["valid"] = best["price_per_pixel"] < 0 and best["price_rms"] <= MAX_RELATIVE_RESIDUAL * best["price_range"]
+    bar_slope, bar_intercept, _, _ = fit_line(xs, offsets + 1 + best["alignment_shift"])
+    best["position_per_pixel"] = bar_slope
+    best["position_at_x0"] = bar_intercept
+    best["anchor_time"] = format_time(candles.time[-1])
+    best["x_positions"] = {str(x): int(offset + 1 + best["alignment_shift"]) for x, offset in zip(xs.tolist(), offsets.tolist())}
+    return best
+
+
+def price_at_y(calibration, y):
+    return calibration["price_per_pixel"] * y + calibration["price_at_y0"]
+
+
+def position_at_x(calibration, x):
+    """Capture position of the bar at pixel column x (1 = last bar closed at capture, 0 and below = later bars)."""
+    exact = calibration["x_positions"].get(str(x))
+    if exact is not None:
+        return exact
+    return int(round(calibration["position_per_pixel"] * x + calibration["position_at_x0"]))
+
+
+def annotate_contracts(contracts_data, calibration, candles, arrow_x):
+    """Add 'calibrated_candles' ({position number: candle}) to each contract for every position it references:
+    sender, receiver, order holder and Breakout_parent with the candle right after it.
+
+    arrow_x maps arrow numbers to candle x, so the candles are found by where they sit on the chart rather than
+    by position numbers that have to be kept in step with the broker. Each contract gets 'calibration_valid';
+    without a valid calibration it is False and no calibrated candles are attached.
+    """
+    if not calibration or not calibration.get("valid") or candles is None:
+        for entry in contracts_data:
+            entry.pop("calibrated_candles", None)
+            entry["calibration_valid"] = False
+        return contracts_data
+
+    def label_position(label):
+        if not label or label in ("invalid", "none"):
+            return None
+        try:
+            return int(label.replace(" order holder", "")[2:])
+        except ValueError:
+            return None
+
+    for entry in contracts_data:
+        receiver = entry.get("receiver", {})
+        breakout_parent = label_position(receiver.get("Breakout_parent"))
+        referenced = [
+            entry.get("sender", {}).get("position_number"),
+            receiver.get("position_number"),
+            label_position(receiver.get("order_parent")),
+            label_position(receiver.get("actual_orderparent")),
+            label_position(receiver.get("reassigned_orderparent")),
+            breakout_parent,
+            breakout_parent - 1 if breakout_parent is not None else None
+        ]
+        capture_positions = {}
+        for position in referenced:
+            if position is None or position not in arrow_x:
+                continue
+            capture_positions[position] = position_at_x(calibration, arrow_x[position])
+        gathered = candles.gather(list(capture_positions.values()))
+        entry["calibrated_candles"] = {
+            str(position): gathered[capture_position]
+            for position, capture_position in capture_positions.items() if capture_position in gathered
+        }
+        entry["calibration_valid"] = True
+    return contracts_data
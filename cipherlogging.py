@@ -0,0 +1,177 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from colorama import Fore, Style, init
+
+# Path configuration
+BASE_JSON_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\base.json"
+DEFAULT_JSON_LOG_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\logs\pipeline.jsonl"
+
+# Extra levels used by log_and_print; both show whenever INFO does
+SUCCESS = logging.INFO + 1
+TITLE = logging.INFO + 2
+logging.addLevelName(SUCCESS, "SUCCESS")
+logging.addLevelName(TITLE, "TITLE")
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "SUCCESS": SUCCESS,
+    "TITLE": TITLE,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+LEVEL_COLORS = {
+    "INFO": Fore.CYAN,
+    "SUCCESS": Fore.GREEN,
+    "WARNING": Fore.YELLOW,
+    "ERROR": Fore.RED,
+    "TITLE": Fore.MAGENTA,
+    "DEBUG": Fore.LIGHTBLACK_EX
+}
+
+# Loggers that are far too chatty below WARNING
+QUIET_LOGGERS = ['webdriver_manager', 'selenium', 'urllib3', 'selenium.webdriver', 'tensorflow']
+
+_setup_lock = threading.Lock()
+_setup_pid = None
+_listener = None
+_config = {}
+
+
+class LazyJson:
+    """Defer json.dumps until a handler actually formats the record."""
+
+    def __init__(self, data, indent=2):
+        self.data = data
+        self.indent = indent
+
+    def __str__(self):
+        try:
+            return json.dumps(self.data, indent=self.indent, default=str)
+        except Exception:
+            return repr(self.data)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The '[ time ] │ LEVEL   │     message' colour layout the programmes have always printed."""
+
+    def format(self, record):
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        color = LEVEL_COLORS.get(record.levelname, Fore.WHITE)
+        return f"{color}[ {timestamp} ] │ {record.levelname:7} │     {message}{Style.RESET_ALL}"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record for the log file."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "pid": record.process,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def load_logging_config(json_path=BASE_JSON_PATH):
+    """Read the LOGGING section of base.json, e.g.
+    {"LEVEL": "INFO", "MODULES": {"connectwithinfinitydb": "WARNING"}, "JSON_LOG_PATH": "...", "CONSOLE": true}
+    """
+    try:
+        if os.path.exists(json_path):
+            with open(json_path, 'r') as f:
+                return json.load(f).get("LOGGING", {}) or {}
+    except Exception as e:
+        print(f"Error loading LOGGING from base.json: {e}")
+    return {}
+
+
+def setup_logging(json_path=BASE_JSON_PATH):
+    """Install a queue handler on the root logger; console and JSON-lines output run on a background thread.
+    Runs once per process (pool workers and spawned processes set themselves up on first use)."""
+    global _setup_pid, _listener, _config
+    with _setup_lock:
+        if _setup_pid == os.getpid():
+            return
+        _config = load_logging_config(json_path)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(LEVELS.get(str(_config.get("LEVEL", "INFO")).upper(), logging.INFO))
+
+        handlers = []
+        if _config.get("CONSOLE", True):
+            init()
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(ConsoleFormatter())
+            handlers.append(console_handler)
+        json_log_path = _config.get("JSON_LOG_PATH", DEFAULT_JSON_LOG_PATH)
+        if json_log_path:
+            try:
+                os.makedirs(os.path.dirname(json_log_path), exist_ok=True)
+                file_handler = logging.FileHandler(json_log_path, mode='a', encoding='utf-8')
+                file_handler.setFormatter(JsonLinesFormatter())
+                handlers.append(file_handler)
+            except Exception as e:
+                print(f"Error opening JSON log file {json_log_path}: {e}")
+
+        log_queue = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        if _listener is not None:
+            try:
+                _listener.stop()
+            except Exception:
+                pass
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=False)
+        _listener.start()
+
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+        for name, level in (_config.get("MODULES", {}) or {}).items():
+            logging.getLogger(name).setLevel(LEVELS.get(str(level).upper(), logging.INFO))
+        _setup_pid = os.getpid()
+
+
+def stop_logging():
+    """Flush whatever is still queued; registered with atexit."""
+    global _listener
+    if _listener is not None and _setup_pid == os.getpid():
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def get_logger(name):
+    """Return a module logger, setting up the process-wide handlers on first use."""
+    setup_logging()
+    return logging.getLogger(name)
+
+
+def log_and_print(logger, message, level="INFO", *args):
+    """Log message at a log_and_print level name. Disabled levels return before any formatting,
+    so pass expensive values as %-style args (or LazyJson) instead of pre-formatting them."""
+    levelno = LEVELS.get(level, logging.INFO)
+    if not logger.isEnabledFor(levelno):
+        return
+    logger.log(levelno, message, *args)
@@ -10,15 +10,16 @@ import time
 import signal
 import sys
 import os
-import colorama
-from colorama import Fore, Style
+import cipherlogging
+from cipherlogging import LazyJson
 from bs4 import BeautifulSoup
 import re
 import json
 from datetime import datetime
+import metrics
 
-# Initialize colorama for colored output
-colorama.init()
+# Configure Logging (levels, console and JSON-lines output come from the LOGGING section of base.json)
+logger = cipherlogging.get_logger(__name__)
 
 # Configuration
 primary_servers = {
@@ -47,23 +48,10 @@ driver = None
 session = None
 current_servers = primary_servers  # Start with primary servers
 
-def log_and_print(message, level="INFO"):
-    """Helper function to print formatted messages with color coding and spacing."""
-    indent = "    "
-    if level == "INFO":
-        color = Fore.CYAN
-    elif level == "SUCCESS":
-        color = Fore.GREEN
-    elif level == "WARNING":
-        color = Fore.YELLOW
-    elif level == "ERROR":
-        color = Fore.YELLOW
-    elif level == "TITLE":
-        color = Fore.MAGENTA
-    else:
-        color = Fore.WHITE
-    formatted_message = f"{level:7} | {indent}{message}"
-    print(f"{color}{formatted_message}{Style.RESET_ALL}")
+def log_and_print(message, level="INFO", *args):
+    """Helper function to log formatted messages with color coding and spacing; disabled levels cost nothing,
+    so pass expensive values as %-style args."""
+    cipherlogging.log_and_print(logger, message, level, *args)
 
 def append_to_json_log(server_type, server_url):
     """Append the server used to the JSON log file if the URL is different from the last recorded URL."""
@@ -277,6 +265,7 @@ def initialize_browser():
                 time.sleep(2)
                 break  # Move to next server
 
+@metrics.timed(kind="db")
 def execute_query(sql_query):
     """
     Execute an SQL query via the PHP web interface using direct POST request or Selenium.
@@ -325,7 +314,7 @@ def execute_query(sql_query):
                         log_and_print("All servers (Primary, Backup, Server3) failed POST, falling back to Selenium", "WARNING")
                     continue
 
-                log_and_print(f"Server response: {json.dumps(response_data, indent=2)}", "DEBUG")
+                log_and_print("Server response: %s", "DEBUG", LazyJson(response_data))
                 
                 if response_data.get('status') == 'success':
                     results = []
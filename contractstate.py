@@ -0,0 +1,153 @@
+import json
+import os
+import numpy as np
+import cipherlogging
+import orderkey
+from atomicjson import write_json_atomic
+from candlearray import format_time, parse_time
+
+logger = cipherlogging.get_logger(__name__)
+
+
+def log_and_print(message, level="INFO", *args):
+    cipherlogging.log_and_print(logger, message, level, *args)
+
+# Contract lifecycle, in the words pricecandle.json and ordertracker use
+STATE_PENDING = "pending order"
+STATE_EXECUTED = "executed"
+STATE_PROFIT = "profit reached exit contract"
+STATE_STOPLOSS = "Exit contract at stoploss"
+TERMINAL_STATES = (STATE_PROFIT, STATE_STOPLOSS)
+
+# Breakeven/profit levels reached in order; a level counts once a candle closes beyond it.
+# Prices are compared as integer ticks at the symbol's digits, so a level touched to the tick counts.
+MILESTONES = ("1:0.5", "1:1", "1:2")
+
+# The stop is checked on the bar that fills the order too. A limit order's stop lies beyond its entry,
+# in the direction price moves to fill it, so a bar that fills and reaches the stop reached it after
+# the fill (a bar opening past the stop fills there and is stopped at once).
+STOP_ON_EXECUTION_BAR = True
+
+# Per market/timeframe store of contract states, next to pricecandle.json
+CONTRACT_STATES_FILE = "contractstates.json"
+
+
+def contract_id(trendline):
+    """Stable id of a contract: 'PH-to-PH_<sender time>_<receiver time>'.
+    Candle times are used instead of position numbers, which shift by one with every closed bar."""
+    sender = trendline.get("sender", {})
+    receiver = trendline.get("receiver", {})
+    return f"{trendline.get('type', 'unknown')}_{sender.get('Time', sender.get('position_number'))}_{receiver.get('Time', receiver.get('position_number'))}"
+
+
+def new_state(trendline, prices):
+    """Initial (pending) state for a trendline and its calculatedprices.json entry (its pip_size gives the digits)."""
+    start_time = trendline.get("Breakout_parent", {}).get("Time") or trendline.get("order_holder", {}).get("Time")
+    return {
+        "state": STATE_PENDING,
+        "order_type": "long" if prices.get("order_type") == "buy_limit" else "short",
+        "entry_price": prices.get("entry_price"),
+        "exit_price": prices.get("exit_price"),
+        "1:0.5_price": prices.get("1:0.5_price"),
+        "1:1_price": prices.get("1:1_price"),
+        "1:2_price": prices.get("1:2_price"),
+        "profit_price": prices.get("profit_price"),
+        "digits": orderkey.digits_from_point(prices.get("pip_size")),
+        "last_bar_time": parse_time(start_time) if start_time else 0,
+        "milestones": [],
+        "executed_time": None,
+        "closed_time": None
+    }
+
+
+def prices_changed(state, prices):
+    """True when calculatedprices.json no longer matches the levels a contract was started with."""
+    return any(state.get(field) != prices.get(field) for field in ("entry_price", "exit_price", "profit_price"))
+
+
+def advance(state, bar_time, high, low, close):
+    """Apply one closed bar to a contract state in O(1); returns True if the state or a milestone changed."""
+    if state["state"] in TERMINAL_STATES or bar_time <= state["last_bar_time"]:
+        return False
+    state["last_bar_time"] = bar_time
+    long = state["order_type"] == "long"
+    digits = state.get("digits", orderkey.DEFAULT_DIGITS)
+
+    def ticks(price):
+        return orderkey.price_ticks(price, digits)
+
+    high, low, close = ticks(high), ticks(low), ticks(close)
+    changed = False
+
+    if state["state"] == STATE_PENDING:
+        reached = low <= ticks(state["entry_price"]) if long else high >= ticks(state["entry_price"])
+        if not reached:
+            return False
+        state["state"] = STATE_EXECUTED
+        state["executed_time"] = bar_time
+        changed = True
+        if not STOP_ON_EXECUTION_BAR:
+            return True
+
+    # Stoploss is hit by the wick, levels need the close beyond them
+    stopped = low <= ticks(state["exit_price"]) if long else high >= ticks(state["exit_price"])
+    if stopped:
+        state["state"] = STATE_STOPLOSS
+        state["closed_time"] = bar_time
+        return True
+
+    def closed_beyond(level):
+        return close >= ticks(level) if long else close <= ticks(level)
+
+    for milestone in MILESTONES:
+        if milestone in state["milestones"]:
+            continue
+        if not closed_beyond(state[f"{milestone}_price"]):
+            break
+        state["milestones"].append(milestone)
+        changed = True
+    if len(state["milestones"]) == len(MILESTONES) and closed_beyond(state["profit_price"]):
+        state["state"] = STATE_PROFIT
+        state["closed_time"] = bar_time
+        changed = True
+    return changed
+
+
+def advance_bars(state, candle_array):
+    """Feed the candles closed since the state's last bar; returns True if anything changed."""
+    if state["state"] in TERMINAL_STATES or candle_array is None or not len(candle_array):
+        return False
+    start = int(np.searchsorted(candle_array.time, state["last_bar_time"], side='right'))
+    changed = False
+    for bar_time, high, low, close in zip(candle_array.time[start:].tolist(), candle_array.high[start:].tolist(),
+                                          candle_array.low[start:].tolist(), candle_array.close[start:].tolist()):
+        changed = advance(state, bar_time, high, low, close) or changed
+        if state["state"] in TERMINAL_STATES:
+            break
+    return changed
+
+
+def summary(state):
+    """The 'contract status summary' written into pricecandle.json."""
+    return {
+        "contract status": state["state"],
+        "milestones reached": list(state["milestones"]),
+        "executed_time": format_time(state["executed_time"]) if state["executed_time"] else None,
+        "closed_time": format_time(state["closed_time"]) if state["closed_time"] else None
+    }
+
+
+def load_states(json_dir):
+    path = os.path.join(json_dir, CONTRACT_STATES_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        log_and_print(f"Error reading {path}, contracts will be replayed from their breakout: {e}", "WARNING")
+        return {}
+
+
+def save_states(json_dir, states):
+    write_json_atomic(os.path.join(json_dir, CONTRACT_STATES_FILE), states)
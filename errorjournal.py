@@ -0,0 +1,156 @@
+import atexit
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import atomicjson
+import metrics
+
+# One append-only JSONL journal per run replaces the per-stage *error.json files
+ERROR_JOURNAL_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\logs\errors"
+
+# Entries are buffered per process; save() writes them once this many are pending or
+# FLUSH_SECONDS have passed since the last write. Pool entry points flush through metrics.
+FLUSH_EVERY = 50
+FLUSH_SECONDS = 2.0
+
+# Journals of older runs are deleted when a new run starts
+KEEP_RUNS = 30
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def journal_path(run_id=None):
+    """Journal of a run; the run id is the metrics cycle, shared with pool workers through the environment."""
+    run_id = run_id if run_id is not None else metrics.current_cycle()
+    return os.path.join(ERROR_JOURNAL_FOLDER, f"errors-{run_id or 'norun'}.jsonl")
+
+
+def record(source, entry):
+    """Buffer one error entry of a stage."""
+    line = {"source": source, "run": metrics.current_cycle(), "pid": os.getpid()}
+    line.update(entry if isinstance(entry, dict) else {"error": str(entry)})
+    with _buffer_lock:
+        _buffer.append(line)
+        should_flush = len(_buffer) >= FLUSH_EVERY
+    if should_flush:
+        flush()
+
+
+def flush():
+    """Append buffered entries to the current run's journal."""
+    global _buffer, _last_flush
+    with _buffer_lock:
+        pending, _buffer = _buffer, []
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    path = journal_path()
+    try:
+        os.makedirs(ERROR_JOURNAL_FOLDER, exist_ok=True)
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in pending)
+        with atomicjson.file_lock(path):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    except Exception as e:
+        print(f"Error writing error journal {path}: {e}")
+
+
+def flush_if_due():
+    if time.monotonic() - _last_flush >= FLUSH_SECONDS:
+        flush()
+
+
+atexit.register(flush)
+metrics.register_flush_hook(flush)
+
+
+class ErrorLog(list):
+    """Drop-in for a stage's error_log list: appended entries are also written to the error journal."""
+
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def append(self, entry):
+        super().append(entry)
+        record(self.source, entry)
+
+    def save(self):
+        """What the stages' save_errors() does now: a buffered append instead of rewriting a JSON file."""
+        flush_if_due()
+
+
+def rotate(keep=KEEP_RUNS):
+    """Delete the journals of all but the newest keep runs."""
+    journals = sorted(glob.glob(os.path.join(ERROR_JOURNAL_FOLDER, "errors-*.jsonl")), key=os.path.getmtime)
+    for path in journals[:-keep] if keep else journals:
+        for stale in (path, f"{path}.lock"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def read(run_id=None, source=None, contains=None):
+    """Entries of a run's journal, optionally filtered by source and by a substring of the error."""
+    flush()
+    path = journal_path(run_id)
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if source and entry.get("source") != source:
+                continue
+            if contains and contains.lower() not in str(entry.get("error", "")).lower():
+                continue
+            entries.append(entry)
+    return entries
+
+
+def summarize(run_id=None, source=None, top=10):
+    """Error counts of a run per source and the most frequent messages (numbers stripped so variants group)."""
+    entries = read(run_id, source)
+    by_source = {}
+    by_message = {}
+    for entry in entries:
+        by_source[entry.get("source", "unknown")] = by_source.get(entry.get("source", "unknown"), 0) + 1
+        message = "".join("#" if ch.isdigit() else ch for ch in str(entry.get("error", "")))[:120]
+        by_message[message] = by_message.get(message, 0) + 1
+    return {
+        "run": run_id if run_id is not None else metrics.current_cycle(),
+        "total": len(entries),
+        "by_source": dict(sorted(by_source.items(), key=lambda item: item[1], reverse=True)),
+        "top_messages": sorted(by_message.items(), key=lambda item: item[1], reverse=True)[:top]
+    }
+
+
+def list_runs():
+    """Run ids that still have a journal, newest last."""
+    journals = sorted(glob.glob(os.path.join(ERROR_JOURNAL_FOLDER, "errors-*.jsonl")), key=os.path.getmtime)
+    return [os.path.basename(path)[len("errors-"):-len(".jsonl")] for path in journals]
+
+
+def print_summary(report):
+    """Print a summarize() report."""
+    print(f"\n=== Errors for {report['run']}: {report['total']} ===")
+    for name, count in report["by_source"].items():
+        print(f"{name:40} {count:5}")
+    for message, count in report["top_messages"]:
+        print(f"{count:5}  {message}")
+
+
+if __name__ == "__main__":
+    # python errorjournal.py [run_id] [source] -- summarize a run's errors (latest run by default)
+    runs = list_runs()
+    run = sys.argv[1] if len(sys.argv) > 1 else (runs[-1] if runs else "")
+    print_summary(summarize(run, sys.argv[2] if len(sys.argv) > 2 else None))
@@ -7,6 +7,7 @@ from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+import cipherlogging
 import logging
 import time
 import os
@@ -14,22 +15,22 @@ import shutil
 import cv2
 import numpy as np
 import json
+import base64
 import multiprocessing
 import MetaTrader5 as mt5
 from datetime import datetime, timedelta
 import pytz
-
-# Configure Logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s [%(levelname)s] [%(processName)s] %(message)s',
-    handlers=[logging.StreamHandler()]
-)
-logger = logging.getLogger(__name__)
-
-# Suppress WebDriver and other logs
-for name in ['webdriver_manager', 'selenium', 'urllib3', 'selenium.webdriver', 'tensorflow']:
-    logging.getLogger(name).setLevel(logging.WARNING)
+import marketstatusstore
+from atomicjson import write_json_atomic
+import metrics
+import chartcache
+import chartslices
+import chartcalibration
+import candlesinbetween
+import analysechart_m
+
+# Configure Logging (levels, console and JSON-lines output come from the LOGGING section of base.json)
+logger = cipherlogging.get_logger(__name__)
 
 # Configuration
 MARKETS_JSON_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\base.json"
@@ -112,6 +113,72 @@ MT5_TIMEFRAMES = {
 }
 DESTINATION_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
 
+# Headless window size and device scale factor (both modes) the charts are captured at; analysechart_m crops the
+# candles' plot area out of whatever size this gives
+CAPTURE_WINDOW_SIZE = (1920, 1080)
+CAPTURE_SCALE = 1.0
+
+# "canvas" reads the chart pixels straight from the page (download is the fallback when that fails);
+# "download" clicks Save Chart as Image and waits for the file in Downloads
+CAPTURE_METHOD = "canvas"
+
+# The chart is the nearest ancestor of the largest canvas that also holds the other canvases drawn over or
+# beside it (price and time axes, overlays): the same area Save Chart as Image exports. Set a CSS selector
+# here to pin a different ancestor.
+CHART_CONTAINER_SELECTOR = None
+
+# Composites the visible canvases of the chart container into one PNG data URL (null if none or tainted).
+# Transparent areas are filled with the first opaque background behind the chart, as the page shows it.
+CANVAS_CAPTURE_SCRIPT = """
+const visible = c => { const r = c.getBoundingClientRect(); return r.width > 0 && r.height > 0; };
+const canvases = Array.from(document.querySelectorAll('canvas')).filter(visible);
+if (!canvases.length) return null;
+const main = canvases.reduce((a, b) => a.width * a.height >= b.width * b.height ? a : b);
+let container = arguments[0] ? main.closest(arguments[0]) : null;
+if (!container) {
+    container = main.parentElement;
+    while (container.parentElement && container.parentElement !== document.body
+           && Array.from(container.querySelectorAll('canvas')).filter(visible).length < 2) {
+        container = container.parentElement;
+    }
+}
+let background = 'rgb(255, 255, 255)';
+for (let e = container; e; e = e.parentElement) {
+    const color = getComputedStyle(e).backgroundColor;
+    if (color && color !== 'transparent' && !/rgba\\(.*,\\s*0\\)$/.test(color)) { background = color; break; }
+}
+const box = container.getBoundingClientRect();
+const scale = window.devicePixelRatio || 1;
+const out = document.createElement('canvas');
+out.width = Math.round(box.width * scale);
+out.height = Math.round(box.height * scale);
+const ctx = out.getContext('2d');
+ctx.fillStyle = background;
+ctx.fillRect(0, 0, out.width, out.height);
+for (const c of Array.from(container.querySelectorAll('canvas')).filter(visible)) {
+    const r = c.getBoundingClientRect();
+    ctx.drawImage(c, (r.left - box.left) * scale, (r.top - box.top) * scale, r.width * scale, r.height * scale);
+}
+try { return out.toDataURL('image/png'); } catch (e) { return null; }
+"""
+
+# The first canvas capture of each process is compared with a Save Chart as Image download of the same chart;
+# a different size or more than CAPTURE_PARITY_MAX_MISMATCH of the candle pixels differing switches the process
+# to downloads
+CAPTURE_PARITY_CHECK = True
+CAPTURE_PARITY_MAX_MISMATCH = 0.02
+_canvas_parity = None
+
+# Capture every timeframe in the browser while PIPELINE_WORKERS processes verify, store and (with
+# PIPELINE_ANALYSIS) analyse each chart as soon as it lands, instead of one timeframe after another
+PIPELINE_ENABLED = True
+PIPELINE_WORKERS = 2
+PIPELINE_ANALYSIS = True
+
+# Save the annotated chartverification_left/right.png images on every verification, not only
+# on failed ones (debug logging also turns this on)
+VERIFICATION_IMAGES = False
+
 # Shared multiprocessing variables
 network_issue_event = multiprocessing.Event()
 network_resolution_lock = multiprocessing.Lock()
@@ -149,25 +216,17 @@ def normalize_timeframe(timeframe):
 
 def get_eligible_market_timeframes():
     eligible_pairs = []
+    try:
+        statuses = marketstatusstore.get_statuses(MARKETS, [normalize_timeframe(tf) for tf in TIMEFRAMES])
+    except Exception as e:
+        logger.warning(f"Error reading market status store: {e}")
+        # If the store can't be read, consider every pair eligible to ensure processing
+        statuses = {}
     for market in MARKETS:
-        market_folder = os.path.join(DESTINATION_PATH, market.replace(" ", "_"))
         for tf in TIMEFRAMES:
-            normalized_tf = normalize_timeframe(tf)
-            status_file = os.path.join(market_folder, normalized_tf, "status.json")
-            try:
-                if os.path.exists(status_file):
-                    with open(status_file, 'r') as f:
-                        status_data = json.load(f)
-                        elligible_status = status_data.get("elligible_status", "")
-                        # Modified condition: eligible if elligible_status is not 'active' or 'chart_identified'
-                        if elligible_status not in ["active", "chart_identified"]:
-                            eligible_pairs.append((market, tf))
-                else:
-                    # If status.json doesn't exist, consider the pair eligible
-                    eligible_pairs.append((market, tf))
-            except Exception as e:
-                logger.warning(f"Error reading status.json for {market} ({tf}): {e}")
-                # If there's an error reading status.json, consider the pair eligible to ensure processing
+            status_data = statuses.get((market, normalize_timeframe(tf)))
+            # Eligible if there is no status yet or elligible_status is not 'active' or 'chart_identified'
+            if status_data is None or status_data.get("elligible_status", "") not in ["active", "chart_identified"]:
                 eligible_pairs.append((market, tf))
     logger.debug(f"Eligible market-timeframe pairs: {eligible_pairs}")
     return eligible_pairs
@@ -179,23 +238,17 @@ def clear_all_market_files():
 
     # Clear market-related files from Downloads folder for eligible markets
     try:
+        try:
+            statuses = marketstatusstore.get_statuses(MARKETS, [tf.lower() for tf in TIMEFRAMES])
+        except Exception as e:
+            logger.warning(f"Error reading market status store: {e}")
+            statuses = {}  # Clear everything if the store is unreadable to ensure processing
         for market in MARKETS:
             market_folder = os.path.join(DESTINATION_PATH, market.replace(" ", "_"))
             for tf in TIMEFRAMES:
-                status_file = os.path.join(market_folder, tf.lower(), "status.json")
-                should_clear = False
-                if os.path.exists(status_file):
-                    try:
-                        with open(status_file, 'r') as f:
-                            status_data = json.load(f)
-                            elligible_status = status_data.get("elligible_status", "")
-                            if elligible_status == "order_free":
-                                should_clear = True
-                    except Exception as e:
-                        logger.warning(f"Error reading status.json for {market} ({tf}): {e}")
-                        should_clear = True  # Clear if status.json is unreadable to ensure processing
-                else:
-                    should_clear = True  # Clear if no status.json exists to allow processing
+                status_data = statuses.get((market, tf.lower()))
+                # Clear if no status exists to allow processing
+                should_clear = status_data is None or status_data.get("elligible_status", "") == "order_free"
 
                 if should_clear:
                     market_files = [f for f in os.listdir(downloads_path)
@@ -544,10 +597,11 @@ def operate(mode="headless"):
     options.add_argument("--disable-autofill")
     options.add_argument("--log-level=3")
     options.binary_location = CHROME_BINARY_PATH
+    options.add_argument(f"--force-device-scale-factor={CAPTURE_SCALE}")
     if mode.lower() in ["headless", "head"]:
         logger.debug(f"Initializing WebDriver in {mode} mode")
         options.add_argument("--headless=new")
-        options.add_argument("--window-size=1920,1080")
+        options.add_argument(f"--window-size={CAPTURE_WINDOW_SIZE[0]},{CAPTURE_WINDOW_SIZE[1]}")
     else:
         logger.debug(f"Initializing WebDriver in {mode} mode")
         options.add_argument("--start-maximized")
@@ -871,6 +925,7 @@ def watchlist(driver, action, market):
         logger.error(f"[Process-{market}] Error toggling watchlist ({action}): {e}")
         return False
 
+@metrics.timed(kind="io")
 def wait_for_download(downloads_path, market, timeframe, max_wait=30):
     """Wait for a chart file to download."""
     start_time = time.time()
@@ -893,6 +948,7 @@ def wait_for_download(downloads_path, market, timeframe, max_wait=30):
     logger.error(f"[Process-{market}] Timeout waiting for download: {market} ({timeframe})")
     return None
 
+@metrics.timed(kind="io")
 def save_chart(driver, timeout, market):
     """Save chart as image."""
     try:
@@ -921,21 +977,116 @@ def check_page_load_status(driver, market, timeout=10):
         logger.error(f"[Process-{market}] Chart canvas not detected")
         return False
 
-def copy_chart_to_destination(driver, market, timeframe, destination_path):
-    """Copy chart to destination folder with filename format market_timeframe.png."""
+def capture_chart_canvas(driver, market):
+    """PNG bytes of the chart read from the page: the composited canvases, or a screenshot of their container
+    when the canvas is tainted. None if neither works."""
+    try:
+        data_url = driver.execute_script(CANVAS_CAPTURE_SCRIPT, CHART_CONTAINER_SELECTOR)
+        if data_url and data_url.startswith("data:image/png;base64,"):
+            return base64.b64decode(data_url.split(",", 1)[1])
+        logger.debug(f"[Process-{market}] Canvas not readable, taking an element screenshot")
+        canvas = driver.find_element(By.TAG_NAME, "canvas")
+        container = driver.execute_script(
+            "return (arguments[1] && arguments[0].closest(arguments[1])) || arguments[0].parentElement;", canvas, CHART_CONTAINER_SELECTOR
+        )
+        return container.screenshot_as_png
+    except Exception as e:
+        logger.error(f"[Process-{market}] Error capturing chart canvas: {e}")
+        return None
+
+def compare_captures(canvas_data, download_data):
+    """Compare a canvas capture with a Save Chart as Image download of the same chart: sizes, and the share of
+    red/green candle pixels (verification's HSV ranges) that differ. "matches" when both agree."""
+    canvas = chartcache.decode_bytes(canvas_data)
+    download = chartcache.decode_bytes(download_data)
+    if canvas is None or download is None:
+        return {"matches": False, "canvas_size": None, "download_size": None, "mismatch": None}
+    report = {"canvas_size": canvas["image"].shape[:2], "download_size": download["image"].shape[:2], "mismatch": None}
+    if report["canvas_size"] != report["download_size"]:
+        report["matches"] = False
+        return report
+    masks = []
+    for chart in (canvas, download):
+        mask_red = chartcache.in_range(chart, [0, 100, 100], [10, 255, 255])
+        mask_green = chartcache.in_range(chart, [40, 100, 100], [80, 255, 255])
+        masks.append((mask_red > 0, mask_green > 0))
+    differing = sum(int(np.count_nonzero(a ^ b)) for a, b in zip(*masks))
+    total = sum(int(np.count_nonzero(a | b)) for a, b in zip(*masks))
+    report["mismatch"] = round(differing / max(total, 1), 4)
+    report["matches"] = total > 0 and report["mismatch"] <= CAPTURE_PARITY_MAX_MISMATCH
+    return report
+
+def download_chart(driver, timeout, market, timeframe):
+    """Capture the chart through Save Chart as Image and the Downloads folder (see capture_chart)."""
+    if not save_chart(driver, timeout, market):
+        return None
+    downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+    latest_file = wait_for_download(downloads_path, market, timeframe)
+    if not latest_file:
+        return None
+    with open(latest_file, 'rb') as f:
+        data = f.read()
+    return {"source": latest_file, "path": latest_file, "data": data}
+
+@metrics.timed(kind="io")
+def capture_chart(driver, timeout, market, timeframe):
+    """Capture the chart as {"source", "path", "data"}: "data" holds the PNG bytes, "path" the downloaded
+    file when the Save Chart as Image download was used. None if the chart could not be captured."""
+    global _canvas_parity
+    if CAPTURE_METHOD == "canvas" and _canvas_parity is not False:
+        # Same settle time the download path waits before clicking Save Chart as Image
+        time.sleep(timeout)
+        data = capture_chart_canvas(driver, market)
+        if data:
+            logger.debug(f"[Process-{market}] Captured chart canvas for {market} ({timeframe}), {len(data)} bytes")
+            capture = {"source": f"canvas capture of {market} ({timeframe})", "path": None, "data": data}
+            if not CAPTURE_PARITY_CHECK or _canvas_parity:
+                return capture
+            download = download_chart(driver, timeout, market, timeframe)
+            if not download:
+                return capture
+            report = compare_captures(data, download["data"])
+            _canvas_parity = report["matches"]
+            if not _canvas_parity:
+                logger.warning(f"[Process-{market}] Canvas capture differs from Save Chart as Image for {market} ({timeframe}): "
+                               f"size {report['canvas_size']} vs {report['download_size']}, candle pixel mismatch {report['mismatch']}; "
+                               f"using downloads for this process")
+                return download
+            logger.info(f"[Process-{market}] Canvas capture matches Save Chart as Image for {market} ({timeframe}), "
+                        f"candle pixel mismatch {report['mismatch']}")
+            discard_capture(download)
+            return capture
+        logger.warning(f"[Process-{market}] Canvas capture failed for {market} ({timeframe}), downloading instead")
+    return download_chart(driver, timeout, market, timeframe)
+
+def discard_capture(capture):
+    """Delete a rejected capture's download, if it came from one."""
+    if capture and capture["path"] and os.path.exists(capture["path"]):
+        os.remove(capture["path"])
+
+def copy_chart_to_destination(driver, market, timeframe, destination_path, capture=None):
+    """Copy chart to destination folder with filename format market_timeframe.png.
+    A capture's bytes are written directly; without one the latest download is copied."""
     try:
         logger.debug(f"[Process-{market}] Copying chart for {market} ({timeframe})")
-        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
         normalized_tf = normalize_timeframe(timeframe)  # Normalize timeframe for folder path
         market_folder = os.path.join(destination_path, market.replace(" ", "_"), normalized_tf)
         os.makedirs(market_folder, exist_ok=True)
+        # Create new filename in the format market_timeframe.png
+        new_filename = f"{market.replace(' ', '_')}_{normalized_tf}.png"
+        destination_file = os.path.join(market_folder, new_filename)
+        if capture:
+            temp_file = f"{destination_file}.tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(capture["data"])
+            os.replace(temp_file, destination_file)
+            logger.debug(f"[Process-{market}] Wrote captured chart to {destination_file}")
+            return destination_file
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
         latest_file = wait_for_download(downloads_path, market, timeframe)
         if not latest_file:
             logger.error(f"[Process-{market}] No chart file found for {market} ({timeframe})")
             return False
-        # Create new filename in the format market_timeframe.png
-        new_filename = f"{market.replace(' ', '_')}_{normalized_tf}.png"
-        destination_file = os.path.join(market_folder, new_filename)
         shutil.copy2(latest_file, destination_file)
         logger.debug(f"[Process-{market}] Copied chart to {destination_file}")
         return destination_file
@@ -943,94 +1094,69 @@ def copy_chart_to_destination(driver, market, timeframe, destination_path):
         logger.error(f"[Process-{market}] Error copying chart for {market} ({timeframe}): {e}")
         return False
 
-def verify_candlestick_contours(image_path, market, timeframe):
-    """Verify candlesticks in the chart image."""
+@metrics.timed(kind="image")
+def render_verification(img, mask_red, mask_green, left_grid_counts, right_grid_counts, market_folder, market):
+    """Save chartverification_left/right.png with the candle outlines, the slice grid and a "D" on slices with candles."""
+    height, width = img.shape[:2]
+    mid_x = width // 2
+    halves = (
+        ("left", img[:, :mid_x].copy(), mask_red[:, :mid_x], mask_green[:, :mid_x], left_grid_counts),
+        ("right", img[:, mid_x:].copy(), mask_red[:, mid_x:], mask_green[:, mid_x:], right_grid_counts)
+    )
+    for side, half, half_red, half_green, grid_counts in halves:
+        grid_count = len(grid_counts)
+        grid_width = half.shape[1] // grid_count
+        for i in range(grid_count):
+            start_x = i * grid_width
+            end_x = (i + 1) * grid_width if i < grid_count - 1 else half.shape[1]
+            contours_red, _ = cv2.findContours(half_red[:, start_x:end_x], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            contours_green, _ = cv2.findContours(half_green[:, start_x:end_x], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            cv2.drawContours(half[:, start_x:end_x], contours_red, -1, (0, 0, 255), 1)
+            cv2.drawContours(half[:, start_x:end_x], contours_green, -1, (0, 255, 0), 1)
+            if grid_counts[i] > 0:
+                cv2.putText(half, "D", (start_x + 10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
+        for i in range(1, grid_count):
+            cv2.line(half, (i * grid_width, 0), (i * grid_width, height), (0, 0, 0), 1)
+        output_path = os.path.join(market_folder, f"chartverification_{side}.png")
+        cv2.imwrite(output_path, half)
+        logger.debug(f"[Process-{market}] Saved {side} half: {output_path}, blocks: {grid_counts}")
+
+@metrics.timed(kind="image")
+def verify_candlestick_contours(image_path, market, timeframe, write_images=None, data=None):
+    """Verify candlesticks in the chart image (data, the encoded image bytes, when given; image_path then only names it in logs).
+    Slice presence comes from chartslices' 2x2 block counts of the red and green masks; the annotated halves
+    are only rendered when verification fails, debug logging is on or write_images/VERIFICATION_IMAGES asks for them."""
     logger.debug(f"[Process-{market}] Verifying candlesticks in {image_path}")
     normalized_tf = normalize_timeframe(timeframe)  # Normalize timeframe for folder path
     market_folder = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalized_tf)
     os.makedirs(market_folder, exist_ok=True)
 
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        chart = chartcache.decode_bytes(data) if data is not None else chartcache.load_chart(image_path)
+        if chart is None:
             logger.error(f"[Process-{market}] Failed to load image: {image_path}")
             return False, False
-        img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        lower_red = np.array([0, 100, 100])
-        upper_red = np.array([10, 255, 255])
-        lower_green = np.array([40, 100, 100])
-        upper_green = np.array([80, 255, 255])
-        mask_red = cv2.inRange(img_hsv, lower_red, upper_red)
-        mask_green = cv2.inRange(img_hsv, lower_green, upper_green)
-        height, width = img.shape[:2]
+        img = chart["image"]
+        mask_red = chartcache.in_range(chart, [0, 100, 100], [10, 255, 255])
+        mask_green = chartcache.in_range(chart, [40, 100, 100], [80, 255, 255])
+        width = img.shape[1]
         mid_x = width // 2
 
-        img_left = img[:, :mid_x].copy()
-        mask_red_left = mask_red[:, :mid_x]
-        mask_green_left = mask_green[:, :mid_x]
-        
-        img_right = img[:, mid_x:].copy()
-        mask_red_right = mask_red[:, mid_x:]
-        mask_green_right = mask_green[:, mid_x:]
-
         grid_count = 5
-        grid_width_left = mid_x // grid_count
-        grid_width_right = (width - mid_x) // grid_count
-
-        left_grid_contours = [0] * grid_count
-        right_grid_contours = [0] * grid_count
-        min_contour_area = 0.01
-
-        for i in range(grid_count):
-            start_x = i * grid_width_left
-            end_x = (i + 1) * grid_width_left if i < grid_count - 1 else mid_x
-            grid_mask_red = mask_red_left[:, start_x:end_x]
-            grid_mask_green = mask_green_left[:, start_x:end_x]
-            contours_red, _ = cv2.findContours(grid_mask_red, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            contours_green, _ = cv2.findContours(grid_mask_green, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            left_grid_contours[i] = len([c for c in contours_red if cv2.contourArea(c) >= min_contour_area]) + \
-                                    len([c for c in contours_green if cv2.contourArea(c) >= min_contour_area])
-            cv2.drawContours(img_left[:, start_x:end_x], contours_red, -1, (0, 0, 255), 1)
-            cv2.drawContours(img_left[:, start_x:end_x], contours_green, -1, (0, 255, 0), 1)
-            if left_grid_contours[i] > 0:
-                text_x = start_x + 10
-                text_y = 30
-                cv2.putText(img_left, "D", (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
-
-        for i in range(grid_count):
-            start_x = i * grid_width_right
-            end_x = (i + 1) * grid_width_right if i < grid_count - 1 else (width - mid_x)
-            grid_mask_red = mask_red_right[:, start_x:end_x]
-            grid_mask_green = mask_green_right[:, start_x:end_x]
-            contours_red, _ = cv2.findContours(grid_mask_red, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            contours_green, _ = cv2.findContours(grid_mask_green, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            right_grid_contours[i] = len([c for c in contours_red if cv2.contourArea(c) >= min_contour_area]) + \
-                                     len([c for c in contours_green if cv2.contourArea(c) >= min_contour_area])
-            cv2.drawContours(img_right[:, start_x:end_x], contours_red, -1, (0, 0, 255), 1)
-            cv2.drawContours(img_right[:, start_x:end_x], contours_green, -1, (0, 255, 0), 1)
-            if right_grid_contours[i] > 0:
-                text_x = start_x + 10
-                text_y = 30
-                cv2.putText(img_right, "D", (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
-
-        for i in range(1, grid_count):
-            x_left = i * grid_width_left
-            cv2.line(img_left, (x_left, 0), (x_left, height), (0, 0, 0), 1)
-            x_right = i * grid_width_right
-            cv2.line(img_right, (x_right, 0), (x_right, height), (0, 0, 0), 1)
-
-        left_output_path = os.path.join(market_folder, "chartverification_left.png")
-        right_output_path = os.path.join(market_folder, "chartverification_right.png")
-        cv2.imwrite(left_output_path, img_left)
-        cv2.imwrite(right_output_path, img_right)
-        logger.debug(f"[Process-{market}] Saved left half: {left_output_path}, contours: {left_grid_contours}")
-        logger.debug(f"[Process-{market}] Saved right half: {right_output_path}, contours: {right_grid_contours}")
+        left_grid_contours = chartslices.slice_counts(mask_red[:, :mid_x], mask_green[:, :mid_x], grid_count)
+        right_grid_contours = chartslices.slice_counts(mask_red[:, mid_x:], mask_green[:, mid_x:], grid_count)
+        logger.debug(f"[Process-{market}] Slice blocks left: {left_grid_contours}, right: {right_grid_contours}")
 
         left_valid = all(count > 0 for count in left_grid_contours)
         right_valid = all(count > 0 for count in right_grid_contours[:3])
         total_left_contours = sum(left_grid_contours)
         total_right_contours = sum(right_grid_contours)
 
+        if write_images is None:
+            write_images = VERIFICATION_IMAGES or logger.isEnabledFor(logging.DEBUG)
+        if write_images or not (left_valid and right_valid):
+            render_verification(img, mask_red, mask_green, left_grid_contours, right_grid_contours, market_folder, market)
+
         if left_valid and right_valid:
             logger.debug(f"[Process-{market}] Candlesticks verified for {image_path}")
             return True, False
@@ -1046,12 +1172,9 @@ def verify_candlestick_contours(image_path, market, timeframe):
         return False, False
 
 def save_status(market, timeframe, destination_path, status):
-    """Save the status of the process for a market and timeframe to a JSON file."""
+    """Save the status of the process for a market and timeframe to the market status store."""
     try:
         mapped_timeframe = normalize_timeframe(timeframe)
-        market_folder = os.path.join(destination_path, market.replace(" ", "_"), mapped_timeframe)
-        os.makedirs(market_folder, exist_ok=True)
-        status_file = os.path.join(market_folder, "status.json")
         current_time = datetime.now(pytz.timezone('Africa/Lagos'))
         am_pm = "am" if current_time.hour < 12 else "pm"
         hour_12 = current_time.hour % 12 or 12
@@ -1066,47 +1189,35 @@ def save_status(market, timeframe, destination_path, status):
             "elligible_status": "chart_identified" if status == "chart_identified" else "order_free"
         }
         
-        if os.path.exists(status_file):
-            try:
-                with open(status_file, 'r') as f:
-                    existing_data = json.load(f)
-                existing_data.update(status_data)
-                status_data = existing_data
-            except Exception as e:
-                logger.warning(f"[Process-{market}] Error reading existing status.json: {e}")
-        
-        with open(status_file, 'w') as f:
-            json.dump(status_data, f, indent=4)
-        logger.debug(f"[Process-{market}] Saved status '{status}' with elligible_status '{status_data['elligible_status']}' to {status_file}")
+        marketstatusstore.update_status(market, mapped_timeframe, status_data)
+        logger.debug(f"[Process-{market}] Saved status '{status}' with elligible_status '{status_data['elligible_status']}' for {market} ({mapped_timeframe})")
     except Exception as e:
         logger.error(f"[Process-{market}] Error saving status for {market} ({timeframe}): {e}")
 
 def create_verification_json(market, destination_path):
-    """Create verification.json for a market by collecting statuses from each timeframe's status.json, creating status.json if missing."""
+    """Create the verification entry for a market by collecting the status of each timeframe, creating missing statuses."""
     try:
-        market_folder = os.path.join(destination_path, market.replace(" ", "_"))
         verification_data = {}
         all_identified = True
+        try:
+            statuses = marketstatusstore.get_statuses([market], [normalize_timeframe(tf) for tf in TIMEFRAMES])
+        except Exception as e:
+            logger.error(f"[Process-{market}] Error reading market status store for {market}: {e}")
+            statuses = None
 
         for tf in TIMEFRAMES:
-            normalized_tf = normalize_timeframe(tf)  # Normalize timeframe for folder path
-            status_file = os.path.join(market_folder, normalized_tf, "status.json")
-            if os.path.exists(status_file):
-                try:
-                    with open(status_file, 'r') as f:
-                        status_data = json.load(f)
-                        status = status_data.get("status", "unknown")
-                        verification_data[tf.lower()] = status
-                        if status != "chart_identified":
-                            all_identified = False
-                except Exception as e:
-                    logger.error(f"[Process-{market}] Error reading status.json for {market} ({tf}): {e}")
-                    verification_data[tf.lower()] = "error_reading_status"
+            normalized_tf = normalize_timeframe(tf)  # Normalize timeframe for store key
+            if statuses is None:
+                verification_data[tf.lower()] = "error_reading_status"
+                all_identified = False
+            elif (market, normalized_tf) in statuses:
+                status = statuses[(market, normalized_tf)].get("status", "unknown")
+                verification_data[tf.lower()] = status
+                if status != "chart_identified":
                     all_identified = False
             else:
-                # Create status.json with "incomplete" status
-                logger.warning(f"[Process-{market}] status.json not found for {market} ({tf}), creating with 'incomplete' status")
-                os.makedirs(os.path.dirname(status_file), exist_ok=True)
+                # Create status with "incomplete" status
+                logger.warning(f"[Process-{market}] No status found for {market} ({tf}), creating with 'incomplete' status")
                 current_time = datetime.now(pytz.timezone('Africa/Lagos'))
                 am_pm = "am" if current_time.hour < 12 else "pm"
                 hour_12 = current_time.hour % 12 or 12
@@ -1120,57 +1231,47 @@ def create_verification_json(market, destination_path):
                     "elligible_status": "order_free"
                 }
                 try:
-                    with open(status_file, 'w') as f:
-                        json.dump(status_data, f, indent=4)
-                    logger.debug(f"[Process-{market}] Created status.json for {market} ({tf}) with status 'incomplete'")
+                    marketstatusstore.update_status(market, normalized_tf, status_data)
+                    logger.debug(f"[Process-{market}] Created status for {market} ({tf}) with status 'incomplete'")
                     verification_data[tf.lower()] = "incomplete"
                     all_identified = False
                 except Exception as e:
-                    logger.error(f"[Process-{market}] Error creating status.json for {market} ({tf}): {e}")
+                    logger.error(f"[Process-{market}] Error creating status for {market} ({tf}): {e}")
                     verification_data[tf.lower()] = "error_creating_status"
                     all_identified = False
 
         verification_data["all_timeframes"] = "verified" if all_identified else "incomplete_verification"
-        verification_file = os.path.join(market_folder, "verification.json")
-        os.makedirs(market_folder, exist_ok=True)
-        with open(verification_file, 'w') as f:
-            json.dump(verification_data, f, indent=4)
-        logger.debug(f"[Process-{market}] Saved verification.json to {verification_file}")
+        marketstatusstore.save_verification(market, verification_data)
+        logger.debug(f"[Process-{market}] Saved verification for {market}")
         return True
     except Exception as e:
         logger.error(f"[Process-{market}] Error creating verification.json for {market}: {e}")
         return False
      
-def download_and_verify_chart(driver, market, timeframe, destination_path, max_timeout=30):
-    """Download and verify chart, retrying up to 2 times within session, and save candle data and status."""
-    normalized_tf = normalize_timeframe(timeframe)  # Normalize timeframe for folder path
-    market_folder = os.path.join(destination_path, market.replace(" ", "_"), normalized_tf)
-    os.makedirs(market_folder, exist_ok=True)
-
-    # Initialize status
-    save_status(market, timeframe, destination_path, "initializing")
-
-    is_trading_active = tradinghoursordays(market)
-    candle_data = None
-    mostrecent_completedcandle_data = None
+def fetch_chart_candles(market, timeframe, destination_path):
+    """Fetch the forming and the most recent completed candle from MT5 before a chart is captured, waiting for
+    the next candle when the current one closes within 3 minutes. Returns (ok, candle, completed_candles), the
+    completed candles being the last CAPTURE_CANDLE_COUNT closed bars (oldest first) for chart calibration;
+    both are None when the market is outside trading hours."""
     candle = None
-    mostrecent_completedcandle = None
+    completed_candles = None
+    is_trading_active = tradinghoursordays(market)
     if is_trading_active:
         if not initialize_mt5(market):
             logger.error(f"[Process-{market}] Failed to initialize MT5 for {market} ({timeframe})")
             save_status(market, timeframe, destination_path, "mt5_initialization_failed")
-            return False
+            return False, None, None
         try:
             candle = fetch_current_price_candle(market, timeframe)
             if candle is None:
                 logger.error(f"[Process-{market}] Failed to fetch current candle for {market} ({timeframe})")
                 save_status(market, timeframe, destination_path, "candle_fetch_failed")
-                return False
+                return False, None, None
             time_left, next_close_time = get_time_until_candle_close(market, timeframe, candle['time'])
             if time_left is None:
                 logger.error(f"[Process-{market}] Failed to calculate candle close time for {market} ({timeframe})")
                 save_status(market, timeframe, destination_path, "candle_time_calculation_failed")
-                return False
+                return False, None, None
             logger.debug(f"[Process-{market}] Time left until candle close for {market} ({timeframe}): {time_left:.2f} minutes")
             if time_left < 3:
                 logger.debug(f"[Process-{market}] Waiting for next candle for {market} ({timeframe})")
@@ -1181,17 +1282,79 @@ def download_and_verify_chart(driver, market, timeframe, destination_path, max_t
                 if candle is None:
                     logger.error(f"[Process-{market}] Failed to fetch current candle after waiting for {market} ({timeframe})")
                     save_status(market, timeframe, destination_path, "candle_fetch_failed")
-                    return False
-            mostrecent_completedcandle = mt5.copy_rates_from_pos(market, MT5_TIMEFRAMES[timeframe.upper()], 1, 1)
-            if mostrecent_completedcandle is None or len(mostrecent_completedcandle) == 0:
+                    return False, None, None
+            completed_candles = mt5.copy_rates_from_pos(market, MT5_TIMEFRAMES[timeframe.upper()], 1, chartcalibration.CAPTURE_CANDLE_COUNT)
+            if completed_candles is None or len(completed_candles) == 0:
                 logger.error(f"[Process-{market}] Failed to fetch previous candle for {market} ({timeframe})")
                 save_status(market, timeframe, destination_path, "previous_candle_fetch_failed")
-                return False
+                return False, None, None
         finally:
             mt5.shutdown()
     else:
         logger.debug(f"[Process-{market}] Market {market} is outside trading hours, skipping MT5 candle fetch")
         save_status(market, timeframe, destination_path, "market_closed")
+    return True, candle, completed_candles
+
+def save_candle_files(market, timeframe, destination_path, candle, completed_candles):
+    """Write currentpricecandle.json, mostrecent_completedcandle.json and the capture candles next to a verified chart."""
+    normalized_tf = normalize_timeframe(timeframe)
+    market_folder = os.path.join(destination_path, market.replace(" ", "_"), normalized_tf)
+    mostrecent_completedcandle = completed_candles[-1:] if completed_candles is not None else None
+    if candle is not None:
+        candle_data = {
+            "market": market,
+            "timeframe": timeframe,
+            "open_price": float(candle['open']),
+            "time": datetime.fromtimestamp(candle['time'], tz=pytz.UTC).isoformat()
+        }
+        candle_json_path = os.path.join(market_folder, "currentpricecandle.json")
+        try:
+            with open(candle_json_path, 'w') as f:
+                json.dump(candle_data, f, indent=4)
+            logger.debug(f"[Process-{market}] Saved current candle data to {candle_json_path}")
+        except Exception as e:
+            logger.error(f"[Process-{market}] Error saving current candle data to {candle_json_path}: {e}")
+            save_status(market, timeframe, destination_path, "candle_data_save_failed")
+    if mostrecent_completedcandle is not None:
+        open_price = float(mostrecent_completedcandle[0]['open'])
+        close_price = float(mostrecent_completedcandle[0]['close'])
+        candle_color = "green" if close_price > open_price else "red" if close_price < open_price else "neutral"
+        mostrecent_completedcandle_data = {
+            "market": market,
+            "timeframe": timeframe,
+            "open_price": open_price,
+            "close_price": close_price,
+            "high_price": float(mostrecent_completedcandle[0]['high']),
+            "low_price": float(mostrecent_completedcandle[0]['low']),
+            "time": datetime.fromtimestamp(mostrecent_completedcandle[0]['time'], tz=pytz.UTC).isoformat(),
+            "color": candle_color
+        }
+        mostrecent_completedcandle_json_path = os.path.join(market_folder, "mostrecent_completedcandle.json")
+        try:
+            with open(mostrecent_completedcandle_json_path, 'w') as f:
+                json.dump(mostrecent_completedcandle_data, f, indent=4)
+            logger.debug(f"[Process-{market}] Saved previous candle data to {mostrecent_completedcandle_json_path}")
+        except Exception as e:
+            logger.error(f"[Process-{market}] Error saving previous candle data to {mostrecent_completedcandle_json_path}: {e}")
+            save_status(market, timeframe, destination_path, "previous_candle_data_save_failed")
+        try:
+            chartcalibration.save_capture_candles(market_folder, completed_candles)
+        except Exception as e:
+            logger.error(f"[Process-{market}] Error saving capture candles for {market} ({timeframe}): {e}")
+
+@metrics.timed()
+def download_and_verify_chart(driver, market, timeframe, destination_path, max_timeout=30):
+    """Download and verify chart, retrying up to 2 times within session, and save candle data and status."""
+    normalized_tf = normalize_timeframe(timeframe)  # Normalize timeframe for folder path
+    market_folder = os.path.join(destination_path, market.replace(" ", "_"), normalized_tf)
+    os.makedirs(market_folder, exist_ok=True)
+
+    # Initialize status
+    save_status(market, timeframe, destination_path, "initializing")
+
+    ok, candle, completed_candles = fetch_chart_candles(market, timeframe, destination_path)
+    if not ok:
+        return False
 
     max_retries = 3
     timeout = 1
@@ -1203,87 +1366,38 @@ def download_and_verify_chart(driver, market, timeframe, destination_path, max_t
                 logger.error(f"[Process-{market}] Chart canvas not detected")
                 save_status(market, timeframe, destination_path, "chart_canvas_not_detected")
                 return False
-            if not save_chart(driver, timeout, market):
-                logger.error(f"[Process-{market}] Failed to save chart for {market} ({timeframe})")
-                save_status(market, timeframe, destination_path, "chart_save_failed")
-                return False
-            downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-            latest_file = wait_for_download(downloads_path, market, timeframe)
-            if not latest_file:
-                logger.error(f"[Process-{market}] No chart file found in downloads for {market} ({timeframe}), retrying save")
-                save_status(market, timeframe, destination_path, "download_failed")
+            capture = capture_chart(driver, timeout, market, timeframe)
+            if not capture:
+                logger.error(f"[Process-{market}] No chart captured for {market} ({timeframe}), retrying")
+                save_status(market, timeframe, destination_path, "chart_capture_failed")
                 time.sleep(3)
-                if not save_chart(driver, timeout, market):
-                    logger.error(f"[Process-{market}] Failed to save chart after retry for {market} ({timeframe})")
-                    save_status(market, timeframe, destination_path, "chart_save_failed")
-                    return False
-                latest_file = wait_for_download(downloads_path, market, timeframe)
-                if not latest_file:
-                    logger.error(f"[Process-{market}] Still no chart file found for {market} ({timeframe})")
-                    save_status(market, timeframe, destination_path, "download_failed")
+                capture = capture_chart(driver, timeout, market, timeframe)
+                if not capture:
+                    logger.error(f"[Process-{market}] Still no chart captured for {market} ({timeframe})")
+                    save_status(market, timeframe, destination_path, "chart_capture_failed")
                     return False
-            verified, needs_reload = verify_candlestick_contours(latest_file, market, timeframe)
+            verified, needs_reload = verify_candlestick_contours(capture["source"], market, timeframe, data=capture["data"])
             if verified:
-                destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path)
+                destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path, capture)
                 if not destination_file:
-                    logger.error(f"[Process-{market}] Failed to copy chart for {market} ({timeframe}), retrying save")
+                    logger.error(f"[Process-{market}] Failed to copy chart for {market} ({timeframe}), retrying capture")
                     save_status(market, timeframe, destination_path, "chart_copy_failed")
                     time.sleep(3)
-                    if not save_chart(driver, timeout, market):
-                        logger.error(f"[Process-{market}] Failed to save chart after retry for {market} ({timeframe})")
-                        save_status(market, timeframe, destination_path, "chart_save_failed")
+                    capture = capture_chart(driver, timeout, market, timeframe)
+                    if not capture:
+                        logger.error(f"[Process-{market}] Still no chart captured for {market} ({timeframe})")
+                        save_status(market, timeframe, destination_path, "chart_capture_failed")
                         return False
-                    latest_file = wait_for_download(downloads_path, market, timeframe)
-                    if not latest_file:
-                        logger.error(f"[Process-{market}] Still no chart file found for {market} ({timeframe})")
-                        save_status(market, timeframe, destination_path, "download_failed")
-                        return False
-                    destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path)
+                    destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path, capture)
                     if not destination_file:
                         logger.error(f"[Process-{market}] Failed to copy chart after retry for {market} ({timeframe})")
                         save_status(market, timeframe, destination_path, "chart_copy_failed")
                         return False
-                if candle is not None:
-                    candle_data = {
-                        "market": market,
-                        "timeframe": timeframe,
-                        "open_price": float(candle['open']),
-                        "time": datetime.fromtimestamp(candle['time'], tz=pytz.UTC).isoformat()
-                    }
-                    candle_json_path = os.path.join(market_folder, "currentpricecandle.json")
-                    try:
-                        with open(candle_json_path, 'w') as f:
-                            json.dump(candle_data, f, indent=4)
-                        logger.debug(f"[Process-{market}] Saved current candle data to {candle_json_path}")
-                    except Exception as e:
-                        logger.error(f"[Process-{market}] Error saving current candle data to {candle_json_path}: {e}")
-                        save_status(market, timeframe, destination_path, "candle_data_save_failed")
-                if mostrecent_completedcandle is not None:
-                    open_price = float(mostrecent_completedcandle[0]['open'])
-                    close_price = float(mostrecent_completedcandle[0]['close'])
-                    candle_color = "green" if close_price > open_price else "red" if close_price < open_price else "neutral"
-                    mostrecent_completedcandle_data = {
-                        "market": market,
-                        "timeframe": timeframe,
-                        "open_price": open_price,
-                        "close_price": close_price,
-                        "high_price": float(mostrecent_completedcandle[0]['high']),
-                        "low_price": float(mostrecent_completedcandle[0]['low']),
-                        "time": datetime.fromtimestamp(mostrecent_completedcandle[0]['time'], tz=pytz.UTC).isoformat(),
-                        "color": candle_color
-                    }
-                    mostrecent_completedcandle_json_path = os.path.join(market_folder, "mostrecent_completedcandle.json")
-                    try:
-                        with open(mostrecent_completedcandle_json_path, 'w') as f:
-                            json.dump(mostrecent_completedcandle_data, f, indent=4)
-                        logger.debug(f"[Process-{market}] Saved previous candle data to {mostrecent_completedcandle_json_path}")
-                    except Exception as e:
-                        logger.error(f"[Process-{market}] Error saving previous candle data to {mostrecent_completedcandle_json_path}: {e}")
-                        save_status(market, timeframe, destination_path, "previous_candle_data_save_failed")
+                save_candle_files(market, timeframe, destination_path, candle, completed_candles)
                 save_status(market, timeframe, destination_path, "chart_identified")
                 return True
             else:
-                os.remove(latest_file)
+                discard_capture(capture)
                 logger.warning(f"[Process-{market}] Verification failed for {market} ({timeframe})")
                 save_status(market, timeframe, destination_path, "chart_verification_failed")
                 if attempt < max_retries - 1:
@@ -1303,63 +1417,23 @@ def download_and_verify_chart(driver, market, timeframe, destination_path, max_t
                         save_status(market, timeframe, destination_path, "timeframe_selection_failed")
                         return False
                     time.sleep(5)
-                    if not save_chart(driver, timeout, market):
-                        logger.error(f"[Process-{market}] Failed to save chart after reload for {market} ({timeframe})")
-                        save_status(market, timeframe, destination_path, "chart_save_failed")
-                        return False
-                    latest_file = wait_for_download(downloads_path, market, timeframe)
-                    if not latest_file:
-                        logger.error(f"[Process-{market}] No chart file found after reload for {market} ({timeframe})")
-                        save_status(market, timeframe, destination_path, "download_failed")
+                    capture = capture_chart(driver, timeout, market, timeframe)
+                    if not capture:
+                        logger.error(f"[Process-{market}] No chart captured after reload for {market} ({timeframe})")
+                        save_status(market, timeframe, destination_path, "chart_capture_failed")
                         return False
-                    verified, _ = verify_candlestick_contours(latest_file, market, timeframe)
+                    verified, _ = verify_candlestick_contours(capture["source"], market, timeframe, data=capture["data"])
                     if verified:
-                        destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path)
+                        destination_file = copy_chart_to_destination(driver, market, timeframe, destination_path, capture)
                         if not destination_file:
                             logger.error(f"[Process-{market}] Failed to copy chart after reload for {market} ({timeframe})")
                             save_status(market, timeframe, destination_path, "chart_copy_failed")
                             return False
-                        if candle is not None:
-                            candle_data = {
-                                "market": market,
-                                "timeframe": timeframe,
-                                "open_price": float(candle['open']),
-                                "time": datetime.fromtimestamp(candle['time'], tz=pytz.UTC).isoformat()
-                            }
-                            candle_json_path = os.path.join(market_folder, "currentpricecandle.json")
-                            try:
-                                with open(candle_json_path, 'w') as f:
-                                    json.dump(candle_data, f, indent=4)
-                                logger.debug(f"[Process-{market}] Saved current candle data to {candle_json_path}")
-                            except Exception as e:
-                                logger.error(f"[Process-{market}] Error saving current candle data to {candle_json_path}: {e}")
-                                save_status(market, timeframe, destination_path, "candle_data_save_failed")
-                        if mostrecent_completedcandle is not None:
-                            open_price = float(mostrecent_completedcandle[0]['open'])
-                            close_price = float(mostrecent_completedcandle[0]['close'])
-                            candle_color = "green" if close_price > open_price else "red" if close_price < open_price else "neutral"
-                            mostrecent_completedcandle_data = {
-                                "market": market,
-                                "timeframe": timeframe,
-                                "open_price": open_price,
-                                "close_price": close_price,
-                                "high_price": float(mostrecent_completedcandle[0]['high']),
-                                "low_price": float(mostrecent_completedcandle[0]['low']),
-                                "time": datetime.fromtimestamp(mostrecent_completedcandle[0]['time'], tz=pytz.UTC).isoformat(),
-                                "color": candle_color
-                            }
-                            mostrecent_completedcandle_json_path = os.path.join(market_folder, "mostrecent_completedcandle.json")
-                            try:
-                                with open(mostrecent_completedcandle_json_path, 'w') as f:
-                                    json.dump(mostrecent_completedcandle_data, f, indent=4)
-                                logger.debug(f"[Process-{market}] Saved previous candle data to {mostrecent_completedcandle_json_path}")
-                            except Exception as e:
-                                logger.error(f"[Process-{market}] Error saving previous candle data to {mostrecent_completedcandle_json_path}: {e}")
-                                save_status(market, timeframe, destination_path, "previous_candle_data_save_failed")
+                        save_candle_files(market, timeframe, destination_path, candle, completed_candles)
                         save_status(market, timeframe, destination_path, "chart_identified")
                         return True
                     else:
-                        os.remove(latest_file)
+                        discard_capture(capture)
                         logger.warning(f"[Process-{market}] Verification failed after reload for {market} ({timeframe})")
                         save_status(market, timeframe, destination_path, "chart_verification_failed")
                         return False
@@ -1370,17 +1444,117 @@ def download_and_verify_chart(driver, market, timeframe, destination_path, max_t
             return False
     return False
 
+def verify_and_analyse_capture(market, timeframe, capture, candle, completed_candles, destination_path):
+    """Pipeline worker: verify a capture, store it with its candle files and analyse it straight away.
+    Returns True once the chart is stored as chart_identified; False sends the timeframe back for a serial retry."""
+    verified, _ = verify_candlestick_contours(capture["source"], market, timeframe, data=capture["data"])
+    if not verified:
+        discard_capture(capture)
+        logger.warning(f"[Process-{market}] Verification failed for {market} ({timeframe}) in pipeline")
+        save_status(market, timeframe, destination_path, "chart_verification_failed")
+        return False
+    if not copy_chart_to_destination(None, market, timeframe, destination_path, capture):
+        save_status(market, timeframe, destination_path, "chart_copy_failed")
+        return False
+    save_candle_files(market, timeframe, destination_path, candle, completed_candles)
+    save_status(market, timeframe, destination_path, "chart_identified")
+    if PIPELINE_ANALYSIS:
+        analyse_fetched_chart(market, timeframe)
+    return True
+
+def analyse_fetched_chart(market, timeframe):
+    """Run analysechart_m on a chart that was just stored; analysechart_m's own run then skips it.
+    candlesamountinbetween.json is refreshed from the chart's mostrecent_completedcandle.json first, as updateorders
+    does before analysechart_m in program.py's cycle; if that fails the analysis is left to analysechart_m's own run."""
+    normalized_tf = normalize_timeframe(timeframe)
+    mostrecent_path = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalized_tf, "mostrecent_completedcandle.json")
+    try:
+        with open(mostrecent_path, 'r') as f:
+            candlesinbetween.refresh_for_chart(market, timeframe, json.load(f))
+    except Exception as e:
+        logger.warning(f"[Process-{market}] Could not refresh candlesamountinbetween.json for {market} ({timeframe}) from "
+                       f"{mostrecent_path}, leaving its analysis to analysechart_m: {e}")
+        return
+    try:
+        if not analysechart_m.process_market_timeframe(market, timeframe):
+            logger.warning(f"[Process-{market}] Pipeline analysis failed for {market} ({timeframe}), analysechart_m will retry it")
+    except Exception as e:
+        logger.error(f"[Process-{market}] Error analysing {market} ({timeframe}) in pipeline: {e}")
+
+@metrics.timed()
+def run_timeframe_pipeline(driver, market, eligible_timeframes, processed_pairs):
+    """Switch timeframes and capture in the browser while a worker pool verifies, stores and analyses the captures.
+    Timeframes whose capture or verification fails are retried serially with download_and_verify_chart."""
+    success = True
+    retry_timeframes = []
+    pending = []
+    with multiprocessing.Pool(processes=PIPELINE_WORKERS) as pool:
+        for tf in eligible_timeframes:
+            logger.debug(f"[Process-{market}] Capturing timeframe {tf} for {market}")
+            if not timeframe(driver, tf, market):
+                logger.error(f"[Process-{market}] Failed to select timeframe {tf} for {market}")
+                save_status(market, tf, DESTINATION_PATH, "timeframe_selection_failed")
+                success = False
+                break
+            save_status(market, tf, DESTINATION_PATH, "initializing")
+            ok, candle, completed_candles = fetch_chart_candles(market, tf, DESTINATION_PATH)
+            if not ok:
+                success = False
+                break
+            capture = capture_chart(driver, 1, market, tf) if check_page_load_status(driver, market, timeout=15) else None
+            if not capture:
+                retry_timeframes.append(tf)
+                continue
+            pending.append((tf, pool.apply_async(
+                verify_and_analyse_capture, (market, tf, capture, candle, completed_candles, DESTINATION_PATH)
+            )))
+
+        # Wait for in-flight charts even after a failure, so no worker is killed while writing
+        for tf, result in pending:
+            try:
+                stored = result.get()
+            except Exception as e:
+                logger.error(f"[Process-{market}] Pipeline worker failed for {market} ({tf}): {e}")
+                stored = False
+            if stored:
+                processed_pairs.append((market, tf))
+            else:
+                retry_timeframes.append(tf)
+        if not success:
+            return False
+
+        pending_analysis = []
+        for tf in [tf for tf in eligible_timeframes if tf in retry_timeframes]:
+            logger.warning(f"[Process-{market}] Retrying timeframe {tf} for {market} without the pipeline")
+            if not timeframe(driver, tf, market):
+                logger.error(f"[Process-{market}] Failed to select timeframe {tf} for {market}")
+                save_status(market, tf, DESTINATION_PATH, "timeframe_selection_failed")
+                success = False
+                break
+            if not download_and_verify_chart(driver, market, tf, DESTINATION_PATH):
+                logger.error(f"[Process-{market}] Failed to process chart for {market} ({tf})")
+                success = False
+                break
+            processed_pairs.append((market, tf))
+            if PIPELINE_ANALYSIS:
+                pending_analysis.append(pool.apply_async(analyse_fetched_chart, (market, tf)))
+        for result in pending_analysis:
+            result.get()
+    return success
+
 def marketsstatus(destination_path, markets, timeframes):
-    """Generate a status report for all markets based on their verification.json files."""
+    """Generate a status report for all markets based on their verification entries."""
     logger.debug("Generating market status report")
     try:
         chart_identified_markets = {}
         incomplete_markets = {}
+        verifications = marketstatusstore.get_verifications(markets)
+        statuses = marketstatusstore.get_statuses(markets, [normalize_timeframe(tf) for tf in timeframes])
 
         for market in markets:
-            verification_file = os.path.join(destination_path, market.replace(" ", "_"), "verification.json")
-            if not os.path.exists(verification_file):
-                logger.warning(f"No verification.json found for {market}, marking all timeframes as incomplete")
+            verification_data = verifications.get(market)
+            if verification_data is None:
+                logger.warning(f"No verification found for {market}, marking all timeframes as incomplete")
                 incomplete_markets[market] = {
                     "timeframes": timeframes,
                     "reason": "missing_verification_file"
@@ -1388,8 +1562,6 @@ def marketsstatus(destination_path, markets, timeframes):
                 continue
 
             try:
-                with open(verification_file, 'r') as f:
-                    verification_data = json.load(f)
                 identified_timeframes = []
                 incomplete_timeframes = []
                 reasons = []
@@ -1397,23 +1569,16 @@ def marketsstatus(destination_path, markets, timeframes):
                 for tf in timeframes:
                     normalized_tf = normalize_timeframe(tf)
                     status = verification_data.get(tf.lower(), "missing_status")
-                    status_file = os.path.join(destination_path, market.replace(" ", "_"), normalized_tf, "status.json")
                     
                     if status == "chart_identified":
                         identified_timeframes.append(tf)
                     else:
                         incomplete_timeframes.append(tf)
-                        # Determine reason based on status or status.json
+                        # Determine reason based on status or the timeframe's stored status
                         if status == "missing_status":
-                            if os.path.exists(status_file):
-                                try:
-                                    with open(status_file, 'r') as f_status:
-                                        status_data = json.load(f_status)
-                                        status_reason = status_data.get("status", "incomplete")
-                                        reasons.append(f"{tf}: {status_reason}")
-                                except Exception as e:
-                                    logger.error(f"Error reading status.json for {market} ({tf}): {e}")
-                                    reasons.append(f"{tf}: error_reading_status")
+                            status_data = statuses.get((market, normalized_tf))
+                            if status_data is not None:
+                                reasons.append(f"{tf}: {status_data.get('status', 'incomplete')}")
                             else:
                                 reasons.append(f"{tf}: missing_status_file")
                         else:
@@ -1430,7 +1595,7 @@ def marketsstatus(destination_path, markets, timeframes):
                     }
 
             except Exception as e:
-                logger.error(f"Error reading verification.json for {market}: {e}")
+                logger.error(f"Error reading verification for {market}: {e}")
                 incomplete_markets[market] = {
                     "timeframes": timeframes,
                     "reason": "error_reading_verification"
@@ -1457,7 +1622,7 @@ def marketsstatus(destination_path, markets, timeframes):
     
 def timeframeselligibilityupdater(*, timeframe, elligible_status):
     """
-    Configure eligible timeframes for processing by setting elligible_status and status in status.json.
+    Configure eligible timeframes for processing by setting elligible_status and status in the market status store.
     This is a settings function called once at script start to specify which timeframes to process.
     
     Args:
@@ -1499,74 +1664,52 @@ def timeframeselligibilityupdater(*, timeframe, elligible_status):
         
         logger.debug(f"Configuring valid timeframes: {valid_timeframes}, elligible_status: {elligible_status}")
         
-        # Update or create status.json for each market and timeframe
+        # Get current time in WAT (Africa/Lagos, UTC+1)
+        current_time = datetime.now(pytz.timezone('Africa/Lagos'))
+        am_pm = "am" if current_time.hour < 12 else "pm"
+        timestamp = (
+            f"{current_time.strftime('%Y-%m-%d T %I:%M:%S')} {am_pm} "
+            f".{current_time.microsecond:06d}+01:00"
+        )
+        
+        # Update or create the status of each specified market and timeframe, preserving other fields
+        specified_updates = []
         for market in MARKETS:
             for tf in TIMEFRAMES:
                 normalized_tf = normalize_timeframe(tf)
-                # Only process specified timeframes
                 if normalized_tf in valid_timeframes:
-                    try:
-                        market_folder = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalized_tf)
-                        status_file = os.path.join(market_folder, "status.json")
-                        os.makedirs(market_folder, exist_ok=True)
-                        
-                        # Get current time in WAT (Africa/Lagos, UTC+1)
-                        current_time = datetime.now(pytz.timezone('Africa/Lagos'))
-                        am_pm = "am" if current_time.hour < 12 else "pm"
-                        hour_12 = current_time.hour % 12 or 12
-                        timestamp = (
-                            f"{current_time.strftime('%Y-%m-%d T %I:%M:%S')} {am_pm} "
-                            f".{current_time.microsecond:06d}+01:00"
-                        )
-                        
-                        # Load existing status.json or create new
-                        status_data = {
-                            "market": market,
-                            "timeframe": tf,
-                            "normalized_timeframe": normalized_tf,
-                            "timestamp": timestamp,
-                            "elligible_status": elligible_status,
-                            "status": elligible_status  # Set status to the same value as elligible_status
-                        }
-                        
-                        if os.path.exists(status_file):
-                            try:
-                                with open(status_file, 'r') as f:
-                                    existing_data = json.load(f)
-                                # Update only the specified fields, preserving others
-                                existing_data.update({
-                                    "elligible_status": elligible_status,
-                                    "status": elligible_status,  # Update status to match elligible_status
-                                    "timestamp": timestamp
-                                })
-                                status_data = existing_data
-                            except Exception as e:
-                                logger.warning(f"[Process-{market}] Error reading existing status.json for {market} ({tf}): {e}")
-                        
-                        # Write updated status.json
-                        with open(status_file, 'w') as f:
-                            json.dump(status_data, f, indent=4)
-                        logger.debug(f"[Process-{market}] Configured status.json for {market} ({tf}) with elligible_status: {elligible_status}, status: {status_data['status']}")
-                    except Exception as e:
-                        logger.error(f"[Process-{market}] Error configuring status.json for {market} ({tf}): {e}")
-                else:
-                    # For non-specified timeframes, set elligible_status to a non-processable state if needed
-                    try:
-                        market_folder = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalized_tf)
-                        status_file = os.path.join(market_folder, "status.json")
-                        if os.path.exists(status_file):
-                            with open(status_file, 'r') as f:
-                                existing_data = json.load(f)
-                            if existing_data.get("elligible_status") != "chart_identified":
-                                existing_data["elligible_status"] = "inactive"
-                                existing_data["timestamp"] = datetime.now(pytz.timezone('Africa/Lagos')).strftime(
-                                    "%Y-%m-%d T %I:%M:%S %p .%f+01:00"
-                                )
-                                with open(status_file, 'w') as f:
-                                    json.dump(existing_data, f, indent=4)
-                                logger.debug(f"[Process-{market}] Set elligible_status to 'inactive' for non-specified timeframe {tf} of {market}")
-                    except Exception as e:
-                        logger.error(f"[Process-{market}] Error updating non-specified timeframe {tf} for {market}: {e}")
+                    defaults = {
+                        "market": market,
+                        "timeframe": tf,
+                        "normalized_timeframe": normalized_tf
+                    }
+                    fields = {
+                        "elligible_status": elligible_status,
+                        "status": elligible_status,  # Set status to the same value as elligible_status
+                        "timestamp": timestamp
+                    }
+                    specified_updates.append((market, normalized_tf, fields, defaults))
+        try:
+            marketstatusstore.update_statuses(specified_updates)
+            logger.debug(f"Configured {len(specified_updates)} market timeframes with elligible_status: {elligible_status}")
+        except Exception as e:
+            logger.error(f"Error configuring statuses for timeframes {valid_timeframes}: {e}")
+            return False
+        
+        # For non-specified timeframes, set elligible_status to a non-processable state if needed
+        try:
+            other_timeframes = [normalize_timeframe(tf) for tf in TIMEFRAMES if normalize_timeframe(tf) not in valid_timeframes]
+            statuses = marketstatusstore.get_statuses(MARKETS, other_timeframes)
+            inactive_timestamp = datetime.now(pytz.timezone('Africa/Lagos')).strftime("%Y-%m-%d T %I:%M:%S %p .%f+01:00")
+            inactive_updates = [
+                (market, tf, {"elligible_status": "inactive", "timestamp": inactive_timestamp}, None)
+                for (market, tf), status_data in statuses.items()
+                if tf in other_timeframes and status_data.get("elligible_status") != "chart_identified"
+            ]
+            marketstatusstore.update_statuses(inactive_updates, only_existing=True)
+            logger.debug(f"Set elligible_status to 'inactive' for {len(inactive_updates)} non-specified market timeframes")
+        except Exception as e:
+            logger.error(f"Error updating non-specified timeframes: {e}")
         
         logger.debug("Completed configuring eligible timeframes")
         return True
@@ -1575,6 +1718,7 @@ def timeframeselligibilityupdater(*, timeframe, elligible_status):
         logger.error(f"Error in timeframeselligibilityupdater: {e}")
         return False
         
+@metrics.timed(flush_after=True)
 def run_script_for_market(market, eligible_pairs, processed_pairs):
     """Process a single market for eligible timeframes with elligible_status 'order_free'."""
     driver = None
@@ -1631,21 +1775,24 @@ def run_script_for_market(market, eligible_pairs, processed_pairs):
             if not watchlist(driver, 'close', market):
                 logger.warning(f"[Process-{market}] Failed to close watchlist for {market}, proceeding")
 
-            success = True
-            for tf in eligible_timeframes:
-                logger.debug(f"[Process-{market}] Processing timeframe {tf} for {market}")
-                if not timeframe(driver, tf, market):
-                    logger.error(f"[Process-{market}] Failed to select timeframe {tf} for {market}")
-                    save_status(market, tf, DESTINATION_PATH, "timeframe_selection_failed")
-                    success = False
-                    break
-                result = download_and_verify_chart(driver, market, tf, DESTINATION_PATH)
-                if not result:
-                    logger.error(f"[Process-{market}] Failed to process chart for {market} ({tf})")
-                    success = False
-                    break
-                else:
-                    processed_pairs.append((market, tf))  # Track successful market-timeframe pair
+            if PIPELINE_ENABLED:
+                success = run_timeframe_pipeline(driver, market, eligible_timeframes, processed_pairs)
+            else:
+                success = True
+                for tf in eligible_timeframes:
+                    logger.debug(f"[Process-{market}] Processing timeframe {tf} for {market}")
+                    if not timeframe(driver, tf, market):
+                        logger.error(f"[Process-{market}] Failed to select timeframe {tf} for {market}")
+                        save_status(market, tf, DESTINATION_PATH, "timeframe_selection_failed")
+                        success = False
+                        break
+                    result = download_and_verify_chart(driver, market, tf, DESTINATION_PATH)
+                    if not result:
+                        logger.error(f"[Process-{market}] Failed to process chart for {market} ({tf})")
+                        success = False
+                        break
+                    else:
+                        processed_pairs.append((market, tf))  # Track successful market-timeframe pair
             driver.quit()
             driver = None
             create_verification_json(market, DESTINATION_PATH)
@@ -1695,18 +1842,16 @@ def test_all_symbols():
 
 def is_pair_completed(market, timeframe):
     """Check if a market-timeframe pair is completed (chart_identified or market_closed)."""
-    status_file = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalize_timeframe(timeframe), "status.json")
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
-                status = status_data.get("status")
-                return status in ["chart_identified", "market_closed"]
-        except Exception as e:
-            logger.error(f"[Process-{market}] Error checking status for {market} ({timeframe}): {e}")
+    try:
+        status_data = marketstatusstore.get_status(market, normalize_timeframe(timeframe))
+        if status_data is None:
             return False
-    return False
+        return status_data.get("status") in ["chart_identified", "market_closed"]
+    except Exception as e:
+        logger.error(f"[Process-{market}] Error checking status for {market} ({timeframe}): {e}")
+        return False
 
+@metrics.timed()
 def main():
     """Main loop with market categorization, symbol pre-check, verification.json creation, and prioritized market processing."""
     logger.debug("Starting main loop")
@@ -1714,11 +1859,10 @@ def main():
     
     # Initialize or overwrite the batch processed JSON file
     BATCH_PROCESSEDCHART_JSON = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\chartprocessed.json"
+    # main is the only writer, so batch_data stays in memory and is rewritten atomically after each batch
     batch_data = {"batch_processed": {}}
     try:
-        os.makedirs(os.path.dirname(BATCH_PROCESSEDCHART_JSON), exist_ok=True)  # Ensure directory exists
-        with open(BATCH_PROCESSEDCHART_JSON, 'w') as f:
-            json.dump(batch_data, f, indent=4)
+        write_json_atomic(BATCH_PROCESSEDCHART_JSON, batch_data)
         logger.debug(f"Initialized/overwritten {BATCH_PROCESSEDCHART_JSON} for real-time batch tracking")
     except Exception as e:
         logger.error(f"Error initializing {BATCH_PROCESSEDCHART_JSON}: {e}")
@@ -1804,9 +1948,6 @@ def main():
             markets_processed_in_batch = len(current_batch) - len(failed_markets)
             remaining_markets = len(markets_to_process) - len(current_batch) + len(failed_markets)
             try:
-                # Read existing batch data
-                with open(BATCH_PROCESSEDCHART_JSON, 'r') as f:
-                    batch_data = json.load(f)
                 # Append new batch info
                 batch_key = f"batch{batch_attempts}"
                 batch_data["batch_processed"][batch_key] = {
@@ -1814,8 +1955,7 @@ def main():
                     "remaining": remaining_markets
                 }
                 # Write updated batch data
-                with open(BATCH_PROCESSEDCHART_JSON, 'w') as f:
-                    json.dump(batch_data, f, indent=4)
+                write_json_atomic(BATCH_PROCESSEDCHART_JSON, batch_data)
                 logger.debug(f"Real-time update to {BATCH_PROCESSEDCHART_JSON} for {batch_key}: processed={markets_processed_in_batch}, remaining={remaining_markets}")
             except Exception as e:
                 logger.error(f"Error updating {BATCH_PROCESSEDCHART_JSON} for batch {batch_attempts}: {e}")
@@ -1873,16 +2013,14 @@ def main():
     for market, tf in eligible_pairs:
         if not is_pair_completed(market, tf):
             all_completed = False
-            status_file = os.path.join(DESTINATION_PATH, market.replace(" ", "_"), normalize_timeframe(tf), "status.json")
-            if os.path.exists(status_file):
-                try:
-                    with open(status_file, 'r') as f:
-                        status_data = json.load(f)
-                        logger.warning(f"[Process-{market}] {market} ({tf}) not completed: status={status_data.get('status')}, elligible_status={status_data.get('elligible_status')}")
-                except Exception as e:
-                    logger.error(f"[Process-{market}] Error reading status.json for {market} ({tf}): {e}")
-            else:
-                logger.warning(f"[Process-{market}] status.json missing for {market} ({tf})")
+            try:
+                status_data = marketstatusstore.get_status(market, normalize_timeframe(tf))
+                if status_data is not None:
+                    logger.warning(f"[Process-{market}] {market} ({tf}) not completed: status={status_data.get('status')}, elligible_status={status_data.get('elligible_status')}")
+                else:
+                    logger.warning(f"[Process-{market}] status missing for {market} ({tf})")
+            except Exception as e:
+                logger.error(f"[Process-{market}] Error reading status for {market} ({tf}): {e}")
     
     # Log final batch JSON state
     try:
@@ -0,0 +1,143 @@
+import time
+import cv2
+import numpy as np
+import cipherlogging
+
+logger = cipherlogging.get_logger(__name__)
+
+# Horizontal structuring element of the morphology path, as a fraction of the chart width
+LINE_KERNEL_FRACTION = 0.2
+OPEN_ITERATIONS = 2
+
+# A removed line must be at least this fraction of the width long, this many times longer than
+# thick, and thinner than MAX_LINE_THICKNESS rows
+MIN_LINE_WIDTH_FRACTION = 0.1
+MIN_ASPECT_RATIO = 10
+MAX_LINE_THICKNESS = 5
+
+# "projection" finds lines from per-row run lengths; "morphology" is the original MORPH_OPEN path
+DEFAULT_METHOD = "projection"
+
+
+def log_and_print(message, level="INFO", *args):
+    cipherlogging.log_and_print(logger, message, level, *args)
+
+
+def binarize(img_enhanced):
+    gray = cv2.cvtColor(img_enhanced, cv2.COLOR_BGR2GRAY)
+    return cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)[1]
+
+
+def open_reach(width):
+    """How far MORPH_OPEN's erosions reach (left, right) of a pixel. The kernel's anchor is k // 2, so for an
+    even k the reach is one pixel longer on the left and the opened run ends up shifted right by the difference."""
+    k = max(1, int(width * LINE_KERNEL_FRACTION))
+    anchor = k // 2
+    return OPEN_ITERATIONS * anchor, OPEN_ITERATIONS * (k - 1 - anchor)
+
+
+def _line_shape_ok(w, h, width):
+    return (w > width * MIN_LINE_WIDTH_FRACTION) & (w / np.maximum(h, 1) > MIN_ASPECT_RATIO) & (h < MAX_LINE_THICKNESS)
+
+
+def line_mask_projection(binary, width):
+    """Pixels of long horizontal runs, found from row sums and run lengths instead of a large-kernel opening."""
+    height, cols = binary.shape[:2]
+    left, right = open_reach(width)
+    line = np.zeros((height, cols), dtype=bool)
+
+    # Row projection: only rows with enough set pixels can hold a long run
+    rows = np.flatnonzero(np.count_nonzero(binary, axis=1) > min(left, right))
+    if not len(rows):
+        return line
+
+    # Run starts/ends per candidate row (end is exclusive)
+    padded = np.zeros((len(rows), cols + 2), dtype=np.int8)
+    padded[:, 1:-1] = binary[rows] > 0
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    # What the erosions keep of each run (pixels outside the image count as set), then what the dilations
+    # grow that back to (pixels outside count as unset)
+    eroded_starts = starts + np.where(starts > 0, left, 0)
+    eroded_ends = ends - np.where(ends < cols, right, 0)
+    long_runs = eroded_ends > eroded_starts
+    if not long_runs.any():
+        return line
+    line_starts = np.maximum(eroded_starts[long_runs] - right, 0)
+    line_ends = np.minimum(eroded_ends[long_runs] + left, cols)
+
+    delta = np.zeros((len(rows), cols + 1), dtype=np.int32)
+    np.add.at(delta, (start_rows[long_runs], line_starts), 1)
+    np.add.at(delta, (start_rows[long_runs], line_ends), -1)
+    line[rows] = np.cumsum(delta, axis=1)[:, :-1] > 0
+
+    # Same shape checks the morphology path applies to each line contour
+    band_rows = np.flatnonzero(line.any(axis=1))
+    top, bottom = band_rows[0], band_rows[-1] + 1
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(line[top:bottom].astype(np.uint8), connectivity=8)
+    keep = np.zeros(count, dtype=bool)
+    keep[1:] = _line_shape_ok(stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT], width)
+    line[top:bottom] = keep[labels]
+    return line
+
+
+def remove_lines_projection(img_enhanced, mask_red, mask_green, width):
+    """Zero the long horizontal lines in place in the image and both masks; returns the removed pixel count."""
+    line = line_mask_projection(binarize(img_enhanced), width)
+    img_enhanced[line] = 0
+    mask_red[line] = 0
+    mask_green[line] = 0
+    return int(np.count_nonzero(line))
+
+
+def remove_lines_morphology(img_enhanced, mask_red, mask_green, width):
+    """The original MORPH_OPEN detection, kept as a fallback; returns the number of lines removed."""
+    binary = binarize(img_enhanced)
+    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(width * LINE_KERNEL_FRACTION), 1))
+    horizontal_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horizontal_kernel, iterations=OPEN_ITERATIONS)
+
+    removed = 0
+    contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if _line_shape_ok(w, h, width):
+            cv2.drawContours(img_enhanced, [contour], -1, (0, 0, 0), -1)
+            cv2.drawContours(mask_red, [contour], -1, 0, -1)
+            cv2.drawContours(mask_green, [contour], -1, 0, -1)
+            removed += 1
+    return removed
+
+
+def remove_lines(img_enhanced, mask_red, mask_green, width, method=DEFAULT_METHOD):
+    """Remove gridlines/price lines with the given method, falling back to morphology if projection fails."""
+    if method == "projection":
+        try:
+            remove_lines_projection(img_enhanced, mask_red, mask_green, width)
+            return "projection"
+        except Exception as e:
+            log_and_print(f"Projection gridline removal failed, using morphology: {str(e)}", "WARNING")
+    remove_lines_morphology(img_enhanced, mask_red, mask_green, width)
+    return "morphology"
+
+
+def compare_methods(img_enhanced, mask_red, mask_green, width):
+    """Run both methods on copies of one chart and report timings and the pixels where their results differ."""
+    results = {}
+    for method, func in (("morphology", remove_lines_morphology), ("projection", remove_lines_projection)):
+        img, red, green = img_enhanced.copy(), mask_red.copy(), mask_green.copy()
+        started = time.perf_counter()
+        func(img, red, green, width)
+        results[method] = (img, red, green, time.perf_counter() - started)
+
+    morph_img, morph_red, morph_green, morph_seconds = results["morphology"]
+    proj_img, proj_red, proj_green, proj_seconds = results["projection"]
+    return {
+        "morphology_ms": round(morph_seconds * 1000, 3),
+        "projection_ms": round(proj_seconds * 1000, 3),
+        "speedup": round(morph_seconds / proj_seconds, 2) if proj_seconds else None,
+        "image_pixels_differing": int(np.count_nonzero((morph_img != proj_img).any(axis=2))),
+        "red_mask_pixels_differing": int(np.count_nonzero(morph_red != proj_red)),
+        "green_mask_pixels_differing": int(np.count_nonzero(morph_green != proj_green))
+    }
+
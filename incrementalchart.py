@@ -0,0 +1,195 @@
+import os
+import numpy as np
+import candlecomponents
+
+# Reuse the previous cycle's enhanced chart and only enhance the right edge where new candles appear
+ENABLED = True
+
+# Per market/timeframe cache, next to the other analysechart outputs
+CACHE_FILE = "incrementalchart.npz"
+
+# How many candles may have closed since the cached chart, and how many settled candles
+# must overlap to prove the two charts line up
+MAX_NEW_CANDLES = 3
+OVERLAP_CANDLES = 5
+
+# Extra columns enhanced left of the splice so the 3x3 sharpening sees real neighbours; rows within
+# MARGIN of a changed row are enhanced again too
+MARGIN = 4
+
+# Fraction of candle pixels allowed to differ in the overlap before falling back to a full pass
+MAX_MISMATCH = 0.05
+
+# Share of rows that may have changed left of the splice (price line, bid/ask lines) before a full pass is cheaper
+MAX_CHANGED_ROWS = 0.25
+
+# The first incremental result after a full pass, and then every CHECK_EVERY-th, is checked against a full pass
+CHECK_EVERY = 10
+
+
+def save_cache(output_folder, img, img_enhanced, mask_red, mask_green, center_xs, start_number, checked=False, unchecked_runs=0):
+    """Store the cropped chart, its enhancement (before gridline removal), its masks and the candle layout.
+    checked/unchecked_runs record whether the incremental results since the last full pass were checked."""
+    center_xs = sorted(center_xs)
+    spacing = int(round(float(np.median(np.diff(center_xs))))) if len(center_xs) > 2 else 0
+    # The rightmost candle was still forming; everything left of it is settled
+    forming_left = center_xs[-1] - spacing // 2 if center_xs and spacing else 0
+    try:
+        with open(os.path.join(output_folder, CACHE_FILE), 'wb') as f:
+            np.savez(f, img=img, enhanced=img_enhanced, mask_red=mask_red, mask_green=mask_green,
+                     spacing=spacing, forming_left=forming_left, start_number=start_number,
+                     checked=checked, unchecked_runs=unchecked_runs)
+    except Exception as e:
+        print(f"Error saving incremental chart cache in {output_folder}: {str(e)}")
+
+
+def load_cache(output_folder):
+    path = os.path.join(output_folder, CACHE_FILE)
+    if not ENABLED or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+    except Exception as e:
+        print(f"Error reading incremental chart cache {path}, running a full pass: {str(e)}")
+        return None
+
+
+def _mismatch(cache, roi_red, roi_green, x0, dx):
+    """Share of candle pixels that differ between the new right edge and the cached chart shifted by dx.
+    Rows a solid line crosses in either chart are left out; a moved price line says nothing about the shift."""
+    stop = int(cache["forming_left"]) - dx
+    n = stop - x0
+    if n < int(cache["spacing"]):
+        return 1.0
+    pairs = [(roi_mask[:, :n] > 0, cached_mask[:, x0 + dx:x0 + dx + n] > 0)
+             for roi_mask, cached_mask in ((roi_red, cache["mask_red"]), (roi_green, cache["mask_green"]))]
+    candle_rows = ~np.logical_or.reduce([mask.all(axis=1) for pair in pairs for mask in pair])
+    differing = 0
+    total = 0
+    for new, old in pairs:
+        new, old = new[candle_rows], old[candle_rows]
+        differing += int(np.count_nonzero(new ^ old))
+        total += int(np.count_nonzero(new | old))
+    return differing / max(total, 1)
+
+
+def find_shift(cache, roi_red, roi_green, x0, shift_hint=None):
+    """Pixel offset the chart scrolled by since the cached cycle, or None if no candidate lines up.
+    The candle count shift_hint (from candlesamountinbetween) is tried first."""
+    spacing = int(cache["spacing"])
+    counts = list(range(MAX_NEW_CANDLES + 1))
+    if shift_hint in counts:
+        counts.remove(shift_hint)
+        counts.insert(0, shift_hint)
+    best_dx, best_mismatch = None, None
+    for count in counts:
+        for offset in (0, -1, 1, -2, 2):
+            dx = count * spacing + offset
+            if dx < 0:
+                continue
+            mismatch = _mismatch(cache, roi_red, roi_green, x0, dx)
+            if best_mismatch is None or mismatch < best_mismatch:
+                best_dx, best_mismatch = dx, mismatch
+        if best_mismatch is not None and best_mismatch <= MAX_MISMATCH and count == shift_hint:
+            break
+    if best_mismatch is None or best_mismatch > MAX_MISMATCH:
+        return None
+    return best_dx
+
+
+def changed_rows(cache, img, x0, dx):
+    """Rows where the chart left of x0 differs from the cached chart shifted by dx (moved price or bid/ask lines)."""
+    return np.flatnonzero((img[:, :x0] != cache["img"][:, dx:dx + x0]).any(axis=(1, 2)))
+
+
+def _bands(rows, height):
+    """Contiguous [start, stop) row ranges covering every row within MARGIN of the given rows."""
+    marked = np.zeros(height + 1, dtype=np.int32)
+    np.add.at(marked, np.maximum(rows - MARGIN, 0), 1)
+    np.add.at(marked, np.minimum(rows + MARGIN + 1, height), -1)
+    covered = np.concatenate(([0], np.cumsum(marked)[:-1] > 0, [0])).astype(np.int8)
+    edges = np.diff(covered)
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def _enhance_region(spliced, img, hsv, enhance, rows, cols):
+    """Enhance img[rows, cols] with MARGIN pixels of context and write it into the spliced arrays."""
+    height, width = img.shape[:2]
+    (top, bottom), (left, right) = rows, cols
+    y0, y1 = max(top - MARGIN, 0), min(bottom + MARGIN, height)
+    x0, x1 = max(left - MARGIN, 0), min(right + MARGIN, width)
+    region_hsv = None if hsv is None else np.ascontiguousarray(hsv[y0:y1, x0:x1])
+    enhanced = enhance(np.ascontiguousarray(img[y0:y1, x0:x1]), region_hsv)[:3]
+    for full, part in zip(spliced, enhanced):
+        full[top:bottom, left:right] = part[top - y0:bottom - y0, left - x0:right - x0]
+
+
+def enhance_incremental(cache, img, start_number, enhance, hsv=None):
+    """Enhance only the right edge of img and splice it onto the cached chart shifted into place.
+
+    Rows that changed left of the splice since the cached cycle (a moved price line) and the
+    leftmost columns are enhanced again over the full width, so a full-width line is complete
+    for gridline removal. enhance(img, hsv) must return (img_enhanced, mask_red, mask_green, mask)
+    like the full-chart steps. Returns that tuple for the whole chart, or None when a full pass is
+    needed (no cache, size change, rescaled price axis, too many changed rows or more new candles
+    than MAX_NEW_CANDLES).
+    """
+    if cache is None or "img" not in cache or cache["img"].shape != img.shape:
+        return None
+    spacing = int(cache["spacing"])
+    forming_left = int(cache["forming_left"])
+    if spacing <= 0:
+        return None
+    x0 = forming_left - (MAX_NEW_CANDLES + OVERLAP_CANDLES) * spacing
+    if x0 - MARGIN <= 0:
+        return None
+
+    roi_hsv = None if hsv is None else np.ascontiguousarray(hsv[:, x0 - MARGIN:])
+    roi_enhanced, roi_red, roi_green, _ = enhance(np.ascontiguousarray(img[:, x0 - MARGIN:]), roi_hsv)
+    roi_enhanced, roi_red, roi_green = roi_enhanced[:, MARGIN:], roi_red[:, MARGIN:], roi_green[:, MARGIN:]
+
+    previous_start = int(cache["start_number"])
+    shift_hint = start_number - previous_start if start_number and previous_start else None
+    dx = find_shift(cache, roi_red, roi_green, x0, shift_hint)
+    if dx is None:
+        return None
+    height = img.shape[0]
+    rows = changed_rows(cache, img, x0, dx)
+    if len(rows) > height * MAX_CHANGED_ROWS:
+        return None
+
+    spliced = []
+    for name, roi in (("enhanced", roi_enhanced), ("mask_red", roi_red), ("mask_green", roi_green)):
+        full = np.empty_like(cache[name])
+        full[:, :x0] = cache[name][:, dx:dx + x0]
+        full[:, x0:] = roi
+        spliced.append(full)
+    # The cached left edge was enhanced next to real columns that are now cut off
+    if dx:
+        _enhance_region(spliced, img, hsv, enhance, (0, height), (0, MARGIN))
+    bands = _bands(rows, height)
+    for band in bands:
+        _enhance_region(spliced, img, hsv, enhance, band, (0, x0))
+    img_enhanced, mask_red, mask_green = spliced
+    print(f"Incremental analysis: chart shifted {dx}px, enhanced {img.shape[1] - x0} of {img.shape[1]} columns"
+          f" and {sum(stop - start for start, stop in bands)} changed rows")
+    return img_enhanced, mask_red, mask_green, np.bitwise_or(mask_red, mask_green)
+
+
+def check_due(cache):
+    """Whether this cycle's incremental result has to be checked against a full pass before it is used."""
+    return not int(cache.get("checked", 0)) or int(cache.get("unchecked_runs", 0)) + 1 >= CHECK_EVERY
+
+
+def candle_positions(enhanced, remove_lines):
+    """Unique candle positions of an (img_enhanced, mask_red, mask_green, mask) tuple after remove_lines, on copies."""
+    img_enhanced, mask_red, mask_green = (array.copy() for array in enhanced[:3])
+    _, mask_red, mask_green, _ = remove_lines(img_enhanced, mask_red, mask_green)
+    candles = candlecomponents.extract_candles(mask_red, mask_green)
+    return candlecomponents.positions(candles, candlecomponents.unique_by_x(candles["center_x"], candles["area"]))
+
+
+def matches_full_pass(incremental, full, remove_lines):
+    """Whether the incremental and full-pass enhancements give the same candles after gridline removal."""
+    return candle_positions(incremental, remove_lines) == candle_positions(full, remove_lines)
@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+from atomicjson import write_json_atomic
+
+# Path configuration
+FETCHED_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
+STATUS_DB_PATH = os.path.join(FETCHED_PATH, "marketstatus.db")
+
+# Keep writing status.json / verification.json next to the charts for the web pages and manual checks.
+# Nothing in the programmes reads them any more; rows missing from the store are imported from them once.
+MIRROR_JSON_FILES = True
+
+# One connection per process (sqlite connections must not cross a fork/spawn)
+_connections = {}
+_lock = threading.Lock()
+
+
+def get_connection(db_path=None):
+    """Return this process's connection to the status store, creating the tables on first use."""
+    db_path = db_path or STATUS_DB_PATH
+    key = (os.getpid(), db_path)
+    with _lock:
+        conn = _connections.get(key)
+        if conn is None:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS timeframe_status (
+                    market TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    status TEXT,
+                    elligible_status TEXT,
+                    timestamp TEXT,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (market, timeframe)
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS market_verification (
+                    market TEXT PRIMARY KEY,
+                    all_timeframes TEXT,
+                    data TEXT NOT NULL
+                )"""
+            )
+            _connections[key] = conn
+        return conn
+
+
+def timeframe_key(timeframe):
+    """Key used for a timeframe, matching the fetched/<market>/<tf> folder names (m5, m15, m30, h1, h4)."""
+    return timeframe.strip().lower()
+
+
+def status_file_path(market, timeframe):
+    return os.path.join(FETCHED_PATH, market.replace(" ", "_"), timeframe_key(timeframe), "status.json")
+
+
+def verification_file_path(market):
+    return os.path.join(FETCHED_PATH, market.replace(" ", "_"), "verification.json")
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+
+
+def _write_json(path, data):
+    if not MIRROR_JSON_FILES:
+        return
+    try:
+        write_json_atomic(path, data)
+    except Exception as e:
+        print(f"Error mirroring {path}: {e}")
+
+
+def _upsert_status(conn, market, timeframe, data):
+    conn.execute(
+        """INSERT INTO timeframe_status (market, timeframe, status, elligible_status, timestamp, data)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(market, timeframe) DO UPDATE SET
+               status = excluded.status,
+               elligible_status = excluded.elligible_status,
+               timestamp = excluded.timestamp,
+               data = excluded.data""",
+        (market, timeframe_key(timeframe), data.get("status"), data.get("elligible_status"),
+         data.get("timestamp"), json.dumps(data))
+    )
+
+
+def _upsert_verification(conn, market, data):
+    conn.execute(
+        """INSERT INTO market_verification (market, all_timeframes, data)
+           VALUES (?, ?, ?)
+           ON CONFLICT(market) DO UPDATE SET
+               all_timeframes = excluded.all_timeframes,
+               data = excluded.data""",
+        (market, data.get("all_timeframes"), json.dumps(data))
+    )
+
+
+def _import_legacy_statuses(conn, pairs):
+    """Import status.json files for (market, timeframe) pairs the store does not know yet."""
+    imported = {}
+    for market, timeframe in pairs:
+        data = _read_json(status_file_path(market, timeframe))
+        if isinstance(data, dict):
+            imported[(market, timeframe_key(timeframe))] = data
+    if imported:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (market, tf), data in imported.items():
+                _upsert_status(conn, market, tf, data)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return imported
+
+
+def _import_legacy_verifications(conn, markets):
+    """Import verification.json files for markets the store does not know yet."""
+    imported = {}
+    for market in markets:
+        data = _read_json(verification_file_path(market))
+        if isinstance(data, dict):
+            imported[market] = data
+    if imported:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for market, data in imported.items():
+                _upsert_verification(conn, market, data)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return imported
+
+
+def get_statuses(markets, timeframes):
+    """Return {(market, timeframe_key): status dict} for every known pair in one query."""
+    conn = get_connection()
+    market_set = set(markets)
+    statuses = {}
+    for market, tf, data in conn.execute("SELECT market, timeframe, data FROM timeframe_status"):
+        if market in market_set:
+            statuses[(market, tf)] = json.loads(data)
+    missing = [(m, tf) for m in markets for tf in timeframes if (m, timeframe_key(tf)) not in statuses]
+    if missing:
+        statuses.update(_import_legacy_statuses(conn, missing))
+    return statuses
+
+
+def get_status(market, timeframe):
+    """Return the status dict for one market/timeframe, or None if it has never been saved."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT data FROM timeframe_status WHERE market = ? AND timeframe = ?",
+        (market, timeframe_key(timeframe))
+    ).fetchone()
+    if row is not None:
+        return json.loads(row[0])
+    return _import_legacy_statuses(conn, [(market, timeframe)]).get((market, timeframe_key(timeframe)))
+
+
+def update_statuses(updates, only_existing=False):
+    """Merge fields into several status rows in one transaction.
+
+    updates is a list of (market, timeframe, fields, defaults): fields overwrite the stored values,
+    defaults are only used when the row does not exist yet. With only_existing=True missing rows are skipped.
+    Returns {(market, timeframe_key): merged status dict} for the rows written.
+    """
+    conn = get_connection()
+    written = {}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for market, timeframe, fields, defaults in updates:
+            tf = timeframe_key(timeframe)
+            row = conn.execute(
+                "SELECT data FROM timeframe_status WHERE market = ? AND timeframe = ?", (market, tf)
+            ).fetchone()
+            if row is not None:
+                data = json.loads(row[0])
+            else:
+                data = _read_json(status_file_path(market, tf))
+                if not isinstance(data, dict):
+                    if only_existing:
+                        continue
+                    data = dict(defaults or {})
+            data.update(fields)
+            _upsert_status(conn, market, tf, data)
+            written[(market, tf)] = data
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for (market, tf), data in written.items():
+        _write_json(status_file_path(market, tf), data)
+    return written
+
+
+def update_status(market, timeframe, fields, defaults=None):
+    """Merge fields into the status of one market/timeframe and return the stored dict."""
+    return update_statuses([(market, timeframe, fields, defaults)]).get((market, timeframe_key(timeframe)))
+
+
+def get_verifications(markets):
+    """Return {market: verification dict} for every known market in one query."""
+    conn = get_connection()
+    market_set = set(markets)
+    verifications = {}
+    for market, data in conn.execute("SELECT market, data FROM market_verification"):
+        if market in market_set:
+            verifications[market] = json.loads(data)
+    missing = [m for m in markets if m not in verifications]
+    if missing:
+        verifications.update(_import_legacy_verifications(conn, missing))
+    return verifications
+
+
+def get_verification(market):
+    """Return the verification dict of one market, or None if it has never been saved."""
+    conn = get_connection()
+    row = conn.execute("SELECT data FROM market_verification WHERE market = ?", (market,)).fetchone()
+    if row is not None:
+        return json.loads(row[0])
+    return _import_legacy_verifications(conn, [market]).get(market)
+
+
+def save_verifications(verifications):
+    """Replace the verification dicts of several markets in one transaction."""
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for market, data in verifications.items():
+            _upsert_verification(conn, market, data)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for market, data in verifications.items():
+        _write_json(verification_file_path(market), data)
+
+
+def save_verification(market, data):
+    """Replace the verification dict of one market."""
+    save_verifications({market: data})
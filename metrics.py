@@ -0,0 +1,257 @@
+import atexit
+import functools
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import atomicjson
+
+# Path configuration
+METRICS_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\logs"
+METRICS_SUMMARY_PATH = os.path.join(METRICS_FOLDER, "metricssummary.json")
+
+# Records are buffered per process and appended in one locked write
+FLUSH_EVERY = 200
+
+# The cycle id travels to pool workers through the environment
+CYCLE_ENV = "CIPHER_METRICS_CYCLE"
+
+# One metrics-<cycle>.jsonl per cycle; files of older cycles are deleted when a new cycle starts
+KEEP_CYCLES = 30
+
+ENABLED = True
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_labels = threading.local()
+_flush_hooks = []
+
+
+def current_cycle():
+    return os.environ.get(CYCLE_ENV, "")
+
+
+def metrics_path(cycle_id=None):
+    """Records file of a cycle."""
+    cycle_id = cycle_id if cycle_id is not None else current_cycle()
+    return os.path.join(METRICS_FOLDER, f"metrics-{cycle_id or 'nocycle'}.jsonl")
+
+
+def rotate(keep=KEEP_CYCLES):
+    """Delete the records files of all but the newest keep cycles."""
+    files = sorted(glob.glob(os.path.join(METRICS_FOLDER, "metrics-*.jsonl")), key=os.path.getmtime)
+    for path in files[:-keep] if keep else files:
+        for stale in (path, f"{path}.lock"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def start_cycle(name="cycle"):
+    """Start a new metrics cycle; processes started afterwards inherit its id."""
+    cycle_id = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    os.environ[CYCLE_ENV] = cycle_id
+    return cycle_id
+
+
+def _current_labels():
+    return getattr(_labels, "values", {})
+
+
+@contextmanager
+def labels(**values):
+    """Attach market/timeframe (or other labels) to every record made inside the block."""
+    previous = _current_labels()
+    _labels.values = {**previous, **{k: v for k, v in values.items() if v is not None}}
+    try:
+        yield
+    finally:
+        _labels.values = previous
+
+
+def record(kind, name, seconds=None, **fields):
+    """Buffer one metrics record: kind is 'stage', 'mt5', 'db', 'image' or 'io'."""
+    if not ENABLED:
+        return
+    entry = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cycle": current_cycle(),
+        "pid": os.getpid(),
+        "kind": kind,
+        "name": name
+    }
+    entry.update(_current_labels())
+    if seconds is not None:
+        entry["seconds"] = round(seconds, 6)
+    entry.update({k: v for k, v in fields.items() if v is not None})
+    with _buffer_lock:
+        _buffer.append(entry)
+        should_flush = len(_buffer) >= FLUSH_EVERY
+    if should_flush:
+        flush()
+
+
+def add_bytes(name, nbytes, direction="write"):
+    """Count file I/O bytes for an artifact."""
+    record("io", name, bytes=int(nbytes), direction=direction)
+
+
+def register_flush_hook(hook):
+    """Have another per-process buffer (e.g. errorjournal) flushed whenever metrics are flushed."""
+    if hook not in _flush_hooks:
+        _flush_hooks.append(hook)
+
+
+def flush():
+    """Append buffered records to the current cycle's metrics file."""
+    global _buffer
+    for hook in _flush_hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"Error in metrics flush hook {getattr(hook, '__name__', hook)}: {e}")
+    with _buffer_lock:
+        pending, _buffer = _buffer, []
+    if not pending:
+        return
+    path = metrics_path()
+    try:
+        os.makedirs(METRICS_FOLDER, exist_ok=True)
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in pending)
+        with atomicjson.file_lock(path):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    except Exception as e:
+        print(f"Error writing metrics to {path}: {e}")
+
+
+atexit.register(flush)
+
+
+@contextmanager
+def timer(kind, name, **fields):
+    """Time the block and record it, including failures."""
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record(kind, name, time.perf_counter() - start, ok=ok, **fields)
+
+
+def timed(name=None, kind="stage", flush_after=False):
+    """Decorator recording the wall time of each call; market and timeframe arguments become labels.
+    Use flush_after=True on pool/process entry points, whose processes exit without running atexit."""
+    def decorator(func):
+        metric_name = name or func.__name__
+        signature = inspect.signature(func)
+        label_params = [p for p in ("market", "timeframe") if p in signature.parameters]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            call_labels = {}
+            if label_params:
+                try:
+                    bound = signature.bind_partial(*args, **kwargs)
+                    call_labels = {p: bound.arguments.get(p) for p in label_params}
+                except TypeError:
+                    pass
+            try:
+                with labels(**call_labels):
+                    with timer(kind, metric_name):
+                        return func(*args, **kwargs)
+            finally:
+                if flush_after:
+                    flush()
+        return wrapper
+    return decorator
+
+
+def timed_call(kind, name, func, *args, **kwargs):
+    """Call func(*args, **kwargs) and record its latency, e.g. timed_call('mt5', 'copy_rates_from_pos', mt5.copy_rates_from_pos, ...)."""
+    with timer(kind, name):
+        return func(*args, **kwargs)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(cycle_id=None, output_path=METRICS_SUMMARY_PATH):
+    """Aggregate the records of a cycle per (kind, name) and per (stage, market, timeframe) and save the report.
+    Only that cycle's file is read, so the cost does not grow with history."""
+    flush()
+    cycle_id = cycle_id if cycle_id is not None else current_cycle()
+    by_name = {}
+    by_stage = {}
+    io_bytes = {}
+    path = metrics_path(cycle_id)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("cycle", "") != cycle_id:
+                    continue
+                if entry["kind"] == "io":
+                    io_bytes[entry["name"]] = io_bytes.get(entry["name"], 0) + entry.get("bytes", 0)
+                    continue
+                seconds = entry.get("seconds")
+                if seconds is None:
+                    continue
+                by_name.setdefault(f"{entry['kind']}:{entry['name']}", []).append(seconds)
+                if entry["kind"] == "stage":
+                    stage_key = f"{entry['name']}|{entry.get('market', '')}|{entry.get('timeframe', '')}"
+                    by_stage.setdefault(stage_key, []).append(seconds)
+
+    def stats(values):
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "total_seconds": round(sum(values), 3),
+            "avg_seconds": round(sum(values) / len(values), 4),
+            "p95_seconds": round(_percentile(values, 0.95), 4),
+            "max_seconds": round(values[-1], 4)
+        }
+
+    summary = {
+        "cycle": cycle_id,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "by_name": dict(sorted(((k, stats(v)) for k, v in by_name.items()),
+                               key=lambda item: item[1]["total_seconds"], reverse=True)),
+        "slowest_stages": [
+            dict(zip(("stage", "market", "timeframe"), key.split("|")), **stats(values))
+            for key, values in sorted(by_stage.items(), key=lambda item: sum(item[1]), reverse=True)[:25]
+        ],
+        "io_bytes": io_bytes
+    }
+    try:
+        atomicjson.write_json_atomic(output_path, summary)
+    except Exception as e:
+        print(f"Error saving metrics summary to {output_path}: {e}")
+    return summary
+
+
+def print_summary(summary, top=10):
+    """Print the slowest entries of a summary."""
+    print(f"\n=== Metrics summary for {summary['cycle']} ===")
+    for key, stat in list(summary["by_name"].items())[:top]:
+        print(f"{key:55} count={stat['count']:5}  total={stat['total_seconds']:9.2f}s  "
+              f"avg={stat['avg_seconds']:7.3f}s  p95={stat['p95_seconds']:7.3f}s  max={stat['max_seconds']:7.3f}s")
+    total_io = sum(summary["io_bytes"].values())
+    if total_io:
+        print(f"file I/O written: {total_io / 1024:.1f} KiB across {len(summary['io_bytes'])} artifacts")
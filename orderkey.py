@@ -0,0 +1,86 @@
+import math
+
+# Prices are compared as integer ticks at this many decimals unless the symbol's digits are known.
+# Finer than any symbol the programmes trade, so prices already rounded to digits never collide.
+DEFAULT_DIGITS = 5
+
+# Lot sizes move in steps of 0.01
+VOLUME_DIGITS = 2
+
+
+def digits_from_point(point, default=DEFAULT_DIGITS):
+    """Symbol digits from its point size (e.g. 0.001 -> 3), as stored in calculatedprices.json 'pip_size'."""
+    try:
+        point = float(point)
+    except (TypeError, ValueError):
+        return default
+    if point <= 0:
+        return default
+    return max(0, int(round(-math.log10(point))))
+
+
+def price_ticks(price, digits=DEFAULT_DIGITS):
+    """Quantize a price to an integer number of ticks at the given digits."""
+    return int(round(float(price) * (10 ** digits)))
+
+
+def normalize_pair(pair):
+    """Key used to match signal pairs with broker symbol names (case and spaces ignored)."""
+    return (pair or "").replace(" ", "").lower()
+
+
+def order_key(pair, timeframe, order_type, entry_price, digits=DEFAULT_DIGITS):
+    """Identity of an order/signal shared by the pending-order collection, the DB inserts and the reconciler."""
+    return (normalize_pair(pair), (timeframe or "").lower(), (order_type or "").lower(), price_ticks(entry_price, digits))
+
+
+def index_by(items, key_func):
+    """Hash index {key: first item with that key}; items whose key_func raises or returns None are left out."""
+    index = {}
+    for item in items:
+        try:
+            key = key_func(item)
+        except (TypeError, ValueError):
+            continue
+        if key is not None and key not in index:
+            index[key] = item
+    return index
+
+
+def keep_oldest(items, key_func, time_func):
+    """Dedup in one pass: returns ({key: oldest item}, [discarded items]) comparing time_func values per key."""
+    kept = {}
+    discarded = []
+    for item in items:
+        key = key_func(item)
+        current = kept.get(key)
+        if current is None:
+            kept[key] = item
+        elif time_func(item) < time_func(current):
+            discarded.append(current)
+            kept[key] = item
+        else:
+            discarded.append(item)
+    return kept, discarded
+
+
+def digits_from_entries(calculated_entries, default=DEFAULT_DIGITS):
+    """Digits of the market a calculatedprices.json list was priced for (all entries share one symbol).
+    Pass default=None to tell a missing pip_size apart from a real value."""
+    for entry in calculated_entries or ():
+        if entry.get("pip_size"):
+            return digits_from_point(entry["pip_size"], default)
+    return default
+
+
+def index_by_price(calculated_entries, digits):
+    """{entry price in ticks: {order type: first calculatedprices.json entry}}, so a lookup can tell
+    "nothing at this price" from "an entry at this price of the other order type"."""
+    index = {}
+    for entry in calculated_entries or ():
+        try:
+            ticks = price_ticks(entry.get("entry_price", 0), digits)
+        except (TypeError, ValueError):
+            continue
+        index.setdefault(ticks, {}).setdefault((entry.get("order_type") or "").lower(), entry)
+    return index
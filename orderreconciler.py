@@ -0,0 +1,201 @@
+import json
+import os
+import time
+import MetaTrader5 as mt5
+import cipherlogging
+import metrics
+import orderkey
+from atomicjson import write_json_atomic
+
+logger = cipherlogging.get_logger(__name__)
+
+
+def log_and_print(message, level="INFO", *args):
+    cipherlogging.log_and_print(logger, message, level, *args)
+
+# Magic number stamped on the limit orders the programmes place
+ORDER_MAGIC = 202501
+
+# Only pending orders carrying one of these magics are kept, modified or cancelled; orders placed by hand
+# or by other tools are left alone.
+MANAGED_MAGICS = (ORDER_MAGIC,)
+
+# Magic of the limit orders placed before magics were stamped. On the first reconcile (no migration file yet)
+# those matching a desired request are adopted as ours and the rest are cancelled, as the old cancel-all did
+# every cycle. Afterwards only the adopted tickets are managed, until they leave the book.
+LEGACY_MAGIC = 0
+ORDERS_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders"
+LEGACY_MIGRATION_FILE = os.path.join(ORDERS_FOLDER, "legacyordermigration.json")
+
+# Pending order types the reconciler manages
+MANAGED_ORDER_TYPES = (mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT)
+
+# Once the broker answers TRADE_RETCODE_TOO_MANY_REQUESTS, the request is retried and the remaining
+# order_send calls are spread to at most this many per second. Until then requests go out unpaced.
+MAX_ACTIONS_PER_SECOND = 10
+
+
+def order_key(symbol, order_type, price, volume, digits=5, magic=ORDER_MAGIC):
+    """Stable identity of a pending order: symbol, type, price and volume as integer ticks, and its magic."""
+    return (symbol, int(order_type), orderkey.price_ticks(price, digits),
+            orderkey.price_ticks(volume, orderkey.VOLUME_DIGITS), int(magic))
+
+
+def load_legacy_migration(path=LEGACY_MIGRATION_FILE):
+    """The legacy order migration state, or None before the first reconcile."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        log_and_print(f"Error reading {path}, legacy orders will be migrated again: {e}", "WARNING")
+        return None
+
+
+def _stop_loss_matches(order, request, digits):
+    return orderkey.price_ticks(order.sl or 0.0, digits) == orderkey.price_ticks(request.get("sl", 0.0) or 0.0, digits)
+
+
+class _Pacer:
+    """Spread order_send calls so no more than max_per_second go out in any second, once engaged."""
+
+    def __init__(self, max_per_second):
+        self.interval = 1.0 / max_per_second if max_per_second else 0.0
+        self.engaged = False
+        self.last = 0.0
+
+    def wait(self):
+        if not self.engaged:
+            return
+        delay = self.last + self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.last = time.monotonic()
+
+
+def reconcile_pending_orders(desired, digits_by_symbol=None, max_actions_per_second=MAX_ACTIONS_PER_SECOND,
+                             migration_path=None):
+    """Bring the account's pending limit orders in line with the desired order requests.
+
+    desired is a list of TRADE_ACTION_PENDING request dicts (their magic defaults to ORDER_MAGIC). The account
+    is read once with orders_get; orders matching a desired key are kept (or have their stop-loss modified),
+    missing ones are placed and every other pending limit order with a MANAGED_MAGICS magic is removed.
+    Legacy magic-0 limit orders are adopted or cancelled as described at LEGACY_MAGIC; the adopted tickets are
+    kept in migration_path (LEGACY_MIGRATION_FILE by default). Unchanged orders never leave the book. Requests
+    are only paced after the broker reports rate limiting.
+
+    Returns (results, summary): results[i] is {"action": "kept"|"modified"|"placed"|"failed", "comment": ...}
+    for desired[i], summary counts every action including "cancelled" and "cancel_failed".
+    """
+    digits_by_symbol = digits_by_symbol or {}
+    pacer = _Pacer(max_actions_per_second)
+    summary = {"kept": 0, "modified": 0, "placed": 0, "failed": 0, "cancelled": 0, "cancel_failed": 0}
+    results = [None] * len(desired)
+
+    migration_path = migration_path or LEGACY_MIGRATION_FILE
+    existing = metrics.timed_call("mt5", "orders_get", mt5.orders_get)
+    migration = load_legacy_migration(migration_path)
+    if existing is None:
+        # Without a view of the book only placements are safe; nothing is cancelled or migrated
+        existing = ()
+        migration = migration or {"adopted_tickets": []}
+        migration_path = None
+    adopted = set(migration.get("adopted_tickets", [])) if migration is not None else None
+
+    # Index existing managed orders by key, ours before legacy ones; duplicates beyond the first are stale.
+    # Legacy orders are keyed with ORDER_MAGIC so they match the requests they were placed for.
+    existing_by_key = {}
+    legacy_tickets = set()
+    for order in existing:
+        if order.type not in MANAGED_ORDER_TYPES or order.magic not in MANAGED_MAGICS:
+            continue
+        digits = digits_by_symbol.get(order.symbol, 5)
+        key = order_key(order.symbol, order.type, order.price_open, order.volume_current, digits, order.magic)
+        existing_by_key.setdefault(key, []).append(order)
+    for order in existing:
+        if order.type not in MANAGED_ORDER_TYPES or order.magic != LEGACY_MAGIC:
+            continue
+        if adopted is not None and order.ticket not in adopted:
+            continue
+        digits = digits_by_symbol.get(order.symbol, 5)
+        key = order_key(order.symbol, order.type, order.price_open, order.volume_current, digits, ORDER_MAGIC)
+        existing_by_key.setdefault(key, []).append(order)
+        legacy_tickets.add(order.ticket)
+    still_adopted = []
+
+    def send(request):
+        pacer.wait()
+        result = metrics.timed_call("mt5", "order_send", mt5.order_send, request)
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_TOO_MANY_REQUESTS and pacer.interval:
+            pacer.engaged = True
+            pacer.last = time.monotonic()
+            pacer.wait()
+            result = metrics.timed_call("mt5", "order_send", mt5.order_send, request)
+        return result
+
+    desired = [dict(request, magic=request.get("magic", ORDER_MAGIC)) for request in desired]
+    to_place = []
+    for index, request in enumerate(desired):
+        digits = digits_by_symbol.get(request["symbol"], 5)
+        key = order_key(request["symbol"], request["type"], request["price"], request["volume"], digits, request["magic"])
+        matches = existing_by_key.get(key)
+        if not matches:
+            to_place.append(index)
+            continue
+        order = matches.pop(0)
+        if _stop_loss_matches(order, request, digits):
+            results[index] = {"action": "kept", "comment": f"ticket {order.ticket} unchanged"}
+            summary["kept"] += 1
+            if order.ticket in legacy_tickets:
+                still_adopted.append(order.ticket)
+            continue
+        result = send({
+            "action": mt5.TRADE_ACTION_MODIFY,
+            "order": order.ticket,
+            "price": float(request["price"]),
+            "sl": float(request.get("sl", 0.0) or 0.0),
+            "tp": float(order.tp or 0.0),
+            "type_time": request.get("type_time", mt5.ORDER_TIME_GTC)
+        })
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            results[index] = {"action": "modified", "comment": f"ticket {order.ticket} stop-loss updated"}
+            summary["modified"] += 1
+            if order.ticket in legacy_tickets:
+                still_adopted.append(order.ticket)
+        else:
+            # Leave the old order to be cancelled below and place a fresh one
+            matches.insert(0, order)
+            to_place.append(index)
+
+    # Remove stale orders before placing, so freed margin is available to the new ones
+    for orders in existing_by_key.values():
+        for order in orders:
+            result = send({"action": mt5.TRADE_ACTION_REMOVE, "order": order.ticket})
+            if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+                summary["cancelled"] += 1
+            else:
+                summary["cancel_failed"] += 1
+                if order.ticket in legacy_tickets:
+                    # Still on the book; try again next cycle
+                    still_adopted.append(order.ticket)
+
+    if migration_path is not None:
+        if adopted is None and legacy_tickets:
+            log_and_print(f"Migrated {len(legacy_tickets)} legacy pending orders, {len(still_adopted)} kept as ours", "INFO")
+        try:
+            write_json_atomic(migration_path, {"adopted_tickets": sorted(still_adopted)})
+        except Exception as e:
+            log_and_print(f"Error saving {migration_path}: {e}", "WARNING")
+
+    for index in to_place:
+        result = send(desired[index])
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            results[index] = {"action": "placed", "comment": f"ticket {result.order}"}
+            summary["placed"] += 1
+        else:
+            comment = result.comment if result is not None else str(mt5.last_error())
+            results[index] = {"action": "failed", "comment": comment}
+            summary["failed"] += 1
+
+    return results, summary
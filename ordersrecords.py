@@ -4,46 +4,20 @@ import os
 import multiprocessing
 from typing import Dict, Optional
 import MetaTrader5 as mt5
-import pandas as pd
-from colorama import Fore, Style, init
-import logging
+import numpy as np
+import cipherlogging
+import metrics
+from atomicjson import write_json_atomic
 from datetime import datetime, timezone
 
-# Initialize colorama for colored console output
-init()
-
-# Configure Logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()  # Console output only
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# Suppress WebDriver-related logs
-for name in ['webdriver_manager', 'selenium', 'urllib3', 'selenium.webdriver']:
-    logging.getLogger(name).setLevel(logging.WARNING)
+# Configure Logging (levels, console and JSON-lines output come from the LOGGING section of base.json)
+logger = cipherlogging.get_logger(__name__)
 
 # Logging Helper Function
-def log_and_print(message, level="INFO"):
-    """Helper function to print formatted messages with color coding and spacing."""
-    indent = "    "
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    level_colors = {
-        "INFO": Fore.CYAN,
-        "SUCCESS": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
-        "TITLE": Fore.MAGENTA,
-        "DEBUG": Fore.LIGHTBLACK_EX
-    }
-    log_level = "INFO" if level in ["TITLE", "SUCCESS"] else level
-    color = level_colors.get(level, Fore.WHITE)
-    formatted_message = f"[ {timestamp} ] │ {level:7} │ {indent}{message}"
-    print(f"{color}{formatted_message}{Style.RESET_ALL}")
-    logger.log(getattr(logging, log_level), message)
+def log_and_print(message, level="INFO", *args):
+    """Helper function to log formatted messages with color coding and spacing; disabled levels cost nothing,
+    so pass expensive values as %-style args."""
+    cipherlogging.log_and_print(logger, message, level, *args)
 
 # Configuration
 LOGIN_ID = "101347351"
@@ -65,6 +39,12 @@ TIMEFRAMES = ["M5", "M15", "M30", "H1", "H4"]
 # Base path for pricecandle.json files
 BASE_OUTPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\bouncestream\chart\orders\main"
 
+# Closed candles fetched once per market/timeframe and shared by every contract's executioner search
+RECENT_CANDLES = 1000
+
+# Per market/timeframe record of the last bar scanned for each contract, next to pricecandle.json
+EXECUTIONER_TRACKER_FILE = "executionertracker.json"
+
 # Timeframe mapping
 TIMEFRAME_MAPPING = {
     "M5": mt5.TIMEFRAME_M5,
@@ -118,39 +98,99 @@ def initialize_mt5():
         mt5.shutdown()
         return False
 
-def fetch_candles_after_breakout(market: str, timeframe: str, breakout_time: str, num_candles: int = 1000) -> Optional[pd.DataFrame]:
-    """Fetch candles after the Breakout_parent candle's time."""
-    log_and_print(f"Fetching candles for {market} {timeframe} after {breakout_time}", "INFO")
+def time_to_epoch(time_str: str) -> int:
+    """Convert a 'YYYY-mm-dd HH:MM:SS' candle time (UTC, as MT5 reports it) to epoch seconds."""
+    return int(datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
 
-    # Select market symbol
+def epoch_to_time(epoch: int) -> str:
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def contract_key(contract: Dict) -> str:
+    """Identify a contract across pricecandle.json rewrites by its type, breakout time and order holder levels."""
+    order_holder = contract.get("order_holder", {})
+    breakout_parent = contract.get("Breakout_parent", {})
+    return f"{contract.get('type', 'unknown')}|{breakout_parent.get('Time')}|{order_holder.get('High')}|{order_holder.get('Low')}"
+
+def load_executioner_tracker(json_dir: str) -> Dict:
+    path = os.path.join(json_dir, EXECUTIONER_TRACKER_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        log_and_print(f"Error reading {path}, rescanning all contracts: {e}", "WARNING")
+        return {}
+
+def save_executioner_tracker(json_dir: str, tracker: Dict) -> None:
+    path = os.path.join(json_dir, EXECUTIONER_TRACKER_FILE)
+    try:
+        write_json_atomic(path, tracker)
+    except Exception as e:
+        log_and_print(f"Error saving {path}: {e}", "ERROR")
+
+def fetch_recent_rates(market: str, timeframe: str, count: int = RECENT_CANDLES) -> Optional[np.ndarray]:
+    """Fetch the last count closed candles (oldest first) as the MT5 structured array."""
     if not mt5.symbol_select(market, True):
         log_and_print(f"Failed to select market: {market}, error: {mt5.last_error()}", "ERROR")
         return None
-
-    # Get timeframe
     mt5_timeframe = TIMEFRAME_MAPPING.get(timeframe)
     if not mt5_timeframe:
         log_and_print(f"Invalid timeframe {timeframe} for {market}", "ERROR")
         return None
-
-    # Parse breakout time
-    try:
-        breakout_datetime = datetime.strptime(breakout_time, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-    except ValueError as e:
-        log_and_print(f"Invalid breakout time format for {market} {timeframe}: {breakout_time}, error: {e}", "ERROR")
+    rates = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5_timeframe, 1, count)
+    if rates is None or len(rates) == 0:
+        log_and_print(f"Failed to fetch recent candles for {market} {timeframe}, error: {mt5.last_error()}", "ERROR")
         return None
-
-    # Fetch candles starting from breakout time
-    candles = mt5.copy_rates_from(market, mt5_timeframe, breakout_datetime, num_candles)
-    if candles is None or len(candles) == 0:
-        log_and_print(f"Failed to fetch candles for {market} {timeframe} after {breakout_time}, error: {mt5.last_error()}", "ERROR")
+    return rates
+
+def fetch_rates_between(market: str, timeframe: str, after_epoch: int, before_epoch: int) -> Optional[np.ndarray]:
+    """Fetch the closed candles opened after after_epoch and before before_epoch (the part older than the recent window)."""
+    rates = metrics.timed_call(
+        "mt5", "copy_rates_range", mt5.copy_rates_range, market, TIMEFRAME_MAPPING[timeframe],
+        datetime.fromtimestamp(after_epoch, tz=timezone.utc), datetime.fromtimestamp(before_epoch, tz=timezone.utc)
+    )
+    if rates is None or len(rates) == 0:
         return None
+    times = rates['time'].astype(np.int64)
+    return rates[(times > after_epoch) & (times < before_epoch)]
 
-    df = pd.DataFrame(candles)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    return df
-
+def find_executioner_index(rates: np.ndarray, after_epoch: int, order_type: str, order_holder_high: float, order_holder_low: float) -> Optional[int]:
+    """Index of the first candle opened after after_epoch that reaches the order holder level, or None."""
+    start = int(np.searchsorted(rates['time'].astype(np.int64), after_epoch, side='right'))
+    if start >= len(rates):
+        return None
+    if order_type == "long":
+        hits = rates['low'][start:] <= order_holder_high
+    elif order_type == "short":
+        hits = rates['high'][start:] >= order_holder_low
+    else:
+        return None
+    if not hits.any():
+        return None
+    return start + int(np.argmax(hits))
+
+def position_for_time(rates: np.ndarray, candle_time: str) -> Optional[int]:
+    """Position number of a candle in the recent window (1 = last closed candle), or None if it is older."""
+    epoch = time_to_epoch(candle_time)
+    times = rates['time'].astype(np.int64)
+    index = int(np.searchsorted(times, epoch))
+    if index < len(times) and times[index] == epoch:
+        return len(times) - index
+    return None
+
+def executioner_from_rate(rate, position_number: Optional[int]) -> Dict:
+    return {
+        "Executioner": "executed order holder level",
+        "position_number": position_number,
+        "Time": epoch_to_time(rate['time']),
+        "Open": float(rate['open']),
+        "High": float(rate['high']),
+        "Low": float(rate['low']),
+        "Close": float(rate['close'])
+    }
 
+@metrics.timed()
 def process_pricecandle_json(market: str, timeframe: str) -> bool:
     """Process pricecandle.json for a given market and timeframe."""
     try:
@@ -182,10 +222,17 @@ def process_pricecandle_json(market: str, timeframe: str) -> bool:
 
         try:
             modified = False
+            json_dir = os.path.dirname(json_path)
+            tracker = load_executioner_tracker(json_dir)
+            updated_tracker = {}
+            rates = None
             for contract in pricecandle_data:
+                key = contract_key(contract)
                 # Check if Executioner_candle already exists
                 if "Executioner_candle" in contract:
                     log_and_print(f"Executioner_candle already exists in contract for {market} {timeframe}, skipping", "INFO")
+                    if key in tracker:
+                        updated_tracker[key] = tracker[key]
                     continue
 
                 # Get order holder and breakout parent details
@@ -202,78 +249,63 @@ def process_pricecandle_json(market: str, timeframe: str) -> bool:
                 order_holder_high = float(order_holder.get("High"))
                 order_holder_low = float(order_holder.get("Low"))
                 breakout_time = breakout_parent.get("Time")
-
-                # Fetch candles after breakout time
-                candles_df = fetch_candles_after_breakout(market, timeframe, breakout_time)
-                if candles_df is None or candles_df.empty:
-                    log_and_print(f"No candles fetched after breakout for {market} {timeframe}", "WARNING")
+                try:
+                    breakout_epoch = time_to_epoch(breakout_time)
+                except ValueError as e:
+                    log_and_print(f"Invalid breakout time format for {market} {timeframe}: {breakout_time}, error: {e}", "ERROR")
                     contract["Executioner_candle"] = {"Executioner": "no execution yet"}
                     modified = True
                     continue
 
-                # Search for executioner candle
-                executioner_candle = None
-                for index, candle in candles_df.iterrows():
-                    candle_time = candle['time'].strftime("%Y-%m-%d %H:%M:%S")
-                    # Skip the breakout candle itself (if it's the first candle)
-                    if candle_time == breakout_time:
-                        continue
-
-                    candle_high = float(candle['high'])
-                    candle_low = float(candle['low'])
-
-                    # Check execution condition based on order type
-                    if order_type == "long" and candle_low <= order_holder_high:
-                        executioner_candle = {
-                            "Executioner": "executed order holder level",
-                            "position_number": None,  # Will be updated later
-                            "Time": candle_time,
-                            "Open": float(candle['open']),
-                            "High": candle_high,
-                            "Low": candle_low,
-                            "Close": float(candle['close'])
-                        }
-                        break
-                    elif order_type == "short" and candle_high >= order_holder_low:
-                        executioner_candle = {
-                            "Executioner": "executed order holder level",
-                            "position_number": None,  # Will be updated later
-                            "Time": candle_time,
-                            "Open": float(candle['open']),
-                            "High": candle_high,
-                            "Low": candle_low,
-                            "Close": float(candle['close'])
-                        }
-                        break
-
-                if executioner_candle:
-                    # Determine position number by fetching recent candles and finding the matching candle
-                    recent_candles = mt5.copy_rates_from_pos(market, TIMEFRAME_MAPPING[timeframe], 1, 300)
-                    if recent_candles is None or len(recent_candles) == 0:
-                        log_and_print(f"Failed to fetch recent candles to determine position for {market} {timeframe}", "ERROR")
+                # One window of recent candles serves every contract of this market/timeframe
+                if rates is None:
+                    rates = fetch_recent_rates(market, timeframe)
+                    if rates is None:
+                        log_and_print(f"No candles fetched after breakout for {market} {timeframe}", "WARNING")
                         contract["Executioner_candle"] = {"Executioner": "no execution yet"}
                         modified = True
                         continue
 
-                    recent_candles_df = pd.DataFrame(recent_candles)
-                    recent_candles_df['time'] = pd.to_datetime(recent_candles_df['time'], unit='s')
-                    for idx, recent_candle in recent_candles_df.iterrows():
-                        recent_candle_time = recent_candle['time'].strftime("%Y-%m-%d %H:%M:%S")
-                        if recent_candle_time == executioner_candle["Time"]:
-                            executioner_candle["position_number"] = 300 - idx
-                            break
-                    else:
-                        log_and_print(f"Could not determine position number for executioner candle in {market} {timeframe}", "WARNING")
-                        executioner_candle["position_number"] = None
+                state = tracker.get(key, {})
+                executioner_candle = None
+                if state.get("executioner"):
+                    # Found in an earlier cycle; only its position has moved on
+                    executioner_candle = dict(state["executioner"])
+                    executioner_candle["position_number"] = position_for_time(rates, executioner_candle["Time"])
+                else:
+                    # Only look at candles that were not scanned in an earlier cycle (the breakout candle itself is skipped)
+                    scan_after = max(breakout_epoch, int(state.get("last_scanned_time", 0)))
+                    window_start = int(rates['time'][0])
+                    if scan_after < window_start - 1:
+                        older_rates = fetch_rates_between(market, timeframe, scan_after, window_start)
+                        if older_rates is not None and len(older_rates):
+                            index = find_executioner_index(older_rates, scan_after, order_type, order_holder_high, order_holder_low)
+                            if index is not None:
+                                log_and_print(f"Could not determine position number for executioner candle in {market} {timeframe}", "WARNING")
+                                executioner_candle = executioner_from_rate(older_rates[index], None)
+                    if executioner_candle is None:
+                        index = find_executioner_index(rates, scan_after, order_type, order_holder_high, order_holder_low)
+                        if index is not None:
+                            executioner_candle = executioner_from_rate(rates[index], len(rates) - index)
 
+                if executioner_candle:
                     contract["Executioner_candle"] = executioner_candle
+                    updated_tracker[key] = {
+                        "last_scanned_time": time_to_epoch(executioner_candle["Time"]),
+                        "executioner": {k: v for k, v in executioner_candle.items() if k != "position_number"}
+                    }
                     log_and_print(f"Executioner candle found for {market} {timeframe} at {executioner_candle['Time']}", "SUCCESS")
                     modified = True
                 else:
                     contract["Executioner_candle"] = {"Executioner": "no execution yet"}
+                    updated_tracker[key] = {"last_scanned_time": max(int(rates['time'][-1]), int(state.get("last_scanned_time", 0)))}
                     log_and_print(f"No executioner candle found for {market} {timeframe}", "INFO")
                     modified = True
 
+            # Contracts that left pricecandle.json are dropped from the tracker
+            if updated_tracker != tracker:
+                save_executioner_tracker(json_dir, updated_tracker)
+
             # Save updated pricecandle.json if modified
             if modified:
                 try:
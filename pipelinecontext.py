@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import metrics
+
+# Artifacts that are read outside process_market_timeframe (analysechart_m, ordertracker,
+# the parent summary in updateorders) and therefore always have to land on disk.
+PERSISTED_ARTIFACTS = (
+    "candle_data.json",
+    "pricecandle.json",
+    "candlesamountinbetween.json",
+    "calculatedprices.json",
+    "contractpendingorders.json",
+    "contractstatechanges.json"
+)
+
+# Snapshot modes for the remaining (in-memory only) artifacts
+SNAPSHOT_MODES = ("never", "on_failure", "always")
+
+
+class PipelineContext:
+    """In-memory hand-off between the updateorders stages of one market/timeframe task.
+
+    Stages put and get artifacts under their legacy file names (e.g. 'pricecandle.json'),
+    so a snapshot reproduces exactly the folder layout the stages used to write one by one.
+    """
+
+    def __init__(self, market, timeframe, json_dir=None, snapshot_mode="on_failure", disk_fallback=False):
+        self.market = market
+        self.timeframe = timeframe
+        self.json_dir = json_dir
+        self.snapshot_mode = snapshot_mode if snapshot_mode in SNAPSHOT_MODES else "on_failure"
+        # Off by default: a file left by a previous run is stale state, not this run's artifact
+        self.disk_fallback = disk_fallback
+        self.artifacts = {}
+        self.created_at = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def put(self, name, data):
+        """Store an artifact in memory, replacing any previous value."""
+        self.artifacts[name] = data
+
+    def _disk_path(self, name):
+        if not self.disk_fallback or self.json_dir is None:
+            return None
+        return os.path.join(self.json_dir, name)
+
+    def has(self, name):
+        """Return True if a stage of this run stored the artifact (or, with disk_fallback, its file exists)."""
+        if name in self.artifacts:
+            return True
+        path = self._disk_path(name)
+        return path is not None and os.path.exists(path)
+
+    def get(self, name, default=None):
+        """Return an artifact stored by a stage of this run, or default when none did.
+        Only with disk_fallback is the file written by a previous run read instead."""
+        if name in self.artifacts:
+            return self.artifacts[name]
+        path = self._disk_path(name)
+        if path is None or not os.path.exists(path):
+            return default
+        with open(path, 'r') as f:
+            data = json.load(f)
+        self.artifacts[name] = data
+        return data
+
+    def write(self, names):
+        """Write the given in-memory artifacts to json_dir, returning the list of paths written."""
+        if self.json_dir is None:
+            return []
+        os.makedirs(self.json_dir, exist_ok=True)
+        written = []
+        for name in names:
+            if name not in self.artifacts:
+                continue
+            path = os.path.join(self.json_dir, name)
+            with open(path, 'w') as f:
+                json.dump(self.artifacts[name], f, indent=4)
+                metrics.add_bytes(name, f.tell())
+            written.append(path)
+        return written
+
+    def flush(self):
+        """Write the artifacts other programmes depend on."""
+        return self.write(PERSISTED_ARTIFACTS)
+
+    def snapshot(self):
+        """Write every JSON artifact held by the context, for audits (in-memory objects such as
+        'candle_array' are not files and are skipped)."""
+        return self.write([name for name in self.artifacts if name.endswith(".json")])
+
+    def finalize(self, success):
+        """Flush persisted artifacts and snapshot the rest according to snapshot_mode."""
+        if self.snapshot_mode == "always" or (self.snapshot_mode == "on_failure" and not success):
+            return self.snapshot()
+        return self.flush()
+
+
+def load_artifact(context, json_dir, name, default=None):
+    """Read an artifact through the context when one is given, otherwise straight from json_dir."""
+    if context is not None:
+        return context.get(name, default)
+    path = os.path.join(json_dir, name)
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def store_artifact(context, json_dir, name, data):
+    """Hand an artifact to the next stage; without a context it is written to json_dir immediately."""
+    if context is not None:
+        context.put(name, data)
+        return None
+    os.makedirs(json_dir, exist_ok=True)
+    path = os.path.join(json_dir, name)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+        metrics.add_bytes(name, f.tell())
+    return path
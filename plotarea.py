@@ -0,0 +1,129 @@
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+# Run analysechart's image steps on the region holding the candles instead of the whole frame
+ENABLED = True
+
+# Per market/timeframe cache, next to the other analysechart outputs
+CACHE_FILE = "plotarea.json"
+
+# Detection samples every STEP-th row (every column: a wick is one pixel wide); the box found is widened
+# by MARGIN px on each side
+STEP = 4
+MARGIN = 12
+
+# Candle pixels within this many px outside the cached box mean the candles moved out of it
+BAND = 2 * MARGIN
+
+# Same candle colour ranges as analysechart_m.enhance_colors
+CANDLE_RANGES = (
+    ((0, 20, 20), (15, 255, 255)),
+    ((165, 20, 20), (180, 255, 255)),
+    ((30, 20, 20), (100, 255, 255))
+)
+
+
+def candle_mask(hsv):
+    mask = None
+    for lower, upper in CANDLE_RANGES:
+        part = cv2.inRange(hsv, np.array(lower), np.array(upper))
+        mask = part if mask is None else cv2.bitwise_or(mask, part)
+    return mask
+
+
+def detect(hsv):
+    """Bounding box {x0, y0, x1, y1} of the candle pixels (end exclusive), widened by MARGIN; None if there are none."""
+    sampled = candle_mask(np.ascontiguousarray(hsv[::STEP])) > 0
+    rows = np.flatnonzero(sampled.any(axis=1))
+    cols = np.flatnonzero(sampled.any(axis=0))
+    if not len(rows) or not len(cols):
+        return None
+    height, width = hsv.shape[:2]
+    return {
+        "x0": max(0, int(cols[0]) - MARGIN),
+        "y0": max(0, int(rows[0]) * STEP - MARGIN),
+        "x1": min(width, int(cols[-1]) + 1 + MARGIN),
+        "y1": min(height, (int(rows[-1]) + 1) * STEP + MARGIN)
+    }
+
+
+def escaped(hsv, roi):
+    """True when candle pixels lie in the BAND just outside roi, i.e. the cached box no longer holds the chart."""
+    height, width = hsv.shape[:2]
+    x0, y0, x1, y1 = roi["x0"], roi["y0"], roi["x1"], roi["y1"]
+    strips = (
+        hsv[y0:y1, max(0, x0 - BAND):x0],
+        hsv[y0:y1, x1:min(width, x1 + BAND)],
+        hsv[max(0, y0 - BAND):y0, max(0, x0 - BAND):min(width, x1 + BAND)],
+        hsv[y1:min(height, y1 + BAND), max(0, x0 - BAND):min(width, x1 + BAND)]
+    )
+    return any(strip.size and cv2.countNonZero(candle_mask(np.ascontiguousarray(strip))) for strip in strips)
+
+
+def plot_area(output_folder, hsv):
+    """The region to analyse for this chart: the cached box while the layout and candles still fit it,
+    otherwise a fresh detection (saved for the next chart). None means use the whole frame."""
+    height, width = hsv.shape[:2]
+    path = os.path.join(output_folder, CACHE_FILE)
+    if not ENABLED:
+        return None
+    try:
+        with open(path, 'r') as f:
+            cached = json.load(f)
+        if cached.get("shape") == [height, width] and not escaped(hsv, cached):
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    roi = detect(hsv)
+    if roi is None:
+        return None
+    roi["shape"] = [height, width]
+    try:
+        with open(path, 'w') as f:
+            json.dump(roi, f, indent=4)
+    except OSError as e:
+        print(f"Error saving plot area cache {path}: {str(e)}")
+    print(f"Plot area detected for {output_folder}: x {roi['x0']}-{roi['x1']}, y {roi['y0']}-{roi['y1']} of {width}x{height}")
+    return roi
+
+
+def crop(array, roi):
+    return array if roi is None else array[roi["y0"]:roi["y1"], roi["x0"]:roi["x1"]]
+
+
+def compare_roi(img, hsv, width):
+    """Run enhancement, gridline removal and candle extraction on the whole frame and on the detected plot area.
+    Reports both timings and whether the candles found (in frame coordinates) are the same."""
+    import analysechart_m
+    import candlecomponents
+
+    def run(image, image_hsv):
+        started = time.perf_counter()
+        img_enhanced, mask_red, mask_green, _ = analysechart_m.enhance_chart(image.copy(), image_hsv)
+        img_enhanced, mask_red, mask_green, _ = analysechart_m.remove_horizontal_lines(img_enhanced, mask_red, mask_green, width)
+        candles = candlecomponents.extract_candles(mask_red, mask_green)
+        found = candlecomponents.positions(candles, candlecomponents.unique_by_x(candles["center_x"], candles["area"]))
+        return found, time.perf_counter() - started
+
+    full_positions, full_seconds = run(img, hsv)
+    started = time.perf_counter()
+    roi = detect(hsv)
+    detect_seconds = time.perf_counter() - started
+    if roi is None:
+        return None
+    roi_positions, roi_seconds = run(np.ascontiguousarray(crop(img, roi)), np.ascontiguousarray(crop(hsv, roi)))
+    roi_positions = [(x + roi["x0"], top + roi["y0"], bottom + roi["y0"], color) for x, top, bottom, color in roi_positions]
+    return {
+        "full_ms": round(full_seconds * 1000, 3),
+        "roi_ms": round(roi_seconds * 1000, 3),
+        "detect_ms": round(detect_seconds * 1000, 3),
+        "area_fraction": round((roi["x1"] - roi["x0"]) * (roi["y1"] - roi["y0"]) / float(hsv.shape[0] * hsv.shape[1]), 3),
+        "full_candles": len(full_positions),
+        "roi_candles": len(roi_positions),
+        "identical": full_positions == roi_positions
+    }
+
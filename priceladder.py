@@ -0,0 +1,86 @@
+import numpy as np
+
+# Reward multiples of the risk distance, in the order the ladder columns are returned
+REWARD_TO_RISK_RATIOS = {
+    "1:0.5_price": 0.5,
+    "1:1_price": 1.0,
+    "1:2_price": 2.0,
+    "profit_price": 3.0
+}
+
+
+def pip_value_for_symbol(market, lot_size, contract_size, point, bid=None):
+    """Value of one point for lot_size; JPY pairs are converted with the current bid.
+    Returns (pip_value, used_fallback); the fallback is lot_size * 10 when no bid is available."""
+    pip_value = lot_size * contract_size * point
+    if market.endswith("JPY"):
+        if bid is not None and bid > 0:
+            return pip_value / bid, False
+        return lot_size * 10, True
+    return pip_value, False
+
+
+def round_to_digits(values, digits):
+    """Round each value to its own symbol's digits (digits may be a scalar or an array).
+
+    Uses Python's round, as the per-trendline code did: np.round scales by 10**digits first and can
+    land on the other side of a half for some floats, which would move a price by one tick.
+    """
+    values = np.asarray(values, dtype=float)
+    digits = np.broadcast_to(np.asarray(digits, dtype=int), values.shape[:1])
+    rounded = np.empty_like(values)
+    for i, (row, d) in enumerate(zip(values.tolist(), digits.tolist())):
+        rounded[i] = [round(value, d) for value in row] if isinstance(row, list) else round(row, d)
+    return rounded
+
+
+def compute_price_ladder(entry_prices, order_types, risk_in_pips, point, digits):
+    """Compute stop and reward prices for many orders in one pass.
+
+    entry_prices, order_types ('long'/'short') and risk_in_pips are per order; point and digits are
+    either scalars (one symbol) or per-order arrays, so rows of several markets can be batched together.
+    Returns a dict of arrays: entry_price, exit_price, the REWARD_TO_RISK_RATIOS prices and a 'valid'
+    mask that is False where any rounded price is not positive.
+    """
+    entry = np.asarray(entry_prices, dtype=float)
+    count = entry.shape[0]
+    direction = np.where(np.asarray(order_types) == "short", -1.0, 1.0)
+    risk = np.broadcast_to(np.asarray(risk_in_pips, dtype=float), (count,))
+    point = np.broadcast_to(np.asarray(point, dtype=float), (count,))
+    digits = np.broadcast_to(np.asarray(digits, dtype=int), (count,))
+
+    # Column 0 is the stop, the remaining columns are the reward levels. Offsets are risk * ratio * point
+    # in that order, like the per-trendline code, so the unrounded prices are bit-identical to it.
+    ratios = np.array([1.0] + list(REWARD_TO_RISK_RATIOS.values()))
+    sides = np.array([-1.0] + [1.0] * len(REWARD_TO_RISK_RATIOS))
+    offsets = (risk[:, None] * ratios[None, :]) * point[:, None]
+    prices = entry[:, None] + (direction[:, None] * sides[None, :]) * offsets
+    prices = round_to_digits(prices, digits)
+
+    ladder = {
+        "entry_price": round_to_digits(entry, digits),
+        "exit_price": prices[:, 0]
+    }
+    for column, name in enumerate(REWARD_TO_RISK_RATIOS, start=1):
+        ladder[name] = prices[:, column]
+    ladder["valid"] = (prices > 0).all(axis=1)
+    return ladder
+
+
+def compute_price_ladders(rows):
+    """Batch version for rows of several markets: each row is a dict with entry_price, order_type,
+    risk_in_pips, point and digits. Returns one dict of plain floats per row, in input order."""
+    if not rows:
+        return []
+    ladder = compute_price_ladder(
+        [row["entry_price"] for row in rows],
+        [row["order_type"] for row in rows],
+        [row["risk_in_pips"] for row in rows],
+        [row["point"] for row in rows],
+        [row["digits"] for row in rows]
+    )
+    names = ["entry_price", "exit_price"] + list(REWARD_TO_RISK_RATIOS)
+    return [
+        dict({name: float(ladder[name][i]) for name in names}, valid=bool(ladder["valid"][i]))
+        for i in range(len(rows))
+    ]
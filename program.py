@@ -7,6 +7,10 @@ import pytz
 import json
 import os
 import connectwithinfinitydb as db
+import marketstatusstore
+import metrics
+import orderkey
+import errorjournal
 
 TIMEFRAME_MAPPING = {
     "M5": mt5.TIMEFRAME_M5,
@@ -82,8 +86,6 @@ def check_and_save_verification_status(batchnumber=20):
     try:
         print("===== Checking Verification Status for All Markets =====")
         
-        # Define the path for verification.json files
-        FETCHCHART_DESTINATION_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
         output_json_path = os.path.join(BACTHES_MARKETS_PATH, "allbatchmarkets.json")
         
         # Initialize list for markets with all timeframes verified
@@ -92,19 +94,17 @@ def check_and_save_verification_status(batchnumber=20):
         # Required timeframes to check
         required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
         
+        # Load every market's verification in one query
+        verifications = marketstatusstore.get_verifications(MARKETS)
+        
         # Check each market
         for market in MARKETS:
-            market_folder_name = market.replace(" ", "_")
-            verification_file = os.path.join(FETCHCHART_DESTINATION_PATH, market_folder_name, "verification.json")
-            
             try:
-                if not os.path.exists(verification_file):
-                    print(f"Verification file not found for {market}: {verification_file}")
+                verification_data = verifications.get(market)
+                if verification_data is None:
+                    print(f"Verification not found for {market}")
                     continue
                 
-                with open(verification_file, 'r') as f:
-                    verification_data = json.load(f)
-                
                 # Check if all required timeframes are "chart_identified" and "all_timeframes" is "verified"
                 all_timeframes_verified = all(
                     verification_data.get(tf) == "chart_identified" for tf in required_timeframes
@@ -319,18 +319,12 @@ def orders_status():
         print("Fetching all records from cipherbouncestream_signals, calculating days old, and saving to activemarketsignals.json", "INFO")
         
         # Initialize error log list
-        error_log = []
+        error_log = errorjournal.ErrorLog("getactivemarketsignals")
         activemarketsignals_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\activemarketsignals.json"
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "getactivemarketsignalserror.json")
         
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}", "INFO")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+            error_log.save()
         
         # Get current date in Africa/Lagos timezone
         current_date = datetime.now(pytz.timezone('Africa/Lagos')).date()
@@ -453,19 +447,13 @@ def orders_status():
             "removing overlapping pairs from processed table, calculating days old, saving to processedmarkets.json and activemarkets.json", "INFO")
         
         # Initialize error log list
-        error_log = []
+        error_log = errorjournal.ErrorLog("getprocessedmarkets")
         nextbatch_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\processedmarkets.json"
         activemarkets_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\activemarkets.json"
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "getprocessedmarketserror.json")
         
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}", "INFO")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+            error_log.save()
         
         # Get current date in Africa/Lagos timezone
         current_date = datetime.now(pytz.timezone('Africa/Lagos')).date()
@@ -741,19 +729,13 @@ def orders_status():
         print("Filtering markets with days_old >= 4 from activemarketsignals.json and saving to activeoldestsignals.json", "INFO")
         
         # Initialize error log list
-        error_log = []
+        error_log = errorjournal.ErrorLog("filteroldestmarkets")
         activemarketsignals_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\activemarketsignals.json"
         activeoldestsignals_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\activeoldestsignals.json"
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "filteroldestmarketserror.json")
         
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}", "INFO")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+            error_log.save()
         
         # Read activemarketsignals.json
         try:
@@ -805,19 +787,11 @@ def orders_status():
         print("Inserting oldest signals into cipher_processed_bouncestreamsignals table", "INFO")
         
         # Initialize error log list
-        error_log = []
+        error_log = errorjournal.ErrorLog("insertoldestsignals")
         
-        # Define error log file path
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "insertoldestsignalserror.json")
-        
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}", "INFO")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+            error_log.save()
         
         # Load oldest signals from JSON
         try:
@@ -934,7 +908,7 @@ def orders_status():
                     if not (MIN_NUMERIC_VALUE <= value <= MAX_NUMERIC_VALUE):
                         raise ValueError(f"{field_name} out of range: {value}")
                 
-                signal_key = (pair, timeframe, order_type, entry_price, old_range)
+                signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price) + (old_range,)
                 if signal_key in json_signal_keys:
                     error_log.append({
                         "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
@@ -978,7 +952,7 @@ def orders_status():
                 entry_price = float(signal.get('entry_price', 0.0))
                 created_at = signal.get('created_at', '')
                 
-                signal_key = (pair, timeframe, order_type, entry_price)
+                signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
                 
                 if signal_key in db_signal_keys:
                     if created_at < db_signal_keys[signal_key]['created_at']:
@@ -1070,7 +1044,7 @@ def orders_status():
                     if not (MIN_NUMERIC_VALUE <= value <= MAX_NUMERIC_VALUE):
                         raise ValueError(f"{field_name} out of range: {value}")
                 
-                signal_key = (pair, timeframe, order_type, entry_price)
+                signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
                 
                 if signal_key not in db_signal_keys:
                     pair_escaped = pair.replace("'", "''")
@@ -1183,19 +1157,11 @@ def orders_status():
         print("Deleting oldest signals from cipherbouncestream_signals table and rewriting activemarkets.json", "INFO")
         
         # Initialize error log list
-        error_log = []
+        error_log = errorjournal.ErrorLog("deleteoldestsignals")
         
-        # Define error log file path
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "deleteoldestsignalserror.json")
-        
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}", "INFO")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+            error_log.save()
         
         # Helper function to calculate days old
         def calculate_days_old(created_at: str) -> int:
@@ -1282,7 +1248,7 @@ def orders_status():
                     if not (MIN_NUMERIC_VALUE <= value <= MAX_NUMERIC_VALUE):
                         raise ValueError(f"{field_name} out of range: {value}")
                 
-                signal_key = (pair, timeframe, order_type, entry_price, old_range)
+                signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price) + (old_range,)
                 if signal_key in json_signal_keys:
                     error_log.append({
                         "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
@@ -1545,7 +1511,6 @@ def save_verified_and_skipped_markets():
         print("===== Saving Verified and Skipped Markets =====")
         
         # Define paths
-        FETCHCHART_DESTINATION_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
         passed_json_path = os.path.join(BACTHES_MARKETS_PATH, "passedmarkets.json")
         skipped_json_path = os.path.join(BACTHES_MARKETS_PATH, "skippedmarkets.json")
         
@@ -1556,23 +1521,21 @@ def save_verified_and_skipped_markets():
         # Required timeframes to check
         required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
         
+        # Load every market's verification in one query
+        verifications = marketstatusstore.get_verifications(MARKETS)
+        
         # Check each market
         for market in MARKETS:
-            market_folder_name = market.replace(" ", "_")
-            verification_file = os.path.join(FETCHCHART_DESTINATION_PATH, market_folder_name, "verification.json")
-            
             try:
-                if not os.path.exists(verification_file):
-                    print(f"Verification file not found for {market}: {verification_file}")
+                verification_data = verifications.get(market)
+                if verification_data is None:
+                    print(f"Verification not found for {market}")
                     skipped_markets.append({
                         "market": market,
-                        "reason": f"Verification file not found: {verification_file}"
+                        "reason": f"Verification not found for {market}"
                     })
                     continue
                 
-                with open(verification_file, 'r') as f:
-                    verification_data = json.load(f)
-                
                 # Check if all required timeframes are "chart_identified" and "all_timeframes" is "verified"
                 all_timeframes_verified = all(
                     verification_data.get(tf) == "chart_identified" for tf in required_timeframes
@@ -1678,29 +1641,21 @@ def save_verified_and_skipped_markets():
         }
     
 def mark_verification_status():
-    """Update verification.json for each market based on passedmarkets.json, activemarkets.json, and processedmarkets.json, setting all_timeframes accordingly."""
+    """Update the verification of each market based on passedmarkets.json, activemarkets.json, and processedmarkets.json, setting all_timeframes accordingly."""
     try:
         print("===== Marking Verification Status for Markets =====")
         
         # Define paths
-        FETCHCHART_DESTINATION_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
         activemarkets_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\activemarkets.json"
         processedmarkets_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\processedmarkets.json"
         passedmarkets_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\batches\passedmarkets.json"
-        error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "mark_verification_status_error.json")
         
         # Initialize error log
-        error_log = []
+        error_log = errorjournal.ErrorLog("mark_verification_status")
         
-        # Helper function to save errors to JSON
+        # Helper function to save errors to the error journal
         def save_errors():
-            try:
-                os.makedirs(BASE_PROCESSING_FOLDER, exist_ok=True)
-                with open(error_json_path, 'w') as f:
-                    json.dump(error_log, f, indent=4)
-                print(f"Errors saved to {error_json_path}")
-            except Exception as e:
-                print(f"Failed to save errors to {error_json_path}: {str(e)}")
+            error_log.save()
         
         # Load passedmarkets.json
         try:
@@ -1771,27 +1726,25 @@ def mark_verification_status():
             print(f"Error loading processedmarkets.json: {str(e)}")
             return False
         
-        # Required timeframes in verification.json
+        # Required timeframes in the verification
         required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
         
+        # Load every market's verification in one query; updates are written back in one transaction
+        verifications = marketstatusstore.get_verifications(list(dict.fromkeys(list(passed_markets) + MARKETS)))
+        updated_verifications = {}
+        
         # Process each market in passedmarkets.json
         for market in passed_markets:
-            market_folder_name = market.replace(" ", "_")
-            verification_file = os.path.join(FETCHCHART_DESTINATION_PATH, market_folder_name, "verification.json")
-            
             try:
-                # Load existing verification.json
-                if not os.path.exists(verification_file):
+                verification_data = verifications.get(market)
+                if verification_data is None:
                     error_log.append({
                         "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
-                        "error": f"Verification file not found for {market}: {verification_file}"
+                        "error": f"Verification not found for {market}"
                     })
-                    print(f"Verification file not found for {market}: {verification_file}")
+                    print(f"Verification not found for {market}")
                     continue
                 
-                with open(verification_file, 'r') as f:
-                    verification_data = json.load(f)
-                
                 # Initialize updated verification data
                 updated_verification_data = verification_data.copy()
                 is_active = False
@@ -1816,52 +1769,35 @@ def mark_verification_status():
                 else:
                     updated_verification_data["all_timeframes"] = "order_free"
                 
-                # Save updated verification.json
-                os.makedirs(os.path.dirname(verification_file), exist_ok=True)
-                with open(verification_file, 'w') as f:
-                    json.dump(updated_verification_data, f, indent=4)
-                print(f"Updated verification.json for {market}: {updated_verification_data}")
+                updated_verifications[market] = updated_verification_data
+                print(f"Updated verification for {market}: {updated_verification_data}")
                 
             except Exception as e:
                 error_log.append({
                     "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
-                    "error": f"Error updating verification.json for {market}: {str(e)}"
+                    "error": f"Error updating verification for {market}: {str(e)}"
                 })
-                print(f"Error updating verification.json for {market}: {str(e)}")
+                print(f"Error updating verification for {market}: {str(e)}")
                 continue
         
-        # Process remaining markets in MARKETS that are not in passedmarkets.json
+        # Save updated verifications
+        try:
+            marketstatusstore.save_verifications(updated_verifications)
+        except Exception as e:
+            error_log.append({
+                "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
+                "error": f"Error saving updated verifications: {str(e)}"
+            })
+            print(f"Error saving updated verifications: {str(e)}")
+        
+        # Remaining markets in MARKETS that are not in passedmarkets.json keep their verification as is
         for market in MARKETS:
-            if market not in passed_markets:
-                market_folder_name = market.replace(" ", "_")
-                verification_file = os.path.join(FETCHCHART_DESTINATION_PATH, market_folder_name, "verification.json")
-                
-                try:
-                    if not os.path.exists(verification_file):
-                        error_log.append({
-                            "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
-                            "error": f"Verification file not found for {market}: {verification_file}"
-                        })
-                        print(f"Verification file not found for {market}: {verification_file}")
-                        continue
-                    
-                    with open(verification_file, 'r') as f:
-                        verification_data = json.load(f)
-                    
-                    # Preserve existing verification data for markets not in passedmarkets.json
-                    updated_verification_data = verification_data.copy()
-                    os.makedirs(os.path.dirname(verification_file), exist_ok=True)
-                    with open(verification_file, 'w') as f:
-                        json.dump(updated_verification_data, f, indent=4)
-                    print(f"Preserved verification.json for {market} (not in passedmarkets.json): {updated_verification_data}")
-                    
-                except Exception as e:
-                    error_log.append({
-                        "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
-                        "error": f"Error preserving verification.json for {market}: {str(e)}"
-                    })
-                    print(f"Error preserving verification.json for {market}: {str(e)}")
-                    continue
+            if market not in passed_markets and market not in verifications:
+                error_log.append({
+                    "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
+                    "error": f"Verification not found for {market}"
+                })
+                print(f"Verification not found for {market}")
         
         # Save any errors to error log
         if error_log:
@@ -2128,7 +2064,12 @@ def execute(mode="loop"):
     try:
         if mode == "once":
             # Execute all batches once
+            metrics.start_cycle("once")
+            metrics.rotate()
+            errorjournal.rotate()
             overall_start_time_ci, overall_end_time_ci, overall_start_time_5m, overall_end_time_5m = process_all_batches()
+            metrics.print_summary(metrics.summarize())
+            errorjournal.print_summary(errorjournal.summarize())
             
             # Print overall summary for all batches
             if overall_start_time_ci and overall_end_time_ci and overall_start_time_5m and overall_end_time_5m:
@@ -2151,7 +2092,12 @@ def execute(mode="loop"):
                 execution_count += 1
                 print(f"\n=== Starting Execution Cycle {execution_count} ===")
                 log_batch_stage(f"Starting Execution Cycle {execution_count}")
+                metrics.start_cycle(f"cycle{execution_count}")
+                metrics.rotate()
+                errorjournal.rotate()
                 overall_start_time_ci, overall_end_time_ci, overall_start_time_5m, overall_end_time_5m = process_all_batches()
+                metrics.print_summary(metrics.summarize())
+                errorjournal.print_summary(errorjournal.summarize())
                 
                 # Print overall summary for all batches
                 if overall_start_time_ci and overall_end_time_ci and overall_start_time_5m and overall_end_time_5m:
@@ -0,0 +1,148 @@
+import time
+import MetaTrader5 as mt5
+import metrics
+
+# Bar length of each timeframe, to tell when a new bar has closed since a fetch
+PERIOD_SECONDS = {"M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400}
+
+
+def open_session(terminal_path, login_id, password, server, retries=3, retry_delay=5):
+    """Initialize and log in to the MT5 terminal; returns (ok, message). Call mt5.shutdown() when done."""
+    mt5.shutdown()
+    for attempt in range(retries):
+        if mt5.initialize(path=terminal_path, timeout=60000):
+            break
+        time.sleep(retry_delay)
+    else:
+        return False, f"Failed to initialize MT5 terminal after {retries} attempts: {mt5.last_error()}"
+
+    for _ in range(5):
+        if mt5.terminal_info() is not None:
+            break
+        time.sleep(2)
+    else:
+        mt5.shutdown()
+        return False, "MT5 terminal not ready"
+
+    for attempt in range(retries):
+        if mt5.login(login=int(login_id), password=password, server=server, timeout=60000):
+            return True, "logged in"
+        time.sleep(retry_delay)
+    mt5.shutdown()
+    return False, f"Failed to log in to MT5 after {retries} attempts: {mt5.last_error()}"
+
+
+def fetch_rates_bulk(requests, timeframe_mapping, start_pos=1):
+    """Fetch closed candles for many (symbol, timeframe, count) requests over the current session.
+
+    Each symbol is selected once and the copy_rates_from_pos calls run back to back. The MetaTrader5
+    package serves one terminal connection per process and its calls do not overlap, so a thread pool
+    would only queue on that connection; the requests are fetched in a tight loop instead.
+
+    Returns ({(symbol, timeframe): rates structured array}, {(symbol, timeframe): error message}, stats).
+    """
+    rates_by_key = {}
+    errors = {}
+    selected = {}
+    started = time.perf_counter()
+    for symbol, timeframe, count in requests:
+        key = (symbol, timeframe)
+        if key in rates_by_key:
+            continue
+        if symbol not in selected:
+            selected[symbol] = bool(mt5.symbol_select(symbol, True))
+        if not selected[symbol]:
+            errors[key] = f"Failed to select market: {symbol}, error: {mt5.last_error()}"
+            continue
+        mt5_timeframe = timeframe_mapping.get(timeframe)
+        if not mt5_timeframe:
+            errors[key] = f"Invalid timeframe {timeframe} for {symbol}"
+            continue
+        rates = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, symbol, mt5_timeframe, start_pos, count)
+        if rates is None or len(rates) < count:
+            errors[key] = f"Failed to fetch candle data for {symbol} {timeframe}, error: {mt5.last_error()}"
+            continue
+        rates_by_key[key] = rates
+    seconds = time.perf_counter() - started
+    stats = {
+        "requested": len(requests),
+        "fetched": len(rates_by_key),
+        "failed": len(errors),
+        "symbols": len(selected),
+        "seconds": round(seconds, 3),
+        "ms_per_series": round(seconds * 1000 / len(requests), 2) if requests else 0.0
+    }
+    metrics.record("stage", "fetch_rates_bulk", seconds, series=len(requests), fetched=len(rates_by_key))
+    return rates_by_key, errors, stats
+
+
+def stamp_fetch_times(rates_by_key):
+    """Wrap bulk-fetched rates with when they were fetched, while the session is still open.
+
+    Bar times are in the server's clock, so each entry records the symbol's last tick time (server time at the
+    fetch, None if the terminal has no tick) next to the local time.time(). Returns
+    {(symbol, timeframe): {"rates", "server_time", "fetched_at"}}.
+    """
+    tick_times = {}
+    for symbol, _ in rates_by_key:
+        if symbol not in tick_times:
+            tick = metrics.timed_call("mt5", "symbol_info_tick", mt5.symbol_info_tick, symbol)
+            tick_times[symbol] = int(tick.time) if tick is not None else None
+    fetched_at = time.time()
+    return {
+        key: {"rates": rates, "server_time": tick_times[key[0]], "fetched_at": fetched_at}
+        for key, rates in rates_by_key.items()
+    }
+
+
+def is_current(prefetched, timeframe, now=None):
+    """False once a new bar may have closed since the prefetched rates (closed bars from position 1) were fetched.
+
+    The bar that was forming at the fetch opened at rates[-1]['time'] + period and closes a period later; the
+    server clock is estimated as the fetch's server time plus the local time elapsed since. Rates without a
+    server time or with an unknown timeframe are never current.
+    """
+    period = PERIOD_SECONDS.get(timeframe)
+    if not prefetched or prefetched.get("server_time") is None or not period:
+        return False
+    now = time.time() if now is None else now
+    server_now = prefetched["server_time"] + (now - prefetched["fetched_at"])
+    return int(prefetched["rates"][-1]["time"]) + 2 * period > server_now
+
+
+def compare_with_per_task(requests, timeframe_mapping, terminal_path, login_id, password, server, start_pos=1):
+    """Time the per-task path fetch_candle_data used before prefetching (a fresh session, symbol_select and
+    copy_rates_from_pos for every request) against fetch_rates_bulk over one session, for the same requests.
+
+    Both runs are recorded as 'fetch_compare_per_task' / 'fetch_compare_bulk' metrics. Returns the report dict.
+    """
+    per_task_started = time.perf_counter()
+    per_task_fetched = 0
+    for symbol, timeframe, count in requests:
+        ok, _ = open_session(terminal_path, login_id, password, server)
+        if ok and mt5.symbol_select(symbol, True) and timeframe_mapping.get(timeframe):
+            rates = mt5.copy_rates_from_pos(symbol, timeframe_mapping[timeframe], start_pos, count)
+            per_task_fetched += int(rates is not None and len(rates) >= count)
+        mt5.shutdown()
+    per_task_seconds = time.perf_counter() - per_task_started
+
+    bulk_started = time.perf_counter()
+    ok, message = open_session(terminal_path, login_id, password, server)
+    rates_by_key = {}
+    if ok:
+        try:
+            rates_by_key, _, _ = fetch_rates_bulk(requests, timeframe_mapping, start_pos)
+        finally:
+            mt5.shutdown()
+    bulk_seconds = time.perf_counter() - bulk_started
+
+    metrics.record("stage", "fetch_compare_per_task", per_task_seconds, series=len(requests), fetched=per_task_fetched)
+    metrics.record("stage", "fetch_compare_bulk", bulk_seconds, series=len(requests), fetched=len(rates_by_key))
+    return {
+        "series": len(requests),
+        "per_task_seconds": round(per_task_seconds, 3),
+        "per_task_fetched": per_task_fetched,
+        "bulk_seconds": round(bulk_seconds, 3),
+        "bulk_fetched": len(rates_by_key),
+        "speedup": round(per_task_seconds / bulk_seconds, 2) if bulk_seconds > 0 else None
+    }
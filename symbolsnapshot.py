@@ -0,0 +1,71 @@
+import MetaTrader5 as mt5
+import metrics
+from orderkey import normalize_pair
+
+
+class SymbolSnapshot:
+    """Broker symbols, Market Watch selection and last ticks for one validation cycle.
+
+    Every distinct symbol is resolved, selected and ticked once, however many orders refer to it.
+    The MetaTrader5 package talks to a single terminal per process, so the ticks are read one after
+    the other from the terminal's local cache rather than through parallel sessions.
+    """
+
+    def __init__(self, symbols=None):
+        if symbols is None:
+            symbols = metrics.timed_call("mt5", "symbols_get", mt5.symbols_get) or ()
+        self.total_symbols = len(symbols)
+        self.broker_symbols = {normalize_pair(symbol.name): symbol.name for symbol in symbols}
+        self.digits_by_symbol = {symbol.name: symbol.digits for symbol in symbols}
+        self.selected = {}
+        self.select_errors = {}
+        self.ticks = {}
+        self.tick_errors = {}
+
+    def resolve(self, pair):
+        """Return the broker's name for a signal pair, or None if the broker does not list it."""
+        return self.broker_symbols.get(normalize_pair(pair))
+
+    def prepare(self, pairs):
+        """Select and fetch a tick for every distinct resolvable pair; returns the broker names handled."""
+        names = []
+        for pair in pairs:
+            name = self.resolve(pair)
+            if name and name not in self.selected and name not in names:
+                names.append(name)
+        for name in names:
+            try:
+                self.selected[name] = bool(mt5.symbol_select(name, True))
+                if not self.selected[name]:
+                    self.select_errors[name] = f"Failed to select symbol: {mt5.last_error()}"
+            except Exception as e:
+                self.selected[name] = False
+                self.select_errors[name] = f"Error selecting symbol: {str(e)}"
+        self.refresh_ticks([name for name in names if self.selected[name]])
+        return names
+
+    def refresh_ticks(self, names=None):
+        """(Re)fetch the last tick of the given selected symbols, by default all of them."""
+        names = names if names is not None else [name for name, ok in self.selected.items() if ok]
+        for name in names:
+            tick = metrics.timed_call("mt5", "symbol_info_tick", mt5.symbol_info_tick, name)
+            if tick:
+                self.ticks[name] = tick
+                self.tick_errors.pop(name, None)
+            else:
+                self.ticks.pop(name, None)
+                self.tick_errors[name] = f"Failed to retrieve tick data: {mt5.last_error()}"
+
+    def is_selected(self, name):
+        return self.selected.get(name, False)
+
+    def tick(self, name):
+        """Last tick of a prepared symbol, or None."""
+        return self.ticks.get(name)
+
+    def mid_price(self, name):
+        """Midpoint of bid/ask of a prepared symbol, or None."""
+        tick = self.ticks.get(name)
+        if not tick:
+            return None
+        return (tick.bid + tick.ask) / 2
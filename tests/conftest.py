@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# MetaTrader5 only installs on Windows. Tests that touch the terminal get this stand-in with the constants
+# the modules use and patch in the calls they need.
+try:
+    import MetaTrader5  # noqa: F401
+except ImportError:
+    fake_mt5 = types.ModuleType("MetaTrader5")
+    fake_mt5.ORDER_TYPE_BUY_LIMIT = 2
+    fake_mt5.ORDER_TYPE_SELL_LIMIT = 3
+    fake_mt5.TRADE_ACTION_PENDING = 5
+    fake_mt5.TRADE_ACTION_MODIFY = 7
+    fake_mt5.TRADE_ACTION_REMOVE = 8
+    fake_mt5.ORDER_TIME_GTC = 0
+    fake_mt5.TRADE_RETCODE_DONE = 10009
+    fake_mt5.TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+    fake_mt5.TIMEFRAME_M5 = 5
+    fake_mt5.TIMEFRAME_M15 = 15
+    fake_mt5.TIMEFRAME_M30 = 30
+    fake_mt5.TIMEFRAME_H1 = 16385
+    fake_mt5.TIMEFRAME_H4 = 16388
+    fake_mt5.last_error = lambda: (0, "")
+    sys.modules["MetaTrader5"] = fake_mt5
+
+import cipherlogging  # noqa: E402
+import metrics  # noqa: E402
+
+# Log to the console only; the JSON-lines file lives under the Windows log folder
+cipherlogging.DEFAULT_JSON_LOG_PATH = ""
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(monkeypatch):
+    # Records would be appended under the Windows log folder
+    monkeypatch.setattr(metrics, "ENABLED", False)
@@ -0,0 +1,56 @@
+import numpy as np
+import cv2
+
+# Colours of the web terminal's dark theme, BGR
+BACKGROUND = (24, 22, 20)
+GRID = (48, 46, 44)
+RED = (80, 80, 235)
+GREEN = (110, 190, 40)
+
+MAX_SCROLL = 5
+
+
+def make_chart(width=1880, height=1000, candles=155, seed=0, price_line_y=300, grid_step=80, margin=(40, 60, 120, 0), scroll=0):
+    """A synthetic chart screenshot: a random walk of red/green candles with wicks, a grey grid and a
+    one-pixel red price line across the whole width (the overlay remove_horizontal_lines has to drop).
+
+    margin is (top, bottom, right, left) empty space around the candles, like the price and time scales.
+    scroll (up to MAX_SCROLL) draws the same series that many candles later, on the same price scale.
+    Returns (BGR image, [(center_x, high_y, low_y, color)] of the candles drawn, oldest first).
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+    for y in range(grid_step, height, grid_step):
+        cv2.line(img, (0, y), (width - 1, y), GRID, 1)
+
+    top, bottom, right, left = margin
+    # Whole-pixel bar spacing, with the vertical grid tied to the bars so it scrolls with them
+    step = (width - left - right) // candles
+    for i in range(scroll, scroll + candles):
+        if i % 8 == 0:
+            x = left + step * (i - scroll)
+            cv2.line(img, (x, 0), (x, height - 1), GRID, 1)
+    body = max(3, int(step * 0.6) | 1)
+    series = candles + MAX_SCROLL
+    closes = np.cumsum(rng.normal(0, 1.0, series + 1))
+    opens, closes = closes[:-1], closes[1:]
+    highs = np.maximum(opens, closes) + np.abs(rng.normal(0, 0.6, series))
+    lows = np.minimum(opens, closes) - np.abs(rng.normal(0, 0.6, series))
+    scale = (height - top - bottom) / (highs.max() - lows.min())
+
+    def y_of(price):
+        return int(round(top + (highs.max() - price) * scale))
+
+    drawn = []
+    for i in range(scroll, scroll + candles):
+        center_x = left + step * (i - scroll) + step // 2
+        color = GREEN if closes[i] >= opens[i] else RED
+        high_y, low_y = y_of(highs[i]), y_of(lows[i])
+        body_top, body_bottom = y_of(max(opens[i], closes[i])), y_of(min(opens[i], closes[i]))
+        cv2.line(img, (center_x, high_y), (center_x, low_y), color, 1)
+        cv2.rectangle(img, (center_x - body // 2, body_top), (center_x + body // 2, max(body_top + 1, body_bottom)), color, -1)
+        drawn.append((center_x, high_y, low_y, "green" if color == GREEN else "red"))
+
+    if price_line_y is not None:
+        cv2.line(img, (0, price_line_y), (width - 1, price_line_y), RED, 1)
+    return img, drawn
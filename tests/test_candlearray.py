@@ -0,0 +1,28 @@
+import numpy as np
+from candlearray import CandleArray
+
+
+def make_candles(count=5):
+    # Oldest first, so position 1 (most recent) is the last row
+    values = np.arange(count, dtype=float) + 1.0
+    return CandleArray(1700000000 + 300 * np.arange(count), values, values + 0.5, values - 0.5, values + 0.25)
+
+
+def test_indices_accepts_numpy_positions():
+    candles = make_candles()
+    assert candles.indices(np.array([1, 2, 3])).tolist() == [4, 3, 2]
+    assert candles.indices(np.arange(1, 4, dtype=np.int32)).tolist() == [4, 3, 2]
+    assert candles.indices([np.int64(5), np.float64(1.0)]).tolist() == [0, 4]
+
+
+def test_indices_marks_missing_and_invalid_positions():
+    candles = make_candles()
+    assert candles.indices([0, 6, None, "Candle_1", float("nan"), 2]).tolist() == [-1, -1, -1, -1, -1, 3]
+
+
+def test_gather_accepts_numpy_positions():
+    candles = make_candles()
+    gathered = candles.gather(np.array([1, 2, 2, 9]))
+    assert sorted(gathered) == [1, 2]
+    assert gathered[1]["Close"] == 5.25 and gathered[2]["High"] == 4.5
+    assert candles.gather(np.array([1, 2])) == candles.gather([1, 2])
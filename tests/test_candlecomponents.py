@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+import analysechart_m
+import candlecomponents
+from synthchart import make_chart
+
+
+def contour_reference(mask_red, mask_green, img):
+    """The findContours loop detect_candlestick_contours used before the arrays: unique positions, skipped areas, outlines."""
+    found, skipped = [], []
+    for color, mask in (("red", mask_red), ("green", mask_green)):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < 0.01:
+                skipped.append((color, area))
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            found.append((x + w // 2, y, y + h, color, contour))
+    unique_positions, seen_x = [], {}
+    for pos in sorted(found, key=lambda p: p[0]):
+        if pos[0] not in seen_x:
+            seen_x[pos[0]] = pos
+            unique_positions.append(pos)
+        elif cv2.contourArea(pos[4]) > cv2.contourArea(seen_x[pos[0]][4]):
+            unique_positions[unique_positions.index(seen_x[pos[0]])] = pos
+            seen_x[pos[0]] = pos
+    for pos in unique_positions:
+        cv2.drawContours(img, [pos[4]], -1, (255, 0, 0) if pos[3] == "red" else (255, 255, 255), 1)
+    return [pos[:4] for pos in unique_positions], skipped
+
+
+def extract(mask_red, mask_green, img):
+    candles = candlecomponents.extract_candles(mask_red, mask_green)
+    unique_indices = candlecomponents.unique_by_x(candles["center_x"], candles["area"])
+    unique_positions = candlecomponents.positions(candles, unique_indices)
+    for index, position in zip(unique_indices.tolist(), unique_positions):
+        cv2.drawContours(img, [candles["contours"][index]], -1, (255, 0, 0) if position[3] == "red" else (255, 255, 255), 1)
+    skipped = [(color, area) for color in candlecomponents.COLORS for area in candles["skipped"][color]]
+    return unique_positions, skipped
+
+
+def chart_masks(seed):
+    img, _ = make_chart(seed=seed)
+    height, width = img.shape[:2]
+    img = analysechart_m.crop_image(img, height, width)
+    img_enhanced, mask_red, mask_green, _ = analysechart_m.enhance_chart(img)
+    return analysechart_m.remove_horizontal_lines(img_enhanced, mask_red, mask_green, width)[:3]
+
+
+def test_matches_contour_reference_on_charts():
+    for seed in range(3):
+        img_enhanced, mask_red, mask_green = chart_masks(seed)
+        expected_img, actual_img = img_enhanced.copy(), img_enhanced.copy()
+        expected, expected_skipped = contour_reference(mask_red, mask_green, expected_img)
+        actual, actual_skipped = extract(mask_red, mask_green, actual_img)
+        assert len(actual) > 100
+        assert actual == expected
+        assert actual_skipped == expected_skipped
+        assert np.array_equal(actual_img, expected_img)
+
+
+def test_diagonal_stroke_is_not_a_candle():
+    mask_red = np.zeros((200, 200), np.uint8)
+    mask_green = np.zeros((200, 200), np.uint8)
+    cv2.line(mask_red, (10, 10), (90, 150), 255, 1)
+    cv2.rectangle(mask_green, (120, 40), (126, 90), 255, -1)
+    candles = candlecomponents.extract_candles(mask_red, mask_green)
+    assert candlecomponents.positions(candles) == [(123, 40, 91, "green")]
+    assert candles["skipped"] == {"red": [0.0], "green": []}
+    assert extract(mask_red, mask_green, np.zeros((200, 200, 3), np.uint8))[0] == \
+        contour_reference(mask_red, mask_green, np.zeros((200, 200, 3), np.uint8))[0]
+
+
+def test_equal_area_tie_keeps_the_earliest():
+    mask_red = np.zeros((50, 50), np.uint8)
+    mask_green = np.zeros((50, 50), np.uint8)
+    cv2.rectangle(mask_red, (10, 5), (14, 15), 255, -1)
+    cv2.rectangle(mask_green, (10, 30), (14, 40), 255, -1)
+    candles = candlecomponents.extract_candles(mask_red, mask_green)
+    unique = candlecomponents.positions(candles, candlecomponents.unique_by_x(candles["center_x"], candles["area"]))
+    assert unique == [(12, 5, 16, "red")]
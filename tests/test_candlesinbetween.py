@@ -0,0 +1,35 @@
+import json
+import os
+
+import pytest
+
+import candlesinbetween
+
+
+def test_inbetween_counts_closed_candles():
+    data = candlesinbetween.inbetween_data(
+        "Volatility 75 Index", "M15",
+        {"time": "2025-08-28 14:00:00", "high_price": 2.5, "low_price": 1.5},
+        {"timestamp": "2025-08-28 13:15:00", "high": 3.0, "low": 2.0}
+    )
+    assert data["candles in between"] == "3"
+    assert data["new number position for matched candle data"] == "4"
+    assert data["matched candle data"]["matched candledata high"] == 3.0
+
+
+def test_inbetween_rejects_malformed_timestamps():
+    with pytest.raises(ValueError):
+        candlesinbetween.inbetween_data("X", "M5", {"time": "2025-08-28T14:00:00"}, {"timestamp": "2025-08-28 13:15:00"})
+
+
+def test_refresh_for_chart_starts_at_the_charts_own_candle(tmp_path, monkeypatch):
+    monkeypatch.setattr(candlesinbetween, "ORDERS_FOLDER", str(tmp_path))
+    mostrecent = {"time": "2025-08-28T13:15:00+00:00", "high_price": 1.25, "low_price": 1.2}
+    path = candlesinbetween.refresh_for_chart("Volatility 75 Index", "m15", mostrecent)
+    assert path == os.path.join(str(tmp_path), "Volatility_75_Index", "m15", "candlesamountinbetween.json")
+    with open(path) as f:
+        data = json.load(f)
+    assert data["timeframe"] == "M15"
+    assert data["candles in between"] == "0" and data["new number position for matched candle data"] == "1"
+    assert data["new most recent"]["timestamp newmostrecent"] == "2025-08-28 13:15:00"
+    assert data["matched candle data"]["timestamp of matched candledata"] == "2025-08-28 13:15:00"
@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+import pytest
+
+import analysechart_m
+import chartcache
+from synthchart import make_chart
+
+
+def encoded_chart(seed=0):
+    return cv2.imencode(".png", make_chart(seed=seed)[0])[1].tobytes()
+
+
+def test_decode_is_shared_and_read_only():
+    data = encoded_chart()
+    chart = chartcache.decode_bytes(data)
+    assert chartcache.decode_bytes(data) is chart
+    assert np.array_equal(chart["hsv"], cv2.cvtColor(chart["image"], cv2.COLOR_BGR2HSV))
+    for name in ("image", "hsv"):
+        with pytest.raises(ValueError):
+            chart[name][0, 0] = 0
+
+
+def test_memory_keeps_the_latest_entries():
+    keys = [chartcache.decode_bytes(encoded_chart(seed))["key"] for seed in range(chartcache._MEMORY_ENTRIES + 1)]
+    assert keys[0] not in chartcache._memory and keys[-1] in chartcache._memory
+
+
+def test_analysis_steps_accept_the_read_only_arrays():
+    chart = chartcache.decode_bytes(encoded_chart())
+    height, width = chart["image"].shape[:2]
+    img = analysechart_m.crop_image(chart["image"], height, width)
+    hsv = analysechart_m.crop_image(chart["hsv"], height, width)
+    img_enhanced, mask_red, mask_green, _ = analysechart_m.enhance_chart(img, hsv)
+    analysechart_m.remove_horizontal_lines(img_enhanced, mask_red, mask_green, width)
+    assert np.array_equal(img_enhanced, analysechart_m.remove_horizontal_lines(
+        *analysechart_m.enhance_chart(img.copy())[:3], width)[0])
@@ -0,0 +1,58 @@
+import numpy as np
+
+import chartcalibration
+from candlearray import CandleArray
+
+PRICE_PER_PIXEL = 0.01
+PRICE_AT_Y0 = 120.0
+
+
+def make_candles(count=80, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, count))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.3, count))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.3, count))
+    return CandleArray(1700000000 + 300 * np.arange(count), open_, high, low, close)
+
+
+def chart_of(candles, shift, arrows=40, right_x=1500, spacing=11):
+    """Arrows and candle extents of a chart whose rightmost completed candle is capture position 1 + shift."""
+    arrow_data, extents = [], {}
+    for offset in range(arrows):
+        x = right_x - offset * spacing
+        index = len(candles) - (offset + 1 + shift)
+        top = int(round((PRICE_AT_Y0 - candles.high[index]) / PRICE_PER_PIXEL))
+        bottom = int(round((PRICE_AT_Y0 - candles.low[index]) / PRICE_PER_PIXEL))
+        arrow_data.append({"arrow_number": offset + 2, "x": x})
+        extents[x] = (top, bottom)
+    return arrow_data, extents
+
+
+def test_calibrate_recovers_a_known_shift():
+    candles = make_candles()
+    for shift in (0, 1, 2):
+        arrow_data, extents = chart_of(candles, shift)
+        calibration = chartcalibration.calibrate(arrow_data, extents, candles)
+        assert calibration["alignment_shift"] == shift
+        assert calibration["valid"]
+        assert abs(calibration["price_per_pixel"] + PRICE_PER_PIXEL) < 1e-4
+        assert chartcalibration.position_at_x(calibration, 1500) == 1 + shift
+        assert chartcalibration.position_at_x(calibration, 1500 - 10 * 11) == 11 + shift
+
+
+def test_annotate_contracts_only_with_a_valid_calibration():
+    candles = make_candles()
+    arrow_data, extents = chart_of(candles, 1)
+    calibration = chartcalibration.calibrate(arrow_data, extents, candles)
+    arrow_x = {arrow["arrow_number"]: arrow["x"] for arrow in arrow_data}
+    contracts = [{"sender": {"position_number": 3}, "receiver": {"position_number": 5}}]
+
+    chartcalibration.annotate_contracts(contracts, calibration, candles, arrow_x)
+    assert contracts[0]["calibration_valid"] is True
+    # Arrow 3 sits on capture position 3 + shift
+    assert contracts[0]["calibrated_candles"]["3"]["High"] == candles.high[len(candles) - 3]
+
+    chartcalibration.annotate_contracts(contracts, dict(calibration, valid=False), candles, arrow_x)
+    assert contracts[0]["calibration_valid"] is False
+    assert "calibrated_candles" not in contracts[0]
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+import chartslices
+from synthchart import BACKGROUND, GREEN, RED, make_chart
+
+
+def contour_reference(mask_red, mask_green, grid_count):
+    """The per-slice findContours count verify_candlestick_contours used before the block counts."""
+    width = mask_red.shape[1]
+    grid_width = width // grid_count
+    counts = []
+    for i in range(grid_count):
+        end_x = (i + 1) * grid_width if i < grid_count - 1 else width
+        count = 0
+        for mask in (mask_red[:, i * grid_width:end_x], mask_green[:, i * grid_width:end_x]):
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            count += len([c for c in contours if cv2.contourArea(c) >= 0.01])
+        counts.append(count)
+    return counts
+
+
+def verdicts(img, counter):
+    """Which slices of each half hold candles, with verify_candlestick_contours' colour ranges."""
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    mask_red = cv2.inRange(hsv, np.array([0, 100, 100]), np.array([10, 255, 255]))
+    mask_green = cv2.inRange(hsv, np.array([40, 100, 100]), np.array([80, 255, 255]))
+    mid_x = img.shape[1] // 2
+    halves = ((mask_red[:, :mid_x], mask_green[:, :mid_x]), (mask_red[:, mid_x:], mask_green[:, mid_x:]))
+    return [count > 0 for half_red, half_green in halves for count in counter(half_red, half_green, 5)]
+
+
+def assert_parity(img):
+    assert verdicts(img, chartslices.slice_counts) == verdicts(img, contour_reference)
+
+
+def blank():
+    return np.full((1000, 1880, 3), BACKGROUND, dtype=np.uint8)
+
+
+def test_matches_contour_reference_on_charts():
+    charts = [{}, {"candles": 60}, {"candles": 300}, {"margin": (40, 60, 600, 0)}, {"margin": (40, 60, 120, 900)},
+              {"price_line_y": None}]
+    for seed in range(5):
+        for kwargs in charts:
+            img, _ = make_chart(seed=seed, **kwargs)
+            assert_parity(img)
+
+
+def test_specks_and_wicks_are_not_candles():
+    rng = np.random.default_rng(0)
+    specks = blank()
+    specks[rng.integers(0, 1000, 400), rng.integers(0, 1880, 400)] = GREEN
+    price_line = blank()
+    cv2.line(price_line, (0, 300), (1879, 300), RED, 1)
+    tall_specks, wicks = blank(), blank()
+    for x in range(10, 1880, 40):
+        tall_specks[500:502, x] = RED
+        wicks[400:480, x] = GREEN
+        wicks[400:480, x + 3] = GREEN
+    for img in (specks, price_line, tall_specks, wicks):
+        assert not any(verdicts(img, chartslices.slice_counts))
+        assert_parity(img)
+
+
+def test_blocks_and_slice_edges():
+    blocks, straddling = blank(), blank()
+    for x in range(10, 1880, 40):
+        blocks[500:502, x:x + 2] = RED
+    # A red and a green pixel pair side by side are no block of either colour
+    mixed = blank()
+    mixed[500:502, 100] = RED
+    mixed[500:502, 101] = GREEN
+    # Two columns either side of the first slice edge of the left half
+    straddling[500:540, 187:189] = RED
+    assert all(verdicts(blocks, chartslices.slice_counts))
+    assert not any(verdicts(mixed, chartslices.slice_counts))
+    assert not any(verdicts(straddling, chartslices.slice_counts))
+    for img in (blocks, mixed, straddling):
+        assert_parity(img)
@@ -0,0 +1,46 @@
+import contractstate
+
+BAR = 1700000000
+
+
+def state(order_type="long", digits=5, **prices):
+    levels = {"entry_price": 1.10000, "exit_price": 1.09900, "1:0.5_price": 1.10050, "1:1_price": 1.10100,
+              "1:2_price": 1.10200, "profit_price": 1.10300}
+    if order_type == "short":
+        levels = {"entry_price": 1.10000, "exit_price": 1.10100, "1:0.5_price": 1.09950, "1:1_price": 1.09900,
+                  "1:2_price": 1.09800, "profit_price": 1.09700}
+    levels.update(prices)
+    calculated = dict(levels, order_type="buy_limit" if order_type == "long" else "sell_limit", pip_size=10 ** -digits)
+    return contractstate.new_state({"order_holder": {"Time": "2023-11-14 22:00:00"}}, calculated)
+
+
+def test_entry_is_compared_at_the_symbols_digits():
+    # 0.00005 above the entry: the old fixed 0.0001 tolerance filled it, at 5 digits it is 5 ticks away
+    contract = state()
+    assert not contractstate.advance(contract, BAR + 300, 1.1010, 1.10005, 1.1008)
+    assert contract["state"] == contractstate.STATE_PENDING
+    assert contractstate.advance(contract, BAR + 600, 1.1010, 1.10000, 1.1008)
+    assert contract["state"] == contractstate.STATE_EXECUTED
+
+
+def test_index_levels_use_their_own_digits():
+    contract = state(digits=2, entry_price=15000.00, exit_price=14950.00, **{"1:0.5_price": 15025.00,
+                     "1:1_price": 15050.00, "1:2_price": 15100.00, "profit_price": 15150.00})
+    assert contract["digits"] == 2
+    assert contractstate.advance(contract, BAR + 300, 15010.0, 15000.004, 15026.0)
+    assert contract["state"] == contractstate.STATE_EXECUTED and contract["milestones"] == ["1:0.5"]
+
+
+def test_stop_on_the_execution_bar():
+    contract = state(order_type="short")
+    assert contractstate.advance(contract, BAR + 300, 1.10120, 1.09990, 1.10050)
+    assert contract["state"] == contractstate.STATE_STOPLOSS
+
+
+def test_stop_from_the_next_bar_when_configured(monkeypatch):
+    monkeypatch.setattr(contractstate, "STOP_ON_EXECUTION_BAR", False)
+    contract = state(order_type="short")
+    assert contractstate.advance(contract, BAR + 300, 1.10120, 1.09990, 1.10050)
+    assert contract["state"] == contractstate.STATE_EXECUTED
+    assert contractstate.advance(contract, BAR + 600, 1.10100, 1.10000, 1.10050)
+    assert contract["state"] == contractstate.STATE_STOPLOSS
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+import analysechart_m
+import gridlines
+from synthchart import GREEN, RED, make_chart
+
+
+def enhanced(img):
+    height, width = img.shape[:2]
+    img = analysechart_m.crop_image(img, height, width)
+    img_enhanced, mask_red, mask_green, _ = analysechart_m.enhance_chart(img)
+    return img_enhanced, mask_red, mask_green, width
+
+
+def assert_parity(img):
+    img_enhanced, mask_red, mask_green, width = enhanced(img)
+    report = gridlines.compare_methods(img_enhanced, mask_red, mask_green, width)
+    assert report["image_pixels_differing"] == 0
+    assert report["red_mask_pixels_differing"] == 0
+    assert report["green_mask_pixels_differing"] == 0
+    return img_enhanced, mask_red, mask_green, width
+
+
+def test_projection_matches_morphology_on_charts():
+    for seed, price_line_y in ((0, 300), (1, 520), (2, None)):
+        assert_parity(make_chart(seed=seed, price_line_y=price_line_y)[0])
+
+
+def test_projection_matches_morphology_on_partial_and_thick_lines():
+    img, _ = make_chart(seed=3)
+    # Line touching the left border only, one in the middle, a 3-row band and a short stroke that must stay
+    cv2.line(img, (0, 150), (500, 150), GREEN, 1)
+    cv2.line(img, (600, 700), (1500, 700), RED, 1)
+    cv2.rectangle(img, (300, 820), (1200, 822), GREEN, -1)
+    cv2.line(img, (900, 60), (1000, 60), RED, 1)
+    img_enhanced, mask_red, mask_green, width = assert_parity(img)
+    gridlines.remove_lines(img_enhanced, mask_red, mask_green, width)
+    # MORPH_OPEN's even-width kernel leaves the first OPEN_ITERATIONS pixels of an interior line behind
+    assert not mask_red[700, 602:1500].any() and not mask_green[821, 302:1200].any()
+    assert mask_red[700, 600:602].all()
+    assert mask_red[60, 900:1000].all()
+
+
+def test_right_border_run_needs_the_longer_reach():
+    width = 1000
+    left, right = gridlines.open_reach(width)
+    for length in range(min(left, right) - 2, max(left, right) + 3):
+        binary = np.zeros((3, width), np.uint8)
+        binary[1, width - length:] = 255
+        binary[2, :length] = 255
+        img = cv2.merge([binary] * 3)
+        morph = [a.copy() for a in (img, binary, binary)]
+        proj = [a.copy() for a in (img, binary, binary)]
+        gridlines.remove_lines_morphology(*morph, width)
+        gridlines.remove_lines_projection(*proj, width)
+        assert np.array_equal(morph[0], proj[0]), length
+
+
+def test_fallback_uses_morphology(monkeypatch):
+    def broken(*args):
+        raise ValueError("boom")
+    monkeypatch.setattr(gridlines, "remove_lines_projection", broken)
+    img_enhanced, mask_red, mask_green, width = enhanced(make_chart(seed=4)[0])
+    expected = [a.copy() for a in (img_enhanced, mask_red, mask_green)]
+    gridlines.remove_lines_morphology(*expected, width)
+    assert gridlines.remove_lines(img_enhanced, mask_red, mask_green, width) == "morphology"
+    assert all(np.array_equal(a, b) for a, b in zip((img_enhanced, mask_red, mask_green), expected))
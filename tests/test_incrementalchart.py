@@ -0,0 +1,50 @@
+import numpy as np
+
+import analysechart_m
+import incrementalchart
+from synthchart import make_chart
+
+
+def cropped(**kwargs):
+    img, _ = make_chart(seed=5, **kwargs)
+    height, width = img.shape[:2]
+    return analysechart_m.crop_image(img, height, width), width
+
+
+def remove_lines(width):
+    return lambda *arrays: analysechart_m.remove_horizontal_lines(*arrays, width)
+
+
+def cached_cycle(tmp_path, img, width):
+    enhanced = analysechart_m.enhance_chart(img)
+    positions = incrementalchart.candle_positions(enhanced, remove_lines(width))
+    incrementalchart.save_cache(str(tmp_path), img, *enhanced[:3], [pos[0] for pos in positions], 40)
+    return incrementalchart.load_cache(str(tmp_path))
+
+
+def test_moved_price_line_matches_full_pass(tmp_path):
+    previous, width = cropped(price_line_y=300)
+    current, _ = cropped(price_line_y=340, scroll=1)
+    cache = cached_cycle(tmp_path, previous, width)
+
+    incremental = incrementalchart.enhance_incremental(cache, current, 41, analysechart_m.enhance_chart)
+    full = analysechart_m.enhance_chart(current)
+    assert incremental is not None
+    for incremental_array, full_array in zip(incremental, full):
+        assert np.array_equal(incremental_array, full_array)
+    assert incrementalchart.matches_full_pass(incremental, full, remove_lines(width))
+    assert len(incrementalchart.candle_positions(incremental, remove_lines(width))) > 100
+
+
+def test_unchanged_chart_reuses_the_cache(tmp_path):
+    img, width = cropped()
+    cache = cached_cycle(tmp_path, img, width)
+    incremental = incrementalchart.enhance_incremental(cache, img, 40, analysechart_m.enhance_chart)
+    assert all(np.array_equal(a, b) for a, b in zip(incremental, analysechart_m.enhance_chart(img)))
+    assert len(incrementalchart.changed_rows(cache, img, img.shape[1] // 2, 0)) == 0
+
+
+def test_check_due_after_a_full_pass_and_every_check_every():
+    assert incrementalchart.check_due({"checked": np.array(False), "unchecked_runs": np.array(0)})
+    assert not incrementalchart.check_due({"checked": np.array(True), "unchecked_runs": np.array(1)})
+    assert incrementalchart.check_due({"checked": np.array(True), "unchecked_runs": np.array(incrementalchart.CHECK_EVERY - 1)})
@@ -0,0 +1,25 @@
+import orderkey
+
+
+def test_price_ticks_at_symbol_digits():
+    assert orderkey.price_ticks(1.10001, 5) == 110001
+    assert orderkey.price_ticks(150.123, 3) == orderkey.price_ticks(150.1230000001, 3)
+    assert orderkey.price_ticks(150.123, 3) != orderkey.price_ticks(150.124, 3)
+
+
+def test_digits_from_entries_reports_missing_pip_size():
+    assert orderkey.digits_from_entries([{"pip_size": 0.001}]) == 3
+    assert orderkey.digits_from_entries([{}]) == orderkey.DEFAULT_DIGITS
+    assert orderkey.digits_from_entries([{}], default=None) is None
+
+
+def test_index_by_price_keeps_order_types_apart():
+    entries = [
+        {"order_type": "buy_limit", "entry_price": 1.10000},
+        {"order_type": "Sell_Limit", "entry_price": 1.20000},
+        {"order_type": "buy_limit", "entry_price": 1.10000, "duplicate": True}
+    ]
+    index = orderkey.index_by_price(entries, 5)
+    assert index[110000] == {"buy_limit": entries[0]}
+    assert index[120000] == {"sell_limit": entries[1]}
+    assert 110001 not in index
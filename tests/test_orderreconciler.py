@@ -0,0 +1,147 @@
+import json
+import sys
+import types
+from collections import namedtuple
+import pytest
+
+# MetaTrader5 only exists on Windows; the reconciler only needs these constants and three calls
+fake_mt5 = types.ModuleType("MetaTrader5")
+fake_mt5.ORDER_TYPE_BUY_LIMIT = 2
+fake_mt5.ORDER_TYPE_SELL_LIMIT = 3
+fake_mt5.TRADE_ACTION_PENDING = 5
+fake_mt5.TRADE_ACTION_MODIFY = 7
+fake_mt5.TRADE_ACTION_REMOVE = 8
+fake_mt5.ORDER_TIME_GTC = 0
+fake_mt5.TRADE_RETCODE_DONE = 10009
+fake_mt5.TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+sys.modules.setdefault("MetaTrader5", fake_mt5)
+
+import orderreconciler  # noqa: E402
+
+Order = namedtuple("Order", "ticket symbol type price_open volume_current sl tp magic")
+Result = namedtuple("Result", "retcode order comment")
+
+
+class Broker:
+    """orders_get/order_send/last_error over an in-memory book."""
+
+    def __init__(self, orders, throttle=0):
+        self.orders = list(orders)
+        self.sent = []
+        self.throttle = throttle
+
+    def orders_get(self):
+        return tuple(self.orders)
+
+    def order_send(self, request):
+        self.sent.append(request)
+        if self.throttle:
+            self.throttle -= 1
+            return Result(fake_mt5.TRADE_RETCODE_TOO_MANY_REQUESTS, 0, "too many requests")
+        return Result(fake_mt5.TRADE_RETCODE_DONE, 900 + len(self.sent), "done")
+
+    def last_error(self):
+        return (0, "")
+
+
+@pytest.fixture(autouse=True)
+def migration_file(tmp_path, monkeypatch):
+    # Already migrated unless a test removes the file
+    path = tmp_path / "legacyordermigration.json"
+    path.write_text(json.dumps({"adopted_tickets": []}))
+    monkeypatch.setattr(orderreconciler, "LEGACY_MIGRATION_FILE", str(path))
+    return path
+
+
+def install(monkeypatch, broker):
+    mt5 = orderreconciler.mt5
+    monkeypatch.setattr(mt5, "orders_get", broker.orders_get, raising=False)
+    monkeypatch.setattr(mt5, "order_send", broker.order_send, raising=False)
+    monkeypatch.setattr(mt5, "last_error", broker.last_error, raising=False)
+
+
+def limit(symbol, price, sl, volume=0.1, order_type=fake_mt5.ORDER_TYPE_BUY_LIMIT):
+    return {"action": fake_mt5.TRADE_ACTION_PENDING, "symbol": symbol, "volume": volume, "type": order_type,
+            "price": price, "sl": sl, "type_time": fake_mt5.ORDER_TIME_GTC}
+
+
+def test_keep_modify_place_and_cancel(monkeypatch):
+    magic = orderreconciler.ORDER_MAGIC
+    broker = Broker([
+        Order(1, "EURUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.10000, 0.1, 1.09000, 0.0, magic),
+        Order(2, "GBPUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.25000, 0.1, 1.24000, 0.0, magic),
+        Order(3, "USDJPY", fake_mt5.ORDER_TYPE_SELL_LIMIT, 150.000, 0.1, 151.000, 0.0, magic)
+    ])
+    install(monkeypatch, broker)
+    desired = [
+        limit("EURUSD", 1.10000, 1.09000),
+        limit("GBPUSD", 1.25000, 1.23500),
+        limit("AUDUSD", 0.66000, 0.65500)
+    ]
+    results, summary = orderreconciler.reconcile_pending_orders(desired, {"USDJPY": 3})
+
+    assert [result["action"] for result in results] == ["kept", "modified", "placed"]
+    assert summary == {"kept": 1, "modified": 1, "placed": 1, "failed": 0, "cancelled": 1, "cancel_failed": 0}
+    actions = [(request["action"], request.get("order")) for request in broker.sent]
+    assert actions == [(fake_mt5.TRADE_ACTION_MODIFY, 2), (fake_mt5.TRADE_ACTION_REMOVE, 3), (fake_mt5.TRADE_ACTION_PENDING, None)]
+    assert broker.sent[2]["magic"] == magic
+
+
+def test_orders_of_other_tools_are_left_alone(monkeypatch):
+    broker = Broker([
+        Order(1, "EURUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.10000, 0.1, 1.09000, 0.0, 0),
+        Order(2, "GBPUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.25000, 0.1, 1.24000, 0.0, 777)
+    ])
+    install(monkeypatch, broker)
+    results, summary = orderreconciler.reconcile_pending_orders([limit("EURUSD", 1.10000, 1.09000)])
+
+    # A manual order with the same symbol, type, price and volume is not taken over as ours
+    assert results[0]["action"] == "placed"
+    assert summary["kept"] == 0 and summary["cancelled"] == 0
+    assert [request["action"] for request in broker.sent] == [fake_mt5.TRADE_ACTION_PENDING]
+
+
+def test_legacy_orders_are_adopted_once(monkeypatch, migration_file):
+    migration_file.unlink()
+    broker = Broker([
+        Order(1, "EURUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.10000, 0.1, 1.09000, 0.0, 0),
+        Order(2, "GBPUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.25000, 0.1, 1.24000, 0.0, 0),
+        Order(3, "USDJPY", fake_mt5.ORDER_TYPE_SELL_LIMIT, 150.000, 0.1, 151.000, 0.0, 0)
+    ])
+    install(monkeypatch, broker)
+    desired = [limit("EURUSD", 1.10000, 1.09000), limit("GBPUSD", 1.25000, 1.23500)]
+    results, summary = orderreconciler.reconcile_pending_orders(desired, {"USDJPY": 3})
+
+    # Matching legacy orders are kept or modified instead of placed a second time; the unmatched one is cancelled
+    assert [result["action"] for result in results] == ["kept", "modified"]
+    assert summary["placed"] == 0 and summary["cancelled"] == 1
+    actions = [(request["action"], request.get("order")) for request in broker.sent]
+    assert actions == [(fake_mt5.TRADE_ACTION_MODIFY, 2), (fake_mt5.TRADE_ACTION_REMOVE, 3)]
+    assert json.loads(migration_file.read_text()) == {"adopted_tickets": [1, 2]}
+
+    # Next cycle the adopted orders are still managed; a new manual magic-0 order is not
+    broker = Broker([
+        Order(1, "EURUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.10000, 0.1, 1.09000, 0.0, 0),
+        Order(2, "GBPUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 1.25000, 0.1, 1.23500, 0.0, 0),
+        Order(4, "AUDUSD", fake_mt5.ORDER_TYPE_BUY_LIMIT, 0.66000, 0.1, 0.65500, 0.0, 0)
+    ])
+    install(monkeypatch, broker)
+    results, summary = orderreconciler.reconcile_pending_orders([limit("EURUSD", 1.10000, 1.09000)])
+    assert results[0]["action"] == "kept"
+    assert [(request["action"], request.get("order")) for request in broker.sent] == [(fake_mt5.TRADE_ACTION_REMOVE, 2)]
+    assert json.loads(migration_file.read_text()) == {"adopted_tickets": [1]}
+
+
+def test_pacing_only_after_rate_limit(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(orderreconciler.time, "sleep", sleeps.append)
+    broker = Broker([])
+    install(monkeypatch, broker)
+    orderreconciler.reconcile_pending_orders([limit("EURUSD", 1.1, 1.09), limit("GBPUSD", 1.25, 1.24)])
+    assert sleeps == []
+
+    broker = Broker([], throttle=1)
+    install(monkeypatch, broker)
+    results, summary = orderreconciler.reconcile_pending_orders([limit("EURUSD", 1.1, 1.09), limit("GBPUSD", 1.25, 1.24)])
+    assert summary["placed"] == 2 and len(broker.sent) == 3
+    assert len(sleeps) == 2
@@ -0,0 +1,26 @@
+import cv2
+import numpy as np
+
+import analysechart_m
+import plotarea
+from synthchart import BACKGROUND, GREEN, make_chart
+
+
+def cropped_hsv(img):
+    height, width = img.shape[:2]
+    img = analysechart_m.crop_image(img, height, width)
+    return img, cv2.cvtColor(img, cv2.COLOR_BGR2HSV), width
+
+
+def test_plot_area_finds_the_same_candles_as_the_full_frame():
+    for seed, margin in ((0, (40, 60, 120, 0)), (1, (40, 60, 120, 0)), (2, (150, 250, 500, 0))):
+        report = plotarea.compare_roi(*cropped_hsv(make_chart(seed=seed, margin=margin)[0]))
+        assert report["identical"] and report["full_candles"] > 100
+
+
+def test_detect_keeps_a_wick_outside_the_sampled_columns():
+    img = np.full((400, 600, 3), BACKGROUND, dtype=np.uint8)
+    cv2.rectangle(img, (100, 200), (106, 300), GREEN, -1)
+    cv2.line(img, (301, 20), (301, 250), GREEN, 1)
+    roi = plotarea.detect(cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+    assert roi["x1"] > 301 and roi["y0"] <= 20
@@ -0,0 +1,50 @@
+import random
+import priceladder
+
+
+def reference_prices(entry_price, order_type, risk_in_pips, pip_size, digits):
+    """The per-trendline arithmetic getorderholderpriceswithlotsizeandrisk used before the batch ladder."""
+    if order_type == "short":
+        exit_price = entry_price + (risk_in_pips * pip_size)
+        price_1_0_5 = entry_price - (risk_in_pips * 0.5 * pip_size)
+        price_1_1 = entry_price - (risk_in_pips * 1 * pip_size)
+        price_1_2 = entry_price - (risk_in_pips * 2 * pip_size)
+        profit_price = entry_price - (risk_in_pips * 3 * pip_size)
+    else:
+        exit_price = entry_price - (risk_in_pips * pip_size)
+        price_1_0_5 = entry_price + (risk_in_pips * 0.5 * pip_size)
+        price_1_1 = entry_price + (risk_in_pips * 1 * pip_size)
+        price_1_2 = entry_price + (risk_in_pips * 2 * pip_size)
+        profit_price = entry_price + (risk_in_pips * 3 * pip_size)
+    return {
+        "entry_price": round(entry_price, digits),
+        "exit_price": round(exit_price, digits),
+        "1:0.5_price": round(price_1_0_5, digits),
+        "1:1_price": round(price_1_1, digits),
+        "1:2_price": round(price_1_2, digits),
+        "profit_price": round(profit_price, digits)
+    }
+
+
+def test_round_to_digits_matches_builtin_round_on_halves():
+    # np.round(189.085, 2) gives 189.08, Python's round gives 189.09
+    assert priceladder.round_to_digits([189.085, 27.3055], [2, 3]).tolist() == [round(189.085, 2), round(27.3055, 3)]
+
+
+def test_ladder_matches_per_trendline_prices():
+    rng = random.Random(7)
+    rows = []
+    for _ in range(2000):
+        digits = rng.choice([1, 2, 3, 5])
+        point = 10 ** -digits
+        rows.append({
+            "entry_price": round(rng.uniform(0.5, 30000), digits),
+            "order_type": rng.choice(["long", "short"]),
+            "risk_in_pips": rng.uniform(1, 5000),
+            "point": point,
+            "digits": digits
+        })
+    for row, prices in zip(rows, priceladder.compute_price_ladders(rows)):
+        expected = reference_prices(row["entry_price"], row["order_type"], row["risk_in_pips"], row["point"], row["digits"])
+        assert {name: prices[name] for name in expected} == expected
+        assert prices["valid"] == all(value > 0 for name, value in expected.items() if name != "entry_price")
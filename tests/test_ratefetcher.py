@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+import numpy as np
+import MetaTrader5 as mt5
+import ratefetcher
+
+TIMEFRAMES = {"M5": mt5.TIMEFRAME_M5, "M15": mt5.TIMEFRAME_M15}
+
+
+class Terminal:
+    """Counts the terminal calls each fetch path makes."""
+
+    def __init__(self):
+        self.calls = {}
+
+    def call(self, name, result):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return result
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(mt5, "initialize", lambda **kwargs: self.call("initialize", True), raising=False)
+        monkeypatch.setattr(mt5, "shutdown", lambda: self.call("shutdown", None), raising=False)
+        monkeypatch.setattr(mt5, "terminal_info", lambda: self.call("terminal_info", object()), raising=False)
+        monkeypatch.setattr(mt5, "login", lambda **kwargs: self.call("login", True), raising=False)
+        monkeypatch.setattr(mt5, "symbol_select", lambda symbol, enable: self.call("symbol_select", True), raising=False)
+        monkeypatch.setattr(mt5, "copy_rates_from_pos", self.copy_rates_from_pos, raising=False)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.call("copy_rates_from_pos", None)
+        rates = np.zeros(count, dtype=[("time", "i8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8")])
+        rates["time"] = np.arange(count) * timeframe * 60
+        return rates
+
+
+def requests(markets=10):
+    return [(f"Market {i}", timeframe, 50) for i in range(markets) for timeframe in TIMEFRAMES]
+
+
+def test_bulk_fetch_selects_each_symbol_once(monkeypatch):
+    terminal = Terminal()
+    terminal.install(monkeypatch)
+    rates_by_key, errors, stats = ratefetcher.fetch_rates_bulk(requests(), TIMEFRAMES)
+    assert not errors and len(rates_by_key) == 20
+    assert terminal.calls == {"symbol_select": 10, "copy_rates_from_pos": 20}
+    assert stats["symbols"] == 10 and stats["fetched"] == 20
+
+
+def test_compare_counts_one_session_against_one_per_task(monkeypatch):
+    terminal = Terminal()
+    terminal.install(monkeypatch)
+    report = ratefetcher.compare_with_per_task(requests(), TIMEFRAMES, "terminal64.exe", "1", "secret", "Server")
+    assert report["per_task_fetched"] == report["bulk_fetched"] == 20
+    # 20 sessions for the per-task path, one for the bulk fetch
+    assert terminal.calls["initialize"] == 21 and terminal.calls["login"] == 21
+    assert terminal.calls["symbol_select"] == 20 + 10
+    assert terminal.calls["copy_rates_from_pos"] == 20 + 20
+
+
+def stamped(last_bar_time, timeframe, server_time, fetched_at=1000.0):
+    rates = np.zeros(3, dtype=[("time", "i8")])
+    rates["time"] = last_bar_time - np.arange(2, -1, -1) * ratefetcher.PERIOD_SECONDS[timeframe]
+    return {"rates": rates, "server_time": server_time, "fetched_at": fetched_at}
+
+
+def test_stamp_records_each_symbols_server_time(monkeypatch):
+    terminal = Terminal()
+    terminal.install(monkeypatch)
+    monkeypatch.setattr(mt5, "symbol_info_tick",
+                        lambda symbol: terminal.call("symbol_info_tick", None if symbol == "Market 1" else SimpleNamespace(time=7000)),
+                        raising=False)
+    rates_by_key, _, _ = ratefetcher.fetch_rates_bulk(requests(2), TIMEFRAMES)
+    entries = ratefetcher.stamp_fetch_times(rates_by_key)
+    assert terminal.calls["symbol_info_tick"] == 2
+    assert entries[("Market 0", "M5")]["server_time"] == 7000 and entries[("Market 0", "M15")]["rates"] is rates_by_key[("Market 0", "M15")]
+    # Without a tick the age of the rates is unknown, so the worker fetches its own
+    assert entries[("Market 1", "M5")]["server_time"] is None
+    assert not ratefetcher.is_current(entries[("Market 1", "M5")], "M5")
+
+
+def test_rates_go_stale_once_the_forming_bar_closes():
+    # Last closed M5 bar opened at 12:00; the 12:05 bar was forming at the fetch (server 12:07, local 1000)
+    prefetched = stamped(43200, "M5", server_time=43200 + 420)
+    assert ratefetcher.is_current(prefetched, "M5", now=1000.0)
+    assert ratefetcher.is_current(prefetched, "M5", now=1000.0 + 179)
+    # At 12:10 server time the 12:05 bar has closed; the worker's position 0 bar would no longer follow rates[-1]
+    assert not ratefetcher.is_current(prefetched, "M5", now=1000.0 + 180)
+    # An H4 task fetched at the same moment stays current
+    assert ratefetcher.is_current(stamped(43200 - 14400, "H4", server_time=43200 + 420), "H4", now=1000.0 + 180)
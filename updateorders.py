@@ -7,47 +7,33 @@ import pandas as pd
 import MetaTrader5 as mt5
 from datetime import datetime, timezone,  timedelta
 import pytz
-from colorama import Fore, Style, init
-import logging
+import cipherlogging
+from cipherlogging import LazyJson
 from typing import Tuple, Optional, Dict
 import shutil
 import connectwithinfinitydb as db
-
-# Initialize colorama for colored console output
-init()
-
-# Configure Logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()  # Console output only
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# Suppress WebDriver-related logs
-for name in ['webdriver_manager', 'selenium', 'urllib3', 'selenium.webdriver']:
-    logging.getLogger(name).setLevel(logging.WARNING)
+from pipelinecontext import PipelineContext, load_artifact, store_artifact
+import marketstatusstore
+from atomicjson import write_json_atomic
+import metrics
+import priceladder
+from symbolsnapshot import SymbolSnapshot
+from candlearray import CandleArray
+import contractstate
+import orderreconciler
+import orderkey
+import errorjournal
+import ratefetcher
+import candlesinbetween
+
+# Configure Logging (levels, console and JSON-lines output come from the LOGGING section of base.json)
+logger = cipherlogging.get_logger(__name__)
 
 # Logging Helper Function
-def log_and_print(message, level="INFO"):
-    """Helper function to print formatted messages with color coding and spacing."""
-    indent = "    "
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    level_colors = {
-        "INFO": Fore.CYAN,
-        "SUCCESS": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
-        "TITLE": Fore.MAGENTA,
-        "DEBUG": Fore.LIGHTBLACK_EX
-    }
-    log_level = "INFO" if level in ["TITLE", "SUCCESS"] else level
-    color = level_colors.get(level, Fore.WHITE)
-    formatted_message = f"[ {timestamp} ] │ {level:7} │ {indent}{message}"
-    print(f"{color}{formatted_message}{Style.RESET_ALL}")
-    logger.log(getattr(logging, log_level), message)
+def log_and_print(message, level="INFO", *args):
+    """Helper function to log formatted messages with color coding and spacing; disabled levels cost nothing,
+    so pass expensive values as %-style args."""
+    cipherlogging.log_and_print(logger, message, level, *args)
 
 # Configuration
 MAX_RETRIES = 5
@@ -61,6 +47,10 @@ TERMINAL_PATH = None
 MARKETS = []
 TIMEFRAMES = []
 CREDENTIALS = {}
+PIPELINE_SNAPSHOT = "on_failure"
+PIPELINE_DISK_FALLBACK = False
+# Time the old per-task candle fetch against the bulk prefetch once per cycle (reconnects once per task)
+COMPARE_RATE_FETCH = False
 
 # Base paths
 BASE_PROCESSING_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\processing"
@@ -68,6 +58,8 @@ BASE_OUTPUT_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders"
 BASE_ERROR_FOLDER = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders\debugs"
 FETCHCHART_DESTINATION_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\fetched"
 MARKETS_JSON_PATH = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\base.json"
+# Markets sorted by candleafterbreakoutparent_to_currentprice outcome, merged by the parent after each pool
+INVALID_MARKETS_JSON_PATH = os.path.join(BASE_OUTPUT_FOLDER, "candleafterbreakoutcandle.json")
 
 # Timeframe mapping
 TIMEFRAME_MAPPING = {
@@ -77,6 +69,8 @@ TIMEFRAME_MAPPING = {
     "H1": mt5.TIMEFRAME_H1,
     "H4": mt5.TIMEFRAME_H4
 }
+# Closed candles fetched per market/timeframe
+CANDLE_COUNT = 500
 # Add this mapping at the top of updateorders.py, near TIMEFRAME_MAPPING
 DB_TIMEFRAME_MAPPING = {
     "M5": "5minutes",
@@ -89,7 +83,7 @@ DB_TIMEFRAME_MAPPING = {
 # Function to load markets, timeframes, and credentials from JSON
 def load_markets_and_timeframes(json_path):
     """Load MARKETS, TIMEFRAMES, and CREDENTIALS from base.json file."""
-    global LOGIN_ID, PASSWORD, SERVER, TERMINAL_PATH, MARKETS, TIMEFRAMES, CREDENTIALS
+    global LOGIN_ID, PASSWORD, SERVER, TERMINAL_PATH, MARKETS, TIMEFRAMES, CREDENTIALS, PIPELINE_SNAPSHOT, PIPELINE_DISK_FALLBACK, COMPARE_RATE_FETCH
     try:
         if not os.path.exists(json_path):
             raise FileNotFoundError(f"Markets JSON file not found at: {json_path}")
@@ -109,6 +103,11 @@ def load_markets_and_timeframes(json_path):
         SERVER = CREDENTIALS.get("SERVER", None)
         TERMINAL_PATH = CREDENTIALS.get("TERMINAL_PATH", None)
         
+        # Load pipeline settings
+        PIPELINE_SNAPSHOT = data.get("PIPELINE", {}).get("SNAPSHOT", "on_failure")
+        PIPELINE_DISK_FALLBACK = bool(data.get("PIPELINE", {}).get("DISK_FALLBACK", False))
+        COMPARE_RATE_FETCH = bool(data.get("PIPELINE", {}).get("COMPARE_RATE_FETCH", False))
+        
         # Validate credentials
         if not all([LOGIN_ID, PASSWORD, SERVER, TERMINAL_PATH]):
             raise ValueError("One or more credentials (LOGIN_ID, PASSWORD, SERVER, TERMINAL_PATH) not found in base.json")
@@ -162,7 +161,7 @@ def candletimeleft(market, timeframe, candle_time, min_time_left):
             return None, None
         while True:
             for attempt in range(3):
-                candles = mt5.copy_rates_from_pos(market, mt5.TIMEFRAME_M15, 0, 1)
+                candles = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5.TIMEFRAME_M15, 0, 1)
                 if candles is None or len(candles) == 0:
                     print(f"[Process-{market}] Attempt {attempt + 1}/3: Failed to fetch candle data for {market} (M15), error: {mt5.last_error()}")
                     time.sleep(2)
@@ -249,7 +248,7 @@ def candletimeleft_5minutes(market, candle_time, min_time_left):
 
         while True:
             for attempt in range(3):
-                candles = mt5.copy_rates_from_pos(market, mt5.TIMEFRAME_M5, 0, 1)
+                candles = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5.TIMEFRAME_M5, 0, 1)
                 if candles is None or len(candles) == 0:
                     print(f"[Process-{market}] Attempt {attempt + 1}/3: Failed to fetch candle data for {market} (M5), error: {mt5.last_error()}")
                     time.sleep(2)
@@ -308,19 +307,8 @@ def normalize_timeframe(timeframe: str) -> str:
         return None
     return normalized
 
-def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Optional[str], Dict]:
-    """Fetch candle data from MT5 for a specific market and timeframe, returning data, path, and status report."""
-    status_report = {
-        "market": market,
-        "timeframe": timeframe,
-        "status": "failed",
-        "message": "",
-        "candle_count": 0,
-        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    log_and_print(f"Fetching candle data for market={market}, timeframe={timeframe}", "INFO")
-    
+def _fetch_candle_rates(market: str, timeframe: str, status_report: Dict):
+    """Open a terminal session and fetch CANDLE_COUNT closed candles; None (with status_report['message'] set) on failure."""
     # Ensure no existing MT5 connections interfere
     mt5.shutdown()
 
@@ -336,7 +324,7 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
         error_msg = f"Failed to initialize MT5 terminal for {market} {timeframe} after {MAX_RETRIES} attempts"
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
-        return None, None, status_report
+        return None
 
     # Wait for terminal to be fully ready
     for _ in range(5):
@@ -350,7 +338,7 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
         mt5.shutdown()
-        return None, None, status_report
+        return None
 
     # Attempt login with retries
     for attempt in range(MAX_RETRIES):
@@ -365,7 +353,7 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
         mt5.shutdown()
-        return None, None, status_report
+        return None
 
     # Select market symbol
     if not mt5.symbol_select(market, True):
@@ -373,7 +361,7 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
         mt5.shutdown()
-        return None, None, status_report
+        return None
 
     # Get timeframe
     mt5_timeframe = TIMEFRAME_MAPPING.get(timeframe)
@@ -382,48 +370,64 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
         mt5.shutdown()
-        return None, None, status_report
+        return None
 
     # Fetch candle data
-    candles = mt5.copy_rates_from_pos(market, mt5_timeframe, 1, 500)
-    if candles is None or len(candles) < 500:
+    candles = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5_timeframe, 1, CANDLE_COUNT)
+    if candles is None or len(candles) < CANDLE_COUNT:
         error_msg = f"Failed to fetch candle data for {market} {timeframe}, error: {mt5.last_error()}"
         log_and_print(error_msg, "ERROR")
         status_report["message"] = error_msg
         mt5.shutdown()
-        return None, None, status_report
+        return None
+    return candles
 
-    df = pd.DataFrame(candles)
-    candle_data = {}
-    for i in range(len(candles)):
-        candle = df.iloc[i]
-        position = 500 - i  # Position 1 is most recent completed candle, 500 is oldest
-        candle_details = {
-            "Time": str(pd.to_datetime(candle['time'], unit='s')),
-            "Open": float(candle['open']),
-            "High": float(candle['high']),
-            "Low": float(candle['low']),
-            "Close": float(candle['close'])
-        }
-        candle_data[f"Candle_{position}"] = candle_details
+@metrics.timed()
+def fetch_candle_data(market: str, timeframe: str, context: Optional[PipelineContext] = None, rates=None) -> tuple[Optional[Dict], Optional[str], Dict]:
+    """Fetch candle data from MT5 for a specific market and timeframe, returning data, path, and status report.
+    Rates prefetched by prefetch_candle_rates are used without opening a terminal session, unless a bar has
+    closed since they were fetched; then the worker fetches fresh ones."""
+    status_report = {
+        "market": market,
+        "timeframe": timeframe,
+        "status": "failed",
+        "message": "",
+        "candle_count": 0,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    
+    log_and_print(f"Fetching candle data for market={market}, timeframe={timeframe}", "INFO")
+    
+    if rates is not None and len(rates["rates"]) >= CANDLE_COUNT and ratefetcher.is_current(rates, timeframe):
+        candles = rates["rates"]
+        log_and_print(f"Using {len(candles)} prefetched candles for {market} {timeframe}", "DEBUG")
+    else:
+        if rates is not None:
+            log_and_print(f"Prefetched candles for {market} {timeframe} are out of date, fetching again", "DEBUG")
+        candles = _fetch_candle_rates(market, timeframe, status_report)
+        if candles is None:
+            return None, None, status_report
+
+    # Position 1 is most recent completed candle, CANDLE_COUNT is oldest
+    candle_array = CandleArray.from_rates(candles)
+    candle_data = candle_array.to_candle_data()
 
     status_report["candle_count"] = len(candles)
-    log_and_print(f"Verifying candle indexing for {market} {timeframe}: Candle_1 Time={candle_data.get('Candle_1', {}).get('Time', 'N/A')}, Candle_2 Time={candle_data.get('Candle_2', {}).get('Time', 'N/A')}", "DEBUG")
+    log_and_print(f"Verifying candle indexing for {market} {timeframe}: Candle_1 Time=%s, Candle_2 Time=%s", "DEBUG",
+                  candle_data.get('Candle_1', {}).get('Time', 'N/A'), candle_data.get('Candle_2', {}).get('Time', 'N/A'))
 
-    # Save candle data to JSON
+    # Hand candle data to the next stage (written to candle_data.json when the context is flushed)
     formatted_market_name = market.replace(" ", "_")
     json_dir = os.path.join(BASE_OUTPUT_FOLDER, formatted_market_name, timeframe.lower())
     os.makedirs(json_dir, exist_ok=True)
     json_file_path = os.path.join(json_dir, "candle_data.json")
 
-    if os.path.exists(json_file_path):
-        os.remove(json_file_path)
-        log_and_print(f"Existing {json_file_path} deleted", "INFO")
-
     try:
-        with open(json_file_path, "w") as json_file:
-            json.dump(candle_data, json_file, indent=4)
-        log_and_print(f"Candle details saved to {json_file_path} with {len(candle_data)} candles", "SUCCESS")
+        store_artifact(context, json_dir, "candle_data.json", candle_data)
+        if context is not None:
+            # Later stages index and slice the same candles without going back to the broker
+            context.put("candle_array", candle_array)
+        log_and_print(f"Candle details stored for {json_file_path} with {len(candle_data)} candles", "SUCCESS")
         status_report["status"] = "success"
         status_report["message"] = f"Fetched and saved {len(candle_data)} candles to {json_file_path}"
     except Exception as e:
@@ -436,7 +440,8 @@ def fetch_candle_data(market: str, timeframe: str) -> tuple[Optional[Dict], Opti
     mt5.shutdown()
     return candle_data, json_dir, status_report
 
-def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: str, timeframe: str) -> Tuple[bool, Optional[str], str, Dict]:
+@metrics.timed()
+def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: str, timeframe: str, context: Optional[PipelineContext] = None) -> Tuple[bool, Optional[str], str, Dict]:
     """Match pending order data with candle data, save to pricecandle.json, and return status report."""
     status_report = {
         "market": market,
@@ -466,11 +471,7 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
         status_report["status"] = "no_pending_orders"
         pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
         try:
-            if os.path.exists(pricecandle_json_path):
-                os.remove(pricecandle_json_path)
-                log_and_print(f"Existing {pricecandle_json_path} deleted", "INFO")
-            with open(pricecandle_json_path, 'w') as f:
-                json.dump([], f, indent=4)
+            store_artifact(context, json_dir, "pricecandle.json", [])
             log_and_print(f"Empty pricecandle.json saved for {market} {normalized_timeframe}", "INFO")
             status_report["message"] = f"No pending orders found; empty pricecandle.json saved for {market} {normalized_timeframe}"
         except Exception as e:
@@ -498,11 +499,7 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
         status_report["status"] = "no_pending_orders"
         pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
         try:
-            if os.path.exists(pricecandle_json_path):
-                os.remove(pricecandle_json_path)
-                log_and_print(f"Existing {pricecandle_json_path} deleted", "INFO")
-            with open(pricecandle_json_path, 'w') as f:
-                json.dump([], f, indent=4)
+            store_artifact(context, json_dir, "pricecandle.json", [])
             log_and_print(f"Empty pricecandle.json saved for {market} {normalized_timeframe}", "INFO")
             status_report["message"] = f"No pending orders in pendingorder.json; empty pricecandle.json saved for {market} {normalized_timeframe}"
         except Exception as e:
@@ -524,11 +521,60 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
         except (ValueError, IndexError):
             return None
 
+    def get_order_holder(receiver: Dict) -> Tuple[Optional[str], Optional[int]]:
+        order_parent = receiver.get("order_parent", "invalid")
+        actual_orderparent = receiver.get("actual_orderparent", "invalid")
+        reassigned_orderparent = receiver.get("reassigned_orderparent", "none")
+        if "order holder" in order_parent:
+            return order_parent, get_position_number_from_label(order_parent)
+        if "order holder" in actual_orderparent:
+            return actual_orderparent, get_position_number_from_label(actual_orderparent)
+        if reassigned_orderparent != "none" and "order holder" in reassigned_orderparent:
+            return reassigned_orderparent, get_position_number_from_label(reassigned_orderparent)
+        return None, None
+
+    # Resolve every position referenced by every trendline in one gather over the candle array
+    candle_array = context.get("candle_array") if context is not None else None
+    if candle_array is None:
+        candle_array = CandleArray.from_candle_data(candle_data)
+    referenced_positions = []
+    for trendline in pending_data:
+        receiver = trendline.get("receiver", {})
+        breakout_parent_pos = get_position_number_from_label(receiver.get("Breakout_parent", "invalid"))
+        referenced_positions.extend([
+            trendline.get("sender", {}).get("position_number"),
+            receiver.get("position_number"),
+            get_order_holder(receiver)[1],
+            breakout_parent_pos,
+            breakout_parent_pos - 1 if breakout_parent_pos is not None else None
+        ])
+    candles_by_position = candle_array.gather(referenced_positions)
+
+    calibrated_matches = 0
     for trendline in pending_data:
         trend_type = trendline.get("type", "")
         sender = trendline.get("sender", {})
         receiver = trendline.get("receiver", {})
 
+        # Candles analysechart found through the chart calibration are anchored in time, so they are used
+        # before the position lookup, which depends on the candle numbering being in step; only once
+        # analysechart confirmed the fit as valid
+        calibrated_candles = {}
+        if trendline.get("calibration_valid") is True:
+            calibrated_candles = {int(pos): candle for pos, candle in trendline.get("calibrated_candles", {}).items()}
+
+        def candle_at(pos):
+            candle = candles_by_position.get(pos)
+            calibrated = calibrated_candles.get(pos)
+            if calibrated is None:
+                return candle
+            if candle and candle["Time"] != calibrated["Time"]:
+                warning = (f"Position {pos} is {candle['Time']} in candle data but {calibrated['Time']} on the chart "
+                           f"for {market} {normalized_timeframe}, using the chart's candle")
+                log_and_print(warning, "WARNING")
+                warnings.append(warning)
+            return calibrated
+
         sender_pos = sender.get("position_number")
         receiver_pos = receiver.get("position_number")
         order_type = receiver.get("order_type", "").lower()
@@ -554,67 +600,33 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
         }
 
         # Add sender candle data
-        sender_candle_key = f"Candle_{sender_pos}"
-        if sender_candle_key in candle_data:
-            sender_candle = candle_data[sender_candle_key]
-            matched_entry["sender"].update({
-                "Time": sender_candle["Time"],
-                "Open": sender_candle["Open"],
-                "High": sender_candle["High"],
-                "Low": sender_candle["Low"],
-                "Close": sender_candle["Close"]
-            })
+        sender_candle = candle_at(sender_pos)
+        if sender_candle:
+            matched_entry["sender"].update(sender_candle)
         else:
             warning = f"No candle data found for sender position {sender_pos} in {market} {normalized_timeframe}"
             log_and_print(warning, "WARNING")
             warnings.append(warning)
 
         # Add receiver candle data
-        receiver_candle_key = f"Candle_{receiver_pos}"
-        if receiver_candle_key in candle_data:
-            receiver_candle = candle_data[receiver_candle_key]
-            matched_entry["receiver"].update({
-                "Time": receiver_candle["Time"],
-                "Open": receiver_candle["Open"],
-                "High": receiver_candle["High"],
-                "Low": receiver_candle["Low"],
-                "Close": receiver_candle["Close"]
-            })
+        receiver_candle = candle_at(receiver_pos)
+        if receiver_candle:
+            matched_entry["receiver"].update(receiver_candle)
         else:
             warning = f"No candle data found for receiver position {receiver_pos} in {market} {normalized_timeframe}"
             log_and_print(warning, "WARNING")
             warnings.append(warning)
 
         # Process order holder
-        order_parent = receiver.get("order_parent", "invalid")
-        actual_orderparent = receiver.get("actual_orderparent", "invalid")
-        reassigned_orderparent = receiver.get("reassigned_orderparent", "none")
-
-        order_holder_label = None
-        order_holder_pos = None
-
-        if "order holder" in order_parent:
-            order_holder_label = order_parent
-            order_holder_pos = get_position_number_from_label(order_parent)
-        elif "order holder" in actual_orderparent:
-            order_holder_label = actual_orderparent
-            order_holder_pos = get_position_number_from_label(actual_orderparent)
-        elif reassigned_orderparent != "none" and "order holder" in reassigned_orderparent:
-            order_holder_label = reassigned_orderparent
-            order_holder_pos = get_position_number_from_label(reassigned_orderparent)
+        order_holder_label, order_holder_pos = get_order_holder(receiver)
 
         if order_holder_pos is not None:
-            order_holder_candle_key = f"Candle_{order_holder_pos}"
-            if order_holder_candle_key in candle_data:
-                order_holder_candle = candle_data[order_holder_candle_key]
+            order_holder_candle = candle_at(order_holder_pos)
+            if order_holder_candle:
                 matched_entry["order_holder"] = {
                     "label": order_holder_label,
                     "position_number": order_holder_pos,
-                    "Time": order_holder_candle["Time"],
-                    "Open": order_holder_candle["Open"],
-                    "High": order_holder_candle["High"],
-                    "Low": order_holder_candle["Low"],
-                    "Close": order_holder_candle["Close"]
+                    **order_holder_candle
                 }
             else:
                 warning = f"No candle data found for order holder position {order_holder_pos} in {market} {normalized_timeframe}"
@@ -641,20 +653,13 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
             breakout_parent_pos = get_position_number_from_label(breakout_parent_label)
 
         if breakout_parent_pos is not None:
-            breakout_parent_candle_key = f"Candle_{breakout_parent_pos}"
             breakout_parent_entry = {
                 "label": breakout_parent_label,
                 "position_number": breakout_parent_pos
             }
-            if breakout_parent_candle_key in candle_data:
-                breakout_parent_candle = candle_data[breakout_parent_candle_key]
-                breakout_parent_entry.update({
-                    "Time": breakout_parent_candle["Time"],
-                    "Open": breakout_parent_candle["Open"],
-                    "High": breakout_parent_candle["High"],
-                    "Low": breakout_parent_candle["Low"],
-                    "Close": breakout_parent_candle["Close"]
-                })
+            breakout_parent_candle = candle_at(breakout_parent_pos)
+            if breakout_parent_candle:
+                breakout_parent_entry.update(breakout_parent_candle)
             else:
                 warning = f"No candle data found for Breakout_parent position {breakout_parent_pos} in {market} {normalized_timeframe}"
                 log_and_print(warning, "WARNING")
@@ -662,16 +667,11 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
 
             # Fetch the candle right after Breakout_parent
             next_candle_pos = breakout_parent_pos - 1
-            next_candle_key = f"Candle_{next_candle_pos}"
-            if next_candle_key in candle_data:
-                next_candle = candle_data[next_candle_key]
+            next_candle = candle_at(next_candle_pos)
+            if next_candle:
                 breakout_parent_entry["candle_rightafter_Breakoutparent"] = {
                     "position_number": next_candle_pos,
-                    "Time": next_candle["Time"],
-                    "Open": next_candle["Open"],
-                    "High": next_candle["High"],
-                    "Low": next_candle["Low"],
-                    "Close": next_candle["Close"]
+                    **next_candle
                 }
             else:
                 warning = f"No candle data found for position {next_candle_pos} (right after Breakout_parent) in {market} {normalized_timeframe}"
@@ -704,20 +704,18 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
                 }
             }
 
+        if calibrated_candles:
+            calibrated_matches += 1
         matched_data.append(matched_entry)
 
     status_report["trendline_count"] = len(matched_data)
+    status_report["calibrated_trendlines"] = calibrated_matches
     if warnings:
         status_report["warnings"] = warnings
 
     pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
-    if os.path.exists(pricecandle_json_path):
-        os.remove(pricecandle_json_path)
-        log_and_print(f"Existing {pricecandle_json_path} deleted", "INFO")
-
     try:
-        with open(pricecandle_json_path, 'w') as f:
-            json.dump(matched_data, f, indent=4)
+        store_artifact(context, json_dir, "pricecandle.json", matched_data)
         log_and_print(f"Matched pending order and candle data saved to {pricecandle_json_path} with {len(matched_data)} trendlines for {market} {normalized_timeframe}", "SUCCESS")
         status_report["status"] = "success"
         status_report["message"] = f"Matched {len(matched_data)} trendlines and saved to {pricecandle_json_path}"
@@ -729,7 +727,8 @@ def match_trendline_with_candle_data(candle_data: Dict, json_dir: str, market: s
 
     return True, None, "success", status_report
 
-def match_mostrecent_candle(market: str, timeframe: str, json_dir: str) -> Tuple[bool, Optional[str], str, Dict]:
+@metrics.timed()
+def match_mostrecent_candle(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> Tuple[bool, Optional[str], str, Dict]:
     """Match the most recent completed candle with candle data, save to matchedcandles.json, and return status report."""
     status_report = {
         "market": market,
@@ -755,7 +754,8 @@ def match_mostrecent_candle(market: str, timeframe: str, json_dir: str) -> Tuple
         log_and_print(error_message, "ERROR")
         status_report["message"] = error_message
         return False, error_message, "failed", status_report
-    if not os.path.exists(candle_data_json_path):
+    candle_data = load_artifact(context, json_dir, "candle_data.json")
+    if candle_data is None:
         error_message = f"candle_data.json not found at {candle_data_json_path} for {market} {timeframe}"
         log_and_print(error_message, "ERROR")
         status_report["message"] = error_message
@@ -766,10 +766,6 @@ def match_mostrecent_candle(market: str, timeframe: str, json_dir: str) -> Tuple
         with open(mostrecent_json_path, 'r') as f:
             mostrecent_data = json.load(f)
         
-        # Load candle data
-        with open(candle_data_json_path, 'r') as f:
-            candle_data = json.load(f)
-        
         # Extract timestamp from most recent completed candle
         mostrecent_timestamp_str = mostrecent_data.get('time')
         if not mostrecent_timestamp_str:
@@ -878,15 +874,10 @@ def match_mostrecent_candle(market: str, timeframe: str, json_dir: str) -> Tuple
             "match_result_status": match_result_status
         }
         
-        # Save to matchedcandles.json
-        if os.path.exists(matched_candles_json_path):
-            os.remove(matched_candles_json_path)
-            log_and_print(f"Existing {matched_candles_json_path} deleted", "INFO")
-        
+        # Hand over as matchedcandles.json
         try:
-            with open(matched_candles_json_path, 'w') as f:
-                json.dump(matched_candles_data, f, indent=4)
-            log_and_print(f"Matched candles data saved to {matched_candles_json_path} for {market} {timeframe}", "SUCCESS")
+            store_artifact(context, json_dir, "matchedcandles.json", matched_candles_data)
+            log_and_print(f"Matched candles data stored for {matched_candles_json_path} for {market} {timeframe}", "SUCCESS")
             status_report["status"] = "success"
             status_report["message"] = f"Matched 1 candle with status '{match_result_status}' and {candles_inbetween} candles in between"
             return True, None, "success", status_report
@@ -902,7 +893,8 @@ def match_mostrecent_candle(market: str, timeframe: str, json_dir: str) -> Tuple
         status_report["message"] = error_message
         return False, error_message, "failed", status_report
     
-def save_new_mostrecent_completed_candle(market: str, timeframe: str, json_dir: str) -> Tuple[bool, Optional[str], str, Dict]:
+@metrics.timed()
+def save_new_mostrecent_completed_candle(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> Tuple[bool, Optional[str], str, Dict]:
     """Fetch and save the most recent completed candle for a market and timeframe, return status report."""
     status_report = {
         "market": market,
@@ -986,7 +978,7 @@ def save_new_mostrecent_completed_candle(market: str, timeframe: str, json_dir:
         return False, error_message, "failed", status_report
 
     # Fetch the most recent completed candle (position 1)
-    new_mostrecent_candle = mt5.copy_rates_from_pos(market, mt5_timeframe, 1, 1)
+    new_mostrecent_candle = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5_timeframe, 1, 1)
     if new_mostrecent_candle is None or len(new_mostrecent_candle) == 0:
         error_message = f"Failed to fetch most recent completed candle for {market} {timeframe}, error: {mt5.last_error()}"
         log_and_print(error_message, "ERROR")
@@ -1016,14 +1008,9 @@ def save_new_mostrecent_completed_candle(market: str, timeframe: str, json_dir:
 
     # Save to JSON
     json_file_path = os.path.join(json_dir, "newmostrecent_completedcandle.json")
-    if os.path.exists(json_file_path):
-        os.remove(json_file_path)
-        log_and_print(f"Existing {json_file_path} deleted", "INFO")
-
     try:
-        with open(json_file_path, "w") as json_file:
-            json.dump(new_mostrecent_candle_data, json_file, indent=4)
-        log_and_print(f"Most recent completed candle saved to {json_file_path}", "SUCCESS")
+        store_artifact(context, json_dir, "newmostrecent_completedcandle.json", new_mostrecent_candle_data)
+        log_and_print(f"Most recent completed candle stored for {json_file_path}", "SUCCESS")
         status_report["status"] = "success"
         status_report["message"] = f"Saved most recent completed candle at {new_mostrecent_candle_data['time']} for {market} {timeframe}"
         mt5.shutdown()
@@ -1035,7 +1022,8 @@ def save_new_mostrecent_completed_candle(market: str, timeframe: str, json_dir:
         mt5.shutdown()
         return False, error_message, "failed", status_report
     
-def calculate_candles_inbetween(market: str, timeframe: str, json_dir: str) -> Tuple[bool, Optional[str], str, Dict]:
+@metrics.timed()
+def calculate_candles_inbetween(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> Tuple[bool, Optional[str], str, Dict]:
     """Calculate the number of candles between newmostrecent_completedcandle.json and matchedcandles.json 'with candledata', return status report."""
     status_report = {
         "market": market,
@@ -1056,26 +1044,21 @@ def calculate_candles_inbetween(market: str, timeframe: str, json_dir: str) -> T
     matched_candles_json_path = os.path.join(json_dir, "matchedcandles.json")
     output_json_path = os.path.join(json_dir, "candlesamountinbetween.json")
     
-    # Check if both JSON files exist
-    if not os.path.exists(newmostrecent_json_path):
+    # Load the outputs of the two previous stages
+    newmostrecent_data = load_artifact(context, json_dir, "newmostrecent_completedcandle.json")
+    if newmostrecent_data is None:
         error_message = f"newmostrecent_completedcandle.json not found at {newmostrecent_json_path} for {market} {timeframe}"
         log_and_print(error_message, "ERROR")
         status_report["message"] = error_message
         return False, error_message, "failed", status_report
-    if not os.path.exists(matched_candles_json_path):
+    matched_candles_data = load_artifact(context, json_dir, "matchedcandles.json")
+    if matched_candles_data is None:
         error_message = f"matchedcandles.json not found at {matched_candles_json_path} for {market} {timeframe}"
         log_and_print(error_message, "ERROR")
         status_report["message"] = error_message
         return False, error_message, "failed", status_report
     
     try:
-        # Load new most recent completed candle
-        with open(newmostrecent_json_path, 'r') as f:
-            newmostrecent_data = json.load(f)
-        
-        # Load matched candles data
-        with open(matched_candles_json_path, 'r') as f:
-            matched_candles_data = json.load(f)
         
         # Extract timestamp from new most recent completed candle
         newmostrecent_timestamp_str = newmostrecent_data.get('time')
@@ -1094,67 +1077,25 @@ def calculate_candles_inbetween(market: str, timeframe: str, json_dir: str) -> T
             status_report["message"] = error_message
             return False, error_message, "failed", status_report
         
-        # Parse timestamps
+        # Count the candles between the two timestamps (fetchchart writes the same file for freshly captured charts)
         try:
-            newmostrecent_timestamp = datetime.strptime(newmostrecent_timestamp_str, "%Y-%m-%d %H:%M:%S")
-            newmostrecent_timestamp = newmostrecent_timestamp.replace(tzinfo=timezone.utc)
-            
-            matched_timestamp = datetime.strptime(matched_timestamp_str, "%Y-%m-%d %H:%M:%S")
-            matched_timestamp = matched_timestamp.replace(tzinfo=timezone.utc)
+            output_data = candlesinbetween.inbetween_data(market, timeframe, newmostrecent_data, matched_candle)
         except ValueError as e:
             error_message = f"Invalid timestamp format in JSON files for {market} {timeframe}: {e}"
             log_and_print(error_message, "ERROR")
             status_report["message"] = error_message
             return False, error_message, "failed", status_report
-        
-        # Calculate time difference in seconds
-        time_diff = (newmostrecent_timestamp - matched_timestamp).total_seconds()
-        
-        # Determine timeframe duration in minutes
-        timeframe_minutes = {
-            "M5": 5,
-            "M15": 15,
-            "M30": 30,
-            "H1": 60,
-            "H4": 240
-        }.get(timeframe, 5)
-        
-        # Calculate number of candles in between
-        candles_inbetween = int(abs(time_diff) / (timeframe_minutes * 60))
-        plusmostrecent = candles_inbetween + 1
+        candles_inbetween = int(output_data["candles in between"])
+        plusmostrecent = int(output_data["plus_newmostrecent"])
         
         # Update status report
         status_report["candles_inbetween"] = candles_inbetween
         status_report["plus_newmostrecent"] = plusmostrecent
         
-        # Prepare output data
-        output_data = {
-            "market": market,
-            "timeframe": timeframe,
-            "candles in between": str(candles_inbetween),
-            "plus_newmostrecent": str(plusmostrecent),
-            "new number position for matched candle data": str(plusmostrecent),
-            "new most recent": {
-                "timestamp newmostrecent": newmostrecent_timestamp_str,
-                "newmostrecent high": float(newmostrecent_data.get('high_price', 0)),
-                "newmostrecent low": float(newmostrecent_data.get('low_price', 0))
-            },
-            "matched candle data": {
-                "timestamp of matched candledata": matched_timestamp_str,
-                "matched candledata high": float(matched_candle.get('high', 0)),
-                "matched candledata low": float(matched_candle.get('low', 0))
-            }
-        }
-        
-        # Save to candlesamountinbetween.json
-        if os.path.exists(output_json_path):
-            os.remove(output_json_path)
-            log_and_print(f"Existing {output_json_path} deleted", "INFO")
-        
+        # Hand over as candlesamountinbetween.json
         try:
-            with open(output_json_path, 'w') as f:
-                json.dump(output_data, f, indent=4)
-            log_and_print(f"Candles in between data saved to {output_json_path} for {market} {timeframe}", "SUCCESS")
+            store_artifact(context, json_dir, "candlesamountinbetween.json", output_data)
+            log_and_print(f"Candles in between data stored for {output_json_path} for {market} {timeframe}", "SUCCESS")
             status_report["status"] = "success"
             status_report["message"] = f"Calculated {candles_inbetween} candles in between, plus {plusmostrecent} including new most recent"
             return True, None, "success", status_report
@@ -1170,7 +1111,8 @@ def calculate_candles_inbetween(market: str, timeframe: str, json_dir: str) -> T
         status_report["message"] = error_message
         return False, error_message, "failed", status_report
     
-def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_dir: str) -> Tuple[bool, Optional[str], str, Dict]:
+@metrics.timed()
+def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> Tuple[bool, Optional[str], str, Dict]:
     """Fetch candles from the candle after Breakout_parent to the current price candle, save to JSON, and return status report."""
     status_report = {
         "market": market,
@@ -1180,7 +1122,8 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
         "trendlines_processed": 0,
         "total_candles_fetched": 0,
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "warnings": []
+        "warnings": [],
+        "invalid_markets": {}
     }
     
     log_and_print(f"Fetching candles from after Breakout_parent to current price for market={market}, timeframe={timeframe}", "INFO")
@@ -1188,42 +1131,16 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
     # Define file paths
     pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
     output_json_path = os.path.join(json_dir, "candlesafterbreakoutparent.json")
-    invalid_markets_json_path = os.path.join(r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders", "candleafterbreakoutcandle.json")
-    
-    # Initialize invalid markets data
-    invalid_markets_data = {}
-    if os.path.exists(invalid_markets_json_path):
-        try:
-            with open(invalid_markets_json_path, 'r') as f:
-                invalid_markets_data = json.load(f)
-        except Exception as e:
-            log_and_print(f"Error loading existing {invalid_markets_json_path}: {e}", "ERROR")
-            status_report["warnings"].append(f"Error loading existing {invalid_markets_json_path}: {e}")
-            invalid_markets_data.setdefault("error_loading_invalid_markets_json", []).append(f"{market}_{timeframe.lower()}")
-
     market_key = f"{market}_{timeframe.lower()}"
     
     def save_invalid_markets(error_key: str):
-        """Helper function to save invalid_markets_data to JSON with deduplication."""
-        if market_key not in invalid_markets_data.get(error_key, []):
-            invalid_markets_data.setdefault(error_key, []).append(market_key)
-        try:
-            with open(invalid_markets_json_path, 'w') as f:
-                json.dump(invalid_markets_data, f, indent=4)
-            log_and_print(f"Updated invalid markets data to {invalid_markets_json_path} for {error_key}", "INFO")
-        except Exception as e:
-            log_and_print(f"Error saving invalid markets to {invalid_markets_json_path}: {e}", "ERROR")
-            status_report["warnings"].append(f"Error saving invalid markets: {e}")
-            invalid_markets_data.setdefault("error_saving_invalid_markets_json", []).append(market_key)
-            try:
-                with open(invalid_markets_json_path, 'w') as f:
-                    json.dump(invalid_markets_data, f, indent=4)
-            except Exception as e2:
-                log_and_print(f"Critical error saving invalid markets after failure: {e2}", "ERROR")
-                status_report["warnings"].append(f"Critical error saving invalid markets: {e2}")
+        """Record market_key under error_key in the status report; the parent merges every task's
+        entries into candleafterbreakoutcandle.json once the pool has finished (see merge_invalid_markets)."""
+        if market_key not in status_report["invalid_markets"].get(error_key, []):
+            status_report["invalid_markets"].setdefault(error_key, []).append(market_key)
 
     # Check if pricecandle.json exists
-    if not os.path.exists(pricecandle_json_path):
+    if context is None and not os.path.exists(pricecandle_json_path):
         error_message = f"pricecandle.json not found at {pricecandle_json_path} for {market} {timeframe}"
         log_and_print(error_message, "ERROR")
         status_report["message"] = error_message
@@ -1232,8 +1149,7 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
     
     try:
         # Load pricecandle.json
-        with open(pricecandle_json_path, 'r') as f:
-            pricecandle_data = json.load(f)
+        pricecandle_data = load_artifact(context, json_dir, "pricecandle.json")
         
         if not pricecandle_data or not isinstance(pricecandle_data, list):
             error_message = f"pricecandle.json is empty or invalid for {market} {timeframe}"
@@ -1313,6 +1229,50 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
             mt5.shutdown()
             return False, error_message, "failed", status_report
 
+        # Candles fetched by fetch_candle_data; ranges after Breakout_parent are sliced from them
+        candle_array = context.get("candle_array") if context is not None else None
+        if candle_array is None:
+            candle_data = load_artifact(context, json_dir, "candle_data.json")
+            candle_array = CandleArray.from_candle_data(candle_data) if candle_data else None
+
+        # When a trendline reaches further back than those candles, fetch the widest range once for all of them
+        start_positions = [
+            int(trendline.get("Breakout_parent", {}).get("candle_rightafter_Breakoutparent", {}).get("position_number"))
+            for trendline in pricecandle_data
+            if isinstance(trendline, dict)
+            and isinstance(trendline.get("Breakout_parent"), dict)
+            and isinstance(trendline["Breakout_parent"].get("candle_rightafter_Breakoutparent"), dict)
+            and isinstance(trendline["Breakout_parent"]["candle_rightafter_Breakoutparent"].get("position_number"), (int, float))
+        ]
+        max_start_pos = max(start_positions, default=0)
+        if max_start_pos > (len(candle_array) if candle_array is not None else 0):
+            candles = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5_timeframe, 1, max_start_pos)
+            if candles is not None and len(candles) > 0:
+                candle_array = CandleArray.from_rates(candles)
+            else:
+                warning = f"Failed to fetch candles from position {max_start_pos} to 1 for {market} {timeframe}, error: {mt5.last_error()}"
+                log_and_print(warning, "ERROR")
+                status_report["warnings"].append(warning)
+                save_invalid_markets("candle_fetch_failed")
+
+        # Fetch current (incomplete) candle (position 0) once for all trendlines
+        current_candle = metrics.timed_call("mt5", "copy_rates_from_pos", mt5.copy_rates_from_pos, market, mt5_timeframe, 0, 1)
+        current_candle_data = {"position_number": 0, "time": None, "open": None}
+        if current_candle is None or len(current_candle) == 0:
+            warning = f"Failed to fetch current candle for {market} {timeframe}, error: {mt5.last_error()}"
+            log_and_print(warning, "WARNING")
+            status_report["warnings"].append(warning)
+            save_invalid_markets("current_candle_fetch_failed")
+        else:
+            try:
+                current_candle_data["time"] = int(current_candle[0]['time'])
+                current_candle_data["open"] = float(current_candle[0]['open'])
+            except (KeyError, ValueError) as e:
+                warning = f"Invalid current candle data for {market} {timeframe}: {e}"
+                log_and_print(warning, "WARNING")
+                status_report["warnings"].append(warning)
+                save_invalid_markets("invalid_current_candle_data")
+
         # Initialize output data
         candles_data = []
         trendlines_processed = 0
@@ -1376,75 +1336,26 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
                 else:
                     valid_trendlines = True  # Mark that at least one valid trendline was found
 
-            # Fetch candles from start_pos to position 0
+            # Candles from start_pos to position 1 as a view of the shared window, then the current candle
             try:
-                num_candles = start_pos - 1
-                if num_candles <= 0:
+                start_pos = int(start_pos)
+                if start_pos < 1:
                     warning = f"No candles to fetch (start_pos={start_pos}) for {market} {timeframe}"
                     log_and_print(warning, "WARNING")
                     status_report["warnings"].append(warning)
                     save_invalid_markets("no_candles_to_fetch")
-                    candles = []
+                    window = None
                 else:
-                    candles = mt5.copy_rates_from_pos(market, mt5_timeframe, 1, num_candles)
-                    if candles is None or len(candles) == 0:
+                    window = candle_array.window(start_pos) if candle_array is not None else None
+                    if window is None:
                         warning = f"Failed to fetch candles from position {start_pos} to 1 for {market} {timeframe}, error: {mt5.last_error()}"
                         log_and_print(warning, "ERROR")
                         status_report["warnings"].append(warning)
                         save_invalid_markets("candle_fetch_failed")
                         continue
 
-                # Prepare candle data
-                trendline_candles = []
-                for i, candle in enumerate(candles):
-                    position = start_pos - i
-                    try:
-                        trendline_candles.append({
-                            "position_number": position,
-                            "Time": str(pd.to_datetime(candle['time'], unit='s')),
-                            "Open": float(candle['open']),
-                            "High": float(candle['high']),
-                            "Low": float(candle['low']),
-                            "Close": float(candle['close'])
-                        })
-                    except (KeyError, ValueError) as e:
-                        warning = f"Invalid candle data at position {position} for {market} {timeframe}: {e}"
-                        log_and_print(warning, "WARNING")
-                        status_report["warnings"].append(warning)
-                        save_invalid_markets("invalid_candle_data")
-                        continue
-
-                # Fetch current (incomplete) candle (position 0)
-                current_candle = mt5.copy_rates_from_pos(market, mt5_timeframe, 0, 1)
-                if current_candle is None or len(current_candle) == 0:
-                    warning = f"Failed to fetch current candle for {market} {timeframe}, error: {mt5.last_error()}"
-                    log_and_print(warning, "WARNING")
-                    status_report["warnings"].append(warning)
-                    save_invalid_markets("current_candle_fetch_failed")
-                    current_candle_data = {
-                        "position_number": 0,
-                        "Time": None,
-                        "Open": None
-                    }
-                else:
-                    try:
-                        current_candle_data = {
-                            "position_number": 0,
-                            "Time": str(pd.to_datetime(current_candle[0]['time'], unit='s')),
-                            "Open": float(current_candle[0]['open'])
-                        }
-                    except (KeyError, ValueError) as e:
-                        warning = f"Invalid current candle data for {market} {timeframe}: {e}"
-                        log_and_print(warning, "WARNING")
-                        status_report["warnings"].append(warning)
-                        save_invalid_markets("invalid_current_candle_data")
-                        current_candle_data = {
-                            "position_number": 0,
-                            "Time": None,
-                            "Open": None
-                        }
-
-                trendline_candles.append(current_candle_data)
+                # Compact arrays: epoch times and OHLC columns instead of one dict per candle
+                trendline_candles = window.to_columns() if window is not None else CandleArray([], [], [], [], []).to_columns()
                 
                 # Add to output data
                 candles_data.append({
@@ -1455,11 +1366,12 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
                         "order_type": order_type,
                         "Order_holder_entry": order_holder_entry
                     },
-                    "candles": trendline_candles
+                    "candles": trendline_candles,
+                    "current_candle": current_candle_data
                 })
                 
                 trendlines_processed += 1
-                total_candles_fetched += len(trendline_candles)
+                total_candles_fetched += len(trendline_candles["time"]) + 1
 
             except Exception as e:
                 warning = f"Error fetching candles for trendline in {market} {timeframe}: {e}"
@@ -1475,22 +1387,11 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
             status_report["warnings"].append(warning)
             save_invalid_markets("no_valid_trendlines")
 
-        # Save to candlesafterbreakoutparent.json
-        if os.path.exists(output_json_path):
-            try:
-                os.remove(output_json_path)
-                log_and_print(f"Existing {output_json_path} deleted", "INFO")
-            except Exception as e:
-                warning = f"Error deleting existing {output_json_path} for {market} {timeframe}: {e}"
-                log_and_print(warning, "ERROR")
-                status_report["warnings"].append(warning)
-                save_invalid_markets("error_deleting_output_json")
-
+        # Hand over as candlesafterbreakoutparent.json
         if not candles_data:
             log_and_print(f"No candles data to save for {market} {timeframe}. Saving empty candlesafterbreakoutparent.json", "INFO")
             try:
-                with open(output_json_path, 'w') as f:
-                    json.dump(candles_data, f, indent=4)
+                store_artifact(context, json_dir, "candlesafterbreakoutparent.json", candles_data)
                 log_and_print(f"Empty candlesafterbreakoutparent.json saved to {output_json_path} for {market} {timeframe}", "INFO")
                 status_report["status"] = "success"
                 status_report["message"] = f"No candles data fetched; saved empty candlesafterbreakoutparent.json"
@@ -1506,9 +1407,8 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
                 return False, error_message, "failed", status_report
 
         try:
-            with open(output_json_path, 'w') as f:
-                json.dump(candles_data, f, indent=4)
-            log_and_print(f"Candles after Breakout_parent saved to {output_json_path} for {market} {timeframe}", "SUCCESS")
+            store_artifact(context, json_dir, "candlesafterbreakoutparent.json", candles_data)
+            log_and_print(f"Candles after Breakout_parent stored for {output_json_path} for {market} {timeframe}", "SUCCESS")
             status_report["status"] = "success"
             status_report["message"] = f"Fetched {total_candles_fetched} candles for {trendlines_processed} trendlines"
             save_invalid_markets("success")  # Log successful markets
@@ -1529,25 +1429,46 @@ def candleafterbreakoutparent_to_currentprice(market: str, timeframe: str, json_
         save_invalid_markets("general_processing_error")
         mt5.shutdown()
         return False, error_message, "failed", status_report
+
+def merge_invalid_markets(results) -> bool:
+    """Merge the invalid_markets entries the pool tasks returned into candleafterbreakoutcandle.json with one atomic write.
+    results are process_market_timeframe's (success, error_message, status, process_messages) tuples."""
+    invalid_markets_data = {}
+    if os.path.exists(INVALID_MARKETS_JSON_PATH):
+        try:
+            with open(INVALID_MARKETS_JSON_PATH, 'r') as f:
+                invalid_markets_data = json.load(f)
+        except json.JSONDecodeError as e:
+            log_and_print(f"Error loading {INVALID_MARKETS_JSON_PATH}, starting a new one: {e}", "WARNING")
+        if not isinstance(invalid_markets_data, dict):
+            invalid_markets_data = {}
+
+    added = 0
+    for result in results:
+        entries = result[3].get("candleafterbreakoutparent_to_currentprice", {}).get("invalid_markets", {})
+        for error_key, market_keys in entries.items():
+            for market_key in market_keys:
+                if market_key not in invalid_markets_data.get(error_key, []):
+                    invalid_markets_data.setdefault(error_key, []).append(market_key)
+                    added += 1
+    try:
+        write_json_atomic(INVALID_MARKETS_JSON_PATH, invalid_markets_data)
+        log_and_print(f"Merged {added} invalid market entries into {INVALID_MARKETS_JSON_PATH}", "INFO")
+        return True
+    except Exception as e:
+        log_and_print(f"Error saving invalid markets to {INVALID_MARKETS_JSON_PATH}: {e}", "ERROR")
+        return False
     
 def fetchlotsizeandriskallowed(json_dir: str = BASE_OUTPUT_FOLDER) -> bool:
     """Fetch all lot size and allowed risk data from ciphercontracts_lotsizeandrisk table and save to lotsizes.json."""
     log_and_print("Fetching all lot size and allowed risk data", "INFO")
     
     # Initialize error log list
-    error_log = []
-    
-    # Define error log file path
-    error_json_path = os.path.join(BASE_ERROR_FOLDER, "fetchlotsizeandriskerror.json")
+    error_log = errorjournal.ErrorLog("fetchlotsizeandrisk")
     
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            log_and_print(f"Errors saved to {error_json_path}", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+        error_log.save()
     
     # SQL query to fetch all rows
     sql_query = """
@@ -1573,7 +1494,7 @@ def fetchlotsizeandriskallowed(json_dir: str = BASE_OUTPUT_FOLDER) -> bool:
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             result = db.execute_query(sql_query)
-            log_and_print(f"Raw query result for lot size and risk: {json.dumps(result, indent=2)}", "DEBUG")
+            log_and_print("Raw query result for lot size and risk: %s", "DEBUG", LazyJson(result))
             
             if not isinstance(result, dict):
                 error_log.append({
@@ -1687,7 +1608,8 @@ def executefetchlotsizeandrisk():
         return False
     return True
 
-def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir: str) -> tuple[bool, dict]:
+@metrics.timed()
+def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> tuple[bool, dict]:
     """Fetch order holder prices, calculate exit and profit prices using lot size and allowed risk from centralized lotsizeandrisk.json, and save to calculatedprices.json."""
     log_and_print(f"Calculating order holder prices with lot size and risk for market={market}, timeframe={timeframe}", "INFO")
     
@@ -1707,23 +1629,16 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
     pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
     lotsizeandrisk_json_path = os.path.join(BASE_OUTPUT_FOLDER, "lotsizeandrisk.json")
     output_json_path = os.path.join(json_dir, "calculatedprices.json")
-    error_json_path = os.path.join(BASE_OUTPUT_FOLDER, "getorderholderpriceserrors.json")
     
     # Initialize error log list
-    error_log = []
+    error_log = errorjournal.ErrorLog("getorderholderprices")
     
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            log_and_print(f"Errors saved to {error_json_path}", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
-            status_report["warnings"].append(f"Failed to save errors: {str(e)}")
+        error_log.save()
     
     # Check if pricecandle.json exists
-    if not os.path.exists(pricecandle_json_path):
+    if context is None and not os.path.exists(pricecandle_json_path):
         error_log.append({
             "timestamp": status_report["timestamp"],
             "market": market,
@@ -1840,8 +1755,7 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
         contract_size = symbol_info.trade_contract_size
 
         # Load pricecandle.json
-        with open(pricecandle_json_path, 'r') as f:
-            pricecandle_data = json.load(f)
+        pricecandle_data = load_artifact(context, json_dir, "pricecandle.json", [])
         
         # Load lotsizeandrisk.json
         with open(lotsizeandrisk_json_path, 'r') as f:
@@ -1849,7 +1763,7 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
         
         # Log available pairs and timeframes for debugging
         available_pairs_timeframes = [(entry.get("pair", ""), entry.get("timeframe", "")) for entry in lotsizeandrisk_data]
-        log_and_print(f"Available pairs and timeframes in lotsizeandrisk.json: {available_pairs_timeframes}", "DEBUG")
+        log_and_print("Available pairs and timeframes in lotsizeandrisk.json: %s", "DEBUG", available_pairs_timeframes)
         
         # Normalize input timeframe
         normalized_timeframe = normalize_timeframe(timeframe)
@@ -1894,8 +1808,57 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
         # Initialize output data
         calculated_prices = []
         
-        # Process each trendline in pricecandle.json
-        for trendline in pricecandle_data:
+        # Lot size, allowed risk and pip value are the same for every trendline of this market/timeframe;
+        # when they are unusable no trendline is priced, but the journal still counts every trendline read
+        trendlines_to_price = pricecandle_data
+        lot_size = float(matching_lot_size.get("lot_size", 0))
+        allowed_risk = float(matching_lot_size.get("allowed_risk", 0))
+        if lot_size <= 0 or allowed_risk <= 0:
+            error_log.append({
+                "timestamp": status_report["timestamp"],
+                "market": market,
+                "timeframe": timeframe,
+                "error": f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk}, {len(pricecandle_data)} trendlines not priced"
+            })
+            save_errors()
+            log_and_print(f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk} in {market} {timeframe}, {len(pricecandle_data)} trendlines not priced", "WARNING")
+            status_report["warnings"].append(f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk}")
+            trendlines_to_price = []
+        
+        # Fetch the tick once for JPY pairs instead of once per trendline
+        bid = None
+        if trendlines_to_price and market.endswith("JPY"):
+            tick = metrics.timed_call("mt5", "symbol_info_tick", mt5.symbol_info_tick, market)
+            bid = tick.bid if tick else None
+        pip_value, used_fallback = priceladder.pip_value_for_symbol(market, lot_size, contract_size, pip_size, bid)
+        if trendlines_to_price and used_fallback:
+            error_log.append({
+                "timestamp": status_report["timestamp"],
+                "market": market,
+                "timeframe": timeframe,
+                "error": f"Failed to fetch current price for {market} to adjust pip value"
+            })
+            save_errors()
+            log_and_print(f"Failed to fetch current price for {market} to adjust pip value", "WARNING")
+            status_report["warnings"].append(f"Failed to fetch current price for {market} to adjust pip value")
+        
+        # Calculate risk in pips
+        risk_in_pips = allowed_risk / pip_value if pip_value != 0 else 0
+        if trendlines_to_price and risk_in_pips <= 0:
+            error_log.append({
+                "timestamp": status_report["timestamp"],
+                "market": market,
+                "timeframe": timeframe,
+                "error": f"Invalid risk_in_pips {risk_in_pips}. pip_value={pip_value}, allowed_risk={allowed_risk}, {len(pricecandle_data)} trendlines not priced"
+            })
+            save_errors()
+            log_and_print(f"Invalid risk_in_pips {risk_in_pips} in {market} {timeframe}, {len(pricecandle_data)} trendlines not priced", "WARNING")
+            status_report["warnings"].append(f"Invalid risk_in_pips {risk_in_pips}")
+            trendlines_to_price = []
+        
+        # Collect the valid trendlines, then price them all in one pass
+        ladder_rows = []
+        for trendline in trendlines_to_price:
             order_holder = trendline.get("order_holder", {})
             order_type = trendline.get("receiver", {}).get("order_type", "").lower()
             trendline_type = trendline.get("type", "unknown")
@@ -1930,7 +1893,7 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
                 continue
             
             # Get entry price based on order type
-            entry_price = float(order_holder.get("Low", 0)) if order_type == "short" else float(order_holder.get("High", 0)) if order_type == "long" else None
+            entry_price = float(order_holder.get("Low", 0)) if order_type == "short" else float(order_holder.get("High", 0))
             if entry_price == 0:
                 error_log.append({
                     "timestamp": status_report["timestamp"],
@@ -1944,95 +1907,30 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
                 status_report["warnings"].append(f"No valid entry price for trendline {trendline_type}")
                 continue
             
-            # Extract lot size and allowed risk
-            lot_size = float(matching_lot_size.get("lot_size", 0))
-            allowed_risk = float(matching_lot_size.get("allowed_risk", 0))
-            if lot_size <= 0 or allowed_risk <= 0:
-                error_log.append({
-                    "timestamp": status_report["timestamp"],
-                    "market": market,
-                    "timeframe": timeframe,
-                    "trendline_type": trendline_type,
-                    "error": f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk}"
-                })
-                save_errors()
-                log_and_print(f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk} for trendline {trendline_type} in {market} {timeframe}", "WARNING")
-                status_report["warnings"].append(f"Invalid lot_size {lot_size} or allowed_risk {allowed_risk} for trendline {trendline_type}")
-                continue
-            
-            # Calculate pip value
-            pip_value = lot_size * contract_size * pip_size
-            if market.endswith("JPY"):
-                current_price = mt5.symbol_info_tick(market).bid
-                if current_price > 0:
-                    pip_value = pip_value / current_price
-                else:
-                    error_log.append({
-                        "timestamp": status_report["timestamp"],
-                        "market": market,
-                        "timeframe": timeframe,
-                        "trendline_type": trendline_type,
-                        "error": f"Failed to fetch current price for {market} to adjust pip value"
-                    })
-                    save_errors()
-                    log_and_print(f"Failed to fetch current price for {market} to adjust pip value", "WARNING")
-                    status_report["warnings"].append(f"Failed to fetch current price for {market} to adjust pip value")
-                    pip_value = lot_size * 10  # Fallback
-            
-            # Calculate risk in pips
-            risk_in_pips = allowed_risk / pip_value if pip_value != 0 else 0
-            if risk_in_pips <= 0:
-                error_log.append({
-                    "timestamp": status_report["timestamp"],
-                    "market": market,
-                    "timeframe": timeframe,
-                    "trendline_type": trendline_type,
-                    "error": f"Invalid risk_in_pips {risk_in_pips}. pip_value={pip_value}, allowed_risk={allowed_risk}"
-                })
-                save_errors()
-                log_and_print(f"Invalid risk_in_pips {risk_in_pips} for trendline {trendline_type} in {market} {timeframe}", "WARNING")
-                status_report["warnings"].append(f"Invalid risk_in_pips {risk_in_pips} for trendline {trendline_type}")
-                continue
-            
-            # Calculate exit_price, 1:0.5_price, 1:1_price, 1:2_price, and profit_price
-            reward_to_risk_ratios = {
-                "1:0.5": 0.5,
-                "1:1": 1,
-                "1:2": 2,
-                "1:3": 3
-            }
-            if order_type == "short":
-                exit_price = entry_price + (risk_in_pips * pip_size)
-                price_1_0_5 = entry_price - (risk_in_pips * reward_to_risk_ratios["1:0.5"] * pip_size)
-                price_1_1 = entry_price - (risk_in_pips * reward_to_risk_ratios["1:1"] * pip_size)
-                price_1_2 = entry_price - (risk_in_pips * reward_to_risk_ratios["1:2"] * pip_size)
-                profit_price = entry_price - (risk_in_pips * reward_to_risk_ratios["1:3"] * pip_size)
-            else:  # order_type == "long"
-                exit_price = entry_price - (risk_in_pips * pip_size)
-                price_1_0_5 = entry_price + (risk_in_pips * reward_to_risk_ratios["1:0.5"] * pip_size)
-                price_1_1 = entry_price + (risk_in_pips * reward_to_risk_ratios["1:1"] * pip_size)
-                price_1_2 = entry_price + (risk_in_pips * reward_to_risk_ratios["1:2"] * pip_size)
-                profit_price = entry_price + (risk_in_pips * reward_to_risk_ratios["1:3"] * pip_size)
-            
-            # Round prices to market-specific decimal places
-            entry_price = round(entry_price, digits)
-            exit_price = round(exit_price, digits)
-            price_1_0_5 = round(price_1_0_5, digits)
-            price_1_1 = round(price_1_1, digits)
-            price_1_2 = round(price_1_2, digits)
-            profit_price = round(profit_price, digits)
+            ladder_rows.append({
+                "entry_price": entry_price,
+                "order_type": order_type,
+                "risk_in_pips": risk_in_pips,
+                "point": pip_size,
+                "digits": digits,
+                "trendline_type": trendline_type,
+                "order_holder_position": order_holder_position
+            })
+        
+        for row, prices in zip(ladder_rows, priceladder.compute_price_ladders(ladder_rows)):
+            trendline_type = row["trendline_type"]
             
             # Validate calculated prices
-            if exit_price <= 0 or price_1_0_5 <= 0 or price_1_1 <= 0 or price_1_2 <= 0 or profit_price <= 0:
+            if not prices["valid"]:
                 error_log.append({
                     "timestamp": status_report["timestamp"],
                     "market": market,
                     "timeframe": timeframe,
                     "trendline_type": trendline_type,
-                    "error": f"Invalid prices: entry={entry_price}, exit={exit_price}, 1:0.5={price_1_0_5}, 1:1={price_1_1}, 1:2={price_1_2}, profit={profit_price}"
+                    "error": f"Invalid prices: entry={prices['entry_price']}, exit={prices['exit_price']}, 1:0.5={prices['1:0.5_price']}, 1:1={prices['1:1_price']}, 1:2={prices['1:2_price']}, profit={prices['profit_price']}"
                 })
                 save_errors()
-                log_and_print(f"Invalid prices: exit={exit_price}, 1:0.5={price_1_0_5}, 1:1={price_1_1}, 1:2={price_1_2}, profit={profit_price} for trendline {trendline_type} in {market} {timeframe}", "ERROR")
+                log_and_print(f"Invalid prices: exit={prices['exit_price']}, 1:0.5={prices['1:0.5_price']}, 1:1={prices['1:1_price']}, 1:2={prices['1:2_price']}, profit={prices['profit_price']} for trendline {trendline_type} in {market} {timeframe}", "ERROR")
                 status_report["warnings"].append(f"Invalid prices for trendline {trendline_type}")
                 continue
             
@@ -2042,16 +1940,16 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
                 "market": market,
                 "pair": matching_lot_size.get("pair"),
                 "timeframe": timeframe,
-                "entry_price": entry_price,
-                "exit_price": exit_price,
-                "1:0.5_price": price_1_0_5,
-                "1:1_price": price_1_1,
-                "1:2_price": price_1_2,
-                "profit_price": profit_price,
+                "entry_price": prices["entry_price"],
+                "exit_price": prices["exit_price"],
+                "1:0.5_price": prices["1:0.5_price"],
+                "1:1_price": prices["1:1_price"],
+                "1:2_price": prices["1:2_price"],
+                "profit_price": prices["profit_price"],
                 "lot_size": lot_size,
-                "order_type": "sell_limit" if order_type == "short" else "buy_limit",
+                "order_type": "sell_limit" if row["order_type"] == "short" else "buy_limit",
                 "trendline_type": trendline_type,
-                "order_holder_position": order_holder_position,
+                "order_holder_position": row["order_holder_position"],
                 "pip_size": pip_size,
                 "risk_in_pips": round(risk_in_pips, 2),
                 "pip_value": round(pip_value, 4)
@@ -2060,11 +1958,9 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
             calculated_prices.append(calculated_entry)
             status_report["orders_processed"] += 1
             log_and_print(
-                f"Calculated prices for trendline {trendline_type}: entry={entry_price}, exit={exit_price}, "
-                f"1:0.5={price_1_0_5}, 1:1={price_1_1}, 1:2={price_1_2}, profit={profit_price}, "
-                f"lot_size={lot_size}, order_type={calculated_entry['order_type']}, "
-                f"risk_in_pips={risk_in_pips}, pip_value={pip_value} in {market} {timeframe}",
-                "DEBUG"
+                "Calculated prices for trendline %s: %s, lot_size=%s, order_type=%s, risk_in_pips=%s, pip_value=%s in %s %s",
+                "DEBUG", trendline_type, LazyJson(prices, indent=None), lot_size, calculated_entry['order_type'],
+                risk_in_pips, pip_value, market, timeframe
             )
         
         # Log the number of calculated prices
@@ -2076,24 +1972,7 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
         })
         save_errors()
         
-        # Save to calculatedprices.json
-        if os.path.exists(output_json_path):
-            try:
-                os.remove(output_json_path)
-                log_and_print(f"Existing {output_json_path} deleted", "INFO")
-            except Exception as e:
-                error_log.append({
-                    "timestamp": status_report["timestamp"],
-                    "market": market,
-                    "timeframe": timeframe,
-                    "error": f"Error deleting existing {output_json_path}: {str(e)}"
-                })
-                save_errors()
-                log_and_print(f"Error deleting existing {output_json_path}: {str(e)}", "ERROR")
-                status_report["message"] = f"Error deleting existing {output_json_path}: {str(e)}"
-                mt5.shutdown()
-                return False, status_report
-        
+        # Hand over as calculatedprices.json
         if not calculated_prices:
             error_log.append({
                 "timestamp": status_report["timestamp"],
@@ -2104,13 +1983,9 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
             save_errors()
             log_and_print(f"No valid calculated prices to save for {market} {timeframe}. Saving empty file.", "INFO")
             try:
-                with open(output_json_path, 'w') as f:
-                    json.dump([], f, indent=4)
-                log_and_print(f"Empty calculatedprices.json saved to {output_json_path} for {market} {timeframe}", "SUCCESS")
-                # Verify saved file
-                with open(output_json_path, 'r') as f:
-                    saved_data = json.load(f)
-                status_report["verified_order_count"] = len(saved_data)
+                store_artifact(context, json_dir, "calculatedprices.json", [])
+                log_and_print(f"Empty calculatedprices.json stored for {output_json_path} for {market} {timeframe}", "SUCCESS")
+                status_report["verified_order_count"] = 0
                 status_report["status"] = "success"
                 status_report["message"] = f"Empty calculatedprices.json saved for {market} {timeframe}"
                 mt5.shutdown()
@@ -2129,16 +2004,12 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
                 return False, status_report
         
         try:
-            with open(output_json_path, 'w') as f:
-                json.dump(calculated_prices, f, indent=4)
+            store_artifact(context, json_dir, "calculatedprices.json", calculated_prices)
             log_and_print(
-                f"Saved {len(calculated_prices)} calculated price entries to {output_json_path} for {market} {timeframe}",
+                f"Saved {len(calculated_prices)} calculated price entries for {output_json_path} for {market} {timeframe}",
                 "SUCCESS"
             )
-            # Verify saved file
-            with open(output_json_path, 'r') as f:
-                saved_data = json.load(f)
-            status_report["verified_order_count"] = len(saved_data)
+            status_report["verified_order_count"] = len(calculated_prices)
             status_report["status"] = "success"
             status_report["message"] = f"Saved {len(calculated_prices)} calculated price entries for {market} {timeframe}"
             mt5.shutdown()
@@ -2170,8 +2041,22 @@ def getorderholderpriceswithlotsizeandrisk(market: str, timeframe: str, json_dir
         return False, status_report
 
 
-def PendingOrderUpdater(market: str, timeframe: str, json_dir: str) -> tuple[bool, dict]:
-    """Update pending orders in pricecandle.json based on calculatedprices.json, handling duplicates."""
+def calculated_prices_digits(calculatedprices_data, market: str, timeframe: str, warnings: List[str]) -> int:
+    """Digits prices are compared at: from the pip_size in calculatedprices.json, else orderkey.DEFAULT_DIGITS (logged,
+    since 5 digits splits prices of 2- and 3-digit symbols into ticks they never trade at)."""
+    digits = orderkey.digits_from_entries(calculatedprices_data, default=None)
+    if digits is None:
+        digits = orderkey.DEFAULT_DIGITS
+        message = f"No pip_size in calculatedprices.json for {market} {timeframe}, comparing prices at {digits} digits"
+        log_and_print(message, "WARNING")
+        warnings.append(message)
+    return digits
+
+
+@metrics.timed()
+def PendingOrderUpdater(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None) -> tuple[bool, dict]:
+    """Update pending orders in pricecandle.json based on calculatedprices.json, handling duplicates,
+    and advance each contract's persisted lifecycle state with the candles closed since the last cycle."""
     log_and_print(f"Updating pending orders for market={market}, timeframe={timeframe}", "INFO")
     
     # Initialize status report
@@ -2190,28 +2075,30 @@ def PendingOrderUpdater(market: str, timeframe: str, json_dir: str) -> tuple[boo
     pricecandle_json_path = os.path.join(json_dir, "pricecandle.json")
     calculatedprices_json_path = os.path.join(json_dir, "calculatedprices.json")
     
-    # Check if required JSON files exist
-    if not os.path.exists(pricecandle_json_path):
+    # Load required artifacts
+    pricecandle_data = load_artifact(context, json_dir, "pricecandle.json")
+    if pricecandle_data is None:
         log_and_print(f"pricecandle.json not found at {pricecandle_json_path} for {market} {timeframe}", "ERROR")
         status_report["message"] = f"pricecandle.json not found at {pricecandle_json_path}"
         return False, status_report
-    if not os.path.exists(calculatedprices_json_path):
+    calculatedprices_data = load_artifact(context, json_dir, "calculatedprices.json")
+    if calculatedprices_data is None:
         log_and_print(f"calculatedprices.json not found at {calculatedprices_json_path} for {market} {timeframe}", "ERROR")
         status_report["message"] = f"calculatedprices.json not found at {calculatedprices_json_path}"
         return False, status_report
     
     try:
-        # Load pricecandle.json
-        with open(pricecandle_json_path, 'r') as f:
-            pricecandle_data = json.load(f)
-        
-        # Load calculatedprices.json
-        with open(calculatedprices_json_path, 'r') as f:
-            calculatedprices_data = json.load(f)
-        
         # Prepare updated pricecandle data
         updated_pricecandle_data = []
         duplicates_removed = 0
+        matched_prices = {}
+        
+        # Index calculated prices by (order type, entry price in ticks) so each trendline is matched in O(1)
+        digits = calculated_prices_digits(calculatedprices_data, market, timeframe, status_report["warnings"])
+        calculated_index = orderkey.index_by(
+            calculatedprices_data,
+            lambda calc: (calc.get("order_type"), orderkey.price_ticks(calc.get("entry_price"), digits))
+        )
         
         # Process each trendline in pricecandle
         for pricecandle_trendline in pricecandle_data:
@@ -2221,21 +2108,13 @@ def PendingOrderUpdater(market: str, timeframe: str, json_dir: str) -> tuple[boo
             
             # Find matching calculatedprices entry
             matching_calculated = None
-            if order_type == "long":
-                for calc_entry in calculatedprices_data:
-                    if (calc_entry.get("order_type") == "buy_limit" and 
-                        abs(calc_entry.get("entry_price") - actual_price) < 1e-5):
-                        matching_calculated = calc_entry
-                        break
-            elif order_type == "short":
-                for calc_entry in calculatedprices_data:
-                    if (calc_entry.get("order_type") == "sell_limit" and 
-                        abs(calc_entry.get("entry_price") - actual_price) < 1e-5):
-                        matching_calculated = calc_entry
-                        break
+            if order_type in ("long", "short"):
+                limit_type = "buy_limit" if order_type == "long" else "sell_limit"
+                matching_calculated = calculated_index.get((limit_type, orderkey.price_ticks(actual_price, digits)))
             
             # Update pending order
             if matching_calculated:
+                matched_prices[id(pricecandle_trendline)] = matching_calculated
                 pricecandle_trendline["pending order"] = {
                     "status": f"{matching_calculated.get('order_type', 'unknown')} {matching_calculated.get('entry_price', 'N/A')}"
                 }
@@ -2251,57 +2130,62 @@ def PendingOrderUpdater(market: str, timeframe: str, json_dir: str) -> tuple[boo
                 continue
         
         # Check for duplicates based on entry_price and keep the oldest
-        final_pricecandle_data = []
-        seen_entry_prices = {}
-        
-        for trendline in updated_pricecandle_data:
-            order_type = trendline.get("receiver", {}).get("order_type", "").lower()
+        def entry_key(trendline):
             order_holder = trendline.get("order_holder", {})
-            entry_price = order_holder.get("High" if order_type == "long" else "Low", 0)
-            order_time = order_holder.get("Time", "")
-            
-            if entry_price and order_time:
-                if entry_price in seen_entry_prices:
-                    existing_time = seen_entry_prices[entry_price]["Time"]
-                    if order_time < existing_time:
-                        seen_entry_prices[entry_price] = {
-                            "trendline": trendline,
-                            "Time": order_time
-                        }
-                        log_and_print(
-                            f"Duplicate pending order detected for trendline {trendline.get('type')} with entry_price {entry_price} in {market} {timeframe}. "
-                            f"Keeping older entry at {order_time}.",
-                            "INFO"
-                        )
-                        duplicates_removed += 1
-                    else:
-                        log_and_print(
-                            f"Duplicate pending order detected for trendline {trendline.get('type')} with entry_price {entry_price} in {market} {timeframe}. "
-                            f"Discarding newer entry at {order_time}.",
-                            "INFO"
-                        )
-                        duplicates_removed += 1
-                        continue
-                else:
-                    seen_entry_prices[entry_price] = {
-                        "trendline": trendline,
-                        "Time": order_time
-                    }
-            final_pricecandle_data.append(trendline)
-        
-        # Save updated pricecandle.json
-        if os.path.exists(pricecandle_json_path):
-            os.remove(pricecandle_json_path)
-            log_and_print(f"Existing {pricecandle_json_path} deleted", "INFO")
+            is_long = trendline.get("receiver", {}).get("order_type", "").lower() == "long"
+            return orderkey.price_ticks(order_holder.get("High" if is_long else "Low", 0), digits)
         
+        dated = [t for t in updated_pricecandle_data if t.get("order_holder", {}).get("Time")]
+        kept, discarded = orderkey.keep_oldest(dated, entry_key, lambda t: t["order_holder"]["Time"])
+        for trendline in discarded:
+            log_and_print(
+                f"Duplicate pending order detected for trendline {trendline.get('type')} with entry_price "
+                f"{entry_key(trendline) / 10 ** digits} in {market} {timeframe}. "
+                f"Discarding newer entry at {trendline['order_holder']['Time']}.",
+                "INFO"
+            )
+        duplicates_removed += len(discarded)
+        discarded_ids = {id(t) for t in discarded}
+        final_pricecandle_data = [t for t in updated_pricecandle_data if id(t) not in discarded_ids]
+        
+        # Advance contract states by the new bars only; contracts that left pricecandle.json are dropped
+        candle_array = context.get("candle_array") if context is not None else None
+        if candle_array is None:
+            candle_data = load_artifact(context, json_dir, "candle_data.json")
+            candle_array = CandleArray.from_candle_data(candle_data) if candle_data else None
+        stored_states = contractstate.load_states(json_dir)
+        contract_states = {}
+        state_changes = []
+        for trendline in final_pricecandle_data:
+            cid = contractstate.contract_id(trendline)
+            prices = matched_prices[id(trendline)]
+            state = stored_states.get(cid)
+            is_new = state is None or contractstate.prices_changed(state, prices)
+            if is_new:
+                state = contractstate.new_state(trendline, prices)
+            # States saved before digits were stored take them from the current prices
+            state.setdefault("digits", orderkey.digits_from_point(prices.get("pip_size")))
+            changed = contractstate.advance_bars(state, candle_array)
+            contract_states[cid] = state
+            trendline["contract status summary"] = contractstate.summary(state)
+            if changed or is_new:
+                state_changes.append({"contract_id": cid, "type": trendline.get("type"), **contractstate.summary(state)})
+        try:
+            contractstate.save_states(json_dir, contract_states)
+        except Exception as e:
+            log_and_print(f"Error saving contract states for {market} {timeframe}: {e}", "WARNING")
+            status_report["warnings"].append(f"Error saving contract states: {str(e)}")
+        store_artifact(context, json_dir, "contractstatechanges.json", state_changes)
+        status_report["contract_state_changes"] = len(state_changes)
+        if state_changes:
+            log_and_print(f"{len(state_changes)} contract state changes for {market} {timeframe}: %s", "INFO",
+                          LazyJson([(c["contract_id"], c["contract status"]) for c in state_changes], indent=None))
+        
+        # Hand over updated pricecandle.json
         try:
-            with open(pricecandle_json_path, 'w') as f:
-                json.dump(final_pricecandle_data, f, indent=4)
+            store_artifact(context, json_dir, "pricecandle.json", final_pricecandle_data)
             log_and_print(f"Updated pricecandle.json with {len(final_pricecandle_data)} entries for {market} {timeframe}", "SUCCESS")
-            # Verify saved file
-            with open(pricecandle_json_path, 'r') as f:
-                saved_data = json.load(f)
-            status_report["verified_order_count"] = len(saved_data)
+            status_report["verified_order_count"] = len(final_pricecandle_data)
             status_report["status"] = "success"
             status_report["message"] = f"Updated {len(final_pricecandle_data)} entries, removed {duplicates_removed} duplicates"
             return True, status_report
@@ -2314,9 +2198,11 @@ def PendingOrderUpdater(market: str, timeframe: str, json_dir: str) -> tuple[boo
         log_and_print(f"Error processing pending order updates for {market} {timeframe}: {e}", "ERROR")
         status_report["message"] = f"Unexpected error: {str(e)}"
         return False, status_report
-def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tuple[bool, dict]:
+@metrics.timed()
+def collect_all_pending_orders(market: str, timeframe: str, json_dir: str, context: Optional[PipelineContext] = None, aggregate: bool = True) -> tuple[bool, dict]:
     """Collect all pending orders from pricecandle.json and fetchedpendingorders.json for a specific market and timeframe,
-    save to contractpendingorders.json, and aggregate across all markets and timeframes to temp_pendingorders.json."""
+    save to contractpendingorders.json, and aggregate across all markets and timeframes to temp_pendingorders.json.
+    Pool workers pass aggregate=False and leave the aggregation to the parent (see aggregate_pending_orders)."""
     log_and_print(f"Collecting pending orders for market={market}, timeframe={timeframe}", "INFO")
     
     # Initialize status report
@@ -2337,27 +2223,20 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
     calculatedprices_json_path = os.path.join(json_dir, "calculatedprices.json")
     fetchedpendingorders_json_path = os.path.join(json_dir, "fetchedpendingorders.json")
     pending_orders_json_path = os.path.join(json_dir, "contractpendingorders.json")
-    collective_pending_path = os.path.join(BASE_OUTPUT_FOLDER, "temp_pendingorders.json")
     
-    # Check if required JSON files exist
-    if not os.path.exists(pricecandle_json_path):
+    # Load required artifacts
+    pricecandle_data = load_artifact(context, json_dir, "pricecandle.json")
+    if pricecandle_data is None:
         log_and_print(f"pricecandle.json not found at {pricecandle_json_path} for {market} {timeframe}", "ERROR")
         status_report["message"] = f"pricecandle.json not found at {pricecandle_json_path}"
         return False, status_report
-    if not os.path.exists(calculatedprices_json_path):
+    calculatedprices_data = load_artifact(context, json_dir, "calculatedprices.json")
+    if calculatedprices_data is None:
         log_and_print(f"calculatedprices.json not found at {calculatedprices_json_path} for {market} {timeframe}", "ERROR")
         status_report["message"] = f"calculatedprices.json not found at {calculatedprices_json_path}"
         return False, status_report
     
     try:
-        # Load pricecandle.json
-        with open(pricecandle_json_path, 'r') as f:
-            pricecandle_data = json.load(f)
-        
-        # Load calculatedprices.json
-        with open(calculatedprices_json_path, 'r') as f:
-            calculatedprices_data = json.load(f)
-        
         # Load fetchedpendingorders.json if it exists
         fetched_pending_orders = []
         if os.path.exists(fetchedpendingorders_json_path):
@@ -2374,6 +2253,11 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                 log_and_print(f"Error reading fetchedpendingorders.json for {market} {timeframe}: {str(e)}", "WARNING")
                 status_report["warnings"].append(f"Error reading fetchedpendingorders.json: {str(e)}")
         
+        # Index calculated prices by entry price in ticks, then order type; duplicates are keyed by the same ticks.
+        # Prices must be equal at the symbol's digits (the old scan allowed 1e-3 either side).
+        digits = calculated_prices_digits(calculatedprices_data, market, timeframe, status_report["warnings"])
+        calculated_index = orderkey.index_by_price(calculatedprices_data, digits)
+        
         # Extract pending orders from pricecandle.json
         contract_pending_orders = []
         seen_entry_prices = {}
@@ -2411,34 +2295,12 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                 status_report["warnings"].append(f"Invalid order_holder price for trendline {trendline_type}")
                 continue
             
-            matching_calculated = None
-            price_tolerance = 1e-3
-            for calc_entry in calculatedprices_data:
-                calc_order_type = calc_entry.get("order_type", "").lower()
-                calc_entry_price = calc_entry.get("entry_price", 0)
-                if (calc_order_type == ("buy_limit" if order_type == "long" else "sell_limit") and 
-                    abs(calc_entry_price - actual_price) < price_tolerance):
-                    matching_calculated = calc_entry
-                    log_and_print(
-                        f"Matched trendline {trendline_type}: pricecandle_entry={actual_price}, "
-                        f"calc_entry={calc_entry_price}, price_diff={abs(calc_entry_price - actual_price)}, "
-                        f"order_type={order_type}",
-                        "DEBUG"
-                    )
-                    break
-            
-            if not matching_calculated:
-                skipped_reasons[trendline_type] = f"No matching calculated prices for entry_price={actual_price}, order_type={order_type}"
-                log_and_print(
-                    f"No matching calculated prices found for trendline {trendline_type} with entry_price {actual_price} in {market} {timeframe}",
-                    "WARNING"
-                )
-                status_report["warnings"].append(f"No matching calculated prices for trendline {trendline_type}")
-                continue
-            
-            calc_order_type = matching_calculated.get("order_type").lower()
-            calc_entry_price = matching_calculated.get("entry_price")
-            if calc_order_type != ("buy_limit" if order_type == "long" else "sell_limit"):
+            price_key = orderkey.price_ticks(actual_price, digits)
+            expected_type = "buy_limit" if order_type == "long" else "sell_limit"
+            at_price = calculated_index.get(price_key, {})
+            matching_calculated = at_price.get(expected_type)
+            if not matching_calculated and at_price:
+                calc_order_type = next(iter(at_price))
                 skipped_reasons[trendline_type] = f"Order type mismatch: pricecandle={order_type}, calculatedprices={calc_order_type}"
                 log_and_print(
                     f"Order type mismatch for trendline {trendline_type} in {market} {timeframe}: "
@@ -2447,20 +2309,26 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                 )
                 status_report["warnings"].append(f"Order type mismatch for trendline {trendline_type}")
                 continue
-            if abs(calc_entry_price - actual_price) > price_tolerance:
-                skipped_reasons[trendline_type] = f"Entry price mismatch: pricecandle={actual_price}, calculatedprices={calc_entry_price}"
+            if matching_calculated:
+                log_and_print(
+                    f"Matched trendline {trendline_type}: pricecandle_entry={actual_price}, "
+                    f"calc_entry={matching_calculated.get('entry_price')}, order_type={order_type}",
+                    "DEBUG"
+                )
+            
+            if not matching_calculated:
+                skipped_reasons[trendline_type] = f"No matching calculated prices for entry_price={actual_price}, order_type={order_type}"
                 log_and_print(
-                    f"Entry price mismatch for trendline {trendline_type} in {market} {timeframe}: "
-                    f"pricecandle={actual_price}, calculatedprices={calc_entry_price}",
+                    f"No matching calculated prices found for trendline {trendline_type} with entry_price {actual_price} in {market} {timeframe}",
                     "WARNING"
                 )
-                status_report["warnings"].append(f"Entry price mismatch for trendline {trendline_type}")
+                status_report["warnings"].append(f"No matching calculated prices for trendline {trendline_type}")
                 continue
             
-            if actual_price in seen_entry_prices:
-                existing_time = seen_entry_prices[actual_price]["order_holder_timestamp"]
+            if price_key in seen_entry_prices:
+                existing_time = seen_entry_prices[price_key]["order_holder_timestamp"]
                 if order_holder_timestamp < existing_time:
-                    seen_entry_prices[actual_price] = {
+                    seen_entry_prices[price_key] = {
                         "trendline": trendline,
                         "matching_calculated": matching_calculated,
                         "order_holder_timestamp": order_holder_timestamp
@@ -2480,7 +2348,7 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                     status_report["warnings"].append(f"Duplicate pending order for trendline {trendline_type}")
                     continue
             else:
-                seen_entry_prices[actual_price] = {
+                seen_entry_prices[price_key] = {
                     "trendline": trendline,
                     "matching_calculated": matching_calculated,
                     "order_holder_timestamp": order_holder_timestamp
@@ -2498,54 +2366,39 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                 status_report["warnings"].append(f"Invalid entry price for fetched order at {order_holder_timestamp}")
                 continue
             
-            matching_calculated = None
-            price_tolerance = 1e-3
-            for calc_entry in calculatedprices_data:
-                calc_order_type = calc_entry.get("order_type", "").lower()
-                calc_entry_price = calc_entry.get("entry_price", 0)
-                if calc_order_type == order_type and abs(calc_entry_price - actual_price) < price_tolerance:
-                    matching_calculated = calc_entry
-                    log_and_print(
-                        f"Matched fetched order: fetched_entry={actual_price}, "
-                        f"calc_entry={calc_entry_price}, price_diff={abs(calc_entry_price - actual_price)}, "
-                        f"order_type={order_type}",
-                        "DEBUG"
-                    )
-                    break
-            
-            if not matching_calculated:
-                skipped_reasons[f"fetched_order_{order_holder_timestamp}"] = f"No matching calculated prices for entry_price={actual_price}, order_type={order_type}"
-                log_and_print(
-                    f"No matching calculated prices found for fetched order at {order_holder_timestamp} with entry_price {actual_price} in {market} {timeframe}",
-                    "WARNING"
-                )
-                status_report["warnings"].append(f"No matching calculated prices for fetched order at {order_holder_timestamp}")
-                continue
-            
-            if matching_calculated.get("order_type").lower() != order_type:
-                skipped_reasons[f"fetched_order_{order_holder_timestamp}"] = f"Order type mismatch: fetched={order_type}, calculatedprices={matching_calculated.get('order_type')}"
+            price_key = orderkey.price_ticks(actual_price, digits)
+            at_price = calculated_index.get(price_key, {})
+            matching_calculated = at_price.get(order_type)
+            if not matching_calculated and at_price:
+                calc_order_type = next(iter(at_price))
+                skipped_reasons[f"fetched_order_{order_holder_timestamp}"] = f"Order type mismatch: fetched={order_type}, calculatedprices={calc_order_type}"
                 log_and_print(
                     f"Order type mismatch for fetched order at {order_holder_timestamp} in {market} {timeframe}: "
-                    f"fetched={order_type}, calculatedprices={matching_calculated.get('order_type')}",
+                    f"fetched={order_type}, calculatedprices={calc_order_type}",
                     "WARNING"
                 )
                 status_report["warnings"].append(f"Order type mismatch for fetched order at {order_holder_timestamp}")
                 continue
+            if matching_calculated:
+                log_and_print(
+                    f"Matched fetched order: fetched_entry={actual_price}, "
+                    f"calc_entry={matching_calculated.get('entry_price')}, order_type={order_type}",
+                    "DEBUG"
+                )
             
-            if abs(matching_calculated.get("entry_price") - actual_price) > price_tolerance:
-                skipped_reasons[f"fetched_order_{order_holder_timestamp}"] = f"Entry price mismatch: fetched={actual_price}, calculatedprices={matching_calculated.get('entry_price')}"
+            if not matching_calculated:
+                skipped_reasons[f"fetched_order_{order_holder_timestamp}"] = f"No matching calculated prices for entry_price={actual_price}, order_type={order_type}"
                 log_and_print(
-                    f"Entry price mismatch for fetched order at {order_holder_timestamp} in {market} {timeframe}: "
-                    f"fetched={actual_price}, calculatedprices={matching_calculated.get('entry_price')}",
+                    f"No matching calculated prices found for fetched order at {order_holder_timestamp} with entry_price {actual_price} in {market} {timeframe}",
                     "WARNING"
                 )
-                status_report["warnings"].append(f"Entry price mismatch for fetched order at {order_holder_timestamp}")
+                status_report["warnings"].append(f"No matching calculated prices for fetched order at {order_holder_timestamp}")
                 continue
             
-            if actual_price in seen_entry_prices:
-                existing_time = seen_entry_prices[actual_price]["order_holder_timestamp"]
+            if price_key in seen_entry_prices:
+                existing_time = seen_entry_prices[price_key]["order_holder_timestamp"]
                 if order_holder_timestamp < existing_time:
-                    seen_entry_prices[actual_price] = {
+                    seen_entry_prices[price_key] = {
                         "fetched_order": fetched_order,
                         "matching_calculated": matching_calculated,
                         "order_holder_timestamp": order_holder_timestamp
@@ -2565,7 +2418,7 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
                     status_report["warnings"].append(f"Duplicate pending order for fetched order at {order_holder_timestamp}")
                     continue
             else:
-                seen_entry_prices[actual_price] = {
+                seen_entry_prices[price_key] = {
                     "fetched_order": fetched_order,
                     "matching_calculated": matching_calculated,
                     "order_holder_timestamp": order_holder_timestamp
@@ -2658,8 +2511,10 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
             status_report["message"] = "No pending orders collected"
         
         try:
-            with open(pending_orders_json_path, 'w') as f:
-                json.dump(contract_pending_orders, f, indent=4)
+            store_artifact(context, json_dir, "contractpendingorders.json", contract_pending_orders)
+            if context is not None and aggregate:
+                # The aggregation below reads this file, so it cannot wait for the final flush
+                context.write(["contractpendingorders.json"])
             log_and_print(
                 f"Saved {len(contract_pending_orders)} pending orders to {pending_orders_json_path} for {market} {timeframe}",
                 "SUCCESS"
@@ -2670,70 +2525,84 @@ def collect_all_pending_orders(market: str, timeframe: str, json_dir: str) -> tu
             status_report["message"] = f"Error saving contractpendingorders.json: {str(e)}"
             return False, status_report
         
-        all_pending_orders = []
-        timeframe_counts_pending = {
-            "5minutes": 0,
-            "15minutes": 0,
-            "30minutes": 0,
-            "1Hour": 0,
-            "4Hour": 0
-        }
-        
-        for mkt in MARKETS:
-            formatted_market = mkt.replace(" ", "_")
-            for tf in TIMEFRAMES:
-                tf_dir = os.path.join(BASE_OUTPUT_FOLDER, formatted_market, tf.lower())
-                pending_path = os.path.join(tf_dir, "contractpendingorders.json")
-                db_tf = DB_TIMEFRAME_MAPPING.get(tf, tf)
-                
-                if os.path.exists(pending_path):
-                    try:
-                        with open(pending_path, 'r') as f:
-                            pending_data = json.load(f)
-                        if isinstance(pending_data, list):
-                            all_pending_orders.extend(pending_data)
-                            timeframe_counts_pending[db_tf] += len(pending_data)
-                        else:
-                            log_and_print(f"Invalid data format in {pending_path}: Expected list, got {type(pending_data)}", "WARNING")
-                            status_report["warnings"].append(f"Invalid data format in {pending_path}")
-                    except Exception as e:
-                        log_and_print(f"Error reading {pending_path}: {str(e)}", "WARNING")
-                        status_report["warnings"].append(f"Error reading {pending_path}: {str(e)}")
-        
-        pending_output = {
-            "temp_pendingorders": len(all_pending_orders),
-            "5minutes pending orders": timeframe_counts_pending["5minutes"],
-            "15minutes pending orders": timeframe_counts_pending["15minutes"],
-            "30minutes pending orders": timeframe_counts_pending["30minutes"],
-            "1Hour pending orders": timeframe_counts_pending["1Hour"],
-            "4Hours pending orders": timeframe_counts_pending["4Hour"],
-            "orders": all_pending_orders
-        }
-        
-        try:
-            with open(collective_pending_path, 'w') as f:
-                json.dump(pending_output, f, indent=4)
-            log_and_print(
-                f"Saved {len(all_pending_orders)} pending orders to {collective_pending_path} "
-                f"(5m: {timeframe_counts_pending['5minutes']}, 15m: {timeframe_counts_pending['15minutes']}, "
-                f"30m: {timeframe_counts_pending['30minutes']}, 1H: {timeframe_counts_pending['1Hour']}, "
-                f"4H: {timeframe_counts_pending['4Hour']})",
-                "SUCCESS"
-            )
-            status_report["total_collective_pending"] = len(all_pending_orders)
-            status_report["status"] = "success"
-            status_report["message"] = f"Saved {len(contract_pending_orders)} pending orders for {market} {timeframe}"
+        status_report["status"] = "success"
+        status_report["message"] = f"Saved {len(contract_pending_orders)} pending orders for {market} {timeframe}"
+        if not aggregate:
             return True, status_report
-        except Exception as e:
-            log_and_print(f"Error saving temp_pendingorders.json: {str(e)}", "ERROR")
-            status_report["message"] = f"Error saving temp_pendingorders.json: {str(e)}"
+        
+        success, total_pending = aggregate_pending_orders(status_report["warnings"])
+        if not success:
+            status_report["status"] = "failed"
+            status_report["message"] = "Error saving temp_pendingorders.json"
             return False, status_report
+        status_report["total_collective_pending"] = total_pending
+        return True, status_report
     
     except Exception as e:
         log_and_print(f"Error collecting pending orders for {market} {timeframe}: {str(e)}", "ERROR")
         status_report["message"] = f"Unexpected error: {str(e)}"
         return False, status_report
 
+@metrics.timed()
+def aggregate_pending_orders(warnings: Optional[List[str]] = None) -> Tuple[bool, int]:
+    """Merge every market/timeframe contractpendingorders.json into temp_pendingorders.json with one atomic write.
+    Called once by the parent after the pool finishes, so workers never race on the shared file."""
+    collective_pending_path = os.path.join(BASE_OUTPUT_FOLDER, "temp_pendingorders.json")
+    warnings = warnings if warnings is not None else []
+    all_pending_orders = []
+    timeframe_counts_pending = {
+        "5minutes": 0,
+        "15minutes": 0,
+        "30minutes": 0,
+        "1Hour": 0,
+        "4Hour": 0
+    }
+    
+    for mkt in MARKETS:
+        formatted_market = mkt.replace(" ", "_")
+        for tf in TIMEFRAMES:
+            pending_path = os.path.join(BASE_OUTPUT_FOLDER, formatted_market, tf.lower(), "contractpendingorders.json")
+            db_tf = DB_TIMEFRAME_MAPPING.get(tf, tf)
+            if not os.path.exists(pending_path):
+                continue
+            try:
+                with open(pending_path, 'r') as f:
+                    pending_data = json.load(f)
+                if isinstance(pending_data, list):
+                    all_pending_orders.extend(pending_data)
+                    timeframe_counts_pending[db_tf] += len(pending_data)
+                else:
+                    log_and_print(f"Invalid data format in {pending_path}: Expected list, got {type(pending_data)}", "WARNING")
+                    warnings.append(f"Invalid data format in {pending_path}")
+            except Exception as e:
+                log_and_print(f"Error reading {pending_path}: {str(e)}", "WARNING")
+                warnings.append(f"Error reading {pending_path}: {str(e)}")
+    
+    pending_output = {
+        "temp_pendingorders": len(all_pending_orders),
+        "5minutes pending orders": timeframe_counts_pending["5minutes"],
+        "15minutes pending orders": timeframe_counts_pending["15minutes"],
+        "30minutes pending orders": timeframe_counts_pending["30minutes"],
+        "1Hour pending orders": timeframe_counts_pending["1Hour"],
+        "4Hours pending orders": timeframe_counts_pending["4Hour"],
+        "orders": all_pending_orders
+    }
+    
+    try:
+        write_json_atomic(collective_pending_path, pending_output)
+        log_and_print(
+            f"Saved {len(all_pending_orders)} pending orders to {collective_pending_path} "
+            f"(5m: {timeframe_counts_pending['5minutes']}, 15m: {timeframe_counts_pending['15minutes']}, "
+            f"30m: {timeframe_counts_pending['30minutes']}, 1H: {timeframe_counts_pending['1Hour']}, "
+            f"4H: {timeframe_counts_pending['4Hour']})",
+            "SUCCESS"
+        )
+        return True, len(all_pending_orders)
+    except Exception as e:
+        log_and_print(f"Error saving temp_pendingorders.json: {str(e)}", "ERROR")
+        warnings.append(f"Error saving temp_pendingorders.json: {str(e)}")
+        return False, 0
+
 def move_fetchedpendingordersto_temppendingorders():
     # File paths
     pending_orders_path = r"C:\xampp\htdocs\CIPHER\cipher i\programmes\chart\orders\fetchedpendingorders.json"
@@ -2825,9 +2694,7 @@ def move_fetchedpendingordersto_temppendingorders():
         temp_pendingorders_data['4Hours pending orders'] += pending_orders_data['summary']['4h_valid_orders']
         
         # Save to temp_pendingorders file
-        os.makedirs(os.path.dirname(temp_pendingorders_path), exist_ok=True)
-        with open(temp_pendingorders_path, 'w') as f:
-            json.dump(temp_pendingorders_data, f, indent=4)
+        write_json_atomic(temp_pendingorders_path, temp_pendingorders_data)
         
         print(f"Successfully appended orders to {temp_pendingorders_path}")
         
@@ -2839,6 +2706,7 @@ def move_fetchedpendingordersto_temppendingorders():
         print(f"Error: {e}")
 
 
+@metrics.timed()
 def validatesignals():
     """Initialize MT5, fetch available symbols, validate signals from temp_pendingorders.json, place limit orders for valid signals, and categorize as valid or invalid price."""
     log_and_print("===== Verifying Signals with Server =====", "TITLE")
@@ -2858,18 +2726,11 @@ def validatesignals():
     invalid_json_path = os.path.join(BASE_OUTPUT_FOLDER, "invalidexecutedorders.json")
     
     # Initialize error log list
-    error_log = []
-    error_json_path = os.path.join(BASE_ERROR_FOLDER, "validatesignalserror.json")
+    error_log = errorjournal.ErrorLog("validatesignals")
     
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            os.makedirs(BASE_ERROR_FOLDER, exist_ok=True)
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            log_and_print(f"Errors saved to {error_json_path}", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+        error_log.save()
     
     # Helper function to normalize timeframe
     def normalize_timeframe(timeframe):
@@ -2969,9 +2830,9 @@ def validatesignals():
         
         log_and_print(f"Successfully initialized and logged into MT5 (loginid={LOGIN_ID}, server={SERVER})", "SUCCESS")
         
-        # Fetch available symbols
-        symbols = mt5.symbols_get()
-        if not symbols:
+        # Resolve, select and tick every distinct symbol once for the whole batch of orders
+        snapshot = SymbolSnapshot()
+        if not snapshot.total_symbols:
             error_log.append({
                 "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
                 "error": f"Failed to retrieve symbols: {mt5.last_error()}"
@@ -2981,8 +2842,10 @@ def validatesignals():
             mt5.shutdown()
             return 0, 0, 0, 0, 0, 0, 0
         
-        total_symbols = len(symbols)
+        total_symbols = snapshot.total_symbols
         log_and_print(f"Retrieved {total_symbols} symbols from the broker", "INFO")
+        prepared_symbols = snapshot.prepare(order.get('pair', '') for order in signals_data['orders'])
+        log_and_print(f"Prepared {len(prepared_symbols)} distinct symbols for {len(signals_data['orders'])} orders", "INFO")
         
         # Initialize counters and lists
         matched_pairs = set()
@@ -2992,6 +2855,7 @@ def validatesignals():
         valid_orders = []
         invalid_executed_orders = []
         orders_placed = 0
+        pending_requests = []
         timeframe_counts = {
             "4h": 0,
             "1h": 0,
@@ -3000,16 +2864,13 @@ def validatesignals():
             "5m": 0
         }
         
-        # Create a dictionary of broker symbols for matching (case-insensitive)
-        broker_symbols_dict = {symbol.name.replace(' ', '').lower(): symbol.name for symbol in symbols}
-        
         # Process each order, validate, and place limit orders only for valid signals
         log_and_print("===== Validation and filtering =====", "TITLE")
         total_orders = len(signals_data['orders'])
         for i, order in enumerate(signals_data['orders'], 1):
             log_and_print(f"Validating orders {i}/{total_orders}", "INFO")
             pair = order.get('pair', '').replace(' ', '').lower()
-            original_symbol = broker_symbols_dict.get(pair)
+            original_symbol = snapshot.resolve(pair)
             order_type = order.get('order_type', '').lower()
             entry_price = order.get('entry_price')
             exit_price = order.get('exit_price')  # Stop-loss
@@ -3024,36 +2885,26 @@ def validatesignals():
                 invalid_executed_orders.append(order_copy)
                 continue
             
-            # Select the symbol in Market Watch
-            try:
-                if mt5.symbol_select(original_symbol, True):
-                    selected_pairs.add(pair)
-                else:
-                    unable_to_select_pairs.add(pair)
-                    unmatched_pairs.add(pair)
-                    order_copy = order.copy()
-                    order_copy['reason'] = f"Failed to select symbol: {mt5.last_error()}"
-                    invalid_executed_orders.append(order_copy)
-                    continue
-            except Exception as e:
+            # The symbol was selected in Market Watch once by the snapshot
+            if snapshot.is_selected(original_symbol):
+                selected_pairs.add(pair)
+            else:
                 unable_to_select_pairs.add(pair)
-                log_and_print(f"Error selecting symbol {original_symbol} for pair {pair}: {str(e)}", "ERROR")
                 unmatched_pairs.add(pair)
                 order_copy = order.copy()
-                order_copy['reason'] = f"Error selecting symbol: {str(e)}"
+                order_copy['reason'] = snapshot.select_errors.get(original_symbol, "Failed to select symbol")
                 invalid_executed_orders.append(order_copy)
                 continue
             
-            # Get current market price (using last tick)
-            tick = mt5.symbol_info_tick(original_symbol)
-            if not tick:
+            # Get current market price (the snapshot's last tick, shared by all orders of the symbol)
+            current_price = snapshot.mid_price(original_symbol)  # Use midpoint of bid/ask for comparison
+            if current_price is None:
                 unmatched_pairs.add(pair)
                 order_copy = order.copy()
-                order_copy['reason'] = f"Failed to retrieve tick data: {mt5.last_error()}"
+                order_copy['reason'] = snapshot.tick_errors.get(original_symbol, "Failed to retrieve tick data")
                 invalid_executed_orders.append(order_copy)
                 continue
             
-            current_price = (tick.bid + tick.ask) / 2  # Use midpoint of bid/ask for comparison
             matched_pairs.add(pair)
             
             # Validate entry price
@@ -3082,7 +2933,7 @@ def validatesignals():
                 invalid_executed_orders.append(order_copy)
                 continue
             
-            # If entry is valid, proceed to place the order
+            # If entry is valid, queue the order for reconciliation with the account
             mt5_order_type = mt5.ORDER_TYPE_BUY_LIMIT if order_type == 'buy_limit' else mt5.ORDER_TYPE_SELL_LIMIT
             
             # Prepare order request
@@ -3095,22 +2946,34 @@ def validatesignals():
                 "sl": float(exit_price) if isinstance(exit_price, (int, float)) else 0.0,  # Include stop-loss if provided
                 "type_time": mt5.ORDER_TIME_GTC,  # Good Till Cancel
                 "type_filling": mt5.ORDER_FILLING_IOC,  # Immediate or Cancel
+                "magic": orderreconciler.ORDER_MAGIC
             }
-            
-            # Place limit order
-            result = mt5.order_send(request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                orders_placed += 1
-                valid_orders.append(order)
-                # Increment timeframe count for normalized timeframe
-                if timeframe in timeframe_counts:
-                    timeframe_counts[timeframe] += 1
-            else:
+            pending_requests.append((order, pair, timeframe, request))
+        
+        # Keep unchanged orders on the book; only cancel, modify or place the differences
+        log_and_print("===== Reconciling pending orders =====", "TITLE")
+        results, reconcile_summary = orderreconciler.reconcile_pending_orders(
+            [request for _, _, _, request in pending_requests], snapshot.digits_by_symbol
+        )
+        for (order, pair, timeframe, _), result in zip(pending_requests, results):
+            if result["action"] == "failed":
                 unmatched_pairs.add(pair)
                 order_copy = order.copy()
-                order_copy['reason'] = f"Failed to place order: {result.comment}"
+                order_copy['reason'] = f"Failed to place order: {result['comment']}"
                 invalid_executed_orders.append(order_copy)
                 continue
+            if result["action"] == "placed":
+                orders_placed += 1
+            valid_orders.append(order)
+            # Increment timeframe count for normalized timeframe
+            if timeframe in timeframe_counts:
+                timeframe_counts[timeframe] += 1
+        log_and_print(
+            f"Reconciled pending orders: kept {reconcile_summary['kept']}, modified {reconcile_summary['modified']}, "
+            f"placed {reconcile_summary['placed']}, failed {reconcile_summary['failed']}, "
+            f"cancelled {reconcile_summary['cancelled']}, cancel failed {reconcile_summary['cancel_failed']}",
+            "INFO"
+        )
         
         # Print newline to move to next line after progress updates
         print()
@@ -3219,7 +3082,8 @@ def validatesignals():
         return 0, 0, 0, 0, 0, 0, 0
 
 def cancel_limitorders():
-    """Delete all pending orders in the MT5 account."""
+    """Delete all pending orders in the MT5 account. The cycle itself no longer calls this:
+    validatesignals reconciles the book with orderreconciler instead."""
     
     # Define MT5 credentials and terminal path
     TERMINAL_PATH = r"C:\Program Files\MetaTrader 5\terminal64.exe"
@@ -3228,18 +3092,12 @@ def cancel_limitorders():
     SERVER = "DerivSVG-Server-02"
     
     # Initialize error log list
-    error_log = []
-    error_json_path = os.path.join(BASE_ERROR_FOLDER, "deletependingorderserror.json")
+    error_log = errorjournal.ErrorLog("deletependingorders")
     
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            #log_and_print(f"Errors saved to {error_json_path}", "INFO")
-            log_and_print(f"ALL CLEANED", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+        error_log.save()
+        log_and_print(f"ALL CLEANED", "INFO")
     
     # Verify terminal executable exists
     if not os.path.exists(TERMINAL_PATH):
@@ -3310,7 +3168,7 @@ def cancel_limitorders():
                 "action": mt5.TRADE_ACTION_REMOVE,
                 "order": order.ticket
             }
-            result = mt5.order_send(request)
+            result = metrics.timed_call("mt5", "order_send", mt5.order_send, request)
             if result.retcode == mt5.TRADE_RETCODE_DONE:
                 orders_deleted += 1
                 #log_and_print(f"Successfully deleted pending order (ticket={order.ticket}, symbol={order.symbol})", "SUCCESS")
@@ -3343,6 +3201,7 @@ def cancel_limitorders():
         mt5.shutdown()
         return 0
 
+@metrics.timed()
 def marketsliststatus() -> tuple[bool, dict]:
     """Generate a status report for all markets and timeframes, summarizing invalid pending orders."""
     log_and_print("Generating markets list status", "INFO")
@@ -3416,8 +3275,7 @@ def marketsliststatus() -> tuple[bool, dict]:
         
         # Save to marketsliststatus.json
         try:
-            with open(output_json_path, 'w') as f:
-                json.dump(output_data, f, indent=4)
+            write_json_atomic(output_json_path, output_data)
             log_and_print(f"Saved markets list status to {output_json_path}", "SUCCESS")
             status_report["status"] = "success"
             status_report["message"] = f"Processed {status_report['markets_processed']} market-timeframe combinations"
@@ -3438,19 +3296,11 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
     removing only duplicate orders."""
     log_and_print("Inserting all invalid executed orders into cipher_processed_bouncestreamsignals table", "INFO")
     # Initialize error log list
-    error_log = []
-    
-    # Define paths
-    error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "insertinvalidexecutedorderserror.json")
+    error_log = errorjournal.ErrorLog("insertinvalidexecutedorders")
     
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            log_and_print(f"Errors saved to {error_json_path}", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+        error_log.save()
     
     # Load invalid executed orders from JSON
     try:
@@ -3494,7 +3344,7 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
     """
     try:
         result = db.execute_query(fetch_query)
-        log_and_print(f"Raw query result for fetching signals: {json.dumps(result, indent=2)}", "DEBUG")
+        log_and_print("Raw query result for fetching signals: %s", "DEBUG", LazyJson(result))
         
         existing_signals = []
         if isinstance(result, dict):
@@ -3568,7 +3418,7 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
             if message is not None and not isinstance(message, str):
                 raise ValueError(f"Invalid message format: {message}")
             
-            order_key = (pair, timeframe, order_type, entry_price)
+            order_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             if order_key in json_order_keys:
                 error_log.append({
                     "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
@@ -3610,7 +3460,7 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
             entry_price = float(signal.get('entry_price', 0.0))
             created_at = signal.get('created_at', '')
             
-            signal_key = (pair, timeframe, order_type, entry_price)
+            signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             
             if signal_key in db_order_keys:
                 if created_at < db_order_keys[signal_key]['created_at']:
@@ -3705,7 +3555,7 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
             if message is not None and not isinstance(message, str):
                 raise ValueError(f"Invalid message format: {message}")
             
-            order_key = (pair, timeframe, order_type, entry_price)
+            order_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             
             if order_key not in db_order_keys:
                 pair_escaped = pair.replace("'", "''")
@@ -3746,7 +3596,7 @@ def insertinvalidexecutedorderstodb(json_path: str = r"C:\xampp\htdocs\CIPHER\ci
         for attempt in range(1, MAX_RETRIES + 1):
             try:
                 result = db.execute_query(sql_query)
-                log_and_print(f"Raw query result for inserting batch {batch_number}: {json.dumps(result, indent=2)}", "DEBUG")
+                log_and_print(f"Raw query result for inserting batch {batch_number}: %s", "DEBUG", LazyJson(result))
                 
                 if not isinstance(result, dict):
                     error_log.append({
@@ -3819,24 +3669,17 @@ def executeinsertinvalidexecutedorderstodb():
     log_and_print("===== Insert Invalid Executed Orders to Database Completed =====", "TITLE")
 
 
+@metrics.timed()
 def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "validpendingorders.json")) -> bool:
     """Insert all pending orders from validpendingorders.json into cipherbouncestream_signals table after validation, 
     removing only duplicate orders."""
     log_and_print("Inserting all pending orders into cipherbouncestream_signals table", "INFO")
     # Initialize error log list
-    error_log = []
+    error_log = errorjournal.ErrorLog("insertpendingorders")
     
-    # Define paths
-    error_json_path = os.path.join(BASE_PROCESSING_FOLDER, "insertpendingorderserror.json")
-    
-    # Helper function to save errors to JSON
+    # Helper function to save errors to the error journal
     def save_errors():
-        try:
-            with open(error_json_path, 'w') as f:
-                json.dump(error_log, f, indent=4)
-            log_and_print(f"Errors saved to {error_json_path}", "INFO")
-        except Exception as e:
-            log_and_print(f"Failed to save errors to {error_json_path}: {str(e)}", "ERROR")
+        error_log.save()
     
     # Load pending orders from JSON
     try:
@@ -3880,7 +3723,7 @@ def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "v
     """
     try:
         result = db.execute_query(fetch_query)
-        log_and_print(f"Raw query result for fetching signals: {json.dumps(result, indent=2)}", "DEBUG")
+        log_and_print("Raw query result for fetching signals: %s", "DEBUG", LazyJson(result))
         
         existing_signals = []
         if isinstance(result, dict):
@@ -3949,7 +3792,7 @@ def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "v
                 if not (MIN_NUMERIC_VALUE <= value <= MAX_NUMERIC_VALUE):
                     raise ValueError(f"{field_name} out of range: {value}")
             
-            order_key = (pair, timeframe, order_type, entry_price)
+            order_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             if order_key in json_order_keys:
                 error_log.append({
                     "timestamp": datetime.now(pytz.timezone('Africa/Lagos')).strftime('%Y-%m-%d %H:%M:%S.%f+01:00'),
@@ -3990,7 +3833,7 @@ def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "v
             entry_price = float(signal.get('entry_price', 0.0))
             created_at = signal.get('created_at', '')
             
-            signal_key = (pair, timeframe, order_type, entry_price)
+            signal_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             
             if signal_key in db_order_keys:
                 if created_at < db_order_keys[signal_key]['created_at']:
@@ -4080,7 +3923,7 @@ def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "v
             if created_at == 'N/A':
                 raise ValueError("Missing created_at")
             
-            order_key = (pair, timeframe, order_type, entry_price)
+            order_key = orderkey.order_key(pair, timeframe, order_type, entry_price)
             
             if order_key not in db_order_keys:
                 pair_escaped = pair.replace("'", "''")
@@ -4120,7 +3963,7 @@ def insertpendingorderstodb(json_path: str = os.path.join(BASE_OUTPUT_FOLDER, "v
         for attempt in range(1, MAX_RETRIES + 1):
             try:
                 result = db.execute_query(sql_query)
-                log_and_print(f"Raw query result for inserting batch {batch_number}: {json.dumps(result, indent=2)}", "DEBUG")
+                log_and_print(f"Raw query result for inserting batch {batch_number}: %s", "DEBUG", LazyJson(result))
                 
                 if not isinstance(result, dict):
                     error_log.append({
@@ -4194,18 +4037,13 @@ def executeinsertpendingorderstodb():
     log_and_print("===== Insert Pending Orders to Database Completed =====", "TITLE")
 
 def check_verification_json(market: str) -> bool:
-    """Check if verification.json for a market has all required timeframes set to 'chart_identified' and 'all_timeframes' set to 'verified'."""
+    """Check if the verification of a market has all required timeframes set to 'chart_identified' and 'all_timeframes' set to 'verified'."""
     try:
-        market_folder_name = market.replace(" ", "_")
-        verification_file = os.path.join(FETCHCHART_DESTINATION_PATH, market_folder_name, "verification.json")
-        
-        if not os.path.exists(verification_file):
-            log_and_print(f"Verification file not found for {market}: {verification_file}", "WARNING")
+        verification_data = marketstatusstore.get_verification(market)
+        if verification_data is None:
+            log_and_print(f"Verification not found for {market}", "WARNING")
             return False
         
-        with open(verification_file, 'r') as f:
-            verification_data = json.load(f)
-        
         required_timeframes = ["m5", "m15", "m30", "h1", "h4"]
         all_timeframes_verified = all(
             verification_data.get(tf) in ["chart_identified", "active"] for tf in required_timeframes
@@ -4221,6 +4059,7 @@ def check_verification_json(market: str) -> bool:
         log_and_print(f"Error reading verification.json for {market}: {e}", "ERROR")
         return False
               
+@metrics.timed()
 def process_5minutes_timeframe():
     """Process all markets for the 5-minute (M5) timeframe if verification.json has all timeframes 'chart_identified' and 'all_timeframes' verified, using markets from batchbybatch.json, returning a summary of processing results."""
     try:
@@ -4349,8 +4188,14 @@ def process_5minutes_timeframe():
         lock_pending_orders_statuses = []
         markets_list_statuses = []
 
+        # One terminal session fetches every task's candles; the workers start from them
+        prefetched_rates = prefetch_candle_rates(tasks)
         with multiprocessing.Pool(processes=4) as pool:
-            results = pool.starmap(process_market_timeframe, tasks)
+            results = pool.starmap(process_market_timeframe, [(market, timeframe, prefetched_rates.get((market, timeframe))) for market, timeframe in tasks])
+
+        # Merge the per-task contractpendingorders.json files into temp_pendingorders.json once
+        aggregate_pending_orders()
+        merge_invalid_markets(results)
 
         # Collect status for each market
         markets_processed = 0
@@ -4710,8 +4555,60 @@ def process_5minutes_timeframe():
         except Exception as e:
             log_and_print(f"Error shutting down MT5: {str(e)}", "WARNING")
 
-def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optional[str], str, Dict]:
-    """Process a single market and timeframe combination, returning success status, error message, status, and process messages."""
+@metrics.timed()
+def prefetch_candle_rates(tasks: List[Tuple[str, str]]) -> Dict:
+    """Fetch the candles of every (market, timeframe) task over one terminal session before the pool starts.
+    Returns {(market, timeframe): ratefetcher.stamp_fetch_times entry}; tasks missing from it, or whose rates
+    are out of date by the time they run, fetch their own candles in the worker."""
+    if COMPARE_RATE_FETCH:
+        report = ratefetcher.compare_with_per_task(
+            [(market, timeframe, CANDLE_COUNT) for market, timeframe in tasks], TIMEFRAME_MAPPING,
+            TERMINAL_PATH, LOGIN_ID, PASSWORD, SERVER
+        )
+        log_and_print(
+            f"Candle fetch latency for {report['series']} series: per task {report['per_task_seconds']}s "
+            f"({report['per_task_fetched']} fetched), bulk {report['bulk_seconds']}s ({report['bulk_fetched']} fetched), "
+            f"speedup {report['speedup']}x", "INFO"
+        )
+    ok, message = ratefetcher.open_session(TERMINAL_PATH, LOGIN_ID, PASSWORD, SERVER, MAX_RETRIES, RETRY_DELAY)
+    if not ok:
+        log_and_print(f"Bulk candle fetch skipped, workers will fetch their own candles: {message}", "WARNING")
+        return {}
+    try:
+        requests = [(market, timeframe, CANDLE_COUNT) for market, timeframe in tasks]
+        rates_by_task, errors, stats = ratefetcher.fetch_rates_bulk(requests, TIMEFRAME_MAPPING)
+        rates_by_task = ratefetcher.stamp_fetch_times(rates_by_task)
+    finally:
+        mt5.shutdown()
+    for (market, timeframe), error in errors.items():
+        log_and_print(f"Bulk fetch failed for {market} {timeframe}, worker will retry: {error}", "WARNING")
+    log_and_print(
+        f"Bulk fetched {stats['fetched']}/{stats['requested']} candle series for {stats['symbols']} markets "
+        f"in {stats['seconds']}s ({stats['ms_per_series']} ms per series)", "INFO"
+    )
+    return rates_by_task
+
+@metrics.timed(flush_after=True)
+def process_market_timeframe(market: str, timeframe: str, rates=None) -> Tuple[bool, Optional[str], str, Dict]:
+    """Process a single market and timeframe combination, returning success status, error message, status, and process messages.
+    Stage outputs are handed over in memory and written to disk once the task finishes."""
+    json_dir = os.path.join(BASE_OUTPUT_FOLDER, market.replace(" ", "_"), timeframe.lower())
+    context = PipelineContext(market, timeframe, json_dir, PIPELINE_SNAPSHOT, PIPELINE_DISK_FALLBACK)
+    result = (False, None, "failed", {})
+    try:
+        result = run_market_timeframe_stages(market, timeframe, context, rates)
+        return result
+    finally:
+        try:
+            written = context.finalize(result[0])
+            log_and_print(f"Wrote {len(written)} pipeline artifacts for {market} {timeframe}", "DEBUG")
+        except Exception as e:
+            log_and_print(f"Error writing pipeline artifacts for {market} {timeframe}: {str(e)}", "ERROR")
+
+@metrics.timed()
+def run_market_timeframe_stages(market: str, timeframe: str, context: PipelineContext, rates=None) -> Tuple[bool, Optional[str], str, Dict]:
+    """Run the updateorders stages for one market and timeframe, passing artifacts through the context.
+    rates are the task's prefetched candles with their fetch times, if any."""
     error_message = None
     status = "failed"
     process_messages = {}
@@ -4719,7 +4616,7 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
         log_and_print(f"Processing market: {market}, timeframe: {timeframe}", "INFO")
         
         # Fetch candle data
-        candle_data, json_dir, fetch_status = fetch_candle_data(market, timeframe)
+        candle_data, json_dir, fetch_status = fetch_candle_data(market, timeframe, context=context, rates=rates)
         process_messages["fetch_candle_data"] = {
             "status": fetch_status["status"],
             "message": fetch_status["message"],
@@ -4732,26 +4629,16 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
             return False, error_message, "failed", process_messages
         
         # Verify candle_data.json
-        candle_data_path = os.path.join(json_dir, 'candle_data.json')
-        if not os.path.exists(candle_data_path) or os.path.getsize(candle_data_path) == 0:
+        candle_data_content = context.get('candle_data.json')
+        if not candle_data_content:
             error_message = f"candle_data.json is missing or empty for {market} {timeframe}"
             log_and_print(error_message, "ERROR")
             process_messages["fetch_candle_data"]["warnings"] = process_messages["fetch_candle_data"].get("warnings", []) + [error_message]
             return False, error_message, "failed", process_messages
-        
-        try:
-            with open(candle_data_path, 'r') as f:
-                candle_data_content = json.load(f)
-            candle_count = len(candle_data_content)
-            process_messages["fetch_candle_data"]["verified_candle_count"] = candle_count
-        except json.JSONDecodeError as e:
-            error_message = f"Error decoding candle_data.json for {market} {timeframe}: {str(e)}"
-            log_and_print(error_message, "ERROR")
-            process_messages["fetch_candle_data"]["warnings"] = process_messages["fetch_candle_data"].get("warnings", []) + [error_message]
-            return False, error_message, "failed", process_messages
+        process_messages["fetch_candle_data"]["verified_candle_count"] = len(candle_data_content)
 
         # Save the most recent completed candle
-        success, error_msg, save_status, save_status_report = save_new_mostrecent_completed_candle(market, timeframe, json_dir)
+        success, error_msg, save_status, save_status_report = save_new_mostrecent_completed_candle(market, timeframe, json_dir, context=context)
         process_messages["save_new_mostrecent_completed_candle"] = {
             "status": save_status_report["status"],
             "message": save_status_report["message"],
@@ -4768,7 +4655,7 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
             process_messages["save_new_mostrecent_completed_candle"]["verified_candle_time"] = save_status_report["candle_time"]
 
         # Match most recent completed candle with candle data
-        success, error_msg, match_status, match_status_report = match_mostrecent_candle(market, timeframe, json_dir)
+        success, error_msg, match_status, match_status_report = match_mostrecent_candle(market, timeframe, json_dir, context=context)
         process_messages["match_mostrecent_candle"] = {
             "status": match_status_report["status"],
             "message": match_status_report["message"],
@@ -4783,20 +4670,15 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
             log_and_print(error_message, "ERROR")
             process_messages["match_mostrecent_candle"]["message"] = error_message
         else:
-            matched_candles_path = os.path.join(json_dir, 'matchedcandles.json')
-            if os.path.exists(matched_candles_path) and os.path.getsize(matched_candles_path) > 0:
-                try:
-                    with open(matched_candles_path, 'r') as f:
-                        matched_data = json.load(f)
-                    process_messages["match_mostrecent_candle"]["verified_match_result_status"] = matched_data.get('match_result_status', 'unknown')
-                    process_messages["match_mostrecent_candle"]["verified_candles_inbetween"] = matched_data.get('candles_inbetween', 0)
-                except json.JSONDecodeError as e:
-                    process_messages["match_mostrecent_candle"]["warnings"] = process_messages["match_mostrecent_candle"].get("warnings", []) + [f"Error decoding matchedcandles.json: {str(e)}"]
+            matched_data = context.get('matchedcandles.json')
+            if matched_data:
+                process_messages["match_mostrecent_candle"]["verified_match_result_status"] = matched_data.get('match_result_status', 'unknown')
+                process_messages["match_mostrecent_candle"]["verified_candles_inbetween"] = matched_data.get('candles_inbetween', 0)
             else:
                 process_messages["match_mostrecent_candle"]["warnings"] = process_messages["match_mostrecent_candle"].get("warnings", []) + [f"matchedcandles.json is missing or empty for {market} {timeframe}"]
 
         # Calculate candles in between
-        success, error_msg, calc_status, calc_status_report = calculate_candles_inbetween(market, timeframe, json_dir)
+        success, error_msg, calc_status, calc_status_report = calculate_candles_inbetween(market, timeframe, json_dir, context=context)
         process_messages["calculate_candles_inbetween"] = {
             "status": calc_status_report["status"],
             "message": calc_status_report["message"],
@@ -4810,20 +4692,15 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
             log_and_print(error_message, "ERROR")
             process_messages["calculate_candles_inbetween"]["message"] = error_message
         else:
-            inbetween_path = os.path.join(json_dir, 'candlesamountinbetween.json')
-            if os.path.exists(inbetween_path) and os.path.getsize(inbetween_path) > 0:
-                try:
-                    with open(inbetween_path, 'r') as f:
-                        inbetween_data = json.load(f)
-                    process_messages["calculate_candles_inbetween"]["verified_candles_inbetween"] = inbetween_data.get('candles in between', 0)
-                    process_messages["calculate_candles_inbetween"]["verified_plus_newmostrecent"] = inbetween_data.get('plus_newmostrecent', 0)
-                except json.JSONDecodeError as e:
-                    process_messages["calculate_candles_inbetween"]["warnings"] = process_messages["calculate_candles_inbetween"].get("warnings", []) + [f"Error decoding candlesamountinbetween.json: {str(e)}"]
+            inbetween_data = context.get('candlesamountinbetween.json')
+            if inbetween_data:
+                process_messages["calculate_candles_inbetween"]["verified_candles_inbetween"] = inbetween_data.get('candles in between', 0)
+                process_messages["calculate_candles_inbetween"]["verified_plus_newmostrecent"] = inbetween_data.get('plus_newmostrecent', 0)
             else:
                 process_messages["calculate_candles_inbetween"]["warnings"] = process_messages["calculate_candles_inbetween"].get("warnings", []) + [f"candlesamountinbetween.json is missing or empty for {market} {timeframe}"]
 
         # Match trendline with candle data
-        success, error_msg, trendline_status, match_status = match_trendline_with_candle_data(candle_data, json_dir, market, timeframe)
+        success, error_msg, trendline_status, match_status = match_trendline_with_candle_data(candle_data, json_dir, market, timeframe, context=context)
         process_messages["match_trendline_with_candle_data"] = {
             "status": match_status["status"],
             "message": match_status["message"],
@@ -4853,63 +4730,48 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
                 process_messages["match_trendline_with_candle_data"]["message"] = f"Failed to match pending orders: {error_msg}"
                 return False, error_msg, trendline_status, process_messages
         else:
-            pricecandle_path = os.path.join(json_dir, 'pricecandle.json')
-            if os.path.exists(pricecandle_path) and os.path.getsize(pricecandle_path) > 0:
-                try:
-                    with open(pricecandle_path, 'r') as f:
-                        pricecandle_data = json.load(f)
-                    process_messages["match_trendline_with_candle_data"]["verified_trendline_count"] = len(pricecandle_data)
-                except json.JSONDecodeError as e:
-                    process_messages["match_trendline_with_candle_data"]["warnings"] = process_messages["match_trendline_with_candle_data"].get("warnings", []) + [f"Error decoding pricecandle.json: {str(e)}"]
+            pricecandle_data = context.get('pricecandle.json')
+            if pricecandle_data:
+                process_messages["match_trendline_with_candle_data"]["verified_trendline_count"] = len(pricecandle_data)
             else:
                 process_messages["match_trendline_with_candle_data"]["warnings"] = process_messages["match_trendline_with_candle_data"].get("warnings", []) + [f"pricecandle.json is missing or empty for {market} {timeframe}"]
 
         # Fetch candles from after Breakout_parent to current price
-        success, error_msg, cabp_status, cabp_status_report = candleafterbreakoutparent_to_currentprice(market, timeframe, json_dir)
+        success, error_msg, cabp_status, cabp_status_report = candleafterbreakoutparent_to_currentprice(market, timeframe, json_dir, context=context)
         process_messages["candleafterbreakoutparent_to_currentprice"] = {
             "status": cabp_status_report["status"],
             "message": cabp_status_report["message"],
             "trendlines_processed": cabp_status_report["trendlines_processed"],
             "total_candles_fetched": cabp_status_report["total_candles_fetched"],
             "timestamp": cabp_status_report["timestamp"],
-            "warnings": cabp_status_report["warnings"]
+            "warnings": cabp_status_report["warnings"],
+            "invalid_markets": cabp_status_report.get("invalid_markets", {})
         }
         if not success:
             error_message = error_msg or f"Failed to fetch candles after Breakout_parent for {market} {timeframe}"
             log_and_print(error_message, "ERROR")
             process_messages["candleafterbreakoutparent_to_currentprice"]["message"] = error_message
         else:
-            cabp_path = os.path.join(json_dir, 'candlesafterbreakoutparent.json')
-            if os.path.exists(cabp_path) and os.path.getsize(cabp_path) > 0:
-                try:
-                    with open(cabp_path, 'r') as f:
-                        cabp_data = json.load(f)
-                    trendline_count = len(cabp_data)
-                    total_candles = sum(len(trendline.get('candles', [])) for trendline in cabp_data)
-                    process_messages["candleafterbreakoutparent_to_currentprice"]["verified_trendline_count"] = trendline_count
-                    process_messages["candleafterbreakoutparent_to_currentprice"]["verified_total_candles"] = total_candles
-                except json.JSONDecodeError as e:
-                    process_messages["candleafterbreakoutparent_to_currentprice"]["warnings"] = process_messages["candleafterbreakoutparent_to_currentprice"].get("warnings", []) + [f"Error decoding candlesafterbreakoutparent.json: {str(e)}"]
+            cabp_data = context.get('candlesafterbreakoutparent.json')
+            if cabp_data:
+                trendline_count = len(cabp_data)
+                total_candles = sum(len(trendline.get('candles', {}).get('time', [])) + 1 for trendline in cabp_data)
+                process_messages["candleafterbreakoutparent_to_currentprice"]["verified_trendline_count"] = trendline_count
+                process_messages["candleafterbreakoutparent_to_currentprice"]["verified_total_candles"] = total_candles
             else:
                 process_messages["candleafterbreakoutparent_to_currentprice"]["warnings"] = process_messages["candleafterbreakoutparent_to_currentprice"].get("warnings", []) + [f"candlesafterbreakoutparent.json is missing or empty for {market} {timeframe}"]
 
         # Calculate order holder prices with lot size and risk
-        if not getorderholderpriceswithlotsizeandrisk(market, timeframe, json_dir):
+        if not getorderholderpriceswithlotsizeandrisk(market, timeframe, json_dir, context=context):
             error_message = f"Failed to calculate order holder prices with lot size and risk for {market} {timeframe}"
             log_and_print(error_message, "ERROR")
             process_messages["getorderholderpriceswithlotsizeandrisk"] = error_message
         else:
-            output_json_path = os.path.join(json_dir, 'calculatedprices.json')
-            if os.path.exists(output_json_path) and os.path.getsize(output_json_path) > 0:
-                try:
-                    with open(output_json_path, 'r') as f:
-                        calculated_data = json.load(f)
-                    process_messages["getorderholderpriceswithlotsizeandrisk"] = (
-                        f"Calculated prices for {len(calculated_data)} trendlines for {market} {timeframe}"
-                    )
-                except json.JSONDecodeError as e:
-                    process_messages["getorderholderpriceswithlotsizeandrisk"] = f"Error decoding calculatedprices.json: {str(e)}"
-                    process_messages["getorderholderpriceswithlotsizeandrisk_warnings"] = [f"Error decoding calculatedprices.json: {str(e)}"]
+            calculated_data = context.get('calculatedprices.json')
+            if calculated_data:
+                process_messages["getorderholderpriceswithlotsizeandrisk"] = (
+                    f"Calculated prices for {len(calculated_data)} trendlines for {market} {timeframe}"
+                )
             else:
                 process_messages["getorderholderpriceswithlotsizeandrisk"] = (
                     f"No calculated prices saved for {market} {timeframe}"
@@ -4917,53 +4779,31 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
                 process_messages["getorderholderpriceswithlotsizeandrisk_warnings"] = [f"calculatedprices.json is missing or empty for {market} {timeframe}"]
 
         # Track breakeven, stoploss, and profit
-        if not PendingOrderUpdater(market, timeframe, json_dir):
+        if not PendingOrderUpdater(market, timeframe, json_dir, context=context):
             error_message = f"Failed to track breakeven, stoploss, and profit for {market} {timeframe}"
             log_and_print(error_message, "ERROR")
             process_messages["PendingOrderUpdater"] = error_message
         else:
-            pricecandle_path = os.path.join(json_dir, 'pricecandle.json')
-            if os.path.exists(pricecandle_path) and os.path.getsize(pricecandle_path) > 0:
-                try:
-                    with open(pricecandle_path, 'r') as f:
-                        pricecandle_data = json.load(f)
-                    contract_statuses = [t.get('contract status summary', {}).get('contract status', 'unknown') for t in pricecandle_data]
-                    process_messages["PendingOrderUpdater"] = (
-                        f"Tracked breakeven, stoploss, and profit for {len(pricecandle_data)} trendlines: {', '.join(set(contract_statuses))} for {market} {timeframe}"
-                    )
-                except json.JSONDecodeError as e:
-                    process_messages["PendingOrderUpdater"] = f"Error decoding pricecandle.json: {str(e)}"
-                    process_messages["PendingOrderUpdater_warnings"] = [f"Error decoding pricecandle.json: {str(e)}"]
+            pricecandle_data = context.get('pricecandle.json')
+            if pricecandle_data:
+                contract_statuses = [t.get('contract status summary', {}).get('contract status', 'unknown') for t in pricecandle_data]
+                process_messages["PendingOrderUpdater"] = (
+                    f"Tracked breakeven, stoploss, and profit for {len(pricecandle_data)} trendlines: {', '.join(set(contract_statuses))} for {market} {timeframe}"
+                )
             else:
                 process_messages["PendingOrderUpdater"] = f"No pricecandle data saved for {market} {timeframe}"
                 process_messages["PendingOrderUpdater_warnings"] = [f"pricecandle.json is missing or empty for {market} {timeframe}"]
 
         # Collect pending orders
-        if not collect_all_pending_orders(market, timeframe, json_dir):
+        # temp_pendingorders.json is aggregated by the parent once the pool has finished
+        if not collect_all_pending_orders(market, timeframe, json_dir, context=context, aggregate=False):
             error_message = f"Failed to collect pending orders for {market} {timeframe}"
             log_and_print(error_message, "ERROR")
             process_messages["collect_all_pending_orders"] = error_message
         else:
-            output_json_path = os.path.join(json_dir, 'contractpendingorders.json')
-            collective_pending_path = os.path.join(BASE_OUTPUT_FOLDER, 'temp_pendingorders.json')
-            pending_count = 0
-            all_pending_count = 0
-            if os.path.exists(output_json_path) and os.path.getsize(output_json_path) > 0:
-                try:
-                    with open(output_json_path, 'r') as f:
-                        contract_data = json.load(f)
-                    pending_count = len(contract_data)
-                except json.JSONDecodeError as e:
-                    process_messages["collect_all_pending_orders_warnings"] = [f"Error decoding contractpendingorders.json: {str(e)}"]
-            if os.path.exists(collective_pending_path) and os.path.getsize(collective_pending_path) > 0:
-                try:
-                    with open(collective_pending_path, 'r') as f:
-                        all_pending_data = json.load(f)
-                    all_pending_count = len(all_pending_data.get('orders', []))
-                except json.JSONDecodeError as e:
-                    process_messages["collect_all_pending_orders_warnings"] = process_messages.get("collect_all_pending_orders_warnings", []) + [f"Error decoding temp_pendingorders.json: {str(e)}"]
+            pending_count = len(context.get('contractpendingorders.json') or [])
             process_messages["collect_all_pending_orders"] = (
-                f"Collected {pending_count} pending orders for {market} {timeframe}, total {all_pending_count} in collective"
+                f"Collected {pending_count} pending orders for {market} {timeframe}"
             )
 
         # Generate markets order list status
@@ -5005,6 +4845,7 @@ def process_market_timeframe(market: str, timeframe: str) -> Tuple[bool, Optiona
         process_messages["error"] = error_message
         return False, error_message, "failed", process_messages
          
+@metrics.timed()
 def main():
     """Main function to process markets for all timeframes with valid verification.json, using markets from batchbybatch.json, saving all status to marketsstatus.json."""
     try:
@@ -5086,8 +4927,14 @@ def main():
         collect_executioner_orders_statuses = []
         markets_list_statuses = []
 
+        # One terminal session fetches every task's candles; the workers start from them
+        prefetched_rates = prefetch_candle_rates(tasks)
         with multiprocessing.Pool(processes=4) as pool:
-            results = pool.starmap(process_market_timeframe, tasks)
+            results = pool.starmap(process_market_timeframe, [(market, timeframe, prefetched_rates.get((market, timeframe))) for market, timeframe in tasks])
+
+        # Merge the per-task contractpendingorders.json files into temp_pendingorders.json once
+        aggregate_pending_orders()
+        merge_invalid_markets(results)
 
         # Collect status for each market-timeframe combination
         for (market, timeframe), (success, error_message, status, process_messages) in zip(tasks, results):
@@ -5365,7 +5212,6 @@ def main():
     except Exception as e:
         log_and_print(f"Error in main processing: {str(e)}", "ERROR")
     finally:
-        cancel_limitorders()
         log_and_print("===== Fetch and Process Candle Data Completed =====", "TITLE")
 
 if __name__ == "__main__":